@@ -122,7 +122,7 @@ const AdminDashboard = () => {
 
       if (response.ok) {
         const result = await response.json();
-        alert(`Success! Added ${urls.length} URLs and created ${result.data.applications_created} applications`);
+        alert(`Success! Added ${result.data.urls_added} URLs; applications are being created in the background (job ${result.data.fanout_job_id})`);
         setNewUrls('');
         loadJobUrls();
         loadStats();
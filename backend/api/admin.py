@@ -3,6 +3,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from auth.auth_middleware import get_current_active_user
 from database.models import UserResponse, APIResponse
 from database.connection import db
+from services.fanout_service import fanout_service
 from pydantic import BaseModel, validator
 from typing import List, Optional
 import uuid
@@ -126,29 +127,30 @@ async def add_job_urls(
         if not category:
             raise HTTPException(status_code=404, detail="Job category not found")
         
-        created_urls = []
-        for url in url_data.urls:
-            new_url = {
+        url_rows = [
+            {
                 "id": str(uuid.uuid4()),
                 "category_id": url_data.category_id,
                 "job_url": url,
                 "status": "active",
                 "uploaded_by": admin_user.email
             }
-            
-            created_url = await db.create_job_url(new_url)
-            if created_url:
-                created_urls.append(created_url)
+            for url in dict.fromkeys(url_data.urls)
+        ]
+        url_result = await db.create_job_urls_bulk(url_rows)
         
-        # Trigger automatic application creation
-        applications_created = await trigger_auto_applications(url_data.category_id, url_data.urls)
+        # Applications for every interested user are queued by a background job
+        job = fanout_service.start(url_data.category_id, url_data.urls)
         
         return APIResponse(
             success=True,
-            message=f"Added {len(created_urls)} URLs and created {applications_created} applications",
+            message=f"Added {url_result['inserted']} URLs; creating applications in the background (job {job['id']})",
             data={
-                "urls_added": len(created_urls),
-                "applications_created": applications_created,
+                "urls_added": url_result['inserted'],
+                "urls_skipped": url_result['skipped'],
+                "applications_created": job['applications_created'],
+                "fanout_job_id": job['id'],
+                "fanout_job": job,
                 "category": category["category_name"]
             }
         )
@@ -158,90 +160,46 @@ async def add_job_urls(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to add URLs: {str(e)}")
 
-# Auto-create applications for users
-async def trigger_auto_applications(category_id: str, job_urls: List[str]) -> int:
-    """Automatically create applications for users interested in this job category"""
-    try:
-        print(f'🔍 Looking for users interested in category: {category_id}')
-        
-        # Find users who want jobs in this category
-        interested_users = await db.get_users_by_job_category(category_id)
-        print(f'📋 Found {len(interested_users)} interested users')
-        
-        if not interested_users:
-            print('⚠️ No users found with this job category preference')
-            return 0
-        
-        applications_created = 0
-        
-        for user in interested_users:
-            user_id = user.get('user_id')
-            profile_id = user.get('profile_id')
-            
-            print(f'👤 Processing user: {user_id}')
-            print(f'   Email: {user.get("email", "Unknown")}')
-            print(f'   Profile: {user.get("profile_name", "Unknown")}')
-            print(f'   Profile ID from query: {profile_id}')
-            
-            # Validate we have a profile_id
-            if not profile_id:
-                print(f'⚠️ No profile_id found for user {user_id}, skipping')
-                continue
-            
-            # Create applications for each URL
-            for job_url in job_urls:
-                print(f'🎯 Creating application for: {job_url}')
-                
-                app_data = {
-                    'id': str(uuid.uuid4()),
-                    'user_id': user_id,
-                    'profile_id': profile_id,  # Use profile_id directly
-                    'job_url': job_url,
-                    'status': 'queued',
-                    'priority': 1,  # Higher priority for admin-added jobs
-                }
-                
-                print(f'📝 Application data: {app_data}')
-                
-                try:
-                    created_app = await db.create_application(app_data)
-                    if created_app:
-                        applications_created += 1
-                        print(f'✅ Created application for user {user_id[:8]}... → {job_url}')
-                    else:
-                        print(f'❌ create_application returned None for user {user_id}')
-                except Exception as app_error:
-                    print(f'❌ Error creating application: {app_error}')
-                    import traceback
-                    traceback.print_exc()
-        
-        print(f'🎯 Auto-created {applications_created} applications for {len(interested_users)} users')
-        return applications_created
-        
-    except Exception as e:
-        print(f'❌ Error in auto-application creation: {e}')
-        import traceback
-        traceback.print_exc()
-        return 0
 # Bulk operations
 @router.post("/bulk-applications")
 async def create_bulk_applications(
     request: BulkApplicationRequest,
     admin_user: UserResponse = Depends(require_admin_access())
 ):
-    """Create applications for all users interested in a job category"""
+    """Queue applications for all users interested in a job category (background job)"""
     try:
-        applications_created = await trigger_auto_applications(request.category_id, request.urls)
+        job = fanout_service.start(request.category_id, request.urls)
         
         return APIResponse(
             success=True,
-            message=f"Created {applications_created} applications",
-            data={"applications_created": applications_created}
+            message=f"Creating applications in the background (job {job['id']})",
+            data={"fanout_job_id": job['id'], "fanout_job": job}
         )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Bulk application creation failed: {str(e)}")
 
+@router.get("/fanout-jobs")
+async def list_fanout_jobs(admin_user: UserResponse = Depends(require_admin_access())):
+    """Recent application fan-out jobs with their progress counters"""
+    return {
+        "success": True,
+        "message": "Fan-out jobs retrieved successfully",
+        "data": fanout_service.list_jobs()
+    }
+
+@router.get("/fanout-jobs/{job_id}")
+async def get_fanout_job(job_id: str, admin_user: UserResponse = Depends(require_admin_access())):
+    """Progress of one application fan-out job"""
+    job = fanout_service.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Fan-out job not found")
+    return {
+        "success": True,
+        "message": f"Fan-out job is {job['status']}",
+        "data": job
+    }
+
 # Statistics for admin dashboard
 @router.get("/stats")
 async def get_admin_stats(admin_user: UserResponse = Depends(require_admin_access())):
@@ -282,7 +240,7 @@ async def test_admin():
         "features": [
             "Job category management",
             "Job URL management", 
-            "Auto-application creation",
+            "Auto-application creation (background fan-out jobs)",
             "User management",
             "Admin statistics"
         ]
@@ -309,6 +309,8 @@ async def solve_captcha(session_id: str):
         success = await db.update_captcha_status(session_id, 'solved', 'admin')
         
         if success:
+            if BOT_SERVICE_AVAILABLE:
+                await bot_service.notify_captcha_status(session_id, 'solved')
             return APIResponse(success=True, message="CAPTCHA marked as solved")
         else:
             raise HTTPException(status_code=400, detail="Failed to update CAPTCHA status")
@@ -324,6 +326,8 @@ async def skip_captcha(session_id: str):
         success = await db.update_captcha_status(session_id, 'skipped', 'admin')
         
         if success:
+            if BOT_SERVICE_AVAILABLE:
+                await bot_service.notify_captcha_status(session_id, 'skipped')
             return APIResponse(success=True, message="CAPTCHA skipped")
         else:
             raise HTTPException(status_code=400, detail="Failed to skip CAPTCHA")
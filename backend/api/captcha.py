@@ -101,6 +101,10 @@ async def solve_captcha(session_id: str, update_data: CaptchaSessionUpdate):
         if not success:
             raise HTTPException(status_code=400, detail="Failed to update CAPTCHA status")
         
+        if DEPS_AVAILABLE:
+            from services.bot_service import bot_service
+            await bot_service.notify_captcha_status(session_id, update_data.status)
+        
         return {"success": True, "message": "CAPTCHA status updated"}
         
     except HTTPException:
@@ -118,6 +122,10 @@ async def skip_captcha(session_id: str):
         if not success:
             raise HTTPException(status_code=400, detail="Failed to skip CAPTCHA")
         
+        if DEPS_AVAILABLE:
+            from services.bot_service import bot_service
+            await bot_service.notify_captcha_status(session_id, 'skipped')
+        
         return {"success": True, "message": "CAPTCHA skipped"}
         
     except HTTPException:
@@ -0,0 +1,88 @@
+# benchmarks/api_latency.py - Event-loop responsiveness while browsers are busy
+#
+# Usage (from backend/):  python -m benchmarks.api_latency [browsers]
+# Uses a fake driver whose page loads block for a fixed time, so no Chrome is needed.
+# A probe coroutine stands in for a /health request and measures how late the
+# event loop wakes it up while several browsers navigate concurrently.
+import asyncio
+import statistics
+import sys
+import time
+from bot.enhanced_browser_handler import EnhancedBrowserHandler
+
+PAGE_LOAD_SECONDS = 0.5
+PROBE_INTERVAL = 0.05
+
+
+class FakeDriver:
+    """Blocks like a real WebDriver command; nothing else"""
+
+    def __init__(self):
+        self.current_url = 'about:blank'
+
+    def get(self, url):
+        time.sleep(PAGE_LOAD_SECONDS)
+        self.current_url = url
+
+    def execute_script(self, script, *args):
+        # Readiness polls see a page that has long been loaded and idle
+        return {'now': 60000, 'readyState': 'complete', 'inflight': 0,
+                'lastNetwork': 0, 'lastMutation': 0, 'rect': None}
+
+    def quit(self):
+        pass
+
+
+class FakeBrowserHandler(EnhancedBrowserHandler):
+    def _setup_browser(self):
+        self.driver = FakeDriver()
+
+
+async def probe(stop: asyncio.Event, delays: list):
+    """Sleep PROBE_INTERVAL repeatedly and record how late each wake-up is"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        delays.append((time.perf_counter() - started - PROBE_INTERVAL) * 1000)
+
+
+async def measure(label: str, browsers: list, navigate):
+    stop = asyncio.Event()
+    delays = []
+    probe_task = asyncio.create_task(probe(stop, delays))
+    await asyncio.sleep(PROBE_INTERVAL)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[navigate(browser, i) for i, browser in enumerate(browsers)])
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await probe_task
+    delays.sort()
+    p95 = delays[int(len(delays) * 0.95) - 1] if len(delays) > 1 else delays[0]
+    print(f"   {label:<22} wall {elapsed:6.2f}s | loop lag median {statistics.median(delays):8.1f} ms, "
+          f"p95 {p95:8.1f} ms, max {delays[-1]:8.1f} ms ({len(delays)} probes)")
+
+
+async def on_loop(browser, i):
+    """Old behaviour: blocking WebDriver work executed directly on the event loop"""
+    browser._navigate_to_job(f"https://example.com/job/{i}", f"app-{i}")
+
+
+async def off_loop(browser, i):
+    await browser.navigate_to_job(f"https://example.com/job/{i}", f"app-{i}")
+
+
+async def run(count: int):
+    browsers = [FakeBrowserHandler(headless=True) for _ in range(count)]
+    try:
+        print(f"\n📊 Event-loop latency with {count} browser(s) navigating")
+        await measure('blocking on loop', browsers, on_loop)
+        await measure('browser executor', browsers, off_loop)
+    finally:
+        for browser in browsers:
+            await browser.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(run(int(sys.argv[1]) if len(sys.argv) > 1 else 4))
@@ -0,0 +1,60 @@
+# benchmarks/category_round_trips.py - Round trips per category lookup must not grow with the category
+#
+# Usage (from backend/):  python -m benchmarks.category_round_trips [max_users]
+# Serves categories of 1 .. max_users interested users from the PostgREST stand-in and
+# counts the requests get_users_by_job_category makes for each: one on a cold cache,
+# none while cached, one again after a profile write. Exits non-zero on any other count.
+import asyncio
+import os
+import sys
+
+from benchmarks.db_throughput import StandInServer
+
+
+def profile_rows(count: int) -> list:
+    return [{
+        'user_id': f'user-{i}',
+        'profile_id': f'profile-{i}',
+        'profile_name': 'Default',
+        'users': {'email': f'user{i}@example.com', 'name': f'User {i}', 'subscription_plan': 'free'}
+    } for i in range(count)]
+
+
+async def run(max_users: int):
+    server = StandInServer(latency=0.001)
+    base_url = server.start()
+    os.environ['SUPABASE_URL'] = base_url
+    os.environ.setdefault('SUPABASE_SERVICE_KEY', 'benchmark-key')
+
+    # Imported after the environment points settings at the stand-in
+    from database.connection import db
+
+    failures = 0
+    sizes = sorted({1, 10, max_users // 10 or 1, max_users})
+    print(f"\n📊 Requests per get_users_by_job_category call")
+    try:
+        for size in sizes:
+            server.rows = profile_rows(size)
+            category_id = f'category-{size}'
+            counts = []
+            for label, before_call in (('cold', None), ('cached', None), ('after profile write', db.invalidate_category_cache)):
+                if before_call:
+                    before_call()
+                before = server.requests
+                users = await db.get_users_by_job_category(category_id)
+                counts.append(server.requests - before)
+                if len(users) != size:
+                    print(f"   ❌ {size} users: got {len(users)} back ({label})")
+                    failures += 1
+            ok = counts == [1, 0, 1]
+            failures += 0 if ok else 1
+            print(f"   {'✅' if ok else '❌'} {size:>6} users: cold {counts[0]}, cached {counts[1]}, "
+                  f"after profile write {counts[2]}")
+    finally:
+        await db.close()
+    return failures
+
+
+if __name__ == "__main__":
+    max_users = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    sys.exit(1 if asyncio.run(run(max_users)) else 0)
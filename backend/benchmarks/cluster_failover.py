@@ -0,0 +1,121 @@
+# benchmarks/cluster_failover.py - Heartbeats, lease renewal and dead-node reclaim across worker processes
+#
+# Usage (from backend/):  python -m benchmarks.cluster_failover [workers] [applications]
+# A model of the failover logic, not the production path: worker processes share one SQLite
+# file (benchmarks/sqlite_queue.py stands in for the job_applications lease columns and the
+# bot_workers registry) and run a hand-written loop that heartbeats, renews and runs both
+# reapers the way ApplicationProcessor._heartbeat_forever / _reclaim_dead_nodes do. The
+# processor itself, PostgresNodeRegistry / RedisNodeRegistry and sql/002-006 are not run;
+# for that, start several `python -m workers.bot --always-on` against the real database
+# (BOT_NODE_REGISTRY=redis for Redis) and `kill -9` one (see workers/bot.py).
+# Each application takes longer than a lease, so it only survives through lease renewal. One worker is killed with
+# SIGKILL mid-application. Checks that every application completes exactly once, that no
+# live worker loses a lease, and that the dead worker's application is reclaimed through
+# its missed heartbeats before its lease would have run out. Exits non-zero otherwise.
+import multiprocessing
+import os
+import signal
+import sys
+import tempfile
+import time
+
+from bot.node_registry import is_dead
+from config import settings
+from benchmarks.sqlite_queue import SQLiteApplicationQueue
+
+HEARTBEAT_SECONDS = 0.25
+LEASE_SECONDS = 1.5
+PROCESSING_SECONDS = 2.5
+settings.bot_node_timeout_seconds = 1.0  # module level so spawned workers see it too
+
+
+def worker(path: str, worker_id: str, results):
+    queue = SQLiteApplicationQueue(path)
+    completed, lost, dead_reclaimed, lease_requeued = [], 0, 0, 0
+
+    def maintain(app_ids):
+        nonlocal lost, dead_reclaimed, lease_requeued
+        queue.heartbeat({'worker_id': worker_id, 'state': 'running', 'pid': os.getpid()})
+        if app_ids:
+            lost += len(app_ids) - queue.renew_leases(worker_id, app_ids, LEASE_SECONDS)
+        lease_requeued += queue.requeue_expired_leases()
+        for node in queue.get_nodes():
+            if node['worker_id'] != worker_id and is_dead(node):
+                queue.set_node_state(node['worker_id'], 'dead')
+                dead_reclaimed += queue.requeue_worker_applications(node['worker_id'])
+
+    while True:
+        maintain([])
+        batch = queue.claim_applications(worker_id, limit=1, lease_seconds=LEASE_SECONDS)
+        if not batch:
+            unfinished = queue.conn.execute(
+                "SELECT count(*) FROM job_applications WHERE status IN ('queued', 'processing')").fetchone()[0]
+            if not unfinished:
+                break
+            time.sleep(HEARTBEAT_SECONDS)  # someone else's (maybe a dead worker's) applications
+            continue
+        app_id = batch[0]['id']
+        finish_at = time.monotonic() + PROCESSING_SECONDS
+        while time.monotonic() < finish_at:
+            time.sleep(HEARTBEAT_SECONDS)
+            maintain([app_id])
+        if queue.renew_leases(worker_id, [app_id], LEASE_SECONDS):  # still ours
+            queue.update_status(app_id, 'completed')
+            completed.append(app_id)
+    queue.close()
+    results.put((worker_id, completed, lost, dead_reclaimed, lease_requeued))
+
+
+def run(workers: int, total: int) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'queue.db')
+        queue = SQLiteApplicationQueue(path)
+        queue.enqueue([{'job_url': f'https://example.com/job/{i}'} for i in range(total)])
+
+        print(f"\n📊 {workers} workers, {total} applications of {PROCESSING_SECONDS}s each, {LEASE_SECONDS}s leases, "
+              f"heartbeat every {HEARTBEAT_SECONDS}s, node timeout {settings.bot_node_timeout_seconds}s")
+        results = multiprocessing.Queue()
+        processes = {f'worker-{n}': multiprocessing.Process(target=worker, args=(path, f'worker-{n}', results))
+                     for n in range(workers)}
+        started = time.perf_counter()
+        for process in processes.values():
+            process.start()
+
+        # Kill worker-0 once it is in the middle of an application
+        victim = 'worker-0'
+        while not queue.conn.execute("SELECT 1 FROM job_applications WHERE worker_id = ? AND status = 'processing'",
+                                     (victim,)).fetchone():
+            time.sleep(0.05)
+        time.sleep(PROCESSING_SECONDS / 2)
+        os.kill(processes[victim].pid, signal.SIGKILL)
+        killed_at = time.perf_counter()
+        print(f"   💀 killed {victim} mid-application at {killed_at - started:.1f}s")
+
+        per_worker = {}
+        for _ in range(workers - 1):
+            worker_id, completed, lost, dead_reclaimed, lease_requeued = results.get(timeout=120)
+            per_worker[worker_id] = (completed, lost, dead_reclaimed, lease_requeued)
+        for process in processes.values():
+            process.join()
+        elapsed = time.perf_counter() - started
+
+        completed = [app_id for ids, *_ in per_worker.values() for app_id in ids]
+        lost = sum(entry[1] for entry in per_worker.values())
+        dead_reclaimed = sum(entry[2] for entry in per_worker.values())
+        lease_requeued = sum(entry[3] for entry in per_worker.values())
+        victim_state = next(node['state'] for node in queue.get_nodes() if node['worker_id'] == victim)
+        queue.close()
+
+    print(f"   {len(completed)} completed ({len(set(completed))} distinct) in {elapsed:.1f}s by "
+          f"{', '.join(f'{w}: {len(entry[0])}' for w, entry in sorted(per_worker.items()))}")
+    print(f"   {victim} marked {victim_state}; {dead_reclaimed} application(s) reclaimed from dead nodes, "
+          f"{lease_requeued} requeued on lease expiry, {lost} lease(s) lost by live workers")
+    ok = (len(completed) == len(set(completed)) == total and lost == 0 and victim_state == 'dead'
+          and dead_reclaimed >= 1 and lease_requeued == 0)
+    print(f"\n   {'✅' if ok else '❌'} every application completed once; the dead node's work was reclaimed by heartbeat")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    sys.exit(run(*(args + [3, 12][len(args):])))
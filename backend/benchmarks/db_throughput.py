@@ -0,0 +1,138 @@
+# benchmarks/db_throughput.py - Data-layer throughput under concurrent load
+#
+# Usage (from backend/):  python -m benchmarks.db_throughput [concurrency] [queries_per_task]
+# Starts a PostgREST stand-in (asyncio HTTP/1.1 with keep-alive, fixed per-request
+# latency) on its own thread, then runs the same lookups two ways:
+#   sync client      - the old path: supabase-py's sync client called inside async methods
+#   async data layer - DatabaseConnection on the pooled async client
+# A probe coroutine measures event-loop lag while the queries run.
+import asyncio
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+SERVER_LATENCY = 0.03
+PROBE_INTERVAL = 0.01
+ROW = {'id': 'app-1', 'user_id': 'user-1', 'status': 'queued', 'job_url': 'https://example.com/job/1'}
+
+
+class StandInServer:
+    """Answers every PostgREST request with the same JSON rows (default: one ROW) after SERVER_LATENCY seconds"""
+
+    def __init__(self, rows: list = None, latency: float = SERVER_LATENCY):
+        self.rows = rows if rows is not None else [ROW]
+        self.latency = latency
+        self.port = None
+        self.requests = 0
+        self.connections = 0
+        self._ready = threading.Event()
+        self._loop = None
+
+    def start(self) -> str:
+        threading.Thread(target=self._serve, daemon=True).start()
+        self._ready.wait()
+        return f"http://127.0.0.1:{self.port}"
+
+    def _serve(self):
+        self._loop = asyncio.new_event_loop()
+        server = self._loop.run_until_complete(asyncio.start_server(self._handle, '127.0.0.1', 0))
+        self.port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b'\r\n\r\n')
+                length = 0
+                for line in head.decode('latin-1').split('\r\n'):
+                    if line.lower().startswith('content-length:'):
+                        length = int(line.split(':', 1)[1])
+                if length:
+                    await reader.readexactly(length)
+                await asyncio.sleep(self.latency)
+                body = json.dumps(self.rows).encode()
+                content_range = f"0-{max(len(self.rows) - 1, 0)}/{len(self.rows)}".encode()
+                self.requests += 1
+                writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+                             b'Content-Range: ' + content_range + b'\r\nContent-Length: ' + str(len(body)).encode() +
+                             b'\r\n\r\n' + body)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+async def probe(stop: asyncio.Event, delays: list):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        delays.append((time.perf_counter() - started - PROBE_INTERVAL) * 1000)
+
+
+def percentile(values: list, fraction: float) -> float:
+    values = sorted(values)
+    return values[max(0, int(len(values) * fraction) - 1)]
+
+
+async def measure(label: str, lookup, concurrency: int, per_task: int):
+    latencies, delays = [], []
+    stop = asyncio.Event()
+    probe_task = asyncio.create_task(probe(stop, delays))
+
+    async def worker(n: int):
+        for i in range(per_task):
+            started = time.perf_counter()
+            await lookup(f"app-{n}-{i}")
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker(n) for n in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe_task
+
+    print(f"   {label:<18} {len(latencies) / elapsed:8.0f} req/s | latency p50 {statistics.median(latencies):7.1f} ms, "
+          f"p95 {percentile(latencies, 0.95):7.1f} ms | loop lag p95 {percentile(delays, 0.95) if delays else 0:7.1f} ms")
+
+
+async def run(concurrency: int, per_task: int):
+    server = StandInServer()
+    base_url = server.start()
+    os.environ['SUPABASE_URL'] = base_url
+    os.environ.setdefault('SUPABASE_SERVICE_KEY', 'benchmark-key')
+
+    # Imported after the environment points settings at the stand-in
+    from postgrest import SyncPostgrestClient
+    from database.connection import db
+
+    sync_client = SyncPostgrestClient(f"{base_url}/rest/v1", headers={'apikey': 'benchmark-key'})
+
+    async def sync_lookup(app_id: str):
+        """The old DatabaseConnection: an async method around a blocking execute()"""
+        sync_client.table('job_applications').select('*').eq('id', app_id).execute()
+
+    print(f"\n📊 {concurrency} concurrent tasks x {per_task} lookups, stand-in latency {SERVER_LATENCY * 1000:.0f} ms")
+    try:
+        before = server.connections
+        await measure('sync client', sync_lookup, concurrency, per_task)
+        print(f"   {'':<18} {server.connections - before} connection(s) opened")
+
+        before = server.connections
+        await measure('async data layer', db.get_application_by_id, concurrency, per_task)
+        stats = db.get_pool_stats()
+        print(f"   {'':<18} {server.connections - before} connection(s) opened, max {stats['max_in_flight']} in flight, "
+              f"avg queue wait {stats['avg_wait_ms']:.1f} ms")
+    finally:
+        sync_client.session.close()
+        await db.close()
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    asyncio.run(run(*(args + [50, 20][len(args):])))
@@ -0,0 +1,137 @@
+# benchmarks/domain_politeness.py - CAPTCHAs and throughput with and without the per-domain limiter
+#
+# Usage (from backend/):  python -m benchmarks.domain_politeness [slots] [ats_urls]
+# Simulated clock. ats_urls applications for aqueity.applytojob.com are claimed ahead of
+# 30 applications spread over 10 other hosts; `slots` workers take 90 s per application.
+# Host model: opening a session while 2 others are open on the host, or as the 8th start
+# there within a minute, hits a CAPTCHA that holds the slot for another 300 s.
+# Runs the queue straight through, then through bot/domain_limiter.py with the default
+# settings the way ApplicationProcessor._run_scheduler drives it: free slots first start held
+# applications whose host allows, then claim more in queue order while fewer than
+# DOMAIN_HOLD_LIMIT are held, and holds older than half a lease go back to the queue in their
+# old place (_requeue_stale_held). That last run is done once with claims in plain queue order
+# and once skipping busy_domains() (sql/008_claim_exclude_hosts.sql). Prints CAPTCHAs, when
+# the first application on another host started, and per-domain waits; exits non-zero unless
+# the limiter with host-skipping claims cuts CAPTCHAs, finishes no later, and (with more
+# slots than one host may fill) starts the other hosts' applications right away.
+import bisect
+import heapq
+import sys
+
+from bot.domain_limiter import DomainLimiter
+from config import settings
+
+SERVICE_SECONDS = 90
+CAPTCHA_SECONDS = 300
+BUSY_HOST = 'aqueity.applytojob.com'
+OTHER_HOSTS = [f'jobs.company{n}.com' for n in range(10)]
+
+
+def simulate(slots: int, ats_urls: int, limited: bool, skip_busy: bool = True) -> dict:
+    now = [0.0]
+    limiter = DomainLimiter(settings.domain_rate_per_minute, settings.domain_burst, settings.domain_max_in_flight,
+                            settings.domain_captcha_cooldown_seconds, clock=lambda: now[0]) if limited else None
+    stale_after = settings.bot_lease_seconds / 2
+    # (position in priority/age order, domain) - requeued holds go back to their old position
+    queue = list(enumerate([BUSY_HOST] * ats_urls + [OTHER_HOSTS[n % len(OTHER_HOSTS)] for n in range(30)]))
+    running = []  # (ends_at, domain)
+    open_sessions, recent_starts = {}, {}
+    captchas = {}
+    first_other_start = [None]
+    requeued = [0]
+
+    def start(domain: str):
+        if domain != BUSY_HOST and first_other_start[0] is None:
+            first_other_start[0] = now[0]
+        starts = [t for t in recent_starts.get(domain, []) if now[0] - t < 60]
+        captcha = open_sessions.get(domain, 0) >= 2 or len(starts) >= 7
+        recent_starts[domain] = starts + [now[0]]
+        open_sessions[domain] = open_sessions.get(domain, 0) + 1
+        if captcha:
+            captchas[domain] = captchas.get(domain, 0) + 1
+            if limiter:
+                limiter.record_captcha(domain)
+        heapq.heappush(running, (now[0] + SERVICE_SECONDS + (CAPTCHA_SECONDS if captcha else 0), domain))
+
+    def claim(limit: int, exclude: set) -> list:
+        claimed = [entry for entry in queue if entry[1] not in exclude][:limit]
+        for entry in claimed:
+            queue.remove(entry)
+        return claimed
+
+    def start_ready(limit: int) -> int:
+        ready = limiter.take_ready(limit) if limit > 0 else []
+        for domain, _ in ready:
+            start(domain)
+        return len(ready)
+
+    while queue or running or (limiter and limiter.held_count()):
+        if limiter:
+            progress = True
+            while progress:
+                for _, entry in limiter.take_stale(stale_after):
+                    bisect.insort(queue, entry)
+                    requeued[0] += 1
+                free = slots - len(running)
+                started = start_ready(free)
+                claimed = []
+                if free > started and limiter.held_count() < settings.domain_hold_limit:
+                    claimed = claim(free - started, set(limiter.busy_domains()) if skip_busy else set())
+                    for entry in claimed:
+                        limiter.hold(entry[1], entry)
+                    started += start_ready(free - started)
+                progress = bool(claimed or started)
+        else:
+            for _ in range(min(slots - len(running), len(queue))):
+                start(queue.pop(0)[1])
+
+        # Advance to the next finish, the next host token, or the next hold going stale
+        wait = limiter.next_ready_in() if limiter and len(running) < slots else None
+        stale = [items[0][0] + stale_after for items in limiter.held.values()] if limiter else []
+        next_times = ([running[0][0]] if running else []) + ([now[0] + wait] if wait else []) + \
+            ([min(stale) + 1e-6] if stale else [])
+        if not next_times:
+            continue
+        now[0] = min(next_times)
+        while running and running[0][0] <= now[0]:
+            _, domain = heapq.heappop(running)
+            open_sessions[domain] -= 1
+            if limiter:
+                limiter.finish(domain)
+
+    return {'finished_at': now[0], 'captchas': captchas, 'first_other_start': first_other_start[0],
+            'requeued': requeued[0], 'limiter': limiter.get_stats() if limiter else None}
+
+
+def run(slots: int, ats_urls: int) -> int:
+    print(f"\n📊 {slots} slots, {SERVICE_SECONDS}s per application, {ats_urls} URLs on {BUSY_HOST} "
+          f"ahead of 30 on {len(OTHER_HOSTS)} other hosts")
+    print(f"   limiter: {settings.domain_rate_per_minute:g}/min per host, burst {settings.domain_burst}, "
+          f"{settings.domain_max_in_flight} in flight, {settings.domain_captcha_cooldown_seconds}s pause after a CAPTCHA, "
+          f"{settings.domain_hold_limit} held, holds requeued after {settings.bot_lease_seconds / 2:.0f}s")
+    straight = simulate(slots, ats_urls, limited=False)
+    queue_order = simulate(slots, ats_urls, limited=True, skip_busy=False)
+    limited = simulate(slots, ats_urls, limited=True)
+
+    for label, result in (('straight through', straight), ('limiter, claims in queue order', queue_order),
+                          ('limiter, claims skip busy hosts', limited)):
+        first = result['first_other_start']
+        print(f"\n   {label}: done after {result['finished_at'] / 60:.1f} min, "
+              f"{sum(result['captchas'].values())} CAPTCHAs {result['captchas'] or ''}")
+        print(f"      first application on another host after {first / 60:.1f} min, "
+              f"{result['requeued']} stale holds requeued")
+    busy = limited['limiter']['domains'][BUSY_HOST]
+    print(f"   {BUSY_HOST} through the limiter: {busy['started']} started, avg wait {busy['avg_wait_seconds']}s, "
+          f"max wait {busy['max_wait_seconds']}s, CAPTCHA rate {busy['captcha_rate_percent']}%")
+
+    # Other hosts can only start at once if the busy host cannot fill every slot by itself
+    others_at_once = slots <= settings.domain_max_in_flight or limited['first_other_start'] < SERVICE_SECONDS
+    ok = ((sum(limited['captchas'].values()) < sum(straight['captchas'].values()) or not straight['captchas'])
+          and limited['finished_at'] <= straight['finished_at'] and others_at_once)
+    print(f"\n   {'✅' if ok else '❌'} fewer CAPTCHAs, no later finish, other hosts served from the start")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    sys.exit(run(*(args + [6, 30][len(args):])))
@@ -0,0 +1,119 @@
+# benchmarks/fake_llm.py - Local stand-in for the Gemini generateContent endpoint
+#
+# Usage (from backend/):  python -m benchmarks.fake_llm [--port 8765] [--latency-ms 300] [--tail-ms 4000]
+#                         [--tail-rate 0.05] [--error-rate 0] [--throttle-rate 0] [--hang-rate 0]
+# then run the bot with LLM_BASE_URL=http://127.0.0.1:8765/v1beta (any GEMINI_API_KEY) to
+# exercise bot/llm_gateway.py offline. Each request is delayed by the base latency (or the
+# tail latency for --tail-rate of them), fails with 503 (--error-rate), 429 + Retry-After
+# (--throttle-rate), or hangs for a minute (--hang-rate). POST /control with a JSON object
+# changes any of these on the fly ({"down": true} fails everything).
+# Answers: page batches (bot/page_resolver.py prompts) get each question's first option or a
+# placeholder; any other prompt gets "Yes".
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Tuple
+
+DEFAULTS = {
+    'latency_ms': 300,
+    'tail_ms': 4000,
+    'tail_rate': 0.05,
+    'error_rate': 0.0,
+    'throttle_rate': 0.0,
+    'hang_rate': 0.0,
+    'hang_seconds': 60,
+    'retry_after': 0.1,
+    'down': False
+}
+
+
+def fake_answer(prompt: str) -> str:
+    match = re.search(r'Questions:\n(\[.*?\n\])', prompt, re.S)
+    if not match:
+        return "Yes"
+    answers = [{'id': question['id'], 'answer': (question.get('options') or ['fake answer'])[0]}
+               for question in json.loads(match.group(1))]
+    return json.dumps({'answers': answers})
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+        if self.path.startswith('/control'):
+            server.config.update(body)
+            return self._send(200, server.config)
+
+        config = server.config
+        with server.lock:
+            server.counts['requests'] += 1
+        roll = random.random()
+        if config['down'] or roll < config['error_rate']:
+            return self._send(503, {'error': {'code': 503, 'message': 'fake overload'}})
+        roll -= config['error_rate']
+        if roll < config['throttle_rate']:
+            return self._send(429, {'error': {'code': 429, 'message': 'fake quota'}},
+                              {'Retry-After': str(config['retry_after'])})
+        roll -= config['throttle_rate']
+        if roll < config['hang_rate']:
+            time.sleep(config['hang_seconds'])
+        else:
+            tail = random.random() < config['tail_rate']
+            time.sleep((config['tail_ms'] if tail else config['latency_ms']) * random.uniform(0.8, 1.2) / 1000)
+
+        prompt = ''.join(part.get('text', '') for content in body.get('contents', []) for part in content.get('parts', []))
+        self._send(200, {'candidates': [{'content': {'parts': [{'text': fake_answer(prompt)}], 'role': 'model'},
+                                         'finishReason': 'STOP'}]})
+
+    def _send(self, status: int, payload: Dict[str, Any], headers: Dict[str, str] = None):
+        data = json.dumps(payload).encode()
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            with self.server.lock:
+                self.server.counts['abandoned'] += 1  # the client gave up (deadline, hedge won)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fake_llm(port: int = 0, **config) -> Tuple[ThreadingHTTPServer, str]:
+    """Serve in a background thread; returns (server, base_url for LLMGateway)"""
+    server = ThreadingHTTPServer(('127.0.0.1', port), FakeLLMHandler)
+    server.daemon_threads = True
+    server.config = {**DEFAULTS, **config}
+    server.counts = {'requests': 0, 'abandoned': 0}
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, name='fake-llm', daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1beta"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Gemini generateContent endpoint")
+    parser.add_argument('--port', type=int, default=8765)
+    for key, value in DEFAULTS.items():
+        if key != 'down':
+            parser.add_argument(f"--{key.replace('_', '-')}", type=float, default=value)
+    args = vars(parser.parse_args())
+    port = args.pop('port')
+    server, base_url = start_fake_llm(port, **args)
+    print(f"🤖 Fake LLM at {base_url} ({args})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# benchmarks/form_scan_commands.py - WebDriver command count: per-element scan vs JS snapshot
+#
+# Usage (from backend/):  python -m benchmarks.form_scan_commands [job_url]
+# Defaults to the multi_page_test.html fixture at the repo root.
+import asyncio
+import os
+import sys
+import time
+from collections import Counter
+from selenium.webdriver.common.by import By
+from bot.enhanced_browser_handler import EnhancedBrowserHandler
+
+FIXTURE_URL = 'file://' + os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'multi_page_test.html'))
+
+
+class CommandCounter:
+    """Counts every WebDriver HTTP command issued through a driver (element calls included)"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.commands = Counter()
+        self._execute = driver.execute
+        driver.execute = self._counting_execute
+
+    def _counting_execute(self, driver_command, params=None):
+        self.commands[driver_command] += 1
+        return self._execute(driver_command, params)
+
+    def reset(self):
+        self.commands.clear()
+
+    @property
+    def total(self) -> int:
+        return sum(self.commands.values())
+
+
+def legacy_scan(driver):
+    """The pre-snapshot scan: is_displayed plus several get_attribute calls per input"""
+    form_fields = []
+    for element in driver.find_elements(By.CSS_SELECTOR, "input, textarea, select"):
+        if not element.is_displayed():
+            continue
+        field_type = element.get_attribute('type') or 'text'
+        if field_type in ['hidden', 'submit', 'button']:
+            continue
+        form_fields.append({
+            'element': element,
+            'type': field_type,
+            'name': element.get_attribute('name') or element.get_attribute('id') or '',
+            'label': element.get_attribute('placeholder') or 'Unknown field',
+            'required': element.get_attribute('required') is not None
+        })
+    return form_fields
+
+
+async def run(job_url: str):
+    browser = EnhancedBrowserHandler(headless=True)
+    try:
+        browser.driver.get(job_url)
+        counter = CommandCounter(browser.driver)
+
+        started = time.perf_counter()
+        legacy_fields = legacy_scan(browser.driver)
+        legacy_ms = (time.perf_counter() - started) * 1000
+        legacy_commands = counter.total
+        legacy_breakdown = dict(counter.commands)
+
+        counter.reset()
+        started = time.perf_counter()
+        snapshot_fields = await browser.scan_form_elements(skip_captcha_check=True)
+        snapshot_ms = (time.perf_counter() - started) * 1000
+
+        print(f"\n📊 Form scan benchmark: {job_url}")
+        print(f"   Legacy scan:   {len(legacy_fields):3d} fields, {legacy_commands:4d} commands, {legacy_ms:8.1f} ms")
+        print(f"   Snapshot scan: {len(snapshot_fields):3d} fields, {counter.total:4d} commands, {snapshot_ms:8.1f} ms")
+        print(f"   Legacy breakdown:   {legacy_breakdown}")
+        print(f"   Snapshot breakdown: {dict(counter.commands)}")
+    finally:
+        browser.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(run(sys.argv[1] if len(sys.argv) > 1 else FIXTURE_URL))
@@ -0,0 +1,119 @@
+# benchmarks/llm_cache.py - Model calls saved by the persistent LLM answer cache
+#
+# Usage (from backend/):  python -m benchmarks.llm_cache [applications] [users]
+# Applications for a few dozen users draw their form pages from a pool of questions (labels
+# vary in case, spacing and required-field asterisks, options in order). Every page goes
+# through BatchFieldResolver with a fake model that counts the questions it is asked, first
+# without a cache, then with bot/llm_cache.py's SQLite cache, which is reopened halfway
+# through (a worker restart). Checks that no (question, profile version) pair reaches the
+# model twice, that a profile edit re-asks, and that the LRU bound and TTL hold.
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+from bot.llm_cache import SQLiteLLMCache, profile_version
+from bot.page_resolver import BatchFieldResolver
+
+QUESTIONS = [{'label': f"Question {n} about your background", 'type': 'text'} for n in range(80)] + \
+    [{'label': f"Pick one for topic {n}", 'type': 'select-one', 'options': ['Alpha', 'Beta', 'Gamma']}
+     for n in range(40)]
+
+
+class CountingModel:
+    def __init__(self):
+        self.calls = 0
+        self.questions = 0
+        self.repeats = 0  # (profile, question) pairs asked before
+        self._asked = set()
+
+    def generate_content(self, prompt: str):
+        questions = json.loads(re.search(r'Questions:\n(\[.*?\n\])', prompt, re.S).group(1))
+        profile = re.search(r'Candidate Profile:\n(.*?)\n\nQuestions', prompt, re.S).group(1)
+        self.calls += 1
+        self.questions += len(questions)
+        for question in questions:
+            asked = (profile, question['label'].strip(' *:').lower())
+            self.repeats += asked in self._asked
+            self._asked.add(asked)
+        answers = [{'id': q['id'], 'answer': (q.get('options') or ['some answer'])[0]} for q in questions]
+        return type('Response', (), {'text': json.dumps({'answers': answers})})()
+
+
+def vary(question: dict, rng: random.Random) -> dict:
+    """The same question as another ATS renders it"""
+    label = question['label']
+    label = rng.choice([label, label.upper(), f"  {label} *", f"{label}:"])
+    options = list(question.get('options') or [])
+    rng.shuffle(options)
+    return {**question, 'label': label, 'options': options or None}
+
+
+def run_applications(resolver: BatchFieldResolver, applications: int, users: int, rng: random.Random,
+                     start: int = 0):
+    for n in range(start, applications):
+        profile = {'user': n % users, 'name': f"User {n % users}"}
+        page = [vary(q, rng) for q in rng.sample(QUESTIONS, 8)]
+        fields = [{**field, 'id': f"q{i}"} for i, field in enumerate(page)]
+        resolver.resolve(fields, json.dumps(profile), profile_version=profile_version(profile))
+
+
+def run(applications: int, users: int) -> int:
+    quiet = open(os.devnull, 'w')
+    stdout, sys.stdout = sys.stdout, quiet
+    try:
+        uncached = CountingModel()
+        run_applications(BatchFieldResolver(uncached), applications, users, random.Random(1))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'llm_cache.sqlite3')
+            cached = CountingModel()
+            rng = random.Random(1)  # the same applications as without the cache
+            cache = SQLiteLLMCache(path, ttl_seconds=3600, max_entries=100000, max_bytes=50 * 1024 * 1024)
+            run_applications(BatchFieldResolver(cached, cache), applications // 2, users, rng)
+            cache.close()
+            restarted = SQLiteLLMCache(path, ttl_seconds=3600, max_entries=100000, max_bytes=50 * 1024 * 1024)
+            entries_after_restart = restarted.size()['entries']
+            resolver = BatchFieldResolver(cached, restarted)
+            run_applications(resolver, applications, users, rng, start=applications // 2)
+            stats = restarted.get_stats()
+
+            asked_before, repeats = cached.questions, cached.repeats
+            edited = {'user': 0, 'name': 'User 0', 'phone': 'new'}
+            resolver.resolve([{**QUESTIONS[0], 'id': 'q0'}], json.dumps(edited), profile_version=profile_version(edited))
+            reasked_after_edit = cached.questions - asked_before
+
+            bounded = SQLiteLLMCache(os.path.join(tmp, 'bounded.sqlite3'), ttl_seconds=0.2, max_entries=100,
+                                     max_bytes=50 * 1024 * 1024)
+            for n in range(500):
+                bounded.set(f"k{n}", f"value {n}")
+            bounded_entries = bounded.size()['entries']
+            recent_kept = bounded.get('k499') == 'value 499'
+            time.sleep(0.3)
+            expired = bounded.get('k499') is None
+    finally:
+        sys.stdout = stdout
+
+    distinct = len(QUESTIONS) * users
+    print(f"\n📊 {applications} applications, {users} users, 8 questions per page from a pool of {len(QUESTIONS)}")
+    print(f"   no cache:   {uncached.calls} model calls, {uncached.questions} questions asked, "
+          f"{uncached.repeats} of them asked before")
+    print(f"   with cache: {cached.calls} model calls, {asked_before} questions asked, {repeats} of them asked "
+          f"before ({distinct} possible question/profile pairs); hit rate after the restart {stats['hit_rate']:.0%}")
+    print(f"   {entries_after_restart} entries survived the restart; {stats['entries']} entries, "
+          f"{stats['bytes'] / 1024:.0f} KiB now")
+    print(f"   profile edit re-asked {reasked_after_edit} question(s); bounded cache holds {bounded_entries}/100 "
+          f"after 500 sets, TTL expiry {'works' if expired else 'FAILED'}")
+
+    ok = (repeats == 0 and asked_before <= distinct and entries_after_restart > 0
+          and reasked_after_edit == 1 and bounded_entries <= 100 and recent_kept and expired)
+    print(f"\n   {'✅' if ok else '❌'} no question reaches the model twice per profile version; bounds hold")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    sys.exit(run(*(args + [2000, 25][len(args):])))
@@ -0,0 +1,122 @@
+# benchmarks/llm_gateway_latency.py - LLM gateway behaviour against the fake Gemini endpoint
+#
+# Usage (from backend/):  python -m benchmarks.llm_gateway_latency [calls]
+# Runs bot/llm_gateway.py against benchmarks/fake_llm.py in four scenarios:
+#   tail      - 5% of responses 20x slower: latency percentiles without and with hedging
+#   hangs     - 10% of requests never answer: every call must finish within its deadline
+#   throttled - 30% of requests get 429 + Retry-After: retries must absorb (nearly) all of them
+#   outage    - every request 503s: the breaker must open and fail calls fast, then close
+#               again on its half-open probe once the endpoint recovers
+# Exits non-zero if any scenario misses its check.
+import asyncio
+import sys
+import time
+from typing import List
+
+from benchmarks.fake_llm import start_fake_llm
+from bot.llm_gateway import LLMGateway, LLMUnavailable
+
+CONCURRENCY = 8
+
+
+def percentile(values: List[float], pct: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * pct), len(values) - 1)] if values else 0
+
+
+async def drive(gateway: LLMGateway, calls: int, deadline: float = None):
+    """calls requests, CONCURRENCY at a time; returns (latencies of successes, failures)"""
+    latencies, failures = [], 0
+    limiter = asyncio.Semaphore(CONCURRENCY)
+
+    async def one():
+        nonlocal failures
+        async with limiter:
+            started = time.perf_counter()
+            try:
+                await gateway.generate("Are you authorized to work in the US?", deadline_seconds=deadline)
+                latencies.append(time.perf_counter() - started)
+            except LLMUnavailable:
+                failures += 1
+
+    await asyncio.gather(*(one() for _ in range(calls)))
+    return latencies, failures
+
+
+def scenario(base_url: str, calls: int, deadline: float = None, warmup: int = 0, **options):
+    gateway = LLMGateway('fake-key', base_url=base_url, max_concurrent=CONCURRENCY * 2, **options)
+    try:
+        if warmup:
+            asyncio.run(drive(gateway, warmup))  # a long-running gateway knows its p95 already
+        latencies, failures = asyncio.run(drive(gateway, calls, deadline))
+        return latencies, failures, gateway.get_stats()
+    finally:
+        gateway.close()
+
+
+def run(calls: int) -> int:
+    server, base_url = start_fake_llm(latency_ms=50, tail_ms=1000, tail_rate=0.05)
+    checks = []
+    try:
+        print(f"\n📊 tail: {calls} calls after 50 warm-up calls, 50ms typical, 5% at 1000ms")
+        tails = {}
+        for hedge in (False, True):
+            latencies, failures, stats = scenario(base_url, calls, warmup=50, hedge=hedge, hedge_min_seconds=0.1)
+            tails[hedge] = percentile(latencies, 0.99)
+            print(f"   hedging {'on ' if hedge else 'off'}: p50 {percentile(latencies, 0.5) * 1000:.0f}ms, "
+                  f"p95 {percentile(latencies, 0.95) * 1000:.0f}ms, p99 {tails[hedge] * 1000:.0f}ms, "
+                  f"{stats['hedges_sent']} hedges sent / {stats['hedges_won']} won, {failures} failed")
+        checks.append(('hedging cuts p99 latency at least in half', tails[True] * 2 <= tails[False]))
+
+        server.config.update(tail_rate=0, hang_rate=0.1, hang_seconds=30)
+        print(f"\n📊 hangs: {calls} calls, 10% never answer, 0.5s per-request timeout, 2s deadline")
+        started = time.perf_counter()
+        latencies, failures, stats = scenario(base_url, calls, deadline=2, timeout_seconds=0.5, hedge=False)
+        elapsed = time.perf_counter() - started
+        print(f"   {len(latencies)} answered (slowest {max(latencies) * 1000:.0f}ms), {failures} failed, "
+              f"{stats['retries']} retries, {elapsed:.1f}s total")
+        checks.append(('hung requests are retried within the deadline',
+                       failures == 0 and max(latencies) < 2.1 and stats['retries'] > 0))
+
+        server.config.update(hang_rate=0, throttle_rate=0.3, retry_after=0.05)
+        print(f"\n📊 throttled: {calls} calls, 30% get 429 (Retry-After 0.05s), up to 5 retries")
+        latencies, failures, stats = scenario(base_url, calls, hedge=False, max_retries=5)
+        print(f"   {len(latencies)} answered, {failures} failed, {stats['retries']} retries, "
+              f"p95 {percentile(latencies, 0.95) * 1000:.0f}ms")
+        checks.append(('429s are absorbed by retries', failures <= calls * 0.01 and stats['retries'] > 0))
+
+        server.config.update(throttle_rate=0, down=True)
+        print(f"\n📊 outage: every request fails with 503, breaker opens after 5 failed calls")
+        gateway = LLMGateway('fake-key', base_url=base_url, max_retries=1, hedge=False,
+                             breaker_threshold=5, breaker_reset_seconds=0.5)
+        try:
+            _, failures = asyncio.run(drive(gateway, 40))
+            stats = gateway.get_stats()
+            started = time.perf_counter()
+            _, fast_failures = asyncio.run(drive(gateway, 20))
+            fast_ms = (time.perf_counter() - started) * 1000
+            requests_before = server.counts['requests']
+            print(f"   {failures} failed, breaker opened {stats['breaker_opens']}x, "
+                  f"{stats['short_circuited']} calls short-circuited; 20 more failed in {fast_ms:.0f}ms")
+            server.config.update(down=False)
+            time.sleep(0.6)
+            asyncio.run(drive(gateway, 1))  # the half-open probe
+            latencies, failures = asyncio.run(drive(gateway, 10))
+            print(f"   after recovery: {len(latencies)} answered, {failures} failed, breaker {gateway.breaker.state}")
+            checks.append(('the breaker fails fast during an outage and closes after it',
+                           stats['short_circuited'] > 0 and fast_failures == 20 and fast_ms < 200
+                           and server.counts['requests'] > requests_before and failures == 0
+                           and gateway.breaker.state == 'closed'))
+        finally:
+            gateway.close()
+    finally:
+        server.shutdown()
+
+    print()
+    for name, ok in checks:
+        print(f"   {'✅' if ok else '❌'} {name}")
+    return 0 if all(ok for _, ok in checks) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(run(int(sys.argv[1]) if len(sys.argv) > 1 else 200))
@@ -0,0 +1,116 @@
+# benchmarks/page_llm_calls.py - AI round trips per form page: one per field vs one per page
+#
+# Usage (from backend/):  python -m benchmarks.page_llm_calls [latency_ms]
+# A fake Gemini model (fixed latency per generate_content, answers parsed from the prompt's
+# question list, one deliberately invalid choice) stands behind bot/page_resolver.py. The same
+# 15-field page goes through QASystem.get_page_answers twice: with the resolver called once
+# per open field (the old per-field Level 3) and once per page. Checks that the page takes a
+# single round trip, that invalid choices are dropped to Level 4 and that both runs agree.
+import asyncio
+import json
+import re
+import sys
+import time
+
+from bot.page_resolver import BatchFieldResolver
+from bot.qa_system import QASystem
+
+PROFILE = {
+    'personal_info': {'legal_first_name': 'Ada', 'legal_last_name': 'Lovelace', 'email': 'ada@example.com',
+                      'phone': '555-0100', 'city': 'London', 'country': 'United Kingdom'},
+    'experience': {'total_years_professional_experience': '9', 'salary_expectation': '$140,000'},
+    'eligibility': {'are_you_legally_authorized_to_work': 'Yes', 'will_you_require_sponsorship': 'No'},
+    'skills': ['Python', 'Threat modelling', 'Incident response']
+}
+
+PAGE = [
+    {'label': 'First Name', 'type': 'text'},
+    {'label': 'Last Name', 'type': 'text'},
+    {'label': 'Email', 'type': 'email'},
+    {'label': 'Phone', 'type': 'tel'},
+    {'label': 'Current employer', 'type': 'text'},
+    {'label': 'Current job title', 'type': 'text'},
+    {'label': 'Highest degree earned', 'type': 'select-one', 'options': ['High school', "Bachelor's", "Master's", 'PhD']},
+    {'label': 'Years of Python experience', 'type': 'select-one', 'options': ['0-2', '3-5', '6+']},
+    {'label': 'Preferred pronouns', 'type': 'select-one', 'options': ['She/her', 'He/him', 'They/them', 'Prefer not to say']},
+    {'label': 'How did you hear about us?', 'type': 'select-one', 'options': ['LinkedIn', 'Referral', 'Job board']},
+    {'label': 'Earliest start date', 'type': 'text'},
+    {'label': 'Notice period', 'type': 'text'},
+    {'label': 'Portfolio URL', 'type': 'url'},
+    {'label': 'Describe a security incident you handled', 'type': 'textarea'},
+    {'label': 'What excites you about this role?', 'type': 'textarea'},
+]
+
+
+class FakeModel:
+    """generate_content with a fixed latency; answers every question in the prompt"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+
+    def generate_content(self, prompt: str):
+        self.calls += 1
+        time.sleep(self.latency)
+        questions = json.loads(re.search(r'Questions:\n(\[.*?\n\])', prompt, re.S).group(1))
+        answers = []
+        for question in questions:
+            if question['label'] == 'How did you hear about us?':
+                answer = 'A friend mentioned it'  # not an option - must be rejected
+            elif question.get('options'):
+                answer = question['options'][-1].upper()  # right option, wrong case
+            else:
+                answer = f"answer to {question['label'].lower()}"
+            answers.append({'id': question['id'], 'answer': answer})
+        return type('Response', (), {'text': f"```json\n{json.dumps({'answers': answers})}\n```"})()
+
+
+class ResolverEngine:
+    """The two things QASystem needs from EnhancedAIEngine, with per-field or per-page batches"""
+
+    def __init__(self, model, per_field: bool):
+        self.model = model
+        self.resolver = BatchFieldResolver(model)
+        self.per_field = per_field
+
+    def resolve_page_fields(self, fields, profile_data):
+        context = json.dumps(profile_data)
+        batches = [[field] for field in fields] if self.per_field else [fields]
+        answers = {}
+        for batch in batches:
+            answers.update({field_id: result['answer']
+                            for field_id, result in self.resolver.resolve(batch, context).items()})
+        return answers
+
+
+async def run_page(latency: float, per_field: bool):
+    model = FakeModel(latency)
+    qa = QASystem(ai_engine=ResolverEngine(model, per_field))
+    started = time.perf_counter()
+    results = await qa.get_page_answers(PAGE, 'example.com', PROFILE, 'user-1', 'app-1')
+    return results, model.calls, time.perf_counter() - started, qa.ai_stats
+
+
+def run(latency_ms: int) -> int:
+    latency = latency_ms / 1000
+    per_field, per_field_calls, per_field_seconds, _ = asyncio.run(run_page(latency, per_field=True))
+    batched, batched_calls, batched_seconds, stats = asyncio.run(run_page(latency, per_field=False))
+
+    ai_fields = sum(1 for _, source in batched if source == 'ai_generated')
+    print(f"\n📊 {len(PAGE)}-field page, {latency_ms}ms per AI call")
+    print(f"   one call per field: {per_field_calls} AI calls, {per_field_seconds:.2f}s")
+    print(f"   one call per page:  {batched_calls} AI call, {batched_seconds:.2f}s "
+          f"({ai_fields} fields answered by AI, {stats['ai_fallbacks']} fell back)")
+    for field, (answer, source) in zip(PAGE, batched):
+        print(f"   {source:14} {field['label'][:40]:40} {str(answer)[:50]}")
+
+    by_label = {field['label']: result for field, result in zip(PAGE, batched)}
+    ok = (batched_calls == 1 and per_field_calls > 1 and per_field == batched
+          and by_label['Preferred pronouns'][0] == 'Prefer not to say'
+          and by_label['How did you hear about us?'][1] != 'ai_generated')
+    print(f"\n   {'✅' if ok else '❌'} one AI round trip per page, answers validated against each field's options")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(run(int(sys.argv[1]) if len(sys.argv) > 1 else 600))
@@ -0,0 +1,237 @@
+# benchmarks/question_index.py - Model calls saved by the similar-question level of the Q&A system
+#
+# Usage (from backend/):  python -m benchmarks.question_index [applications]
+# A user's Q&A cache holds one wording of a dozen screening questions. Their applications ask
+# the same questions in other ATSs' words (plus a company-specific essay question), and each
+# page goes through QASystem.get_page_answers with a fake AI engine that knows the right
+# answers and counts the questions it is asked - first without, then with the question index
+# of bot/question_index.py. The profile and keyword levels are switched off: they catch these
+# common questions already, and the index is for the ones their rules don't know. Then asks
+# counter-examples that share a cached question's wording but not its meaning (travel vs
+# relocate, 21 vs 18 years). Checks that the index takes questions off the model, never gives
+# a wrong answer, reuses an essay or answers a counter-example, survives a restart from its
+# .npz file, seeds only the user's own cache answers (not AI or default ones, not untagged
+# rows an older seed left in the file), picks up an edited cache answer on the next refresh,
+# and that a lookup in a 2000-question index stays well under a millisecond.
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+from bot.qa_system import QASystem
+from bot.question_index import QuestionIndex, QuestionIndexStore, same_subject
+
+YES_NO = ['Yes', 'No']
+# (answer, wordings) - the first wording is the one in the user's Q&A cache
+QUESTIONS = [
+    ('No', ["Will you now or in the future require sponsorship for employment visa status?",
+            "Do you now or will you in the future require visa sponsorship?",
+            "Will you require sponsorship to work in the US?",
+            "Will you now or in the future need immigration sponsorship?"]),
+    ('Yes', ["Are you legally authorized to work in the United States?",
+             "Are you authorized to work in the US?",
+             "Are you legally eligible to work in the United States?",
+             "Are you legally authorized to work in the country where this job is located?"]),
+    ('Yes', ["Are you willing to relocate?",
+             "Would you be willing to relocate for this role?",
+             "Are you willing to relocate to the job location?"]),
+    ('Yes', ["Are you at least 18 years of age?",
+             "Are you 18 years of age or older?",
+             "Are you at least 18 years old?"]),
+    ('Yes', ["Are you willing to undergo a background check?",
+             "Are you willing to submit to a background check?",
+             "Would you be willing to undergo a background check and drug screening?"]),
+    ('No', ["Are you subject to a non-compete agreement?",
+            "Are you currently subject to any non-compete or non-solicitation agreement?",
+            "Are you bound by a non-compete agreement?"]),
+    ('No', ["Have you previously worked for this company?",
+            "Have you ever worked for this company before?",
+            "Have you previously been employed by this company?"]),
+    ('Yes', ["Are you able to work on-site three days a week?",
+             "Are you able to work onsite 3 days per week?",
+             "Can you work on-site three days a week?"]),
+    ('No', ["Do you have a criminal conviction?",
+            "Have you ever been convicted of a crime?",
+            "Do you have any criminal convictions?"]),
+    ('Yes', ["Do you have a valid driver's license?",
+             "Do you hold a valid driver's license?",
+             "Do you possess a valid drivers license?"]),
+    ('$150,000', ["What are your salary expectations?",
+                  "What are your salary expectations?*",
+                  "Salary expectations"]),
+]
+COMPANIES = ['Stripe', 'Airbnb', 'Datadog', 'Cloudflare', 'Figma', 'Notion']
+# Close in wording to a cached question, different in meaning - must go to the model
+COUNTER_EXAMPLES = [
+    "Are you willing to travel?",  # relocate
+    "Do you have a valid passport?",  # driver's license
+    "Are you at least 21 years of age?",  # 18 years of age
+    "Are you authorized to work in Canada?",  # authorized to work in the US
+    "Are you willing to relocate to Canada?",
+    "Do you have a valid commercial driver's license?",
+    "Are you willing to undergo a credit check?",  # background check
+    "Have you previously worked for a competitor of this company?",
+]
+# (asked, answered) pairs whose answers must never stand in for each other
+DIFFERENT_SUBJECTS = [
+    ("Will you require sponsorship to work in the United States?", "Are you legally authorized to work in the United States?"),
+    ("Are you legally authorized to work in the United States?", "Will you require sponsorship to work in the US?"),
+    ("Are you willing to travel?", "Are you willing to relocate?"),
+    ("Do you have a valid passport?", "Do you have a valid driver's license?"),
+    ("Are you at least 21 years of age?", "Are you at least 18 years of age?"),
+]
+
+
+class RulesOff(QASystem):
+    def _get_profile_answer_fixed(self, field_label, profile_data):
+        return None
+
+    def _get_smart_answer(self, field_label, field_type, profile_data):
+        return None
+
+
+class FakeEngine:
+    """Knows every question's answer; counts what it is asked"""
+    model = 'fake'
+
+    def __init__(self):
+        self.truth = {wording: answer for answer, wordings in QUESTIONS for wording in wordings}
+        self.questions = 0
+
+    def resolve_page_fields(self, specs, profile):
+        self.questions += len(specs)
+        return {spec['id']: self.truth.get(spec['label'], f"Essay for {spec['label']}") for spec in specs}
+
+
+async def run_applications(qa: QASystem, applications: int, rng: random.Random):
+    """(answers checked, wrong answers, reused essays)"""
+    checked, wrong, essays = 0, 0, 0
+    for n in range(applications):
+        page = [(answer, rng.choice(wordings[1:])) for answer, wordings in rng.sample(QUESTIONS, 6)]
+        fields = [{'label': label, 'type': 'text' if answer.startswith('$') else 'select-one',
+                   'options': None if answer.startswith('$') else YES_NO} for answer, label in page]
+        fields.append({'label': f"Why do you want to work at {COMPANIES[n % len(COMPANIES)]}?", 'type': 'textarea'})
+        results = await qa.get_page_answers(fields, 'jobs.example.com', {'name': 'Ada'}, 'user-1', f"app-{n}")
+        for (answer, _), (given, source) in zip(page, results):
+            checked += 1
+            wrong += given != answer
+        essays += results[-1][1] == 'similar_question'
+    return checked, wrong, essays
+
+
+async def counter_examples(store: QuestionIndexStore) -> list:
+    """The counter-examples the index answered (should be none)"""
+    qa = RulesOff(ai_engine=FakeEngine(), question_index=store)
+    fields = [{'label': question, 'type': 'select-one', 'options': YES_NO} for question in COUNTER_EXAMPLES]
+    answers = await qa._get_similar_answers(fields, {'name': 'Ada'}, 'user-1')
+    return [(COUNTER_EXAMPLES[position], answer) for position, answer in answers.items()]
+
+
+async def cache_sync(directory: str) -> list:
+    """What went wrong keeping an index in step with its user's Q&A cache (should be nothing)"""
+    cache = [{'question_text': "Are you willing to relocate?", 'answer_text': 'Yes', 'answer_source': 'manual_input'},
+             {'question_text': "Do you have a valid driver's license?", 'answer_text': 'Yes',
+              'answer_source': 'ai_generated'},
+             {'question_text': "Are you willing to work overtime?", 'answer_text': 'Yes', 'source': 'default_value'}]
+
+    async def loader(user_id):
+        return cache
+
+    # A file from an older seed, with an untagged AI answer from the Q&A history
+    store = QuestionIndexStore(directory, loader=loader, refresh_seconds=0)
+    legacy = QuestionIndex()
+    legacy.add("Do you have a security clearance?", 'Yes', 'ai_generated')
+    legacy.save(store.path_for('user-2'))
+
+    problems = []
+    index = await store.for_user('user-2')
+    if index.questions != ["Are you willing to relocate?"]:
+        problems.append(f"seeded {index.questions}, expected only the user's own answer")
+    store.add('user-2', index, [{'question': "Do you have a security clearance?", 'answer': 'No',
+                                 'source': 'ai_generated', 'version': 'v1'}])
+    cache[0]['answer_text'] = 'No'
+    index = await store.for_user('user-2')
+    answers = dict(zip(index.questions, index.answers))
+    if answers.get("Are you willing to relocate?") != 'No':
+        problems.append("the edited cache answer did not reach the index")
+    if answers.get("Do you have a security clearance?") != 'No':
+        problems.append("the refresh lost an answer recorded since the seed")
+    return problems
+
+
+def seed_rows():
+    return [{'question_text': wordings[0], 'answer_text': answer, 'answer_source': 'qa_cache'}
+            for answer, wordings in QUESTIONS]
+
+
+def lookup_timing(entries: int):
+    """(µs per lookup, µs per insert) in an index of `entries` questions"""
+    rng = random.Random(3)
+    words = [w for _, wordings in QUESTIONS for wording in wordings for w in wording.lower().split()]
+    index = QuestionIndex()
+    started = time.perf_counter()
+    for n in range(entries):
+        index.add(' '.join(rng.choice(words) for _ in range(rng.randint(5, 12))) + f" {n}", 'Yes')
+    insert_us = (time.perf_counter() - started) / entries * 1e6
+    index.search('warm up')  # the lazy IDF reweighting after the inserts
+    started = time.perf_counter()
+    for _ in range(1000):
+        index.search(QUESTIONS[0][1][1], k=3)
+    return (time.perf_counter() - started) / 1000 * 1e6, insert_us
+
+
+def run(applications: int) -> int:
+    quiet = open(os.devnull, 'w')
+    stdout, sys.stdout = sys.stdout, quiet
+    try:
+        plain_engine = FakeEngine()
+        plain = asyncio.run(run_applications(RulesOff(ai_engine=plain_engine), applications, random.Random(1)))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            async def loader(user_id):
+                return seed_rows()
+
+            indexed_engine = FakeEngine()
+            store = QuestionIndexStore(tmp, loader=loader)
+            rng = random.Random(1)
+            first = asyncio.run(run_applications(
+                RulesOff(ai_engine=indexed_engine, question_index=store), applications // 2, rng))
+            asked_before_restart = indexed_engine.questions
+            reused_counter_examples = asyncio.run(counter_examples(store))
+            reused_counter_examples += [(asked, answered) for asked, answered in DIFFERENT_SUBJECTS
+                                        if same_subject(asked, answered)]
+
+            restarted = QuestionIndexStore(tmp, loader=None)  # must come back from the .npz file
+            second = asyncio.run(run_applications(
+                RulesOff(ai_engine=indexed_engine, question_index=restarted), applications - applications // 2, rng))
+            stats = restarted.get_stats()
+            sync_problems = asyncio.run(cache_sync(tmp))
+        lookup_us, insert_us = lookup_timing(2000)
+    finally:
+        sys.stdout = stdout
+
+    checked, wrong, essays = (a + b for a, b in zip(first, second))
+    asked_after_restart = indexed_engine.questions - asked_before_restart
+    print(f"\n📊 {applications} applications, 6 reworded screening questions + 1 essay per page, "
+          f"{len(QUESTIONS)} questions in the Q&A cache")
+    print(f"   no index:   {plain_engine.questions} questions asked, {plain[1]} wrong answers")
+    print(f"   with index: {indexed_engine.questions} questions asked ({asked_after_restart} after the restart, "
+          f"{stats['loaded_from_disk']} index loaded from disk), {wrong} wrong of {checked}, {essays} essays reused")
+    print(f"   counter-examples answered from the index: {len(reused_counter_examples)} of {len(COUNTER_EXAMPLES) + len(DIFFERENT_SUBJECTS)}"
+          + ''.join(f"\n      ❌ {question} -> {answer}" for question, answer in reused_counter_examples))
+    print(f"   Q&A cache sync: {'ok' if not sync_problems else '; '.join(sync_problems)}")
+    print(f"   lookups in a 2000-question index: {lookup_us:.0f}µs each, inserts {insert_us:.0f}µs each")
+
+    essay_questions = applications  # the essay always reaches the model
+    ok = (wrong == 0 and essays == 0 and plain[1] == 0 and stats['loaded_from_disk'] == 1
+          and not reused_counter_examples and not sync_problems
+          and indexed_engine.questions <= essay_questions + plain_engine.questions // 4 and lookup_us < 1000)
+    print(f"\n   {'✅' if ok else '❌'} reworded questions answered from the index, none wrongly, "
+          f"no counter-example reused, in step with the cache; fast lookups")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(run(int(sys.argv[1]) if len(sys.argv) > 1 else 200))
@@ -0,0 +1,76 @@
+# benchmarks/queue_claims.py - Several workers draining one queue must never share an application
+#
+# Usage (from backend/):  python -m benchmarks.queue_claims [workers] [applications]
+# Runs the SQLite model of the claim functions (benchmarks/sqlite_queue.py) with one
+# worker process per slot against a shared file, then checks that every application
+# was claimed exactly once and that an expired lease is requeued by the reaper.
+# Exits non-zero if either check fails. This checks the claim logic, not sql/002 itself:
+# against Postgres, run several `python -m workers.bot --always-on` instead.
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.sqlite_queue import SQLiteApplicationQueue
+
+CLAIM_BATCH = 3
+
+
+def worker(path: str, worker_id: str, results):
+    queue = SQLiteApplicationQueue(path)
+    claimed = []
+    while True:
+        batch = queue.claim_applications(worker_id, limit=CLAIM_BATCH, lease_seconds=60)
+        if not batch:
+            break
+        for application in batch:
+            time.sleep(0.001)  # "process" it
+            queue.update_status(application['id'], 'completed')
+            claimed.append(application['id'])
+    queue.close()
+    results.put((worker_id, claimed))
+
+
+def run(workers: int, total: int) -> int:
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'queue.db')
+        queue = SQLiteApplicationQueue(path)
+        queue.enqueue([{'job_url': f'https://example.com/job/{i}', 'priority': i % 3} for i in range(total)])
+
+        print(f"\n📊 {workers} workers claiming {total} applications, {CLAIM_BATCH} per claim")
+        results = multiprocessing.Queue()
+        started = time.perf_counter()
+        processes = [multiprocessing.Process(target=worker, args=(path, f'worker-{n}', results)) for n in range(workers)]
+        for process in processes:
+            process.start()
+        per_worker = dict(results.get() for _ in processes)
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - started
+
+        claimed = [app_id for ids in per_worker.values() for app_id in ids]
+        duplicates = len(claimed) - len(set(claimed))
+        ok = duplicates == 0 and len(claimed) == total
+        failures += 0 if ok else 1
+        print(f"   {'✅' if ok else '❌'} {len(claimed)} claimed, {len(set(claimed))} distinct, {duplicates} claimed twice "
+              f"in {elapsed:.2f}s ({', '.join(f'{w}: {len(ids)}' for w, ids in sorted(per_worker.items()))})")
+
+        # A worker that dies mid-application: its lease runs out and the reaper requeues it
+        queue.enqueue([{'job_url': 'https://example.com/job/abandoned'}])
+        abandoned = queue.claim_applications('worker-dead', limit=1, lease_seconds=0)
+        time.sleep(0.01)
+        requeued = queue.requeue_expired_leases()
+        reclaimed = queue.claim_applications('worker-alive', limit=1)
+        ok = requeued == 1 and [a['id'] for a in reclaimed] == [a['id'] for a in abandoned]
+        failures += 0 if ok else 1
+        print(f"   {'✅' if ok else '❌'} expired lease requeued: {requeued}, reclaimed by "
+              f"{reclaimed[0]['worker_id'] if reclaimed else 'nobody'} (claim #{reclaimed[0]['claim_count'] if reclaimed else 0})")
+        queue.close()
+    return failures
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    sys.exit(1 if run(*(args + [4, 500][len(args):])) else 0)
@@ -0,0 +1,94 @@
+# benchmarks/queue_fairness.py - Queue wait per plan: FIFO claims vs fair-share claims
+#
+# Usage (from backend/):  python -m benchmarks.queue_fairness [slots] [bulk_urls]
+# One free user queues bulk_urls applications just before 10 free, 3 pro and 2
+# enterprise users queue 10 each. The queue is drained by `slots` workers that
+# take 60 s per application, first with priority/age claims, then with
+# fair-share claims (the SQLite model in benchmarks/sqlite_queue.py, same ordering
+# as sql/004_fair_share_claims.sql - the SQL function itself is not run). Prints
+# queue-wait percentiles per group and exits non-zero unless fair share cuts the
+# small users' p90 wait and the p90 waits rank enterprise <= pro <= free.
+import os
+import sys
+import tempfile
+import time
+
+from bot.queue_metrics import QueueWaitTracker, parse_plan_weights
+from benchmarks.sqlite_queue import SQLiteApplicationQueue
+
+SERVICE_SECONDS = 60
+WEIGHTS = parse_plan_weights('free:1,pro:2,enterprise:4')
+
+
+def build_queue(path: str, bulk_urls: int) -> dict:
+    queue = SQLiteApplicationQueue(path)
+    plans = {'bulk-user': 'free'}
+    plans.update({f'free-{n}': 'free' for n in range(10)})
+    plans.update({f'pro-{n}': 'pro' for n in range(3)})
+    plans.update({f'enterprise-{n}': 'enterprise' for n in range(2)})
+    queue.add_users(plans)
+
+    started = 1_000_000.0
+    applications = [{'user_id': 'bulk-user', 'job_url': f'https://example.com/bulk/{i}', 'created_at': started + i * 0.001}
+                    for i in range(bulk_urls)]
+    small_users = [user for user in plans if user != 'bulk-user']
+    applications += [{'user_id': user, 'job_url': f'https://example.com/{user}/{i}', 'created_at': started + 1 + i * 0.01 + n * 0.0001}
+                     for i in range(10) for n, user in enumerate(small_users)]
+    queue.enqueue(applications)
+    queue.close()
+    return plans
+
+
+def drain(path: str, slots: int, plans: dict, plan_weights: dict = None) -> dict:
+    """Simulated clock: the i-th claimed application starts when a slot frees up"""
+    queue = SQLiteApplicationQueue(path)
+    waits = {}
+    started = 1_000_001.0  # everything is queued by now
+    claimed = 0
+    while True:
+        batch = queue.claim_applications('worker', limit=slots, lease_seconds=3600, plan_weights=plan_weights)
+        if not batch:
+            break
+        for application in batch:
+            start_time = started + (claimed // slots) * SERVICE_SECONDS
+            user = application['user_id']
+            group = 'bulk user (free)' if user == 'bulk-user' else plans[user]
+            waits.setdefault(group, []).append(start_time - application['created_at'])
+            claimed += 1
+    queue.close()
+    return {group: sorted(values) for group, values in waits.items()}
+
+
+def report(label: str, waits: dict):
+    print(f"\n   {label}")
+    for group in ('enterprise', 'pro', 'free', 'bulk user (free)'):
+        values = waits.get(group, [])
+        print(f"   {group:<18} {len(values):>4} apps | wait p50 {QueueWaitTracker.percentile(values, 0.5) / 60:7.1f} min, "
+              f"p90 {QueueWaitTracker.percentile(values, 0.9) / 60:7.1f} min, max {(values[-1] if values else 0) / 60:7.1f} min")
+
+
+def run(slots: int, bulk_urls: int) -> int:
+    print(f"\n📊 {slots} slots, {SERVICE_SECONDS}s per application, one user queues {bulk_urls} URLs ahead of 15 others")
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+        for label, weights in (('priority + age (FIFO)', None), (f'fair share {WEIGHTS}', WEIGHTS)):
+            path = os.path.join(tmp, f"{'fair' if weights else 'fifo'}.db")
+            plans = build_queue(path, bulk_urls)
+            started = time.perf_counter()
+            results[label] = drain(path, slots, plans, weights)
+            report(f"{label} - claims took {time.perf_counter() - started:.2f}s", results[label])
+
+    fifo, fair = results.values()
+    fifo_p90 = QueueWaitTracker.percentile(fifo['free'], 0.9)
+    fair_p90 = QueueWaitTracker.percentile(fair['free'], 0.9)
+    ordered = (QueueWaitTracker.percentile(fair['enterprise'], 0.9) <= QueueWaitTracker.percentile(fair['pro'], 0.9)
+               <= fair_p90)
+    ok = fair_p90 < fifo_p90 and ordered
+    print(f"\n   {'✅' if ok else '❌'} small free users' p90 wait {fifo_p90 / 60:.1f} -> {fair_p90 / 60:.1f} min; "
+          f"plans ordered by weight: {ordered}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    sys.exit(run(*(args + [4, 500][len(args):])))
@@ -0,0 +1,119 @@
+# benchmarks/single_flight.py - Identical AI questions asked in parallel by several applications
+#
+# Usage (from backend/):  python -m benchmarks.single_flight [applications] [latency_ms]
+# Several applications for the same profile reach the same ATS at once (one thread each, like
+# the processor's slots) and each page asks the shared screening questions plus one question of
+# its own. A fake model with a fixed latency counts the questions it is asked. Runs once without
+# and once with bot/single_flight.py coalescing (no answer cache, so only in-flight sharing
+# counts). Checks that each shared question is asked once, that every application still gets
+# every answer, and that a failed leader's error reaches its waiters.
+import json
+import re
+import sys
+import threading
+import time
+
+from bot.page_resolver import BatchFieldResolver
+from bot.single_flight import SingleFlight
+
+PROFILE = json.dumps({'eligibility': {'will_you_require_sponsorship': 'No'}, 'name': 'Ada'})
+SHARED = [
+    {'label': 'Will you now or in the future require sponsorship?', 'type': 'select-one', 'options': ['Yes', 'No']},
+    {'label': 'Are you legally authorized to work in the US?', 'type': 'select-one', 'options': ['Yes', 'No']},
+    {'label': 'Desired salary', 'type': 'text'},
+]
+
+
+class SlowModel:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+        self.questions = {}
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt: str):
+        questions = json.loads(re.search(r'Questions:\n(\[.*?\n\])', prompt, re.S).group(1))
+        with self._lock:
+            self.calls += 1
+            for question in questions:
+                self.questions[question['label']] = self.questions.get(question['label'], 0) + 1
+        time.sleep(self.latency)
+        answers = [{'id': q['id'], 'answer': (q.get('options') or ['$150,000'])[-1]} for q in questions]
+        return type('Response', (), {'text': json.dumps({'answers': answers})})()
+
+
+def run_wave(applications: int, latency: float, flight):
+    model = SlowModel(latency)
+    resolver = BatchFieldResolver(model, flight=flight)
+    start = threading.Barrier(applications)
+    results = [None] * applications
+
+    def application(n):
+        fields = [{**field, 'id': f"q{i}"} for i, field in enumerate(SHARED)] + \
+            [{'label': f"Why do you want to work on team {n}?", 'type': 'text', 'id': 'own'}]
+        start.wait()
+        results[n] = resolver.resolve(fields, PROFILE)
+
+    threads = [threading.Thread(target=application, args=(n,)) for n in range(applications)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return model, results, time.perf_counter() - started
+
+
+def run(applications: int, latency_ms: int) -> int:
+    latency = latency_ms / 1000
+    flight = SingleFlight()
+    plain, plain_results, plain_seconds = run_wave(applications, latency, None)
+    shared, shared_results, shared_seconds = run_wave(applications, latency, flight)
+    stats = flight.get_stats()
+
+    # A leader's failure fans out to its waiters too
+    failing = SingleFlight()
+    gate = threading.Event()
+    errors = []
+
+    def boom():
+        gate.wait()
+        raise TimeoutError("model did not answer")
+
+    def caller():
+        try:
+            failing.do('sponsorship', boom)
+        except TimeoutError as e:
+            errors.append(e)
+
+    callers = [threading.Thread(target=caller) for _ in range(5)]
+    for thread in callers:
+        thread.start()
+    while failing.get_stats()['leaders'] + failing.get_stats()['coalesced'] < 5:
+        time.sleep(0.01)
+    gate.set()
+    for thread in callers:
+        thread.join()
+
+    sponsorship = SHARED[0]['label']
+    print(f"\n📊 {applications} parallel applications, {len(SHARED)} shared questions + 1 own each, "
+          f"{latency_ms}ms per model call")
+    print(f"   without single-flight: {plain.calls} calls, {sum(plain.questions.values())} questions, "
+          f"'{sponsorship[:30]}...' asked {plain.questions[sponsorship]}x, {plain_seconds:.2f}s")
+    print(f"   with single-flight:    {shared.calls} calls, {sum(shared.questions.values())} questions, "
+          f"'{sponsorship[:30]}...' asked {shared.questions[sponsorship]}x, {shared_seconds:.2f}s; {stats['coalesced']} of "
+          f"{stats['leaders'] + stats['coalesced']} question requests coalesced")
+    print(f"   failed leader: {len(errors)}/5 callers got its error ({failing.get_stats()['coalesced']} coalesced)")
+
+    complete = all(len(result) == len(SHARED) + 1 for result in shared_results)
+    same = all(result[f"q{i}"]['answer'] == plain_results[0][f"q{i}"]['answer']
+               for result in shared_results for i in range(len(SHARED)))
+    ok = (all(shared.questions[q['label']] == 1 for q in SHARED) and complete and same
+          and stats['coalesced'] == len(SHARED) * (applications - 1) and stats['in_flight'] == 0
+          and len(errors) == 5)
+    print(f"\n   {'✅' if ok else '❌'} each shared question asked once; every application got every answer")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    sys.exit(run(*(args + [8, 300][len(args):])))
@@ -0,0 +1,181 @@
+# benchmarks/sqlite_queue.py - SQLite model of the queue claim, lease and worker-registry SQL
+#
+# Used only by the queue benchmarks. It re-implements the logic of sql/002_queue_claims.sql,
+# 004_fair_share_claims.sql and 005/006 (bot_workers heartbeats) in SQLite so several local
+# processes can share a queue without Postgres. It is a model: the real SQL functions, the
+# PostgREST calls in database/connection.py and the node registries are not exercised here.
+import json
+import sqlite3
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import List, Dict, Any
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS job_applications (
+    id TEXT PRIMARY KEY,
+    user_id TEXT,
+    profile_id TEXT,
+    job_url TEXT,
+    status TEXT NOT NULL DEFAULT 'queued',
+    priority INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    worker_id TEXT,
+    lease_expires_at REAL,
+    claimed_at REAL,
+    claim_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS job_applications_queue_idx ON job_applications (status, priority DESC, created_at);
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    subscription_plan TEXT NOT NULL DEFAULT 'free'
+);
+CREATE TABLE IF NOT EXISTS bot_workers (
+    worker_id TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    last_seen_at TEXT NOT NULL,
+    node TEXT
+);
+"""
+
+FAIR_CLAIM = """
+WITH weights(plan, weight) AS (VALUES {weights}),
+served AS (
+    SELECT user_id, count(*) AS recent FROM job_applications WHERE claimed_at > ? GROUP BY user_id
+),
+ranked AS (
+    SELECT a.id, a.priority, a.created_at,
+           -- integer ceil(n / w)
+           (COALESCE(s.recent, 0) + row_number() OVER (PARTITION BY a.user_id, a.priority ORDER BY a.created_at)
+            + COALESCE(w.weight, 1) - 1) / COALESCE(w.weight, 1) AS round
+    FROM job_applications a
+    LEFT JOIN users u ON u.id = a.user_id
+    LEFT JOIN weights w ON w.plan = u.subscription_plan
+    LEFT JOIN served s ON s.user_id = a.user_id
+    WHERE a.status = 'queued'
+)
+UPDATE job_applications
+SET status = 'processing', worker_id = ?, lease_expires_at = ?, claimed_at = ?, claim_count = claim_count + 1
+WHERE id IN (SELECT id FROM ranked ORDER BY priority DESC, round, created_at LIMIT ?)
+RETURNING *
+"""
+
+
+class SQLiteApplicationQueue:
+    """claim_queued_applications[_fair] / requeue_expired_leases (sql/002 and 004), lease
+    renewal and the bot_workers node registry (sql/005 and 006) on SQLite.
+
+    SQLite has no row locks, so SKIP LOCKED becomes BEGIN IMMEDIATE: one writer at a
+    time selects and flips its rows in a single UPDATE ... RETURNING, and the next
+    writer only sees what is still queued. Open one instance per thread or process.
+    Timestamps are epoch seconds.
+    """
+
+    def __init__(self, path: str, timeout: float = 30):
+        self.conn = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def enqueue(self, applications: List[Dict[str, Any]]):
+        rows = [(a.get('id') or str(uuid.uuid4()), a.get('user_id'), a.get('profile_id'), a['job_url'],
+                 a.get('priority', 0), a.get('created_at', time.time())) for a in applications]
+        with self._transaction():
+            self.conn.executemany(
+                "INSERT INTO job_applications (id, user_id, profile_id, job_url, priority, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def add_users(self, plans: Dict[str, str]):
+        """{user_id: subscription_plan}"""
+        with self._transaction():
+            self.conn.executemany("INSERT OR REPLACE INTO users (id, subscription_plan) VALUES (?, ?)",
+                                  list(plans.items()))
+
+    def claim_applications(self, worker_id: str, limit: int = 1, lease_seconds: int = 1800,
+                           plan_weights: Dict[str, int] = None, fair_share_window: int = 3600) -> List[Dict[str, Any]]:
+        if plan_weights is not None:
+            return self._claim_fair(worker_id, limit, lease_seconds, plan_weights, fair_share_window)
+        with self._transaction():
+            rows = self.conn.execute(
+                """UPDATE job_applications
+                   SET status = 'processing', worker_id = ?, lease_expires_at = ?, claimed_at = ?,
+                       claim_count = claim_count + 1
+                   WHERE id IN (SELECT id FROM job_applications WHERE status = 'queued'
+                                ORDER BY priority DESC, created_at LIMIT ?)
+                   RETURNING *""",
+                (worker_id, time.time() + lease_seconds, time.time(), limit)).fetchall()
+        return [dict(row) for row in rows]
+
+    def _claim_fair(self, worker_id: str, limit: int, lease_seconds: int, plan_weights: Dict[str, int],
+                    window_seconds: int = 3600) -> List[Dict[str, Any]]:
+        """claim_queued_applications_fair (sql/004_fair_share_claims.sql); unknown plans weigh 1"""
+        weights = [(plan, max(1, int(weight))) for plan, weight in plan_weights.items()] or [('', 1)]
+        sql = FAIR_CLAIM.format(weights=', '.join('(?, ?)' for _ in weights))
+        now = time.time()
+        params = ([value for pair in weights for value in pair] +
+                  [now - window_seconds, worker_id, now + lease_seconds, now, limit])
+        with self._transaction():
+            rows = self.conn.execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def requeue_expired_leases(self) -> int:
+        with self._transaction():
+            cursor = self.conn.execute(
+                "UPDATE job_applications SET status = 'queued', worker_id = NULL, lease_expires_at = NULL "
+                "WHERE status = 'processing' AND lease_expires_at < ?", (time.time(),))
+        return cursor.rowcount
+
+    def renew_leases(self, worker_id: str, app_ids: List[str], lease_seconds: int) -> int:
+        """DatabaseConnection.renew_leases: how many of app_ids are still this worker's"""
+        with self._transaction():
+            cursor = self.conn.execute(
+                f"UPDATE job_applications SET lease_expires_at = ? "
+                f"WHERE worker_id = ? AND id IN ({', '.join('?' for _ in app_ids)})",
+                [time.time() + lease_seconds, worker_id, *app_ids])
+        return cursor.rowcount
+
+    def requeue_worker_applications(self, worker_id: str) -> int:
+        with self._transaction():
+            cursor = self.conn.execute(
+                "UPDATE job_applications SET status = 'queued', worker_id = NULL, lease_expires_at = NULL "
+                "WHERE worker_id = ? AND status IN ('processing', 'captcha_required')", (worker_id,))
+        return cursor.rowcount
+
+    # Node registry (bot/node_registry.py), rows shaped like bot_workers
+
+    def heartbeat(self, node: Dict[str, Any]):
+        node = {**node, 'last_seen_at': datetime.now(timezone.utc).isoformat()}
+        with self._transaction():
+            self.conn.execute("INSERT OR REPLACE INTO bot_workers (worker_id, state, last_seen_at, node) "
+                              "VALUES (?, ?, ?, ?)",
+                              (node['worker_id'], node['state'], node['last_seen_at'], json.dumps(node)))
+
+    def get_nodes(self) -> List[Dict[str, Any]]:
+        rows = self.conn.execute("SELECT state, node FROM bot_workers ORDER BY last_seen_at DESC").fetchall()
+        return [{**json.loads(row['node']), 'state': row['state']} for row in rows]
+
+    def set_node_state(self, worker_id: str, state: str):
+        with self._transaction():
+            self.conn.execute("UPDATE bot_workers SET state = ? WHERE worker_id = ?", (state, worker_id))
+
+    def update_status(self, app_id: str, status: str):
+        with self._transaction():
+            self.conn.execute("UPDATE job_applications SET status = ? WHERE id = ?", (status, app_id))
+
+    def close(self):
+        self.conn.close()
+
+    def _transaction(self):
+        return _ImmediateTransaction(self.conn)
+
+
+class _ImmediateTransaction:
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
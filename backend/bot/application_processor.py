@@ -1,26 +1,59 @@
 # bot/application_processor.py - UPDATED WITH Q&A SYSTEM INTEGRATION
 
 import asyncio
+import json
+import os
+import socket
 import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 from urllib.parse import urlparse
 from database.connection import db
 from bot.enhanced_browser_handler import EnhancedBrowserHandler
+from bot.browser_pool import BrowserPool
+from bot.resource_policy import ResourcePolicy
+from bot.form_template_cache import FormTemplateCache
+from bot.captcha_parking import CaptchaParkingLot
+from bot.domain_limiter import DomainLimiter
+from bot.node_registry import node_registry, is_dead, process_tree_rss_mb
+from bot.queue_metrics import QueueWaitTracker, parse_plan_weights
 from bot.enhanced_ai_engine import EnhancedAIEngine
 from bot.qa_system import QASystem  # NEW: Import Q&A system
+from bot.question_index import question_index_store
 from services.notification_service import NotificationService
+from config import settings
 import uuid
+from collections import deque
+
+# How long a stop waits for in-flight applications to finish before cancelling them
+STOP_TIMEOUT_SECONDS = 120
 
 class ApplicationProcessor:
     """Main engine for processing job applications with Q&A system integration"""
     
-    def __init__(self, headless: bool = True, max_concurrent: int = 1):
+    def __init__(self, headless: bool = True, max_concurrent: int = 1, worker_id: str = None):
         self.headless = headless
         self.max_concurrent = max_concurrent
         self.ai_engine = EnhancedAIEngine()
-        self.qa_system = QASystem()  # NEW: Initialize Q&A system
+        self.qa_system = QASystem(
+            ai_engine=self.ai_engine,
+            question_index=question_index_store(settings.qa_index_dir, loader=self._load_answered_questions,
+                                                refresh_seconds=settings.qa_index_refresh_seconds)
+            if settings.qa_index else None,
+            min_similarity=settings.qa_index_min_similarity,
+            min_text_similarity=settings.qa_index_min_text_similarity,
+            min_margin=settings.qa_index_min_margin
+        )
         self.notification_service = NotificationService()
+        self.browser_pool = BrowserPool(
+            size=settings.browser_pool_size or max_concurrent,
+            headless=headless,
+            max_uses=settings.browser_max_uses,
+            max_rss_mb=settings.browser_max_rss_mb,
+            # Visible browsers are for people solving CAPTCHAs - only trim headless runs
+            resource_policy=ResourcePolicy.from_setting(settings.resource_blocking) if headless else None
+        )
+        self.template_cache = FormTemplateCache(os.path.join(settings.bot_data_dir, 'form_templates.json'))
         self.active_sessions = {}
         self.processing_stats = {
             'total_processed': 0,
@@ -31,7 +64,62 @@ class ApplicationProcessor:
             'manual_inputs_required': 0,  # NEW: Track manual inputs
             'start_time': datetime.utcnow()
         }
+        self.resource_stats = {
+            'applications': 0,
+            'blocked_requests': 0,
+            'blocked_by_category': {},
+            'bytes_transferred': 0,
+            'est_bytes_saved': 0,
+            'total_page_load_ms': 0,
+            'page_loads': 0
+        }
+        self.page_stats = {
+            'applications': 0,
+            'steps': 0,
+            'max_steps': 0,
+            'review_steps': 0,
+            'carried_answers': 0,
+            'failed': 0,
+            'total_ms': 0,
+            'phase_ms': {}
+        }
         self.is_running = False
+        # Claims in the shared queue are made under this id (one per processor)
+        self.worker_id = worker_id or settings.bot_worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.claim_stats = {'claimed': 0, 'claim_requests': 0, 'leases_requeued': 0, 'held_requeued': 0,
+                            'leases_renewed': 0, 'leases_lost': 0, 'dead_nodes_reclaimed': 0}
+        # Fair share: priority, then weighted round-robin across users (None = priority and age only)
+        self.plan_weights = parse_plan_weights(settings.bot_plan_weights) if settings.bot_fair_share else None
+        self.queue_waits = QueueWaitTracker(db)
+        self._last_reap = 0.0
+        self._heartbeat_task = None
+        # Continuous scheduler: one semaphore slot per concurrent application
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._work_available = asyncio.Event()
+        self._in_flight = set()
+        # CAPTCHA-blocked applications wait here with their browser instead of in a slot
+        self.captcha_parking = CaptchaParkingLot(
+            capacity=settings.captcha_parking_capacity,
+            timeout_seconds=settings.captcha_park_timeout_seconds,
+            recheck_seconds=settings.captcha_recheck_seconds,
+            on_resolved=self._on_captcha_resolved
+        )
+        self._resume_queue = deque()  # solved parked applications, ahead of new claims
+        # Claimed applications start only when their ATS host allows (rate, in-flight, CAPTCHA pause)
+        self.domain_limiter = DomainLimiter(
+            rate_per_minute=settings.domain_rate_per_minute,
+            burst=settings.domain_burst,
+            max_in_flight=settings.domain_max_in_flight,
+            captcha_cooldown_seconds=settings.domain_captcha_cooldown_seconds
+        )
+        self._slots_started_at = self._slots_changed_at = time.monotonic()
+        self.slot_stats = {
+            'busy': 0,
+            'max_busy': 0,
+            'busy_slot_seconds': 0.0,
+            'empty_polls': 0,
+            'current_backoff_seconds': 0
+        }
         
         print(f"🤖 Application Processor with Q&A System initialized (max_concurrent: {max_concurrent})")
     
@@ -41,47 +129,240 @@ class ApplicationProcessor:
         print("🚀 Starting application processing engine with Q&A system...")
         
         try:
-            while self.is_running:
-                await self._process_queue_batch()
-                await asyncio.sleep(5)  # Check queue every 5 seconds
+            self._heartbeat_task = asyncio.create_task(self._heartbeat_forever())
+            await self.browser_pool.start()
+            self.captcha_parking.start()
+            await self._run_scheduler()
                 
         except KeyboardInterrupt:
             print("\n⏸️ Processing stopped by user")
         except Exception as e:
             print(f"❌ Processing engine error: {e}")
         finally:
+            if self._in_flight:
+                await asyncio.gather(*self._in_flight, return_exceptions=True)
             await self._cleanup_all_sessions()
             self.is_running = False
+            if self._heartbeat_task:
+                self._heartbeat_task.cancel()
+            await node_registry.heartbeat(self._node_status('stopped'))
     
     async def stop_processing(self):
-        """Stop the processing engine"""
+        """Stop claiming new applications. In-flight ones finish in their slots; start_processing
+        then requeues parked and held applications and closes the browsers - await its task
+        (with STOP_TIMEOUT_SECONDS) to wait for that."""
         self.is_running = False
-        await self._cleanup_all_sessions()
-        print("⏹️ Application processing stopped")
+        self._work_available.set()
+        print("⏹️ Application processing stopping - letting in-flight applications finish")
     
-    async def _process_queue_batch(self):
-        """Process a batch of applications from the queue"""
-        try:
-            # Get queued applications
-            applications = await db.get_applications_by_status('queued', limit=self.max_concurrent)
+    def notify_work_available(self):
+        """Cut an idle back-off short (new applications were queued)"""
+        self._work_available.set()
+    
+    async def _run_scheduler(self):
+        """Keep max_concurrent slots busy: a freed slot claims the next application right away.
+        
+        Claimed applications go through the domain limiter: a slot starts the next held
+        application whose host is free (domains in turn) and claims more while fewer than
+        domain_hold_limit are held, skipping the hosts that cannot take another start yet. The queue is only polled on a timer while it is empty,
+        backing off from bot_idle_backoff_min to bot_idle_backoff_max seconds.
+        """
+        backoff = settings.bot_idle_backoff_min
+        while self.is_running:
+            await self._requeue_expired_leases()
+            await self._requeue_stale_held()
             
-            if not applications:
-                return  # No applications to process
+            # Wait for a free slot, waking up periodically so the reaper keeps running
+            try:
+                await asyncio.wait_for(self._slots.acquire(), timeout=settings.bot_lease_reap_seconds)
+            except asyncio.TimeoutError:
+                continue
+            if not self.is_running:
+                self._slots.release()
+                break
+            held = 1
+            while not self._slots.locked() and held < self.max_concurrent:
+                await self._slots.acquire()  # free slots are taken without waiting
+                held += 1
             
-            print(f"📋 Found {len(applications)} applications to process")
+            # Applications whose CAPTCHA was solved go first - their browser is already on the form
+            resumed = []
+            while self._resume_queue and len(resumed) < held:
+                resumed.append(self._resume_queue.popleft())
+            for entry in resumed:
+                self._start_slot(entry, resume=True)
             
-            # Process applications concurrently
-            tasks = []
-            for application in applications:
-                if len(self.active_sessions) < self.max_concurrent:
-                    task = asyncio.create_task(self._process_single_application(application))
-                    tasks.append(task)
+            free = held - len(resumed)
+            started = self._start_ready_held(free)
+            applications = []
+            if free > started and self.domain_limiter.held_count() < settings.domain_hold_limit:
+                applications = await self._claim_applications(free - started, self.domain_limiter.busy_domains())
+                for application in applications:
+                    self.domain_limiter.hold(self._extract_domain(application['job_url']), application)
+                started += self._start_ready_held(free - started)
+            for _ in range(free - started):
+                self._slots.release()
             
-            if tasks:
-                await asyncio.gather(*tasks, return_exceptions=True)
-                
+            if applications or resumed or started:
+                backoff = settings.bot_idle_backoff_min
+                continue
+            
+            self._work_available.clear()
+            if self.domain_limiter.held_count():
+                # Held applications wait for their host's next token (or a finished application)
+                wait = self.domain_limiter.next_ready_in()
+                try:
+                    await asyncio.wait_for(self._work_available.wait(), timeout=min(
+                        wait if wait is not None else settings.bot_lease_reap_seconds, settings.bot_lease_reap_seconds))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            
+            # Queue empty (or claim failed): back off, unless new work is announced first
+            self.slot_stats['empty_polls'] += 1
+            self.slot_stats['current_backoff_seconds'] = backoff
+            try:
+                await asyncio.wait_for(self._work_available.wait(), timeout=backoff)
+                backoff = settings.bot_idle_backoff_min
+            except asyncio.TimeoutError:
+                backoff = min(backoff * 2, settings.bot_idle_backoff_max)
+        
+    async def _claim_applications(self, limit: int, exclude_hosts: List[str] = None) -> List[Dict[str, Any]]:
+        """Claim up to `limit` applications from the queue for this worker, none on exclude_hosts"""
+        try:
+            # Claimed rows are already 'processing' under our worker id - no other worker sees them
+            applications = await db.claim_applications(self.worker_id, limit=limit,
+                                                       lease_seconds=settings.bot_lease_seconds,
+                                                       plan_weights=self.plan_weights,
+                                                       fair_share_window=settings.bot_fair_share_window_seconds,
+                                                       exclude_hosts=exclude_hosts)
+            self.claim_stats['claim_requests'] += 1
+            if applications:
+                self.claim_stats['claimed'] += len(applications)
+                await self.queue_waits.record_claims(applications)
+                print(f"📋 Claimed {len(applications)} applications to process (worker {self.worker_id})")
+            return applications
+        except Exception as e:
+            print(f"❌ Queue claim error: {e}")
+            return []
+    
+    def _start_ready_held(self, limit: int) -> int:
+        """Start up to `limit` held applications whose host may take one now"""
+        ready = self.domain_limiter.take_ready(limit) if limit > 0 else []
+        for _, application in ready:
+            self._start_slot(application)
+        return len(ready)
+    
+    async def _requeue_stale_held(self):
+        """Held applications still waiting for their host halfway through the lease go back
+        to the queue (another worker may have a free host slot), before the reaper would"""
+        for _, application in self.domain_limiter.take_stale(settings.bot_lease_seconds / 2):
+            await db.update_application_status(application['id'], 'queued')
+            self.claim_stats['held_requeued'] += 1
+    
+    def _start_slot(self, application: Dict[str, Any], resume: bool = False):
+        self._track_busy_slots(+1)
+        task = asyncio.create_task(self._run_slot(application, resume))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+    
+    async def _run_slot(self, item: Dict[str, Any], resume: bool = False):
+        try:
+            if resume:
+                await self._resume_parked(item)
+            else:
+                await self._process_single_application(item)
         except Exception as e:
-            print(f"❌ Queue batch processing error: {e}")
+            print(f"❌ Unhandled error processing {item.get('id', item.get('app_id', ''))[:8]}: {e}")
+        finally:
+            if not resume:
+                self.domain_limiter.finish(self._extract_domain(item['job_url']))
+                if self.domain_limiter.held_count():
+                    self._work_available.set()  # the host may have room for a held application
+            self._track_busy_slots(-1)
+            self._slots.release()
+    
+    def _track_busy_slots(self, change: int):
+        """Integrate busy slots over time for the utilization metric"""
+        now = time.monotonic()
+        stats = self.slot_stats
+        stats['busy_slot_seconds'] += stats['busy'] * (now - self._slots_changed_at)
+        self._slots_changed_at = now
+        stats['busy'] += change
+        stats['max_busy'] = max(stats['max_busy'], stats['busy'])
+    
+    def _slot_utilization_stats(self) -> Dict[str, Any]:
+        self._track_busy_slots(0)
+        stats = self.slot_stats.copy()
+        elapsed = time.monotonic() - self._slots_started_at
+        stats['size'] = self.max_concurrent
+        stats['utilization_percent'] = round(
+            stats['busy_slot_seconds'] / (self.max_concurrent * elapsed) * 100, 1) if elapsed > 0 else 0
+        return stats
+    
+    async def _requeue_expired_leases(self):
+        """Reaper: return applications held by workers that stopped (expired lease) to the queue"""
+        if time.monotonic() - self._last_reap < settings.bot_lease_reap_seconds:
+            return
+        self._last_reap = time.monotonic()
+        requeued = await db.requeue_expired_leases()
+        if requeued:
+            self.claim_stats['leases_requeued'] += requeued
+            print(f"♻️ Requeued {requeued} application(s) with expired leases")
+        await self._reclaim_dead_nodes()
+    
+    async def _reclaim_dead_nodes(self):
+        """Requeue the applications of nodes that stopped heartbeating, without waiting for their leases"""
+        for node in await node_registry.get_nodes():
+            if node['worker_id'] == self.worker_id or not is_dead(node):
+                continue
+            await node_registry.set_state(node['worker_id'], 'dead')
+            requeued = await db.requeue_worker_applications(node['worker_id'])
+            self.claim_stats['dead_nodes_reclaimed'] += 1
+            self.claim_stats['leases_requeued'] += requeued
+            print(f"💀 Worker {node['worker_id']} stopped heartbeating - requeued {requeued} of its application(s)")
+    
+    async def _heartbeat_forever(self):
+        """Report this node to the registry and keep the leases of live sessions from running out"""
+        while True:
+            try:
+                await node_registry.heartbeat(self._node_status('running'))
+                await self._renew_leases()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Heartbeat failed: {e}")
+            await asyncio.sleep(settings.bot_heartbeat_seconds)
+    
+    async def _renew_leases(self):
+        # Held applications (waiting for their host) keep their claim-time lease on purpose
+        app_ids = list(self.active_sessions)
+        app_ids += [entry['app_id'] for entry in list(self.captcha_parking.entries.values()) + list(self._resume_queue)]
+        if not app_ids:
+            return
+        still_ours = await db.renew_leases(self.worker_id, app_ids, settings.bot_lease_seconds)
+        self.claim_stats['leases_renewed'] += still_ours
+        if still_ours < len(app_ids):
+            self.claim_stats['leases_lost'] += len(app_ids) - still_ours
+            print(f"⚠️ {len(app_ids) - still_ours} application(s) were requeued by another node while still in progress here")
+    
+    def _node_status(self, state: str) -> Dict[str, Any]:
+        """This processor's registry entry"""
+        stats = self.get_processing_stats()
+        return {
+            'worker_id': self.worker_id,
+            'hostname': socket.gethostname(),
+            'pid': os.getpid(),
+            'state': state,
+            'max_concurrent': self.max_concurrent,
+            'busy_slots': self.slot_stats['busy'],
+            'active_sessions': len(self.active_sessions),
+            'parked_captchas': len(self.captcha_parking.entries),
+            'rss_mb': process_tree_rss_mb(),
+            'started_at': self.processing_stats['start_time'].isoformat(),
+            # datetimes and other non-JSON values as strings
+            'stats': json.loads(json.dumps(stats, default=str))
+        }
     
     async def _process_single_application(self, application: Dict[str, Any]):
         """Process a single job application with Q&A system integration"""
@@ -94,9 +375,11 @@ class ApplicationProcessor:
         print(f"   URL: {job_url}")
         
         browser = None
+        parked = False
         try:
-            # Update status to processing
-            await db.update_application_status(app_id, 'processing')
+            # Claimed applications are already 'processing'; direct runs are not in the queue
+            if application.get('status') != 'processing':
+                await db.update_application_status(app_id, 'processing')
             
             # Get user profile with enhanced fetching
             profile_data = await self._get_user_profile_from_database(user_id, application['profile_id'])
@@ -107,8 +390,8 @@ class ApplicationProcessor:
             site_domain = self._extract_domain(job_url)
             print(f"🌐 Site domain: {site_domain}")
             
-            # Create browser session
-            browser = EnhancedBrowserHandler(user_id=user_id, headless=self.headless)
+            # Lease a warm browser session from the pool
+            browser = await self.browser_pool.acquire(user_id)
             self.active_sessions[app_id] = browser
             
             # Navigate to job page
@@ -116,12 +399,15 @@ class ApplicationProcessor:
             if not navigation_success:
                 raise Exception("Failed to navigate to job page")
             
-            # Scan form elements
-            form_fields = await browser.scan_form_elements()
-            
-            # Check if CAPTCHA was detected
-            if form_fields and len(form_fields) == 1 and form_fields[0].get('__captcha_detected__'):
-                captcha_info = form_fields[0]['captcha_info']
+            # Check for a CAPTCHA before touching the form
+            captcha_info = await browser.check_for_captcha()
+            if captcha_info:
+                self.domain_limiter.record_captcha(site_domain)
+                context = {'profile_data': profile_data, 'site_domain': site_domain}
+                if await self._park_for_captcha(application, browser, captcha_info, 'form', context):
+                    parked = True
+                    return  # the slot moves on; the form is filled once the CAPTCHA is solved
+                
                 print(f"🚨 CAPTCHA detected - waiting for manual solution...")
                 
                 # Wait for CAPTCHA to be solved
@@ -129,45 +415,252 @@ class ApplicationProcessor:
                 
                 if captcha_solved:
                     print("✅ CAPTCHA solved - continuing with form filling...")
-                    # Re-scan form fields after CAPTCHA is solved
-                    form_fields = await browser.scan_form_elements(skip_captcha_check=True)
                 else:
                     raise Exception("CAPTCHA timeout - manual intervention required")
             
-            if not form_fields:
-                raise Exception("No form fields found on page")
-            
-            print(f"📝 Found {len(form_fields)} form fields to fill")
-            
-            # Fill form fields using Q&A system
-            filled_count = await self._fill_form_fields_with_qa_fixed(browser, form_fields, profile_data, user_id, app_id, site_domain)
-            print(f"✅ Successfully filled {filled_count} fields using Q&A system")
-            
-            # Check for CAPTCHA after filling
-            captcha_info = await browser.check_for_captcha()
-            if captcha_info:
-                await self._handle_captcha(app_id, captcha_info, browser)
-                return  # Wait for manual CAPTCHA resolution
-            
-            # Submit application
-            submission_result = await browser.submit_application()
-            
-            if submission_result['success']:
-                await self._handle_successful_application(app_id, user_id, submission_result)
-                # Update site patterns based on successful submission
-                await self._update_site_patterns_after_success(site_domain, form_fields, user_id)
-            else:
-                await self._handle_failed_application(app_id, user_id, submission_result['error'])
+            parked = await self._fill_and_submit(application, browser, profile_data, site_domain)
                 
         except Exception as e:
             await self._handle_failed_application(app_id, user_id, str(e))
             
         finally:
-            # Cleanup browser session
-            if browser:
-                browser.close()
-            if app_id in self.active_sessions:
-                del self.active_sessions[app_id]
+            if not parked:
+                await self._finish_session(app_id, browser)
+    
+    async def _fill_and_submit(self, application: Dict[str, Any], browser: EnhancedBrowserHandler,
+                               profile_data: dict, site_domain: str) -> bool:
+        """Fill every form step, then submit. Returns True if the application was parked on a CAPTCHA."""
+        app_id = application['id']
+        user_id = application['user_id']
+        
+        # Scan, fill and advance through every step of the form up to its submit step
+        outcome = await self._complete_form_steps(browser, profile_data, user_id, app_id, site_domain)
+        self._record_page_timings(outcome)
+        if outcome['state'] == 'failed':
+            raise Exception(f"Multi-page form error: {outcome['error']}")
+        
+        form_steps = [step for step in outcome['pages'] if step['fields']]
+        if not form_steps:
+            raise Exception("No form fields found on page")
+        
+        filled_count = sum(step['filled'] for step in form_steps)
+        print(f"✅ Successfully filled {filled_count} fields across {len(outcome['pages'])} step(s) using Q&A system")
+        
+        # Cached steps whose fields no longer fill are stale
+        for step in form_steps:
+            if step['template'] and step['filled'] < len(step['assignments']):
+                self.template_cache.invalidate(site_domain, step['template']['fingerprint'],
+                                               'cached fields failed to fill')
+        
+        # Check for CAPTCHA after filling
+        captcha_info = await browser.check_for_captcha()
+        if captcha_info:
+            self.domain_limiter.record_captcha(site_domain)
+            context = {'outcome': outcome, 'form_steps': form_steps, 'site_domain': site_domain}
+            if await self._park_for_captcha(application, browser, captcha_info, 'submit', context):
+                return True
+            await self._handle_captcha(app_id, captcha_info, browser)
+            return False  # Waited for manual CAPTCHA resolution in this slot
+        
+        await self._submit_form(application, browser, outcome, form_steps, site_domain)
+        return False
+    
+    async def _submit_form(self, application: Dict[str, Any], browser: EnhancedBrowserHandler,
+                           outcome: Dict[str, Any], form_steps: List[Dict[str, Any]], site_domain: str):
+        """Submit a filled form and record the result"""
+        app_id = application['id']
+        user_id = application['user_id']
+        
+        submit_locator = None
+        if outcome['state'] == 'done':
+            # The last 'next' may have completed the form (no separate submit step) - or led to
+            # an error page, an expired session or a login wall; only a confirmation counts
+            submission_result = await browser.confirm_completion()
+        else:
+            # Only a template learned on the submit step itself knows the submit button
+            submit_step = outcome['pages'][-1]
+            submit_template = submit_step['template'] or {}
+            submission_result = await browser.submit_application(
+                preferred_locator=submit_template.get('submit_locator'))
+            submit_locator = browser.last_button['locator'] if browser.last_button else None
+        
+        if submission_result['success']:
+            self._store_form_templates(site_domain, outcome['pages'], submit_locator)
+            await self._handle_successful_application(app_id, user_id, submission_result)
+            # Update site patterns based on successful submission
+            await self._update_site_patterns_after_success(
+                site_domain, [field for step in form_steps for field in step['fields']], user_id)
+        else:
+            await self._handle_failed_application(app_id, user_id, submission_result['error'])
+    
+    async def _finish_session(self, app_id: str, browser: Optional[EnhancedBrowserHandler]):
+        # Return the browser to the pool (reset or recycled there)
+        if browser:
+            await self._record_resource_report(app_id, browser)
+            await self.browser_pool.release(browser)
+        if app_id in self.active_sessions:
+            del self.active_sessions[app_id]
+    
+    async def _park_for_captcha(self, application: Dict[str, Any], browser: EnhancedBrowserHandler,
+                                captcha_info: Dict[str, Any], stage: str, context: Dict[str, Any]) -> bool:
+        """Hand a CAPTCHA-blocked application to the parking lot, freeing its slot.
+        Returns False (caller waits in its slot as before) when the lot is full."""
+        if not self.captcha_parking.reserve():
+            return False
+        
+        app_id = application['id']
+        try:
+            print(f"🚨 CAPTCHA detected for application {app_id[:8]} ({stage} step)")
+            await db.update_application_status(app_id, 'captcha_required')
+            captcha_session = await db.create_captcha_session({
+                'id': str(uuid.uuid4()),
+                'application_id': app_id,
+                'screenshot_url': captcha_info.get('screenshot_url'),
+                'page_url': captcha_info.get('page_url'),
+                'status': 'pending'
+            })
+            if not captcha_session:
+                raise Exception("Could not create CAPTCHA session")
+            await self.notification_service.send_captcha_alert(captcha_session)
+        except Exception:
+            self.captcha_parking.cancel_reservation()
+            raise
+        
+        # Off the pool's books so the freed slot can lease a fresh browser
+        self.browser_pool.detach(browser)
+        self.active_sessions.pop(app_id, None)
+        self.processing_stats['captcha_required'] += 1
+        self.captcha_parking.park(captcha_session['id'], {
+            'app_id': app_id,
+            'application': application,
+            'browser': browser,
+            'stage': stage,
+            'context': context,
+            # Before the form a person may solve it in the visible window without the dashboard
+            'page_check': stage == 'form'
+        })
+        return True
+    
+    def _on_captcha_resolved(self, entry: Dict[str, Any], outcome: str):
+        """Parking lot callback: solved sessions wait for the next free slot"""
+        if outcome == 'solved':
+            self._resume_queue.append(entry)
+            self._work_available.set()
+        else:
+            task = asyncio.create_task(self._abandon_parked(entry, outcome))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+    
+    async def _resume_parked(self, entry: Dict[str, Any]):
+        """Continue a parked application from where its CAPTCHA stopped it"""
+        application, browser, context = entry['application'], entry['browser'], entry['context']
+        app_id = application['id']
+        print(f"▶️ Resuming application {app_id[:8]} after CAPTCHA ({entry['stage']} step)")
+        self.active_sessions[app_id] = browser
+        parked = False
+        try:
+            await db.update_application_status(app_id, 'processing')
+            if entry['stage'] == 'form':
+                parked = await self._fill_and_submit(application, browser, context['profile_data'],
+                                                     context['site_domain'])
+            else:
+                await self._submit_form(application, browser, context['outcome'], context['form_steps'],
+                                        context['site_domain'])
+        except Exception as e:
+            await self._handle_failed_application(app_id, application['user_id'], str(e))
+        finally:
+            if not parked:
+                await self._finish_session(app_id, browser)
+    
+    async def _abandon_parked(self, entry: Dict[str, Any], outcome: str):
+        application = entry['application']
+        try:
+            if outcome == 'expired':
+                await db.update_captcha_status(entry['session_id'], 'expired')
+            await self._handle_failed_application(application['id'], application['user_id'], f"CAPTCHA {outcome}")
+        finally:
+            await self.browser_pool.release(entry['browser'])
+    
+    async def _complete_form_steps(self, browser: EnhancedBrowserHandler, profile_data: dict, user_id: str,
+                                   app_id: str, site_domain: str) -> Dict[str, Any]:
+        """Run the multi-page engine on the browser's thread; each step's answers are
+        resolved back on the event loop, where the Q&A system and database live"""
+        loop = asyncio.get_running_loop()
+        
+        def answer_step(step):
+            resolve = self._resolve_form_fields(step['pending'], profile_data, user_id, app_id, site_domain,
+                                                template=step['template'])
+            assignments, step['mapping'] = asyncio.run_coroutine_threadsafe(resolve, loop).result()
+            return assignments
+        
+        return await browser.complete_form_steps(
+            answer_step,
+            pacing_seconds=settings.fill_pacing_seconds,
+            template_cache=self.template_cache,
+            domain=site_domain
+        )
+    
+    def _store_form_templates(self, site_domain: str, pages: List[Dict[str, Any]], submit_locator: str):
+        """Learn every step that was resolved from scratch; refresh the submit button of a cached submit step"""
+        last_step = pages[-1]
+        for step in pages:
+            if not step['fields']:
+                continue
+            locator = submit_locator if step is last_step else None
+            if step['template']:
+                if locator:
+                    self.template_cache.record_submit(site_domain, step['template']['fingerprint'], locator)
+                continue
+            mapping = dict(step.get('mapping') or {})
+            for field in step['fields']:
+                # Answers carried forward from earlier steps were never resolved here
+                mapping.setdefault(field.get('locator'), {
+                    'label': field.get('label'),
+                    'type': field.get('type'),
+                    'options': field.get('options') if field.get('elements') else None,
+                    'profile_key': None
+                })
+            # Only templates that made it through a submission are worth reusing
+            self.template_cache.store(site_domain, step['fields'], mapping, locator)
+    
+    def _record_page_timings(self, outcome: Dict[str, Any]):
+        """Accumulate per-step timings so long applications show where their time goes"""
+        stats = self.page_stats
+        pages = outcome['pages']
+        stats['applications'] += 1
+        stats['steps'] += len(pages)
+        stats['max_steps'] = max(stats['max_steps'], len(pages))
+        stats['total_ms'] += outcome['total_ms']
+        stats['review_steps'] += sum(1 for step in pages if step['kind'] == 'review')
+        stats['carried_answers'] += sum(step['carried'] for step in pages)
+        if outcome['state'] == 'failed':
+            stats['failed'] += 1
+        for step in pages:
+            for phase, value in step['timings'].items():
+                stats['phase_ms'][phase] = stats['phase_ms'].get(phase, 0) + value
+    
+    async def _record_resource_report(self, app_id: str, browser: EnhancedBrowserHandler):
+        """Log and accumulate bandwidth / page-load figures for one application"""
+        try:
+            report = await browser.run(browser.collect_resource_report)
+        except Exception as e:
+            print(f"⚠️ Could not collect resource report: {e}")
+            return
+        
+        stats = self.resource_stats
+        stats['applications'] += 1
+        if report.get('page_load_ms') is not None:
+            stats['page_loads'] += 1
+            stats['total_page_load_ms'] += report['page_load_ms']
+        if 'bytes_transferred' in report:
+            stats['blocked_requests'] += report['blocked_requests']
+            stats['bytes_transferred'] += report['bytes_transferred']
+            stats['est_bytes_saved'] += report['est_bytes_saved']
+            for category, count in report['blocked'].items():
+                stats['blocked_by_category'][category] = stats['blocked_by_category'].get(category, 0) + count
+            print(f"📉 Application {app_id[:8]}: page load {report.get('page_load_ms')} ms, "
+                  f"{report['bytes_transferred'] / 1024:.0f} KB transferred, {report['blocked_requests']} blocked "
+                  f"(~{report['est_bytes_saved'] / 1024:.0f} KB saved)")
     
     def _extract_domain(self, url: str) -> str:
         """Extract domain from URL for site-specific patterns"""
@@ -215,6 +708,11 @@ class ApplicationProcessor:
             print(f"❌ Error fetching profile from database: {e}")
             return self._get_fallback_profile_data()
     
+    async def _load_answered_questions(self, user_id: str) -> List[Dict[str, Any]]:
+        """Seed rows for a user's question index: their Q&A cache. History rows are not seeded -
+        they carry no profile version, and most were answered by the AI or a default."""
+        return await db.get_user_qa_cache(user_id)
+    
     def _get_fallback_profile_data(self) -> dict:
         """Fallback profile data if database fetch fails"""
         return {
@@ -246,58 +744,80 @@ class ApplicationProcessor:
         }
     
     
-    async def _fill_form_fields_with_qa_fixed(self, browser, form_fields, profile_data, user_id, app_id, site_domain):
-        """Fixed form filling that handles Q&A return values correctly"""
-        filled_count = 0
+    async def _resolve_form_fields(self, form_fields, profile_data, user_id, app_id, site_domain,
+                                   template: Dict[str, Any] = None):
+        """Resolve every field of one form step through the Q&A system (or a cached form template).
+        Template hits are answered directly; all other fields go to the Q&A system together, so
+        whatever its rules can't answer costs one AI round trip for the whole step.
+        Returns (assignments, mapping) where mapping is the template entry per field locator."""
+        assignments = []
+        mapping = {}
+        cached_fields = template['fields'] if template else {}
+        results = [None] * len(form_fields)
+        open_fields = []
         
-        print(f"📝 Starting FIXED Q&A form filling for {len(form_fields)} fields...")
+        print(f"📝 Resolving {len(form_fields)} fields with the Q&A system...")
         
         for i, field in enumerate(form_fields):
+            cached = cached_fields.get(field.get('locator'))
+            if cached and cached.get('profile_key'):
+                # Template hit: the label → profile key mapping is already known
+                answer = self.qa_system.get_profile_value(cached['profile_key'], profile_data)
+                results[i] = (answer, 'form_template') if answer else None
+                print(f"📝 Template field: {field.get('label', f'Field {i+1}')} → {cached['profile_key']}")
+            else:
+                open_fields.append(i)
+        
+        if open_fields:
             try:
-                field_label = field.get('label', f'Field {i+1}')
-                field_type = field.get('type', 'unknown')
-                
-                print(f"📝 Processing field: {field_label} ({field_type})")
-                
-                # Get answer from Q&A system
-                qa_result = await self.qa_system.get_field_answer_hierarchical(
-                    field_label=field_label,
-                    field_type=field_type,
+                page_results = await self.qa_system.get_page_answers(
+                    [{
+                        'label': form_fields[i].get('label', f'Field {i+1}'),
+                        'type': form_fields[i].get('type', 'unknown'),
+                        'options': form_fields[i].get('options') if form_fields[i].get('elements') else None
+                    } for i in open_fields],
                     site_domain=site_domain,
                     profile_data=profile_data,
                     user_id=user_id,
                     application_id=app_id
                 )
+                for i, qa_result in zip(open_fields, page_results):
+                    results[i] = qa_result
+            except Exception as e:
+                print(f"❌ Error resolving form fields: {e}")
+        
+        for i, field in enumerate(form_fields):
+            try:
+                field_label = field.get('label', f'Field {i+1}')
+                field_type = field.get('type', 'unknown')
+                cached = cached_fields.get(field.get('locator'))
+                qa_result = results[i]
+                
+                mapping[field.get('locator')] = {
+                    'label': field_label,
+                    'type': field_type,
+                    'options': field.get('options') if field.get('elements') else None,
+                    'profile_key': cached.get('profile_key') if cached else (
+                        self.qa_system.resolve_profile_key(field_label, profile_data)
+                        if qa_result and qa_result[1] == 'profile_direct' else None)
+                }
                 
                 # Extract just the answer string from the tuple
                 if qa_result and isinstance(qa_result, tuple) and len(qa_result) >= 2:
                     answer, source = qa_result
                     if answer:
-                        print(f"   ✅ Q&A Answer: {answer} (from {source})")
-                        
-                        # Fill the form field with the string answer
-                        try:
-                            fill_success = await browser.fill_field(field, answer)
-                            if fill_success:
-                                filled_count += 1
-                                print(f"   ✅ Form field filled successfully")
-                            else:
-                                print(f"   ❌ Form field filling failed")
-                        except Exception as fill_error:
-                            print(f"   ❌ Form filling error: {fill_error}")
+                        print(f"   ✅ Q&A Answer: {field_label} → {answer} (from {source})")
+                        assignments.append((field, answer))
                     else:
-                        print(f"   ❌ No answer from Q&A system")
+                        print(f"   ❌ No answer from Q&A system for {field_label}")
                 else:
-                    print(f"   ❌ Invalid Q&A response format: {qa_result}")
-                
-                # Small delay between fields
-                await asyncio.sleep(0.3)
+                    print(f"   ❌ No answer for {field_label}")
                 
             except Exception as e:
                 print(f"❌ Error processing field {field_label}: {e}")
                 continue
         
-        return filled_count
+        return assignments, mapping
 
     async def _get_enhanced_field_label(self, browser: EnhancedBrowserHandler, field: Dict[str, Any]) -> str:
         """Get enhanced field label using multiple detection methods"""
@@ -604,11 +1124,21 @@ class ApplicationProcessor:
         """Cleanup all active browser sessions"""
         print("🧹 Cleaning up browser sessions...")
         
-        for app_id, browser in self.active_sessions.items():
-            try:
-                browser.close()
-            except Exception as e:
-                print(f"⚠️ Error closing session {app_id}: {e}")
+        # Parked applications go back to the queue; their browsers close with the pool
+        parked = await self.captcha_parking.close()
+        parked += list(self._resume_queue)
+        self._resume_queue.clear()
+        for entry in parked:
+            await db.update_captcha_status(entry['session_id'], 'expired')
+            await db.update_application_status(entry['app_id'], 'queued')
+        # So do claimed applications still waiting for their host
+        for _, application in self.domain_limiter.drain():
+            await db.update_application_status(application['id'], 'queued')
+        
+        try:
+            await self.browser_pool.close_all()
+        except Exception as e:
+            print(f"⚠️ Error closing browser pool: {e}")
         
         self.active_sessions.clear()
     
@@ -618,6 +1148,22 @@ class ApplicationProcessor:
         stats['uptime_seconds'] = (datetime.utcnow() - stats['start_time']).total_seconds()
         stats['active_sessions'] = len(self.active_sessions)
         stats['ai_cache_stats'] = self.ai_engine.get_cache_stats()
+        stats['browser_pool'] = self.browser_pool.get_stats()
+        stats['form_templates'] = self.template_cache.get_stats()
+        stats['question_index'] = self.qa_system.question_index.get_stats() if self.qa_system.question_index else None
+        stats['resources'] = self.resource_stats.copy()
+        page_loads = self.resource_stats['page_loads']
+        stats['resources']['avg_page_load_ms'] = (self.resource_stats['total_page_load_ms'] / page_loads) if page_loads else 0
+        stats['multi_page'] = self._page_timing_stats()
+        stats['database'] = db.get_pool_stats()
+        stats['worker_id'] = self.worker_id
+        stats['queue_claims'] = self.claim_stats.copy()
+        stats['queue_claims']['fair_share_weights'] = self.plan_weights
+        stats['queue_wait_by_plan'] = self.queue_waits.get_stats()
+        stats['slots'] = self._slot_utilization_stats()
+        stats['captcha_parking'] = self.captcha_parking.get_stats()
+        stats['captcha_parking']['waiting_for_slot'] = len(self._resume_queue)
+        stats['domains'] = self.domain_limiter.get_stats()
         
         if stats['total_processed'] > 0:
             stats['success_rate'] = (stats['successful'] / stats['total_processed']) * 100
@@ -628,6 +1174,13 @@ class ApplicationProcessor:
         
         return stats
     
+    def _page_timing_stats(self) -> Dict[str, Any]:
+        stats = self.page_stats.copy()
+        steps = stats['steps']
+        stats['avg_steps_per_application'] = (steps / stats['applications']) if stats['applications'] else 0
+        stats['avg_ms_per_step'] = {phase: value / steps for phase, value in stats['phase_ms'].items()} if steps else {}
+        return stats
+    
     async def process_single_url(self, user_id: str, profile_id: str, job_url: str) -> Dict[str, Any]:
         """Process a single application manually (for testing)"""
         try:
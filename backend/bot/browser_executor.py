@@ -0,0 +1,28 @@
+# bot/browser_executor.py - Dedicated worker thread for one browser's blocking WebDriver calls
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+
+class BrowserExecutor:
+    """Runs blocking Selenium work for a single browser on its own thread.
+
+    WebDriver sessions are not thread-safe, so each browser gets exactly one
+    worker thread: commands stay serialized per driver while the event loop
+    keeps serving API requests and other browsers run in parallel.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"browser-{name}")
+        self.calls = 0
+
+    async def run(self, func, *args, **kwargs):
+        """Await `func(*args, **kwargs)` executed on this browser's thread"""
+        self.calls += 1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    def shutdown(self):
+        # Don't wait: close() may itself be running on the worker thread
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,202 @@
+# bot/browser_pool.py - Warm pool of pre-launched Chrome sessions shared across applications
+import asyncio
+import time
+from typing import Dict, Any, Optional
+from bot.enhanced_browser_handler import EnhancedBrowserHandler
+from bot.resource_policy import ResourcePolicy
+
+try:
+    import psutil
+except ImportError:  # RSS-based recycling is skipped without psutil
+    psutil = None
+
+
+class BrowserPool:
+    """Keeps N configured Chrome drivers warm and leases them to applications.
+
+    Every lease starts from a clean session (cookies, storage and extra windows
+    cleared on release). Drivers are recycled after `max_uses` leases or once the
+    chromedriver + Chrome process tree grows past `max_rss_mb`.
+    """
+
+    def __init__(self, size: int = 1, headless: bool = True, max_uses: int = 25, max_rss_mb: int = 1500,
+                 resource_policy: ResourcePolicy = None):
+        self.size = max(1, size)
+        self.headless = headless
+        self.resource_policy = resource_policy
+        self.max_uses = max_uses
+        self.max_rss_mb = max_rss_mb
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._uses: Dict[int, int] = {}
+        self._leased: Dict[int, EnhancedBrowserHandler] = {}
+        self._detached: Dict[int, EnhancedBrowserHandler] = {}
+        self._launching = 0
+        self._closed = False
+        # Set whenever a browser goes idle or capacity frees up; waiting acquire()s re-check
+        self._changed = asyncio.Event()
+        self.metrics = {
+            'leases': 0,
+            'warm_hits': 0,
+            'cold_starts': 0,
+            'recycled': 0,
+            'recycled_max_uses': 0,
+            'recycled_rss': 0,
+            'reset_failures': 0,
+            'detached': 0,
+            'total_lease_wait_seconds': 0.0,
+            'max_lease_wait_seconds': 0.0
+        }
+        print(f"🏊 Browser pool configured (size: {self.size}, max_uses: {max_uses}, max_rss_mb: {max_rss_mb})")
+
+    @property
+    def total_browsers(self) -> int:
+        return self._idle.qsize() + len(self._leased) + self._launching
+
+    async def start(self):
+        """Pre-launch the pool so the first applications get warm browsers"""
+        missing = self.size - self.total_browsers
+        if missing <= 0:
+            return
+        print(f"🏊 Pre-launching {missing} browser(s)...")
+        browsers = await asyncio.gather(*[self._launch() for _ in range(missing)], return_exceptions=True)
+        for browser in browsers:
+            if isinstance(browser, EnhancedBrowserHandler):
+                self._idle.put_nowait(browser)
+                self._changed.set()
+            else:
+                print(f"⚠️ Browser pre-launch failed: {browser}")
+
+    async def acquire(self, user_id: str = None) -> EnhancedBrowserHandler:
+        """Lease a clean browser, launching one if the pool is below capacity"""
+        started = time.monotonic()
+        while True:
+            if self._closed:
+                raise Exception("Browser pool is closed")
+            if not self._idle.empty():
+                browser = self._idle.get_nowait()
+                self.metrics['warm_hits'] += 1
+                break
+            if self.total_browsers < self.size:
+                browser = await self._launch()
+                self.metrics['cold_starts'] += 1
+                break
+            # At capacity: wait for a release, a recycle or a detach
+            self._changed.clear()
+            await self._changed.wait()
+
+        wait = time.monotonic() - started
+        self.metrics['leases'] += 1
+        self.metrics['total_lease_wait_seconds'] += wait
+        self.metrics['max_lease_wait_seconds'] = max(self.metrics['max_lease_wait_seconds'], wait)
+
+        browser.user_id = user_id
+        self._leased[id(browser)] = browser
+        self._uses[id(browser)] = self._uses.get(id(browser), 0) + 1
+        return browser
+
+    def detach(self, browser: EnhancedBrowserHandler):
+        """Take a leased browser out of the pool's capacity (e.g. parked on a CAPTCHA) so
+        the pool can launch a replacement; release() it as usual when done with it"""
+        key = id(browser)
+        if self._leased.pop(key, None) is not None:
+            self._detached[key] = browser
+            self.metrics['detached'] += 1
+            self._changed.set()
+
+    async def release(self, browser: EnhancedBrowserHandler, discard: bool = False):
+        """Return a browser to the pool, resetting or recycling it"""
+        key = id(browser)
+        self._leased.pop(key, None)
+        was_detached = self._detached.pop(key, None) is not None
+
+        if self._closed:
+            await self._quit(browser)
+            return
+        if was_detached and self.total_browsers >= self.size:
+            # A replacement took its place while it was detached
+            await self._quit(browser)
+            return
+
+        recycle_reason = None
+        if discard:
+            recycle_reason = 'discarded'
+        elif self._uses.get(key, 0) >= self.max_uses:
+            recycle_reason = 'max_uses'
+        else:
+            rss_mb = self._rss_mb(browser)
+            if rss_mb is not None and rss_mb > self.max_rss_mb:
+                recycle_reason = 'rss'
+
+        if not recycle_reason:
+            try:
+                await browser.run(browser.reset_session)
+                self._idle.put_nowait(browser)
+                self._changed.set()
+                return
+            except Exception as e:
+                print(f"⚠️ Browser reset failed, recycling: {e}")
+                self.metrics['reset_failures'] += 1
+                recycle_reason = 'reset_failed'
+
+        print(f"♻️ Recycling browser {browser.session_id[:8]} ({recycle_reason})")
+        self.metrics['recycled'] += 1
+        if recycle_reason == 'max_uses':
+            self.metrics['recycled_max_uses'] += 1
+        elif recycle_reason == 'rss':
+            self.metrics['recycled_rss'] += 1
+        await self._quit(browser)
+        # The freed capacity goes to a waiting acquire(), which launches the replacement
+        self._changed.set()
+
+    async def close_all(self):
+        """Quit every browser, idle and leased"""
+        self._closed = True
+        self._changed.set()
+        browsers = list(self._leased.values()) + list(self._detached.values())
+        while not self._idle.empty():
+            browsers.append(self._idle.get_nowait())
+        self._leased.clear()
+        self._detached.clear()
+        for browser in browsers:
+            await self._quit(browser)
+        print("🏊 Browser pool closed")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Pool metrics: lease wait time, warm hit rate, recycle counts"""
+        stats = self.metrics.copy()
+        leases = stats['leases']
+        stats['hit_rate'] = (stats['warm_hits'] / leases * 100) if leases else 0
+        stats['avg_lease_wait_seconds'] = (stats['total_lease_wait_seconds'] / leases) if leases else 0
+        stats['idle'] = self._idle.qsize()
+        stats['leased'] = len(self._leased)
+        stats['detached_now'] = len(self._detached)
+        stats['size'] = self.size
+        return stats
+
+    async def _launch(self) -> EnhancedBrowserHandler:
+        """Start Chrome off the event loop (driver startup blocks for seconds)"""
+        self._launching += 1
+        try:
+            loop = asyncio.get_running_loop()
+            browser = await loop.run_in_executor(None, lambda: EnhancedBrowserHandler(
+                headless=self.headless, resource_policy=self.resource_policy))
+            self._uses[id(browser)] = 0
+            return browser
+        finally:
+            self._launching -= 1
+            self._changed.set()  # a failed launch gives its capacity back
+
+    async def _quit(self, browser: EnhancedBrowserHandler):
+        self._uses.pop(id(browser), None)
+        await browser.aclose()
+
+    def _rss_mb(self, browser: EnhancedBrowserHandler) -> Optional[float]:
+        """Resident memory of chromedriver plus every Chrome process it spawned"""
+        if not psutil:
+            return None
+        try:
+            root = psutil.Process(browser.driver.service.process.pid)
+            processes = [root] + root.children(recursive=True)
+            return sum(p.memory_info().rss for p in processes) / (1024 * 1024)
+        except Exception:
+            return None
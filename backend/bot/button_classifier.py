@@ -0,0 +1,108 @@
+# bot/button_classifier.py - One-call submit/next/apply button ranking with per-site learned overrides
+import json
+import os
+import threading
+from typing import Dict, Any, List, Optional
+from urllib.parse import urlparse
+from bot.page_scripts import load_page_script
+from config import settings
+
+DEFAULT_OVERRIDES_PATH = os.path.join(settings.bot_data_dir, 'button_overrides.json')
+MAX_OVERRIDES_PER_KIND = 5
+
+
+class ButtonClassifier:
+    """Ranks every clickable on the page as submit / next / apply in a single script call.
+
+    Overrides are CSS locators learned per site (host) whenever a click led to a
+    successful step; they are stored as JSON ({host: {kind: [locator, ...]}}) and
+    outrank the heuristic scores on later visits. The file can also be edited by
+    hand to pin a button for a troublesome ATS.
+    """
+
+    def __init__(self, overrides_path: str = None):
+        self.overrides_path = overrides_path or DEFAULT_OVERRIDES_PATH
+        self.overrides = self._load()
+        self._lock = threading.Lock()  # browsers learn from their own worker threads
+
+    def classify(self, driver, url: str = None, kinds: List[str] = None,
+                 preferred: Dict[str, List[str]] = None) -> Dict[str, Any]:
+        """Ranked candidates per kind: {kind: [{element, locator, text, score, override}], clickables}.
+        `preferred` locators (e.g. from a form template) rank ahead of the learned ones."""
+        host = self._host(url or driver.current_url)
+        with self._lock:  # learn() mutates the lists from other browsers' threads
+            overrides = {kind: list(locators) for kind, locators in self.overrides.get(host, {}).items()}
+        for kind, locators in (preferred or {}).items():
+            overrides[kind] = list(locators) + [l for l in overrides.get(kind, []) if l not in locators]
+        result = driver.execute_script(load_page_script('classify_buttons'), {
+            'kinds': kinds or ['submit', 'next', 'apply'],
+            'overrides': overrides
+        })
+        return result or {'clickables': 0}
+
+    def best(self, driver, kind: str, url: str = None, fallback_kinds: List[str] = None,
+             preferred: Dict[str, List[str]] = None) -> Optional[Dict[str, Any]]:
+        """Top candidate for `kind`, else the top candidate of the first fallback kind that has one"""
+        kinds = [kind] + list(fallback_kinds or [])
+        url = url or driver.current_url
+        ranked = self.classify(driver, url, kinds, preferred)
+        for candidate_kind in kinds:
+            candidates = ranked.get(candidate_kind) or []
+            if candidates:
+                best = candidates[0]
+                source = 'learned override' if best.get('override') else f"score {best.get('score')}"
+                print(f"✅ Found {candidate_kind} button: '{best.get('text')}' ({best.get('tag')}, {source})")
+                best.update({'kind': candidate_kind, 'url': url})
+                return best
+        print(f"❌ No {kind} button among {ranked.get('clickables', 0)} visible clickable elements")
+        return None
+
+    def learn_from(self, candidate: Optional[Dict[str, Any]]):
+        """Learn from a candidate returned by best() once clicking it worked"""
+        if candidate:
+            self.learn(candidate['url'], candidate['kind'], candidate['locator'])
+
+    def learn(self, url: str, kind: str, locator: str):
+        """Remember the locator that worked for this site so it is tried first next time"""
+        host = self._host(url)
+        if not host or not locator:
+            return
+        with self._lock:
+            learned = self.overrides.setdefault(host, {}).setdefault(kind, [])
+            if learned and learned[0] == locator:
+                return
+            if locator in learned:
+                learned.remove(locator)
+            learned.insert(0, locator)
+            del learned[MAX_OVERRIDES_PER_KIND:]
+            print(f"🧠 Learned {kind} button for {host}: {locator}")
+            self._save()
+
+    def _load(self) -> Dict[str, Dict[str, List[str]]]:
+        if not os.path.exists(self.overrides_path):
+            return {}
+        try:
+            with open(self.overrides_path, 'r') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"⚠️ Could not read button overrides ({e}); starting fresh")
+            return {}
+
+    def _save(self):
+        try:
+            # Atomic swap: workers sharing BOT_DATA_DIR never read half a file
+            os.makedirs(os.path.dirname(self.overrides_path), exist_ok=True)
+            tmp = f"{self.overrides_path}.{os.getpid()}.tmp"
+            with open(tmp, 'w') as f:
+                json.dump(self.overrides, f, indent=2)
+            os.replace(tmp, self.overrides_path)
+        except IOError as e:
+            print(f"⚠️ Could not save button overrides: {e}")
+
+    @staticmethod
+    def _host(url: Optional[str]) -> str:
+        return (urlparse(url or '').hostname or '').lower()
+
+
+# Shared by every browser in the process so learned overrides are seen immediately
+button_classifier = ButtonClassifier()
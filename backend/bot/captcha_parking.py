@@ -0,0 +1,147 @@
+# bot/captcha_parking.py - Holds CAPTCHA-blocked browsers so worker slots keep processing
+import asyncio
+import time
+from typing import Dict, Any, Callable, List, Optional
+from database.connection import db
+
+# Outcomes handed to on_resolved
+SOLVED = 'solved'
+SKIPPED = 'skipped'
+EXPIRED = 'expired'
+
+
+class CaptchaParkingLot:
+    """Parked applications keep their live browser (off the pool) while a person solves
+    the CAPTCHA; the worker slot that found it moves on to other applications.
+
+    A parked session leaves the lot through on_resolved(entry, outcome):
+      solved  - notify() from the CAPTCHA solve endpoint (instant), the captcha_sessions
+                row seen as 'solved' by the periodic recheck (run early by recheck_now() when
+                the API runs in another process), or, for entries parked with
+                page_check, the CAPTCHA gone from the page itself
+      skipped - notify() or recheck saw 'skipped' / 'expired' in the database
+      expired - nobody solved it within timeout_seconds
+    At most `capacity` sessions are parked; reserve() returns False when the lot is full.
+    """
+
+    def __init__(self, capacity: int, timeout_seconds: int, recheck_seconds: int,
+                 on_resolved: Callable[[Dict[str, Any], str], None]):
+        self.capacity = capacity
+        self.timeout_seconds = timeout_seconds
+        self.recheck_seconds = recheck_seconds
+        self.on_resolved = on_resolved
+        self.entries: Dict[str, Dict[str, Any]] = {}  # captcha session id -> entry
+        self._reserved = 0
+        self._sweeper: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+        self._recheck = asyncio.Event()
+        self.stats = {
+            'parked': 0,
+            'solved': 0,
+            'skipped': 0,
+            'expired': 0,
+            'rejected_full': 0,
+            'max_parked': 0,
+            'total_parked_seconds': 0.0
+        }
+
+    def start(self):
+        if not self._sweeper:
+            self._sweeper = asyncio.create_task(self._sweep_forever())
+
+    def reserve(self) -> bool:
+        """Hold a space while the CAPTCHA session is created; False when the lot is full.
+        Follow with park() or cancel_reservation()."""
+        if len(self.entries) + self._reserved >= self.capacity:
+            self.stats['rejected_full'] += 1
+            print(f"🅿️ CAPTCHA parking full ({self.capacity}) - application waits in its slot")
+            return False
+        self._reserved += 1
+        return True
+
+    def cancel_reservation(self):
+        self._reserved = max(0, self._reserved - 1)
+
+    def park(self, session_id: str, entry: Dict[str, Any]):
+        """Park an application's browser (in a reserved space) until its CAPTCHA session is resolved"""
+        self.cancel_reservation()
+        entry.update({'session_id': session_id, 'parked_at': time.monotonic()})
+        self.entries[session_id] = entry
+        self.stats['parked'] += 1
+        self.stats['max_parked'] = max(self.stats['max_parked'], len(self.entries))
+        print(f"🅿️ Parked application {entry['app_id'][:8]} for CAPTCHA {session_id[:8]} "
+              f"({len(self.entries)}/{self.capacity} parked)")
+        self._wake.set()  # the sweeper sleeps indefinitely while the lot is empty
+
+    def notify(self, session_id: str, status: str) -> bool:
+        """CAPTCHA session status changed in this process; True if it was parked here"""
+        if session_id not in self.entries:
+            return False
+        self._release(session_id, SOLVED if status == SOLVED else SKIPPED)
+        return True
+
+    def recheck_now(self):
+        """A CAPTCHA session may have been resolved in another process - sweep without waiting"""
+        self._recheck.set()
+
+    async def close(self) -> List[Dict[str, Any]]:
+        """Stop the sweeper and hand back every still-parked entry"""
+        if self._sweeper:
+            self._sweeper.cancel()
+            self._sweeper = None
+        entries = list(self.entries.values())
+        self.entries.clear()
+        return entries
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self.stats.copy()
+        resolved = stats['solved'] + stats['skipped'] + stats['expired']
+        stats['parked_now'] = len(self.entries)
+        stats['capacity'] = self.capacity
+        stats['avg_parked_seconds'] = (stats['total_parked_seconds'] / resolved) if resolved else 0
+        return stats
+
+    def _release(self, session_id: str, outcome: str):
+        entry = self.entries.pop(session_id)
+        self.stats[outcome] += 1
+        self.stats['total_parked_seconds'] += time.monotonic() - entry['parked_at']
+        print(f"🅿️ CAPTCHA {session_id[:8]} {outcome} - application {entry['app_id'][:8]} leaves parking")
+        self.on_resolved(entry, outcome)
+
+    async def _sweep_forever(self):
+        while True:
+            try:
+                if not self.entries:
+                    self._wake.clear()
+                    await self._wake.wait()
+                try:
+                    await asyncio.wait_for(self._recheck.wait(), timeout=self.recheck_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                self._recheck.clear()
+                await self._sweep()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ CAPTCHA parking recheck failed: {e}")
+
+    async def _sweep(self):
+        """Expire old entries and pick up resolutions made outside this process"""
+        now = time.monotonic()
+        for session_id, entry in list(self.entries.items()):
+            if now - entry['parked_at'] > self.timeout_seconds:
+                self._release(session_id, EXPIRED)
+
+        if not self.entries:
+            return
+        statuses = await db.get_captcha_statuses(list(self.entries))
+        for session_id, status in statuses.items():
+            if session_id in self.entries and status in (SOLVED, SKIPPED, EXPIRED):
+                self._release(session_id, SOLVED if status == SOLVED else SKIPPED)
+
+        # Solved in the visible browser window without touching the dashboard
+        for session_id, entry in list(self.entries.items()):
+            if entry.get('page_check') and not await entry['browser'].check_for_captcha():
+                if session_id in self.entries:
+                    await db.update_captcha_status(session_id, SOLVED, 'browser')
+                    self._release(session_id, SOLVED)
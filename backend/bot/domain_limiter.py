@@ -0,0 +1,174 @@
+# bot/domain_limiter.py - Per-domain politeness: token bucket, in-flight cap and CAPTCHA cool-down
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+
+class DomainLimiter:
+    """Keeps parallel sessions from piling onto one ATS host.
+
+    Each domain gets a token bucket (rate_per_minute starts, bursts of up to `burst`)
+    and at most max_in_flight open applications. A CAPTCHA on a domain pauses new
+    starts there for captcha_cooldown_seconds, since CAPTCHAs and blocks cost far more
+    than the wait.
+
+    Claimed applications are held per domain until their domain may start; take_ready()
+    hands them out round-robin across domains, so a claim of ten URLs on one host is
+    interleaved with whatever else is held instead of opening ten sessions there.
+    busy_domains() lists the hosts the next claim should skip, so holds don't fill up with
+    one host while the worker's other slots could serve other hosts.
+    """
+
+    def __init__(self, rate_per_minute: float, burst: int, max_in_flight: int,
+                 captcha_cooldown_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.rate_per_second = max(rate_per_minute, 0.001) / 60
+        self.burst = max(1, burst)
+        self.max_in_flight = max(1, max_in_flight)
+        self.captcha_cooldown_seconds = captcha_cooldown_seconds
+        self.clock = clock
+        self.domains: Dict[str, Dict[str, Any]] = {}
+        self.held: 'OrderedDict[str, deque]' = OrderedDict()  # domain -> (held_at, item), rotated round-robin
+
+    # Held applications
+
+    def hold(self, domain: str, item: Any):
+        self.held.setdefault(domain, deque()).append((self.clock(), item))
+        self._domain(domain)['held'] += 1
+
+    def held_count(self) -> int:
+        return sum(len(items) for items in self.held.values())
+
+    def take_ready(self, limit: int) -> List[Tuple[str, Any]]:
+        """Up to `limit` held items whose domain may start now, one domain at a time in turn.
+        Taken items are counted as started (in flight) on their domain."""
+        taken = []
+        progress = True
+        while len(taken) < limit and progress:
+            progress = False
+            for domain in list(self.held):
+                if len(taken) >= limit:
+                    break
+                if self.wait_seconds(domain) != 0:
+                    continue
+                held_at, item = self.held[domain].popleft()
+                if not self.held[domain]:
+                    del self.held[domain]
+                else:
+                    self.held.move_to_end(domain)
+                self._start(domain, self.clock() - held_at)
+                taken.append((domain, item))
+                progress = True
+        return taken
+
+    def take_stale(self, max_age_seconds: float) -> List[Tuple[str, Any]]:
+        """Held items waiting longer than max_age_seconds (e.g. to hand back before their lease runs out)"""
+        now = self.clock()
+        stale = []
+        for domain in list(self.held):
+            items = self.held[domain]
+            while items and now - items[0][0] > max_age_seconds:
+                stale.append((domain, items.popleft()[1]))
+                self._domain(domain)['held'] -= 1
+            if not items:
+                del self.held[domain]
+        return stale
+
+    def drain(self) -> List[Tuple[str, Any]]:
+        items = [(domain, item) for domain, entries in self.held.items() for _, item in entries]
+        for domain, _ in items:
+            self._domain(domain)['held'] -= 1
+        self.held.clear()
+        return items
+
+    def busy_domains(self) -> List[str]:
+        """Domains that should get no new claims for now: applications already held there, or
+        no start allowed at the moment (in-flight cap, cool-down, out of tokens)"""
+        return [domain for domain in self.domains if domain in self.held or self.wait_seconds(domain) != 0]
+
+    def next_ready_in(self) -> Optional[float]:
+        """Seconds until a held domain's token or cool-down allows a start; None when every
+        held domain is waiting on in-flight applications (or nothing is held)"""
+        waits = [self.wait_seconds(domain) for domain in self.held]
+        waits = [wait for wait in waits if wait is not None]
+        return min(waits) if waits else None
+
+    # Per-domain state
+
+    def wait_seconds(self, domain: str) -> Optional[float]:
+        """0 if the domain may start an application now, seconds until it may, or None
+        while it is at max_in_flight (frees up when one finishes)"""
+        state = self._refill(domain)
+        if state['in_flight'] >= self.max_in_flight:
+            return None
+        cooldown = state['cooldown_until'] - self.clock()
+        if cooldown > 0:
+            return cooldown
+        if state['tokens'] >= 1:
+            return 0
+        return (1 - state['tokens']) / self.rate_per_second
+
+    def finish(self, domain: str):
+        state = self._domain(domain)
+        state['in_flight'] = max(0, state['in_flight'] - 1)
+
+    def record_captcha(self, domain: str):
+        state = self._domain(domain)
+        state['captchas'] += 1
+        if self.captcha_cooldown_seconds > 0:
+            state['cooldown_until'] = self.clock() + self.captcha_cooldown_seconds
+            print(f"🐢 CAPTCHA on {domain} - no new applications there for {self.captcha_cooldown_seconds:.0f}s")
+
+    def get_stats(self) -> Dict[str, Any]:
+        now = self.clock()
+        domains = {}
+        for domain, state in self.domains.items():
+            started = state['started']
+            domains[domain] = {
+                'started': started,
+                'in_flight': state['in_flight'],
+                'held': state['held'],
+                'avg_wait_seconds': round(state['total_wait_seconds'] / started, 1) if started else 0,
+                'max_wait_seconds': round(state['max_wait_seconds'], 1),
+                'captchas': state['captchas'],
+                'captcha_rate_percent': round(state['captchas'] / started * 100, 1) if started else 0,
+                'cooling_down_seconds': round(max(0.0, state['cooldown_until'] - now), 1)
+            }
+        return {
+            'rate_per_minute': round(self.rate_per_second * 60, 2),
+            'burst': self.burst,
+            'max_in_flight': self.max_in_flight,
+            'captcha_cooldown_seconds': self.captcha_cooldown_seconds,
+            'held': self.held_count(),
+            'domains': domains
+        }
+
+    def _start(self, domain: str, waited: float):
+        state = self._domain(domain)
+        state['tokens'] -= 1
+        state['in_flight'] += 1
+        state['held'] -= 1
+        state['started'] += 1
+        state['total_wait_seconds'] += waited
+        state['max_wait_seconds'] = max(state['max_wait_seconds'], waited)
+
+    def _refill(self, domain: str) -> Dict[str, Any]:
+        state = self._domain(domain)
+        now = self.clock()
+        state['tokens'] = min(self.burst, state['tokens'] + (now - state['refilled_at']) * self.rate_per_second)
+        state['refilled_at'] = now
+        return state
+
+    def _domain(self, domain: str) -> Dict[str, Any]:
+        if domain not in self.domains:
+            self.domains[domain] = {
+                'tokens': float(self.burst),
+                'refilled_at': self.clock(),
+                'in_flight': 0,
+                'held': 0,
+                'cooldown_until': 0.0,
+                'started': 0,
+                'total_wait_seconds': 0.0,
+                'max_wait_seconds': 0.0,
+                'captchas': 0
+            }
+        return self.domains[domain]
@@ -1,34 +1,83 @@
 # bot/enhanced_ai_engine.py - Enhanced AI engine for multi-user applications
-import google.generativeai as genai
+try:
+    import google.generativeai as genai
+except ImportError:
+    genai = None
 from config import settings
 import json
 from typing import Dict, List, Optional, Any
 from datetime import datetime
-import hashlib
+from bot.page_resolver import BatchFieldResolver, match_option, truncate_essay
+from bot.llm_gateway import GatewayModel, shared_gateway
+from bot.llm_cache import cache_key, profile_version, shared_llm_cache
+from bot.single_flight import single_flight
+
+_MISS = object()
 
 class EnhancedAIEngine:
     """Enhanced AI engine with improved decision making and caching"""
     
     def __init__(self):
+        # Answers persist across restarts and (with LLM_CACHE=redis) across workers
+        self.cache = shared_llm_cache(
+            settings.llm_cache,
+            settings.llm_cache_path,
+            redis_url=settings.redis_url,
+            ttl_seconds=settings.llm_cache_ttl_seconds,
+            max_entries=settings.llm_cache_max_entries,
+            max_bytes=settings.llm_cache_max_mb * 1024 * 1024
+        )
+        self.gateway = None
         try:
-            genai.configure(api_key=settings.gemini_api_key)
-            self.model = genai.GenerativeModel('gemini-1.5-flash')
-            self.field_mapping_cache = {}
-            self.choice_cache = {}
-            print("✅ Enhanced AI Engine initialized")
+            if settings.llm_client == 'rest':
+                if not settings.gemini_api_key:
+                    raise ValueError("GEMINI_API_KEY is not set")
+                self.gateway = shared_gateway(
+                    settings.gemini_api_key,
+                    model=settings.llm_model,
+                    base_url=settings.llm_base_url,
+                    max_concurrent=settings.llm_max_concurrent,
+                    timeout_seconds=settings.llm_timeout_seconds,
+                    max_retries=settings.llm_max_retries,
+                    hedge=settings.llm_hedge,
+                    hedge_min_seconds=settings.llm_hedge_min_seconds,
+                    breaker_threshold=settings.llm_breaker_threshold,
+                    breaker_reset_seconds=settings.llm_breaker_reset_seconds
+                )
+                self.model = GatewayModel(self.gateway)
+            else:
+                genai.configure(api_key=settings.gemini_api_key)
+                self.model = genai.GenerativeModel(settings.llm_model)
+            print(f"✅ Enhanced AI Engine initialized ({settings.llm_client} client)")
         except Exception as e:
             print(f"❌ AI Engine initialization error: {e}")
             self.model = None
+        self.batch_resolver = BatchFieldResolver(self.model, self.cache, settings.llm_model)
+    
+    def _cache_get(self, template: str, inputs: Dict[str, Any], profile_data: Dict[str, Any] = None):
+        """(key, cached answer or _MISS); profile_data makes the entry specific to that profile version"""
+        key = cache_key(settings.llm_model, template, inputs,
+                        profile_version(profile_data) if profile_data is not None else None)
+        return key, self.cache.get(key, _MISS) if self.cache else _MISS
+    
+    def _cache_set(self, key: str, value: Any):
+        if self.cache:
+            self.cache.set(key, value)
+    
+    def _generate(self, key: str, prompt: str) -> str:
+        """Model text for prompt; concurrent identical requests (same key) share one call"""
+        return single_flight.do(key, lambda: self.model.generate_content(prompt).text)
     
     def map_field_to_profile_data(self, field_label: str, profile_data: Dict[str, Any]) -> Optional[str]:
         """Map a form field label to profile data using AI and caching"""
         
-        # Create cache key
-        cache_key = hashlib.md5(field_label.lower().encode()).hexdigest()
+        # Flatten profile data for AI analysis
+        flattened_data = self._flatten_profile_data(profile_data)
+        available_fields = list(flattened_data.keys())
         
-        # Check cache first
-        if cache_key in self.field_mapping_cache:
-            cached_result = self.field_mapping_cache[cache_key]
+        # Check cache first - the mapping depends on the label and the profile's fields, not their values
+        cache_key, cached_result = self._cache_get('field_mapping', {'label': field_label, 'fields': available_fields[:20]})
+        if cached_result is not _MISS:
             print(f"🧠 Cache hit for field: {field_label} -> {cached_result}")
             return cached_result
         
@@ -39,10 +88,6 @@ class EnhancedAIEngine:
             return self._fallback_field_mapping(field_label, profile_data)
         
         try:
-            # Flatten profile data for AI analysis
-            flattened_data = self._flatten_profile_data(profile_data)
-            available_fields = list(flattened_data.keys())
-            
             prompt = f"""
             You are an intelligent form-filling assistant. Given a form field label, find the best matching data field from the user's profile.
             
@@ -59,21 +104,20 @@ class EnhancedAIEngine:
             Response format: Just the field name or "NONE"
             """
             
-            response = self.model.generate_content(prompt)
-            result = response.text.strip().replace('"', '').replace("'", "")
+            result = self._generate(cache_key, prompt).strip().replace('"', '').replace("'", "")
             
             # Validate result
             if result in available_fields:
-                self.field_mapping_cache[cache_key] = result
+                self._cache_set(cache_key, result)
                 print(f"🧠 AI mapped: {field_label} -> {result}")
                 return result
             elif result == "NONE":
-                self.field_mapping_cache[cache_key] = None
+                self._cache_set(cache_key, None)
                 return None
             else:
                 # Fallback to fuzzy matching
                 fallback_result = self._fallback_field_mapping(field_label, profile_data)
-                self.field_mapping_cache[cache_key] = fallback_result
+                self._cache_set(cache_key, fallback_result)
                 return fallback_result
                 
         except Exception as e:
@@ -216,21 +260,17 @@ class EnhancedAIEngine:
     def make_intelligent_choice(self, question: str, options: List[str], profile_data: Dict[str, Any]) -> Optional[str]:
         """Make an intelligent choice using AI and caching"""
         
-        # Create cache key
-        cache_key = hashlib.md5(f"{question}:{','.join(options)}".encode()).hexdigest()
-        
-        # Check cache
-        if cache_key in self.choice_cache:
-            cached_choice = self.choice_cache[cache_key]
-            print(f"🧠 Cache hit for choice: {question[:30]}... -> {cached_choice}")
-            return cached_choice
-        
         # Rule-based answers first
         rule_based_answer = self._rule_based_choice(question, options, profile_data)
         if rule_based_answer:
-            self.choice_cache[cache_key] = rule_based_answer
             return rule_based_answer
         
+        # Check cache (per profile version - the choice depends on the profile)
+        cache_key, cached_choice = self._cache_get('choice', {'question': question, 'options': options}, profile_data)
+        if cached_choice is not _MISS and cached_choice in options:
+            print(f"🧠 Cache hit for choice: {question[:30]}... -> {cached_choice}")
+            return cached_choice
+        
         if not self.model:
             return self._fallback_choice(question, options, profile_data)
         
@@ -256,26 +296,24 @@ class EnhancedAIEngine:
             Your choice:
             """
             
-            response = self.model.generate_content(prompt)
-            ai_choice = response.text.strip().replace('"', '').replace("'", "")
+            ai_choice = self._generate(cache_key, prompt).strip().replace('"', '').replace("'", "")
             
             # Validate choice is in options
-            for option in options:
-                if ai_choice.lower() == option.lower() or ai_choice in option or option in ai_choice:
-                    self.choice_cache[cache_key] = option
-                    print(f"🧠 AI chose: {question[:30]}... -> {option}")
-                    return option
+            option = match_option(ai_choice, options)
+            if option:
+                self._cache_set(cache_key, option)
+                print(f"🧠 AI chose: {question[:30]}... -> {option}")
+                return option
             
             # Fallback if AI choice doesn't match
             fallback_choice = self._fallback_choice(question, options, profile_data)
-            self.choice_cache[cache_key] = fallback_choice
+            self._cache_set(cache_key, fallback_choice)
             return fallback_choice
             
         except Exception as e:
+            # Not cached: the model may answer once it is reachable again
             print(f"❌ AI choice error: {e}")
-            fallback_choice = self._fallback_choice(question, options, profile_data)
-            self.choice_cache[cache_key] = fallback_choice
-            return fallback_choice
+            return self._fallback_choice(question, options, profile_data)
     
     def _rule_based_choice(self, question: str, options: List[str], profile_data: Dict[str, Any]) -> Optional[str]:
         """Rule-based choice for common questions"""
@@ -396,6 +434,11 @@ class EnhancedAIEngine:
         if not self.model:
             return self._fallback_essay_response(question, profile_data)
         
+        cache_key, cached_essay = self._cache_get('essay', {'question': question, 'max_length': max_length}, profile_data)
+        if cached_essay is not _MISS:
+            print(f"🧠 Cache hit for essay: {question[:30]}...")
+            return cached_essay
+        
         try:
             context = self._prepare_profile_context(profile_data)
             
@@ -417,19 +460,11 @@ class EnhancedAIEngine:
             Response:
             """
             
-            response = self.model.generate_content(prompt)
-            essay = response.text.strip()
+            essay = self._generate(cache_key, prompt).strip()
             
             # Ensure length limit
-            if len(essay) > max_length:
-                sentences = essay.split('. ')
-                truncated = ''
-                for sentence in sentences:
-                    if len(truncated + sentence + '. ') <= max_length - 3:
-                        truncated += sentence + '. '
-                    else:
-                        break
-                essay = truncated.rstrip() + '...'
+            essay = truncate_essay(essay, max_length)
+            self._cache_set(cache_key, essay)
             
             print(f"📝 Generated essay response ({len(essay)} chars)")
             return essay
@@ -438,6 +473,44 @@ class EnhancedAIEngine:
             print(f"❌ Essay generation error: {e}")
             return self._fallback_essay_response(question, profile_data)
     
+    def resolve_page_fields(self, fields: List[Dict[str, Any]], profile_data: Dict[str, Any]) -> Dict[str, str]:
+        """Answer a form page's open fields with at most one AI call: {field id: answer}
+        
+        fields are dicts with 'id', 'label', 'type' and optional 'options'. Choices the
+        rules already know don't go to the model; the rest share one prompt with the
+        profile context in it once. Choice answers are checked against the field's
+        options; fields left out of the result get the caller's fallbacks. Answers are
+        per profile, so the cache keeps them per profile version.
+        """
+        answers = {}
+        pending = []
+        
+        for field in fields:
+            options = field.get('options')
+            choice = self._rule_based_choice(field['label'], options, profile_data) if options else None
+            if choice:
+                answers[field['id']] = choice
+            else:
+                pending.append(field)
+        
+        resolved = self.batch_resolver.resolve(pending, self._prepare_page_context(profile_data),
+                                               profile_version=profile_version(profile_data))
+        for field_id, result in resolved.items():
+            answers[field_id] = result['answer']
+        
+        return answers
+    
+    def _prepare_page_context(self, profile_data: Dict[str, Any]) -> str:
+        """Whole profile as 'section.key: value' lines - sent once per page, so it can afford detail"""
+        lines = []
+        for key, value in self._flatten_profile_data(profile_data).items():
+            if isinstance(value, list):
+                value = ', '.join(str(item) for item in value if item not in (None, ''))
+            if value in (None, '') or isinstance(value, (dict, list)):
+                continue
+            lines.append(f"{key}: {value}")
+        return '\n'.join(lines) or self._prepare_profile_context(profile_data)
+    
     def _fallback_essay_response(self, question: str, profile_data: Dict[str, Any]) -> str:
         """Fallback essay response"""
         try:
@@ -471,9 +544,11 @@ class EnhancedAIEngine:
             'work_type': 'unknown'
         }
     
-    def get_cache_stats(self) -> Dict[str, int]:
+    def get_cache_stats(self) -> Dict[str, Any]:
         """Get AI cache statistics"""
         return {
-            'field_mappings_cached': len(self.field_mapping_cache),
-            'choices_cached': len(self.choice_cache)
+            'llm_cache': self.cache.get_stats() if self.cache else None,
+            'page_batches': self.batch_resolver.get_stats(),
+            'single_flight': single_flight.get_stats(),
+            'llm_gateway': self.gateway.get_stats() if self.gateway else None
         }
\ No newline at end of file
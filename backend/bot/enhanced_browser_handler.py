@@ -12,18 +12,35 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import NoSuchElementException, TimeoutException
 from typing import Dict, List, Optional, Any
 from datetime import datetime
+from urllib.parse import urlparse
+from bot.page_scripts import take_form_snapshot, fill_values
+from bot.browser_executor import BrowserExecutor
+from bot.page_readiness import PageReadiness
+from bot.resource_policy import ResourcePolicy
+from bot.button_classifier import button_classifier
+from bot.multi_page_engine import MultiPageEngine, PAGE_TEXT_SCRIPT
+
+SUCCESS_INDICATORS = ['thank you', 'success', 'submitted', 'received', 'confirmation', 'complete']
+# Pages a form can end on without being submitted
+FAILURE_INDICATORS = ['session expired', 'session has expired', 'session timed out', 'something went wrong',
+                      'an error occurred', 'error occurred', 'page not found', 'access denied',
+                      'sign in to continue', 'log in to continue', 'please sign in', 'please log in']
 
 class EnhancedBrowserHandler:
     """Simplified enhanced browser handler that actually works"""
     
-    def __init__(self, user_id: str = None, headless: bool = False):
+    def __init__(self, user_id: str = None, headless: bool = False, resource_policy: ResourcePolicy = None):
         self.user_id = user_id
         self.headless = headless
+        self.resource_policy = resource_policy
+        self.page_load_ms = None
+        self.last_button = None
         self.driver = None
         self.wait = None
         self.session_id = str(uuid.uuid4())
         self.current_application_id = None
         self.current_url = None
+        self.visited_origins = set()
         
         # Stats tracking
         self.session_stats = {
@@ -34,8 +51,16 @@ class EnhancedBrowserHandler:
             'session_start': datetime.utcnow()
         }
         
+        # Every WebDriver call for this browser runs on its own thread, off the event loop
+        self.executor = BrowserExecutor(self.session_id[:8])
+        
         print(f"🤖 Initializing browser handler for session {self.session_id[:8]}")
         self._setup_browser()
+        self.readiness = PageReadiness(self.driver)
+    
+    async def run(self, func, *args, **kwargs):
+        """Run a blocking WebDriver routine on this browser's thread"""
+        return await self.executor.run(func, *args, **kwargs)
     
     def _setup_browser(self):
         """Setup browser with simplified, working configuration"""
@@ -53,6 +78,10 @@ class EnhancedBrowserHandler:
         options.add_experimental_option("excludeSwitches", ["enable-automation"])
         options.add_experimental_option('useAutomationExtension', False)
         
+        # Network events feed the per-application resource report
+        if self.resource_policy:
+            options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+        
         try:
             # Use the path that worked in our tests
             driver_path = '/opt/homebrew/bin/chromedriver'
@@ -83,16 +112,27 @@ class EnhancedBrowserHandler:
             raise Exception(f"Browser initialization failed: {e}")
     
     async def navigate_to_job(self, job_url: str, application_id: str) -> bool:
+        """Navigate to a job application page"""
+        return await self.run(self._navigate_to_job, job_url, application_id)
+    
+    def _navigate_to_job(self, job_url: str, application_id: str) -> bool:
         """Navigate to a job application page"""
         try:
             self.current_application_id = application_id
             self.current_url = job_url
             
+            if self.resource_policy:
+                blocked = self.resource_policy.apply(self.driver, job_url)
+                print(f"🚫 Blocking {blocked} resource pattern(s) for this site")
+            
             print(f"🌐 Navigating to: {job_url}")
             self.driver.get(job_url)
+            self.visited_origins.add(self._origin_of(self.driver.current_url))
             
             # Wait for page load
-            await asyncio.sleep(3)
+            self.readiness.for_url(job_url)
+            self.readiness.wait_for_page()
+            self.page_load_ms = self._navigation_duration_ms()
             
             print(f"✅ Successfully navigated to job page")
             return True
@@ -102,6 +142,10 @@ class EnhancedBrowserHandler:
             return False
     
     async def check_for_captcha(self) -> Optional[Dict[str, Any]]:
+        """Simple CAPTCHA detection"""
+        return await self.run(self._check_for_captcha)
+    
+    def _check_for_captcha(self) -> Optional[Dict[str, Any]]:
         """Simple CAPTCHA detection"""
         try:
             print("🔍 Checking for CAPTCHA...")
@@ -120,8 +164,14 @@ class EnhancedBrowserHandler:
             try:
                 iframe = self.driver.find_element(By.CSS_SELECTOR, 'iframe[src*="recaptcha"]')
                 if iframe.is_displayed():
+                    if self.resource_policy:
+                        # Challenge tiles are images - let them load for whoever solves it
+                        try:
+                            self.resource_policy.lift(self.driver)
+                        except Exception as e:
+                            print(f"⚠️ Could not lift resource blocking: {e}")
                     # Take screenshot
-                    screenshot_path = await self._take_captcha_screenshot()
+                    screenshot_path = self._take_captcha_screenshot()
                     
                     print(f"🚨 CAPTCHA detected - manual solving required")
                     return {
@@ -140,7 +190,7 @@ class EnhancedBrowserHandler:
             print(f"❌ CAPTCHA check error: {e}")
             return None
     
-    async def _take_captcha_screenshot(self) -> str:
+    def _take_captcha_screenshot(self) -> str:
         """Take a screenshot for CAPTCHA solving"""
         try:
             # Create screenshots directory
@@ -199,41 +249,27 @@ class EnhancedBrowserHandler:
             print(f"❌ Error waiting for CAPTCHA solution: {e}")
             return False
     
-    async def scan_form_elements(self, skip_captcha_check: bool = False) -> List[Dict[str, Any]]:
-        """Scan form elements (simplified version)"""
+    async def scan_form_elements(self, skip_captcha_check: bool = False, skeleton: bool = False) -> List[Dict[str, Any]]:
+        """Scan form elements with a single JavaScript snapshot of the page"""
+        return await self.run(self._scan_form_elements, skip_captcha_check, skeleton)
+    
+    def _scan_form_elements(self, skip_captcha_check: bool = False, skeleton: bool = False) -> List[Dict[str, Any]]:
+        """Scan form elements with a single JavaScript snapshot of the page.
+        skeleton=True skips label inference (structure only, for template lookups)."""
         try:
             # Check for CAPTCHA first unless skipped
             if not skip_captcha_check:
-                captcha_info = await self.check_for_captcha()
+                captcha_info = self._check_for_captcha()
                 if captcha_info:
                     print("🚨 CAPTCHA detected - returning CAPTCHA info")
                     return [{'__captcha_detected__': True, 'captcha_info': captcha_info}]
             
             print("📋 Scanning form elements...")
             
-            # Simple form scanning
-            inputs = self.driver.find_elements(By.CSS_SELECTOR, "input, textarea, select")
-            form_fields = []
-            
-            for element in inputs:
-                if not element.is_displayed():
-                    continue
-                
-                field_type = element.get_attribute('type') or 'text'
-                
-                # Skip certain types
-                if field_type in ['hidden', 'submit', 'button']:
-                    continue
-                
-                field_data = {
-                    'element': element,
-                    'type': field_type,
-                    'name': element.get_attribute('name') or element.get_attribute('id') or '',
-                    'label': element.get_attribute('placeholder') or 'Unknown field',
-                    'required': element.get_attribute('required') is not None
-                }
-                
-                form_fields.append(field_data)
+            # One injected script walks the DOM and returns every visible control
+            # (labels, options and groups resolved in-page) in a single round trip
+            snapshot = take_form_snapshot(self.driver, skeleton=skeleton)
+            form_fields = [field for field in snapshot['fields'] if field.get('element')]
             
             print(f"📋 Found {len(form_fields)} form fields")
             return form_fields
@@ -242,31 +278,40 @@ class EnhancedBrowserHandler:
             print(f"❌ Form scanning error: {e}")
             return []
     
-    async def submit_application(self) -> Dict[str, Any]:
+    async def complete_form_steps(self, answer_step, **engine_options) -> Dict[str, Any]:
+        """Scan, fill and advance through every step of the form up to its submit step"""
+        return await self.run(self._complete_form_steps, answer_step, **engine_options)
+    
+    def _complete_form_steps(self, answer_step, **engine_options) -> Dict[str, Any]:
+        """Scan, fill and advance through every step of the form up to its submit step.
+        answer_step(step) is called on this browser's thread for each step with new fields."""
+        engine = MultiPageEngine(self.driver, self.readiness, **engine_options)
+        outcome = engine.run(answer_step)
+        if outcome['submit_button']:
+            self.last_button = outcome['submit_button']
+        return outcome
+    
+    async def submit_application(self, preferred_locator: str = None) -> Dict[str, Any]:
+        """Submit the application using enhanced button detection"""
+        return await self.run(self._submit_application, preferred_locator)
+    
+    def _submit_application(self, preferred_locator: str = None) -> Dict[str, Any]:
         """Submit the application using enhanced button detection"""
         try:
             print("🚀 Attempting to submit application...")
             
             # Use the enhanced submit button finder
-            submit_success = await self.find_submit_button()
+            submit_success = self._find_submit_button(preferred_locator)
             
             if submit_success:
                 # Check for success indicators after submission
-                await asyncio.sleep(3)
+                self.readiness.wait_for_page()
                 
                 # Look for success messages
                 page_source = self.driver.page_source.lower()
-                success_indicators = [
-                    'thank you',
-                    'success',
-                    'submitted',
-                    'received',
-                    'confirmation',
-                    'complete'
-                ]
-                
-                for indicator in success_indicators:
+                for indicator in SUCCESS_INDICATORS:
                     if indicator in page_source:
+                        button_classifier.learn_from(self.last_button)
                         return {
                             'success': True,
                             'message': f'Application submitted successfully (detected: {indicator})',
@@ -292,149 +337,85 @@ class EnhancedBrowserHandler:
             }
     
     
+    async def confirm_completion(self) -> Dict[str, Any]:
+        """Whether a form that ended without a submit step (its last 'next' left a page with
+        nothing to fill or click) really was submitted: the visible text must confirm it"""
+        return await self.run(self._confirm_completion)
+    
+    def _confirm_completion(self) -> Dict[str, Any]:
+        try:
+            final_url = self.driver.current_url
+            page_text = (self.driver.execute_script(PAGE_TEXT_SCRIPT) or '').lower()
+            failure = next((f for f in FAILURE_INDICATORS if f in page_text), None)
+            if failure:
+                return {'success': False, 'final_url': final_url,
+                        'error': f"Form ended on a page that is not a confirmation (detected: {failure})"}
+            indicator = next((i for i in SUCCESS_INDICATORS if i in page_text), None)
+            if not indicator:
+                return {'success': False, 'final_url': final_url,
+                        'error': 'Form ended on a page without fields, buttons or a confirmation message'}
+            return {'success': True, 'final_url': final_url,
+                    'message': f'Application completed through its final step (detected: {indicator})'}
+        except Exception as e:
+            return {'success': False, 'error': f'Completion check error: {str(e)}'}
+    
     async def fill_field(self, field_data: Dict[str, Any], value: Any) -> bool:
         """Fill a form field with the given value"""
+        return await self.run(self._fill_field, field_data, value)
+    
+    def _fill_field(self, field_data: Dict[str, Any], value: Any) -> bool:
+        """Fill a form field with the given value"""
+        return self._fill_fields([(field_data, value)])[0]['filled']
+    
+    async def fill_fields(self, assignments: List[tuple], pacing_seconds: float = 0) -> List[Dict[str, Any]]:
+        """Fill every (field, value) pair on the page in one script call"""
+        return await self.run(self._fill_fields, assignments, pacing_seconds)
+    
+    def _fill_fields(self, assignments: List[tuple], pacing_seconds: float = 0) -> List[Dict[str, Any]]:
+        """Fill every (field, value) pair on the page in one script call"""
         try:
-            element = field_data['element']
-            field_type = field_data.get('type', 'text')
-            field_label = field_data.get('label', 'Unknown')
-            
-            print(f"📝 Filling field '{field_label}' with: {value}")
-            
-            # Scroll to element
-            self.driver.execute_script("arguments[0].scrollIntoView(true);", element)
-            await asyncio.sleep(0.5)
-            
-            if field_type in ['text', 'email', 'tel', 'url', 'search']:
-                # Text input
-                element.clear()
-                element.send_keys(str(value))
-                
-            elif field_type == 'textarea':
-                # Textarea
-                element.clear()
-                element.send_keys(str(value))
-                
-            elif field_type == 'select-one':
-                # Dropdown
-                from selenium.webdriver.support.ui import Select
-                select = Select(element)
-                
-                # Try to select by visible text first
-                try:
-                    select.select_by_visible_text(str(value))
-                except:
-                    # If that fails, try by value
-                    try:
-                        select.select_by_value(str(value))
-                    except:
-                        # If both fail, select first non-empty option
-                        options = [opt for opt in select.options if opt.text.strip() and opt.text.strip() != '--']
-                        if options:
-                            select.select_by_visible_text(options[0].text)
-                            
-            elif field_type == 'checkbox':
-                # Checkbox - check if value is truthy
-                if value and str(value).lower() not in ['false', 'no', '0', '']:
-                    if not element.is_selected():
-                        element.click()
+            pacing = f" over {pacing_seconds:.0f}s" if pacing_seconds else ""
+            print(f"📝 Filling {len(assignments)} field(s) in one pass{pacing}")
+            results = fill_values(self.driver, assignments, pacing_seconds)
+            
+            for (field_data, value), result in zip(assignments, results):
+                field_label = field_data.get('label', 'Unknown')
+                if result.get('filled'):
+                    print(f"✅ Filled '{field_label}' with: {value}")
                 else:
-                    if element.is_selected():
-                        element.click()
-                        
-            elif field_type == 'radio':
-                # Radio button - click if this is the selected value
-                if str(value).lower() in field_label.lower():
-                    element.click()
-                    
-            elif field_type == 'file':
-                # File upload
-                if value and os.path.exists(str(value)):
-                    element.send_keys(str(value))
-                    
-            print(f"✅ Successfully filled field '{field_label}'")
-            return True
+                    print(f"❌ Could not fill '{field_label}': {result.get('reason')}")
+            return results
             
         except Exception as e:
-            print(f"❌ Error filling field '{field_label}': {e}")
-            return False
+            print(f"❌ Error filling fields: {e}")
+            return [{'filled': False, 'reason': str(e)} for _ in assignments]
     
     
-    async def find_submit_button(self) -> bool:
+    async def find_submit_button(self, preferred_locator: str = None) -> bool:
+        """Enhanced submit button detection with click interception handling"""
+        return await self.run(self._find_submit_button, preferred_locator)
+    
+    def _find_submit_button(self, preferred_locator: str = None) -> bool:
         """Enhanced submit button detection with click interception handling"""
         try:
             print("🔍 Looking for submit button...")
             
-            submit_button = None
+            # One injected classifier ranks every clickable; learned overrides come first
+            candidate = button_classifier.best(self.driver, 'submit', url=self.current_url, fallback_kinds=['apply'],
+                                               preferred={'submit': [preferred_locator]} if preferred_locator else None)
+            self.last_button = candidate
             
-            # Method 1: Direct CSS selectors (avoiding :contains which doesn't work)
-            direct_selectors = [
-                'button[type="submit"]',
-                'input[type="submit"]',
-                '.resumator-external-apply-button',
-                '*[class*="submit"]',
-                '*[class*="apply"]',
-                '*[id*="submit"]',
-                '*[id*="apply"]'
-            ]
-            
-            for selector in direct_selectors:
-                try:
-                    buttons = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    for button in buttons:
-                        if button.is_displayed() and button.is_enabled():
-                            button_text = button.text.strip()
-                            button_class = button.get_attribute('class') or ''
-                            print(f"✅ Found submit button: '{button_text}' (class: {button_class})")
-                            submit_button = button
-                            break
-                    if submit_button:
-                        break
-                except Exception as e:
-                    print(f"⚠️ Error with selector {selector}: {e}")
-                    continue
-            
-            # Method 2: XPath text-based search if CSS failed
-            if not submit_button:
-                print("🔍 Trying XPath text-based search...")
-                
-                xpath_patterns = [
-                    "//button[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'submit')]",
-                    "//button[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'apply')]",
-                    "//div[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'apply')]",
-                    "//a[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'submit')]",
-                    "//*[contains(@class, 'resumator-external-apply-button')]",
-                    "//*[contains(@class, 'indeed-apply')]"
-                ]
-                
-                for xpath in xpath_patterns:
-                    try:
-                        elements = self.driver.find_elements(By.XPATH, xpath)
-                        for element in elements:
-                            if element.is_displayed() and element.is_enabled():
-                                element_text = element.text.strip() or element.get_attribute('value') or 'No text'
-                                print(f"✅ Found submit element via XPath: '{element_text}' (tag: {element.tag_name})")
-                                submit_button = element
-                                break
-                        if submit_button:
-                            break
-                    except Exception as e:
-                        print(f"⚠️ Error with XPath {xpath}: {e}")
-                        continue
-            
-            # Method 3: Try clicking the submit button with multiple strategies
-            if submit_button:
-                return await self._click_submit_button_with_fallbacks(submit_button)
+            if candidate:
+                return self._click_submit_button_with_fallbacks(candidate['element'])
             else:
                 print("❌ No submit button found")
-                await self._debug_available_buttons()
                 return False
                 
         except Exception as e:
             print(f"❌ Error in submit button detection: {e}")
             return False
     
-    async def _click_submit_button_with_fallbacks(self, submit_button) -> bool:
+    def _click_submit_button_with_fallbacks(self, submit_button) -> bool:
         """Try multiple strategies to click the submit button"""
         try:
             print(f"🎯 Attempting to click submit button: '{submit_button.text}'")
@@ -464,19 +445,19 @@ class EnhancedBrowserHandler:
                 });
             """)
             
-            await asyncio.sleep(1)
+            self.readiness.wait_for_dom_quiet()
             
             # Strategy 2: Scroll to submit button and ensure it's in view
             print("📍 Scrolling to submit button...")
             self.driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", submit_button)
-            await asyncio.sleep(2)
+            self.readiness.wait_for_element_stable(submit_button)
             
             # Strategy 3: Try normal click first
             try:
                 print("🖱️ Attempting normal click...")
                 submit_button.click()
                 print("✅ Normal click successful!")
-                await asyncio.sleep(3)
+                self.readiness.wait_for_page()
                 return True
                 
             except Exception as click_error:
@@ -487,7 +468,7 @@ class EnhancedBrowserHandler:
                     print("🖱️ Attempting JavaScript click...")
                     self.driver.execute_script("arguments[0].click();", submit_button)
                     print("✅ JavaScript click successful!")
-                    await asyncio.sleep(3)
+                    self.readiness.wait_for_page()
                     return True
                     
                 except Exception as js_error:
@@ -500,7 +481,7 @@ class EnhancedBrowserHandler:
                         actions = ActionChains(self.driver)
                         actions.move_to_element(submit_button).click().perform()
                         print("✅ ActionChains click successful!")
-                        await asyncio.sleep(3)
+                        self.readiness.wait_for_page()
                         return True
                         
                     except Exception as action_error:
@@ -512,7 +493,7 @@ class EnhancedBrowserHandler:
                             form = submit_button.find_element(By.XPATH, "./ancestor::form[1]")
                             self.driver.execute_script("arguments[0].submit();", form)
                             print("✅ Form submission successful!")
-                            await asyncio.sleep(3)
+                            self.readiness.wait_for_page()
                             return True
                             
                         except Exception as form_error:
@@ -524,7 +505,7 @@ class EnhancedBrowserHandler:
                                 parent = submit_button.find_element(By.XPATH, "./..")
                                 self.driver.execute_script("arguments[0].click();", parent)
                                 print("✅ Parent element click successful!")
-                                await asyncio.sleep(3)
+                                self.readiness.wait_for_page()
                                 return True
                                 
                             except Exception as parent_error:
@@ -535,32 +516,6 @@ class EnhancedBrowserHandler:
             print(f"❌ Error in click strategies: {e}")
             return False
     
-    async def _debug_available_buttons(self):
-        """Debug helper to show all available buttons on the page"""
-        try:
-            print("🔍 DEBUG: Available buttons on page:")
-            all_buttons = self.driver.find_elements(By.CSS_SELECTOR, 'button, input[type="button"], input[type="submit"], a[role="button"], div[role="button"], *[onclick]')
-            
-            visible_buttons = []
-            for btn in all_buttons:
-                try:
-                    if btn.is_displayed():
-                        text = btn.text.strip() or btn.get_attribute('value') or btn.get_attribute('aria-label') or 'No text'
-                        btn_class = btn.get_attribute('class') or 'No class'
-                        btn_id = btn.get_attribute('id') or 'No ID'
-                        tag = btn.tag_name
-                        visible_buttons.append(f"   {tag}: '{text[:50]}' (class: {btn_class[:50]}, id: {btn_id[:30]})")
-                except:
-                    continue
-            
-            print(f"   Found {len(visible_buttons)} visible clickable elements:")
-            for i, btn_info in enumerate(visible_buttons[:20]):  # Show first 20
-                print(f"   {i+1}. {btn_info}")
-                
-        except Exception as e:
-            print(f"   ❌ Debug error: {e}")
-
-    
     async def get_user_profile_data(self, user_id: str, profile_id: str = None) -> Dict[str, Any]:
         """Fetch user profile data from database instead of file"""
         try:
@@ -617,8 +572,70 @@ class EnhancedBrowserHandler:
             }
         }
 
+    def collect_resource_report(self) -> Dict[str, Any]:
+        """Network usage for the current application: blocked requests, bytes, page-load time"""
+        report = {'page_load_ms': self.page_load_ms}
+        if self.resource_policy:
+            report.update(self.resource_policy.read_network_log(self.driver))
+        return report
+    
+    def _navigation_duration_ms(self) -> Optional[float]:
+        try:
+            return self.driver.execute_script("""
+                var nav = performance.getEntriesByType('navigation')[0];
+                if (!nav) return null;
+                return Math.round((nav.loadEventEnd || performance.now()) - nav.startTime);
+            """)
+        except Exception:
+            return None
+    
+    def reset_session(self):
+        """Wipe cookies, storage and extra windows so the next lease starts clean"""
+        handles = self.driver.window_handles
+        for handle in handles[1:]:
+            self.driver.switch_to.window(handle)
+            self.driver.close()
+        self.driver.switch_to.window(handles[0])
+
+        # Clear web storage for every origin this lease visited, then every cookie in the profile
+        self.visited_origins.add(self._origin_of(self.driver.current_url))
+        for origin in self.visited_origins:
+            if origin:
+                self.driver.execute_cdp_cmd('Storage.clearDataForOrigin', {
+                    'origin': origin,
+                    'storageTypes': 'local_storage,session_storage,indexeddb,websql,service_workers,cache_storage'
+                })
+        self.driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+        self.driver.get('about:blank')
+        if self.resource_policy:
+            self.driver.get_log('performance')  # drop anything the last lease didn't collect
+
+        self.session_id = str(uuid.uuid4())
+        self.page_load_ms = None
+        self.last_button = None
+        self.current_application_id = None
+        self.current_url = None
+        self.visited_origins = set()
+        print(f"🧽 Browser reset for new session {self.session_id[:8]}")
+
+    @staticmethod
+    def _origin_of(url: str) -> Optional[str]:
+        parsed = urlparse(url or '')
+        if parsed.scheme not in ('http', 'https'):
+            return None
+        return f"{parsed.scheme}://{parsed.netloc}"
+
     def close(self):
         """Close the browser"""
+        self._quit_driver()
+        self.executor.shutdown()
+    
+    async def aclose(self):
+        """Close the browser without blocking the event loop"""
+        await self.run(self._quit_driver)
+        self.executor.shutdown()
+    
+    def _quit_driver(self):
         try:
             if self.driver:
                 self.driver.quit()
@@ -0,0 +1,155 @@
+# bot/form_template_cache.py - Per-ATS form templates keyed by (site domain, DOM fingerprint)
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+
+
+class FormTemplateCache:
+    """Remembers how a form was resolved so the next application on the same template
+    skips label inference and Q&A mapping.
+
+    A template is keyed by the site domain plus a hash of the form's structural
+    skeleton (tag, type, name, locator and choice values of every control, in DOM
+    order). It stores, per field locator, the label, type, option texts and the
+    profile key the label resolved to, plus the submit button locator.
+
+    Invalidation:
+      - the fingerprint drifts: a changed form hashes differently, misses, and is
+        re-learned; the drift is counted against the domain
+      - a cached mapping stops working (fill failures) -> invalidate()
+      - per domain only the `max_per_domain` most recently used templates are kept,
+        and templates unused for `max_age_days` are purged
+    """
+
+    def __init__(self, path: str, max_per_domain: int = 10, max_age_days: int = 30):
+        self.path = path
+        self.max_per_domain = max_per_domain
+        self.max_age = timedelta(days=max_age_days)
+        self._lock = threading.Lock()
+        self.templates: Dict[str, Dict[str, Dict[str, Any]]] = self._load()
+        self.metrics = {
+            'lookups': 0,
+            'hits': 0,
+            'misses': 0,
+            'drifts': 0,
+            'stores': 0,
+            'invalidations': 0
+        }
+
+    @staticmethod
+    def fingerprint(fields: List[Dict[str, Any]]) -> str:
+        """Hash of the structural skeleton - identical for skeleton and full snapshots"""
+        skeleton = [
+            [f.get('tag'), f.get('type'), f.get('name'), f.get('locator'), list(f.get('values') or [])]
+            for f in fields
+        ]
+        return hashlib.sha1(json.dumps(skeleton).encode('utf-8')).hexdigest()[:16]
+
+    def lookup(self, domain: str, fields: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Template for this exact form structure, or None (counted as a miss / drift)"""
+        fingerprint = self.fingerprint(fields)
+        self.metrics['lookups'] += 1
+        with self._lock:
+            domain_templates = self.templates.get(domain, {})
+            template = domain_templates.get(fingerprint)
+            if not template:
+                self.metrics['misses'] += 1
+                if domain_templates:
+                    self.metrics['drifts'] += 1
+                    print(f"🧬 Form template drift on {domain}: {fingerprint} not among {len(domain_templates)} known")
+                return None
+            template['last_used'] = datetime.utcnow().isoformat()
+            template['uses'] = template.get('uses', 0) + 1
+        self.metrics['hits'] += 1
+        print(f"🧬 Form template hit on {domain} ({fingerprint}, used {template['uses']}x)")
+        return template
+
+    def apply(self, template: Dict[str, Any], fields: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Copy cached labels / option texts onto skeleton-scanned fields"""
+        for field in fields:
+            cached = template['fields'].get(field.get('locator'))
+            if not cached:
+                continue
+            field['label'] = cached.get('label') or field.get('label')
+            if field.get('elements') and len(cached.get('options') or []) == len(field['elements']):
+                field['options'] = cached['options']
+        return fields
+
+    def store(self, domain: str, fields: List[Dict[str, Any]], mapping: Dict[str, Dict[str, Any]],
+              submit_locator: str = None) -> str:
+        """Save the resolved mapping {locator: {label, type, options, profile_key, source}}"""
+        fingerprint = self.fingerprint(fields)
+        now = datetime.utcnow().isoformat()
+        with self._lock:
+            domain_templates = self.templates.setdefault(domain, {})
+            domain_templates[fingerprint] = {
+                'fingerprint': fingerprint,
+                'fields': mapping,
+                'submit_locator': submit_locator,
+                'created_at': now,
+                'last_used': now,
+                'uses': 0
+            }
+            self._evict(domain)
+            self._save()
+        self.metrics['stores'] += 1
+        print(f"🧬 Stored form template for {domain} ({fingerprint}, {len(mapping)} fields)")
+        return fingerprint
+
+    def record_submit(self, domain: str, fingerprint: str, locator: str):
+        with self._lock:
+            template = self.templates.get(domain, {}).get(fingerprint)
+            if template and locator and template.get('submit_locator') != locator:
+                template['submit_locator'] = locator
+                self._save()
+
+    def invalidate(self, domain: str, fingerprint: str, reason: str = ''):
+        with self._lock:
+            if self.templates.get(domain, {}).pop(fingerprint, None) is None:
+                return
+            if not self.templates[domain]:
+                del self.templates[domain]
+            self._save()
+        self.metrics['invalidations'] += 1
+        print(f"🧬 Invalidated form template {fingerprint} on {domain}: {reason}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self.metrics.copy()
+        stats['hit_rate'] = (stats['hits'] / stats['lookups'] * 100) if stats['lookups'] else 0
+        stats['domains'] = len(self.templates)
+        stats['templates'] = sum(len(t) for t in self.templates.values())
+        return stats
+
+    def _evict(self, domain: str):
+        cutoff = (datetime.utcnow() - self.max_age).isoformat()
+        domain_templates = self.templates[domain]
+        for fingerprint in [fp for fp, t in domain_templates.items() if t.get('last_used', '') < cutoff]:
+            del domain_templates[fingerprint]
+        if len(domain_templates) > self.max_per_domain:
+            by_recency = sorted(domain_templates, key=lambda fp: domain_templates[fp].get('last_used', ''))
+            for fingerprint in by_recency[:len(domain_templates) - self.max_per_domain]:
+                del domain_templates[fingerprint]
+
+    def _load(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"⚠️ Could not read form templates ({e}); starting fresh")
+            return {}
+
+    def _save(self):
+        try:
+            # Atomic swap: workers sharing BOT_DATA_DIR never read half a file
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, 'w') as f:
+                json.dump(self.templates, f, indent=2)
+            os.replace(tmp, self.path)
+        except IOError as e:
+            print(f"⚠️ Could not save form templates: {e}")
@@ -0,0 +1,129 @@
+// classify_buttons.js - Score every clickable element as submit / next / apply in one pass
+//
+// Executed with driver.execute_script(script, options):
+//   options.kinds:     kinds to rank (default ['submit', 'next', 'apply'])
+//   options.overrides: {kind: [locator, ...]} learned for this site; a visible,
+//                      enabled match outranks every heuristic candidate
+//   options.limit:     candidates returned per kind (default 5)
+// Returns {kind: [{element, locator, tag, text, score, override}], clickables: n}.
+//
+// Uses clean/isVisible/locatorFor from dom_helpers.js (prepended by page_scripts.py).
+var options = arguments[0] || {};
+var kinds = options.kinds || ['submit', 'next', 'apply'];
+var overrides = options.overrides || {};
+var limit = options.limit || 5;
+
+// [pattern, weight] matched against the element's visible text / value / aria-label
+var TEXT_RULES = {
+    submit: [[/submit (my |your )?application/, 12], [/\bsubmit\b/, 9], [/send application/, 9],
+             [/\bfinish\b/, 6], [/complete application/, 7], [/\bsend\b/, 4], [/\bapply\b/, 4],
+             [/\bnext\b|continue|\bback\b|previous|cancel|save (as )?draft|sign in|log ?in|search|subscribe/, -10]],
+    next: [[/save (and|&) continue/, 10], [/\bnext\b/, 9], [/continue/, 8], [/proceed/, 6],
+           [/\bsubmit\b|\bback\b|previous|cancel|sign in|log ?in/, -10]],
+    apply: [[/apply (now|for this (job|position|role))/, 12], [/easy apply/, 10], [/\bapply\b/, 8],
+            [/i'?m interested/, 5], [/submit|sign in|log ?in|search/, -6]]
+};
+
+// Substrings of class / id / name attributes
+var ATTR_RULES = {
+    submit: [['submit', 3], ['resumator-submit', 6], ['apply-button', 2]],
+    next: [['next', 3], ['continue', 3], ['forward', 2]],
+    apply: [['apply', 3], ['resumator-external-apply-button', 6], ['indeed-apply', 5]]
+};
+
+var CANDIDATES = 'button, input[type="submit"], input[type="button"], input[type="image"], a, ' +
+    '[role="button"], [onclick], [class*="btn"], [class*="button"], [class*="submit"], [class*="apply"]';
+
+function textOf(el) {
+    if (el.tagName === 'INPUT') return clean(el.value || el.getAttribute('aria-label') || el.alt || '');
+    return clean(el.innerText || el.textContent || el.getAttribute('aria-label') || el.title || '');
+}
+
+function isEnabled(el) {
+    return !el.disabled && el.getAttribute('aria-disabled') !== 'true';
+}
+
+function formHasFields(form) {
+    return !!(form && form.querySelector('input:not([type="hidden"]):not([type="submit"]), select, textarea'));
+}
+
+function score(kind, el, text, attrs) {
+    var total = 0;
+    var lowered = text.toLowerCase();
+    TEXT_RULES[kind].forEach(function (rule) {
+        if (rule[0].test(lowered)) total += rule[1];
+    });
+    ATTR_RULES[kind].forEach(function (rule) {
+        if (attrs.indexOf(rule[0]) !== -1) total += rule[1];
+    });
+
+    var type = (el.getAttribute('type') || '').toLowerCase();
+    var isNative = el.tagName === 'BUTTON' || el.tagName === 'INPUT';
+    if (kind === 'submit') {
+        if (type === 'submit' || (el.tagName === 'BUTTON' && !type && el.form)) total += 4;
+        if (formHasFields(el.form || el.closest('form'))) total += 3;
+    }
+    if (kind === 'next' && type === 'submit') total += 1;
+    if (isNative || el.getAttribute('role') === 'button') total += 1;
+    if (el.tagName === 'A' && (el.getAttribute('href') || '').indexOf('mailto:') === 0) total -= 10;
+    // Long text blocks are containers that happen to mention a keyword
+    if (text.length > 60) total -= 5;
+    return total;
+}
+
+var NATIVE = 'button, input[type="submit"], input[type="button"], input[type="image"], a[href]';
+
+// Score the element a user would actually click: skip wrappers around a native
+// button/link, and decorated spans nested inside one.
+function isOwnClickable(el) {
+    var tag = el.tagName;
+    if (tag !== 'BUTTON' && tag !== 'INPUT' && tag !== 'A' && el.querySelector(NATIVE)) return false;
+    return !(el.parentElement && el.parentElement.closest('button, a'));
+}
+
+var elements = document.querySelectorAll(CANDIDATES);
+var ranked = {};
+kinds.forEach(function (kind) { ranked[kind] = []; });
+
+// Learned overrides first - only the first visible, enabled match per locator counts
+kinds.forEach(function (kind) {
+    (overrides[kind] || []).forEach(function (locator, index) {
+        var el;
+        try { el = document.querySelector(locator); } catch (e) { el = null; }
+        if (!el || !isVisible(el) || !isEnabled(el)) return;
+        ranked[kind].push({
+            element: el, locator: locator, tag: el.tagName.toLowerCase(), text: textOf(el),
+            score: 1000 - index, override: true
+        });
+    });
+});
+
+var clickables = 0;
+for (var i = 0; i < elements.length; i++) {
+    var el = elements[i];
+    if (!isOwnClickable(el) || !isVisible(el) || !isEnabled(el)) continue;
+    var text = textOf(el);
+    if (!text && el.tagName !== 'INPUT') continue;
+    clickables++;
+
+    var attrs = ((el.className && el.className.baseVal !== undefined ? el.className.baseVal : el.className) + ' ' +
+        el.id + ' ' + (el.getAttribute('name') || '')).toLowerCase();
+    var locator = null;
+
+    kinds.forEach(function (kind) {
+        var value = score(kind, el, text, attrs);
+        if (value <= 0) return;
+        if (ranked[kind].some(function (c) { return c.element === el; })) return;
+        locator = locator || locatorFor(el);
+        ranked[kind].push({
+            element: el, locator: locator, tag: el.tagName.toLowerCase(), text: text.slice(0, 80),
+            score: value, override: false
+        });
+    });
+}
+
+var result = { clickables: clickables };
+kinds.forEach(function (kind) {
+    result[kind] = ranked[kind].sort(function (a, b) { return b.score - a.score; }).slice(0, limit);
+});
+return result;
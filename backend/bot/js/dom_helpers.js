@@ -0,0 +1,52 @@
+// dom_helpers.js - Shared helpers prepended to page scripts that need them
+//
+// Plain function declarations only: page_scripts.py concatenates this file in
+// front of a script body before it is sent with execute_script.
+
+function clean(text) {
+    return (text || '').replace(/\s+/g, ' ').trim();
+}
+
+function isVisible(el) {
+    if (!el.isConnected) return false;
+    var style = window.getComputedStyle(el);
+    if (style.display === 'none' || style.visibility === 'hidden') return false;
+    if (el.type !== 'file' && parseFloat(style.opacity) === 0) return false;
+    return el.getClientRects().length > 0;
+}
+
+function cssEscape(value) {
+    return window.CSS && CSS.escape ? CSS.escape(value) : value.replace(/(["\\#.:\[\]])/g, '\\$1');
+}
+
+function locatorFor(el) {
+    var tag = el.tagName.toLowerCase();
+    if (el.id && document.querySelectorAll('#' + cssEscape(el.id)).length === 1) {
+        return '#' + cssEscape(el.id);
+    }
+    var name = el.getAttribute('name');
+    if (name) {
+        var byName = tag + '[name="' + cssEscape(name) + '"]';
+        if ((el.type === 'radio' || el.type === 'checkbox') && el.value) {
+            var byValue = byName + '[value="' + cssEscape(el.value) + '"]';
+            if (document.querySelectorAll(byValue).length === 1) return byValue;
+        }
+        if (document.querySelectorAll(byName).length === 1) return byName;
+    }
+    var parts = [];
+    var node = el;
+    while (node && node.nodeType === 1 && node !== document.body) {
+        if (node !== el && node.id && document.querySelectorAll('#' + cssEscape(node.id)).length === 1) {
+            parts.unshift('#' + cssEscape(node.id));
+            break;
+        }
+        var index = 1;
+        var sibling = node;
+        while ((sibling = sibling.previousElementSibling)) {
+            if (sibling.tagName === node.tagName) index++;
+        }
+        parts.unshift(node.tagName.toLowerCase() + ':nth-of-type(' + index + ')');
+        node = node.parentElement;
+    }
+    return parts.join(' > ');
+}
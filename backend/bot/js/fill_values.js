@@ -0,0 +1,202 @@
+// fill_values.js - Fill every resolved field on a page in one WebDriver call
+//
+// arguments[0]: list of {element, elements?, options?, values?, value}
+// arguments[1]: {pacingMs: total time budget for the page, 0 = fill instantly}
+// arguments[2]: async callback (only when pacing, via execute_async_script)
+//
+// Values are written through the native value setter and followed by
+// input/change/blur events so React/Angular/Vue forms pick them up. Radio and
+// checkbox choices are clicked so the framework sees a real toggle. File inputs
+// are left to Python (send_keys) and reported as {filled: false, reason: 'file'}.
+var entries = arguments[0] || [];
+var options = arguments[1] || {};
+var done = arguments[2];
+var pacingMs = done ? (options.pacingMs || 0) : 0;
+var STEP_MS = 40;
+
+function text(value) {
+    return value === null || value === undefined ? '' : String(value);
+}
+
+function fire(el, type) {
+    el.dispatchEvent(new Event(type, { bubbles: true }));
+}
+
+// React tracks the last value it rendered; going through the prototype setter
+// keeps its tracker in sync so the following input event is not swallowed.
+function setNativeValue(el, value) {
+    var proto = el.tagName === 'TEXTAREA' ? HTMLTextAreaElement.prototype
+        : el.tagName === 'SELECT' ? HTMLSelectElement.prototype
+        : HTMLInputElement.prototype;
+    var setter = Object.getOwnPropertyDescriptor(proto, 'value').set;
+    setter.call(el, value);
+}
+
+function matches(choice, optionText, optionValue) {
+    var wanted = choice.toLowerCase();
+    var label = text(optionText).toLowerCase();
+    return wanted === label || wanted === text(optionValue).toLowerCase() || (label && label.indexOf(wanted) !== -1);
+}
+
+function matchesExactly(choice, optionText, optionValue) {
+    var wanted = choice.trim().toLowerCase();
+    return wanted === text(optionText).trim().toLowerCase() || wanted === text(optionValue).trim().toLowerCase();
+}
+
+// Index of the choice among radio/checkbox options: an exact label/value match wins over
+// containment, so "No" never lands on "Not sure" or "None" listed before it
+function findOption(choice, elements, labels, values) {
+    var i;
+    for (i = 0; i < elements.length; i++) {
+        if (matchesExactly(choice, labels[i], values[i] || elements[i].value)) return i;
+    }
+    for (i = 0; i < elements.length; i++) {
+        if (matches(choice, labels[i], values[i] || elements[i].value)) return i;
+    }
+    return -1;
+}
+
+function isTruthy(value) {
+    return ['', 'false', 'no', '0', 'null', 'none'].indexOf(text(value).trim().toLowerCase()) === -1;
+}
+
+function fillSelect(el, value) {
+    var choice = text(value);
+    var best = -1;
+    for (var i = 0; i < el.options.length; i++) {
+        var option = el.options[i];
+        if (choice.toLowerCase() === option.text.trim().toLowerCase() || choice === option.value) {
+            best = i;
+            break;
+        }
+        if (best === -1 && option.value && matches(choice, option.text.trim(), option.value)) best = i;
+    }
+    if (best === -1) return { filled: false, reason: 'no matching option' };
+    el.focus();
+    setNativeValue(el, el.options[best].value);
+    fire(el, 'input');
+    fire(el, 'change');
+    el.blur();
+    return { filled: true };
+}
+
+function setChecked(el, checked) {
+    if (el.checked !== checked) el.click();
+}
+
+function fillChoice(entry) {
+    var elements = entry.elements && entry.elements.length ? entry.elements : [entry.element];
+    var labels = entry.options || [];
+    var values = entry.values || [];
+    var type = elements[0].type;
+
+    if (elements.length === 1 && type === 'checkbox' && !labels.length) {
+        setChecked(elements[0], isTruthy(entry.value));
+        return { filled: true };
+    }
+
+    if (type === 'checkbox') {
+        var choices = text(entry.value).split(',').map(function (c) { return c.trim(); }).filter(Boolean);
+        var picked = choices.map(function (c) { return findOption(c, elements, labels, values); });
+        var any = false;
+        elements.forEach(function (el, i) {
+            var wanted = picked.indexOf(i) !== -1;
+            if (elements.length === 1 && !wanted) wanted = isTruthy(entry.value);
+            setChecked(el, wanted);
+            any = any || wanted;
+        });
+        return any || elements.length === 1 ? { filled: true } : { filled: false, reason: 'no matching option' };
+    }
+
+    var index = findOption(text(entry.value), elements, labels, values);
+    if (index === -1) return { filled: false, reason: 'no matching option' };
+    setChecked(elements[index], true);
+    return { filled: true };
+}
+
+function isTextLike(entry) {
+    var el = entry.element;
+    if (!el || entry.elements && entry.elements.length > 1) return false;
+    if (el.tagName === 'TEXTAREA') return true;
+    return el.tagName === 'INPUT' && ['radio', 'checkbox', 'file'].indexOf(el.type) === -1;
+}
+
+function finishText(el, value) {
+    setNativeValue(el, value);
+    fire(el, 'input');
+    fire(el, 'change');
+    el.blur();
+}
+
+function fillNow(entry) {
+    var el = entry.element || (entry.elements || [])[0];
+    if (!el || !el.isConnected) return { filled: false, reason: 'detached' };
+    if (el.tagName === 'INPUT' && el.type === 'file') return { filled: false, reason: 'file' };
+    if (el.tagName === 'SELECT') return fillSelect(el, entry.value);
+    if (el.type === 'radio' || el.type === 'checkbox') return fillChoice(entry);
+    el.focus();
+    finishText(el, text(entry.value));
+    return { filled: true };
+}
+
+function fillSafely(entry) {
+    try {
+        return fillNow(entry);
+    } catch (e) {
+        return { filled: false, reason: String(e && e.message || e) };
+    }
+}
+
+if (!pacingMs) {
+    var filled = entries.map(fillSafely);
+    if (done) done(filled);
+    return filled;
+}
+
+// Human pacing: spread the page budget over the fields in proportion to their
+// length and reveal text progressively, one input event per step.
+var weights = entries.map(function (entry) {
+    return isTextLike(entry) ? Math.max(1, text(entry.value).length) : 10;
+});
+var totalWeight = weights.reduce(function (a, b) { return a + b; }, 0) || 1;
+var results = [];
+
+function next(index) {
+    if (index >= entries.length) {
+        done(results);
+        return;
+    }
+    var entry = entries[index];
+    var share = pacingMs * weights[index] / totalWeight;
+
+    if (!isTextLike(entry) || !entry.element.isConnected) {
+        results.push(fillSafely(entry));
+        setTimeout(function () { next(index + 1); }, share);
+        return;
+    }
+
+    var el = entry.element;
+    var value = text(entry.value);
+    var steps = Math.max(1, Math.min(value.length, Math.floor(share / STEP_MS)));
+    var step = 0;
+    el.focus();
+
+    (function type() {
+        step++;
+        try {
+            if (step < steps) {
+                setNativeValue(el, value.slice(0, Math.ceil(value.length * step / steps)));
+                fire(el, 'input');
+                setTimeout(type, share / steps);
+                return;
+            }
+            finishText(el, value);
+            results.push({ filled: true });
+        } catch (e) {
+            results.push({ filled: false, reason: String(e && e.message || e) });
+        }
+        setTimeout(function () { next(index + 1); }, share / steps);
+    })();
+}
+
+next(0);
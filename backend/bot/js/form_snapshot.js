@@ -0,0 +1,204 @@
+// form_snapshot.js - Single-pass snapshot of every visible form control
+//
+// Executed with driver.execute_script(script, options). Walks the DOM once and
+// returns one entry per visible control (radio/checkbox groups collapsed into a
+// single entry). DOM nodes in the result come back to Python as WebElements,
+// so the whole scan costs one WebDriver round trip.
+//
+// options.known: list of locators already seen on this page; those controls are
+//                returned as {locator, known: true} stubs so callers can diff steps.
+// options.skeleton: structure only - skip label, question and option-text inference
+//                   (label/options come back empty; used for template-cache lookups).
+//
+// Uses clean/isVisible/locatorFor from dom_helpers.js (prepended by page_scripts.py).
+var options = arguments[0] || {};
+var known = {};
+var skeleton = !!options.skeleton;
+(options.known || []).forEach(function (locator) { known[locator] = true; });
+
+var SKIP_TYPES = { hidden: 1, submit: 1, button: 1, reset: 1, image: 1 };
+
+function labelsText(el) {
+    if (!el.labels || !el.labels.length) return '';
+    var texts = [];
+    for (var i = 0; i < el.labels.length; i++) {
+        // Wrapping labels also contain the control's own text (e.g. select options)
+        var clone = el.labels[i].cloneNode(true);
+        clone.querySelectorAll('select, textarea, option').forEach(function (n) { n.remove(); });
+        texts.push(clean(clone.textContent));
+    }
+    return clean(texts.join(' '));
+}
+
+function ariaText(el) {
+    var ids = el.getAttribute('aria-labelledby');
+    if (ids) {
+        var text = ids.split(/\s+/).map(function (id) {
+            var ref = document.getElementById(id);
+            return ref ? clean(ref.textContent) : '';
+        }).join(' ');
+        if (clean(text)) return clean(text);
+    }
+    return clean(el.getAttribute('aria-label'));
+}
+
+// Text that sits directly before the control (label/span/p without a "for" link)
+function precedingText(el) {
+    var node = el;
+    for (var depth = 0; depth < 3 && node; depth++) {
+        var sibling = node.previousElementSibling;
+        while (sibling) {
+            var tag = sibling.tagName;
+            if (tag === 'INPUT' || tag === 'SELECT' || tag === 'TEXTAREA' || tag === 'BR') {
+                sibling = sibling.previousElementSibling;
+                continue;
+            }
+            if (sibling.querySelector('input, select, textarea')) break;
+            var text = clean(sibling.textContent);
+            if (text) return text;
+            sibling = sibling.previousElementSibling;
+        }
+        node = node.parentElement;
+        if (node && node.tagName === 'FORM') break;
+    }
+    return '';
+}
+
+// Text right after a radio/checkbox ("<input type=radio> Yes")
+function optionText(el) {
+    var text = labelsText(el);
+    if (text) return text;
+    var next = el.nextSibling;
+    while (next) {
+        if (next.nodeType === 3 && clean(next.textContent)) return clean(next.textContent);
+        if (next.nodeType === 1) {
+            if (next.tagName === 'INPUT') break;
+            if (clean(next.textContent)) return clean(next.textContent);
+        }
+        next = next.nextSibling;
+    }
+    return ariaText(el) || el.value || '';
+}
+
+function questionFor(el) {
+    var fieldset = el.closest('fieldset');
+    if (fieldset) {
+        var legend = fieldset.querySelector('legend');
+        if (legend && clean(legend.textContent)) return clean(legend.textContent);
+    }
+    var group = el.closest('[role="radiogroup"], [role="group"]');
+    if (group) {
+        var groupLabel = ariaText(group);
+        if (groupLabel) return groupLabel;
+    }
+    return precedingText(el);
+}
+
+function isRequired(el, label, labelNode) {
+    if (el.required || el.getAttribute('aria-required') === 'true') return true;
+    if (label && label.indexOf('*') !== -1) return true;
+    return !!(labelNode && /required/i.test(labelNode.className || ''));
+}
+
+function requiredLabelNode(el) {
+    if (el.labels && el.labels.length) return el.labels[0];
+    var sibling = el.previousElementSibling;
+    while (sibling && (sibling.tagName === 'INPUT' || sibling.tagName === 'BR')) {
+        sibling = sibling.previousElementSibling;
+    }
+    return sibling;
+}
+
+var fields = [];
+var groups = {};
+var controls = document.querySelectorAll('input, textarea, select');
+
+for (var i = 0; i < controls.length; i++) {
+    var el = controls[i];
+    var type = (el.type || 'text').toLowerCase();
+    if (SKIP_TYPES[type] || !isVisible(el)) continue;
+
+    var locator = locatorFor(el);
+    var name = el.getAttribute('name') || el.id || '';
+    var isChoice = type === 'radio' || type === 'checkbox';
+
+    if (isChoice && name) {
+        var groupSize = document.querySelectorAll(
+            'input[type="' + type + '"][name="' + cssEscape(name) + '"]').length;
+        if (groupSize > 1) {
+            var key = type + ':' + name;
+            var group = groups[key];
+            if (!group) {
+                var question = skeleton ? '' : questionFor(el);
+                group = groups[key] = {
+                    element: el,
+                    elements: [],
+                    locator: 'input[type="' + type + '"][name="' + cssEscape(name) + '"]',
+                    tag: 'input',
+                    type: type,
+                    name: name,
+                    id: el.id || '',
+                    label: skeleton ? '' : question.replace(/\*/g, '').trim() || name,
+                    required: isRequired(el, question, requiredLabelNode(el)),
+                    options: [],
+                    values: [],
+                    checked: [],
+                    group: name
+                };
+                if (known[group.locator]) {
+                    groups[key] = { locator: group.locator, known: true, elements: [] };
+                }
+                fields.push(groups[key]);
+                group = groups[key];
+            }
+            if (group.known) continue;
+            group.elements.push(el);
+            group.options.push(skeleton ? '' : optionText(el));
+            group.values.push(el.value);
+            if (el.checked) group.checked.push(el.value);
+            if (el.required) group.required = true;
+            continue;
+        }
+    }
+
+    if (known[locator]) {
+        fields.push({ locator: locator, known: true });
+        continue;
+    }
+
+    var label = '';
+    if (!skeleton) {
+        label = labelsText(el) || ariaText(el);
+        if (!label && !isChoice) label = precedingText(el);
+        if (!label && isChoice) label = optionText(el);
+        label = label || el.getAttribute('placeholder') || el.getAttribute('title') || name;
+    }
+
+    var field = {
+        element: el,
+        locator: locator,
+        tag: el.tagName.toLowerCase(),
+        type: type,
+        name: name,
+        id: el.id || '',
+        label: clean(label.replace(/\*/g, '')),
+        placeholder: el.getAttribute('placeholder') || '',
+        required: skeleton ? el.required : isRequired(el, label, requiredLabelNode(el)),
+        value: isChoice ? (el.checked ? el.value : '') : (type === 'file' ? '' : el.value),
+        group: null
+    };
+    if (el.tagName === 'SELECT') {
+        field.options = [];
+        field.values = [];
+        for (var j = 0; j < el.options.length; j++) {
+            var option = el.options[j];
+            var text = clean(option.text);
+            if (!text || text.indexOf('--') !== -1) continue;
+            field.options.push(text);
+            field.values.push(option.value);
+        }
+    }
+    fields.push(field);
+}
+
+return { url: window.location.href, title: document.title, fields: fields };
@@ -0,0 +1,72 @@
+// page_readiness.js - One poll of the page's readiness signals
+//
+// Executed with driver.execute_script(script, element). The first call on a
+// document installs a MutationObserver and fetch/XHR in-flight counters on
+// window.__applyReadiness; every call returns the current signals so Python can
+// decide which readiness conditions hold. All times are performance.now() ms.
+//
+// arguments[0]: optional element whose bounding rect should be reported.
+var element = arguments[0];
+var state = window.__applyReadiness;
+
+if (!state) {
+    state = window.__applyReadiness = {
+        installedAt: performance.now(),
+        lastMutation: performance.now(),
+        lastRequest: 0,
+        inflight: 0
+    };
+
+    var root = document.documentElement || document;
+    new MutationObserver(function () {
+        state.lastMutation = performance.now();
+    }).observe(root, { childList: true, subtree: true, attributes: true, characterData: true });
+
+    var started = function () { state.inflight++; state.lastRequest = performance.now(); };
+    var finished = function () {
+        state.inflight = Math.max(0, state.inflight - 1);
+        state.lastRequest = performance.now();
+    };
+
+    if (window.fetch) {
+        var originalFetch = window.fetch;
+        window.fetch = function () {
+            started();
+            return originalFetch.apply(this, arguments).then(
+                function (response) { finished(); return response; },
+                function (error) { finished(); throw error; }
+            );
+        };
+    }
+
+    var originalSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        started();
+        this.addEventListener('loadend', finished);
+        return originalSend.apply(this, arguments);
+    };
+}
+
+// Last completed network activity, including requests issued before install
+var lastResource = 0;
+var resources = performance.getEntriesByType('resource');
+for (var i = 0; i < resources.length; i++) {
+    if (resources[i].responseEnd > lastResource) lastResource = resources[i].responseEnd;
+}
+var navigation = performance.getEntriesByType('navigation')[0];
+if (navigation && navigation.loadEventEnd > lastResource) lastResource = navigation.loadEventEnd;
+
+var rect = null;
+if (element && element.isConnected) {
+    var box = element.getBoundingClientRect();
+    rect = [Math.round(box.x), Math.round(box.y), Math.round(box.width), Math.round(box.height)];
+}
+
+return {
+    now: performance.now(),
+    readyState: document.readyState,
+    inflight: state.inflight,
+    lastNetwork: Math.max(lastResource, state.lastRequest),
+    lastMutation: state.lastMutation,
+    rect: rect
+};
@@ -0,0 +1,266 @@
+# bot/llm_cache.py - Persistent, bounded cache of LLM answers (SQLite file or Redis)
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, Optional
+
+try:
+    import redis
+except ImportError:  # LLM_CACHE=redis falls back to sqlite
+    redis = None
+
+CACHE_FORMAT = 1  # bump when prompts change in a way that invalidates stored answers
+
+
+def normalize_text(text: Any) -> str:
+    """Case, spacing, and the required-field asterisks/colons forms decorate labels with don't matter"""
+    text = re.sub(r'\s+', ' ', str(text or '')).strip().lower()
+    return re.sub(r'[\s*:?]+$', '', text)
+
+
+def cache_key(model: str, template: str, inputs: Dict[str, Any], profile_version: str = None) -> str:
+    """(model, prompt template id, normalized inputs, profile version) -> cache key.
+    Option lists are sorted - the answer names an option, so their order doesn't matter."""
+    normalized = {}
+    for name, value in inputs.items():
+        if isinstance(value, (list, tuple)):
+            normalized[name] = sorted(normalize_text(item) for item in value)
+        elif isinstance(value, str):
+            normalized[name] = normalize_text(value)
+        else:
+            normalized[name] = value
+    material = json.dumps([CACHE_FORMAT, model, template, normalized, profile_version], sort_keys=True)
+    return f"{template}:{hashlib.sha256(material.encode()).hexdigest()[:40]}"
+
+
+def profile_version(profile_data: Dict[str, Any]) -> str:
+    """Content hash of a profile: any edit makes a new version, so stale answers are never reused"""
+    return hashlib.sha256(json.dumps(profile_data, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+class _Stats:
+    def __init__(self):
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'sets': 0, 'evictions': 0, 'errors': 0}
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self.stats.copy()
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = (stats['hits'] / lookups) if lookups else 0
+        stats['backend'] = self.backend
+        stats.update(self.size())
+        return stats
+
+
+class SQLiteLLMCache(_Stats):
+    """LLM answers in a local SQLite file: TTL per entry, least recently used entries evicted
+    once the cache exceeds max_entries or max_bytes (down to 90% of the limit)"""
+    backend = 'sqlite'
+
+    def __init__(self, path: str, ttl_seconds: float, max_entries: int, max_bytes: int):
+        super().__init__()
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS llm_cache_accessed_idx ON llm_cache (accessed_at);
+        """)
+        self._entries, self._bytes = self.conn.execute(
+            "SELECT count(*), COALESCE(sum(size), 0) FROM llm_cache").fetchone()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        now = time.time()
+        try:
+            with self._lock:
+                row = self.conn.execute("SELECT value, size, expires_at FROM llm_cache WHERE key = ?",
+                                        (key,)).fetchone()
+                if row and row[2] <= now:
+                    self.conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    self._entries -= 1
+                    self._bytes -= row[1]
+                    self.stats['expired'] += 1
+                    row = None
+                if not row:
+                    self.stats['misses'] += 1
+                    return default
+                self.conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+                self.stats['hits'] += 1
+                return json.loads(row[0])
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"⚠️ LLM cache read error: {e}")
+            return default
+
+    def set(self, key: str, value: Any, ttl_seconds: float = None):
+        data = json.dumps(value)
+        size = len(key) + len(data)
+        now = time.time()
+        try:
+            with self._lock:
+                old = self.conn.execute("SELECT size FROM llm_cache WHERE key = ?", (key,)).fetchone()
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, size, created_at, accessed_at, expires_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, data, size, now, now, now + (ttl_seconds or self.ttl_seconds)))
+                self._entries += 0 if old else 1
+                self._bytes += size - (old[0] if old else 0)
+                self.stats['sets'] += 1
+                if self._entries > self.max_entries or self._bytes > self.max_bytes:
+                    self._evict()
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"⚠️ LLM cache write error: {e}")
+
+    def _evict(self):
+        """Expired entries first, then least recently used ones"""
+        self.conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),))
+        entries, size = self.conn.execute("SELECT count(*), COALESCE(sum(size), 0) FROM llm_cache").fetchone()
+        evicted = self._entries - entries
+        target_entries, target_bytes = int(self.max_entries * 0.9), int(self.max_bytes * 0.9)
+        if entries > target_entries or size > target_bytes:
+            drop, freed = 0, 0
+            for (row_size,) in self.conn.execute("SELECT size FROM llm_cache ORDER BY accessed_at"):
+                if entries - drop <= target_entries and size - freed <= target_bytes:
+                    break
+                drop += 1
+                freed += row_size
+            self.conn.execute("DELETE FROM llm_cache WHERE key IN "
+                              "(SELECT key FROM llm_cache ORDER BY accessed_at LIMIT ?)", (drop,))
+            entries, size = entries - drop, size - freed
+            evicted += drop
+        self._entries, self._bytes = entries, size
+        self.stats['evictions'] += evicted
+
+    def size(self) -> Dict[str, Any]:
+        return {'entries': self._entries, 'bytes': self._bytes,
+                'max_entries': self.max_entries, 'max_bytes': self.max_bytes}
+
+    def close(self):
+        self.conn.close()
+
+
+class RedisLLMCache(_Stats):
+    """LLM answers in Redis, shared by every worker: values expire through Redis TTLs; a sorted
+    set of access times and a hash of entry sizes drive the same LRU bound as the SQLite cache"""
+    backend = 'redis'
+    PREFIX = 'intelliapply:llm_cache'
+
+    def __init__(self, url: str, ttl_seconds: float, max_entries: int, max_bytes: int):
+        super().__init__()
+        self.redis = redis.Redis.from_url(url, decode_responses=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.lru_key = f"{self.PREFIX}:lru"
+        self.sizes_key = f"{self.PREFIX}:sizes"
+        self.bytes_key = f"{self.PREFIX}:bytes"
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            value = self.redis.get(f"{self.PREFIX}:{key}")
+            if value is None:
+                self.stats['misses'] += 1
+                if self.redis.zscore(self.lru_key, key) is not None:
+                    self.stats['expired'] += 1  # the TTL ran out; forget its bookkeeping
+                    self._forget([key])
+                return default
+            self.redis.zadd(self.lru_key, {key: time.time()})
+            self.stats['hits'] += 1
+            return json.loads(value)
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"⚠️ LLM cache read error: {e}")
+            return default
+
+    def set(self, key: str, value: Any, ttl_seconds: float = None):
+        data = json.dumps(value)
+        size = len(key) + len(data)
+        try:
+            old = self.redis.hget(self.sizes_key, key)
+            pipe = self.redis.pipeline()
+            pipe.set(f"{self.PREFIX}:{key}", data, ex=int(ttl_seconds or self.ttl_seconds))
+            pipe.zadd(self.lru_key, {key: time.time()})
+            pipe.hset(self.sizes_key, key, size)
+            pipe.incrby(self.bytes_key, size - int(old or 0))
+            pipe.execute()
+            self.stats['sets'] += 1
+            if self.redis.zcard(self.lru_key) > self.max_entries or \
+                    int(self.redis.get(self.bytes_key) or 0) > self.max_bytes:
+                self._evict()
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"⚠️ LLM cache write error: {e}")
+
+    def _evict(self):
+        target_entries, target_bytes = int(self.max_entries * 0.9), int(self.max_bytes * 0.9)
+        entries, size = self.redis.zcard(self.lru_key), int(self.redis.get(self.bytes_key) or 0)
+        while entries > target_entries or size > target_bytes:
+            oldest = [key for key, _ in self.redis.zpopmin(self.lru_key, 100)]
+            if not oldest:
+                break
+            size -= self._forget(oldest)
+            entries -= len(oldest)
+            self.stats['evictions'] += len(oldest)
+
+    def _forget(self, keys) -> int:
+        sizes = self.redis.hmget(self.sizes_key, keys)
+        freed = sum(int(s or 0) for s in sizes)
+        pipe = self.redis.pipeline()
+        pipe.delete(*(f"{self.PREFIX}:{key}" for key in keys))
+        pipe.zrem(self.lru_key, *keys)
+        pipe.hdel(self.sizes_key, *keys)
+        pipe.incrby(self.bytes_key, -freed)
+        pipe.execute()
+        return freed
+
+    def size(self) -> Dict[str, Any]:
+        try:
+            return {'entries': self.redis.zcard(self.lru_key), 'bytes': int(self.redis.get(self.bytes_key) or 0),
+                    'max_entries': self.max_entries, 'max_bytes': self.max_bytes}
+        except Exception:
+            return {'entries': None, 'bytes': None, 'max_entries': self.max_entries, 'max_bytes': self.max_bytes}
+
+    def close(self):
+        self.redis.close()
+
+
+_shared_caches: Dict[str, Any] = {}
+
+
+def shared_llm_cache(backend: str, path: str, redis_url: str = None, ttl_seconds: float = 30 * 86400,
+                     max_entries: int = 100000, max_bytes: int = 200 * 1024 * 1024):
+    """The process-wide cache for these settings ("sqlite", "redis" or "off" -> None)"""
+    if backend == 'off':
+        return None
+    identity = f"{backend}:{redis_url if backend == 'redis' else path}"
+    if identity not in _shared_caches:
+        cache = None
+        if backend == 'redis':
+            if redis is None:
+                print("⚠️ LLM_CACHE=redis needs the redis package - using the SQLite cache")
+            else:
+                try:
+                    cache = RedisLLMCache(redis_url, ttl_seconds, max_entries, max_bytes)
+                    cache.redis.ping()
+                except Exception as e:
+                    print(f"⚠️ Redis LLM cache unavailable ({e}) - using the SQLite cache")
+                    cache = None
+        _shared_caches[identity] = cache or SQLiteLLMCache(path, ttl_seconds, max_entries, max_bytes)
+    return _shared_caches[identity]
@@ -0,0 +1,330 @@
+# bot/llm_gateway.py - Async Gemini REST client: concurrency limit, deadlines, jittered retries, hedging, circuit breaker
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Optional
+
+import httpx
+
+DEFAULT_BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+MAX_BACKOFF_SECONDS = 8.0
+MIN_HEDGE_SAMPLES = 20  # latencies needed before the p95 is trusted for hedging
+
+
+class LLMUnavailable(Exception):
+    """No answer from the model: deadline passed, retries used up, request rejected or circuit open"""
+
+
+class _RetryableError(Exception):
+    def __init__(self, message: str, retry_after: float = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failed calls; after reset_seconds one probe is let through
+    (half-open) - its success closes the circuit, its failure opens it again, and a probe that ends
+    without telling either way (cancelled, unexpected error) lets the next call probe instead"""
+
+    def __init__(self, threshold: int, reset_seconds: float, clock=time.monotonic):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def allow(self) -> bool:
+        if self.state == 'open' and self.clock() - self.opened_at >= self.reset_seconds:
+            self.state = 'half_open'
+            self._probing = False
+        if self.state == 'closed':
+            return True
+        if self.state == 'half_open' and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self):
+        self.state = 'closed'
+        self.failures = 0
+        self._probing = False
+
+    def release(self):
+        """The call ended without a verdict on the service - free the probe slot"""
+        self._probing = False
+
+    def record_failure(self) -> bool:
+        """True when this failure opened the circuit"""
+        self.failures += 1
+        if self.state == 'half_open' or (self.state == 'closed' and self.failures >= self.threshold):
+            self.state = 'open'
+            self.opened_at = self.clock()
+            self._probing = False
+            return True
+        return False
+
+
+class LLMGateway:
+    """Every Gemini call of the process goes through here.
+
+    Requests run on the gateway's own event loop thread, so synchronous callers (generate_sync,
+    GatewayModel) and async ones (generate) share one connection pool, one concurrency limit and
+    one circuit breaker. Each call has a deadline; 408/429/5xx and transport errors are retried
+    with full-jitter exponential backoff (or the server's Retry-After) while the deadline allows.
+    With hedging on, a call still unanswered after the recent p95 latency gets a second request
+    if a slot is free, and the first answer wins. Consecutive failed calls open the circuit:
+    calls fail fast with LLMUnavailable and the AI engines fall back to their rules.
+    """
+
+    def __init__(self, api_key: str, model: str = 'gemini-1.5-flash', base_url: str = None,
+                 max_concurrent: int = 8, timeout_seconds: float = 20, max_retries: int = 3,
+                 hedge: bool = True, hedge_min_seconds: float = 1.5, breaker_threshold: int = 5,
+                 breaker_reset_seconds: float = 30):
+        self.api_key = api_key
+        self.model = model
+        self.url = f"{(base_url or DEFAULT_BASE_URL).rstrip('/')}/models/{model}:generateContent"
+        self.max_concurrent = max_concurrent
+        self.timeout_seconds = timeout_seconds
+        self.max_retries = max_retries
+        self.hedge = hedge
+        self.hedge_min_seconds = hedge_min_seconds
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset_seconds)
+        self._latencies = deque(maxlen=200)
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._semaphore = None
+        self._client = None
+        self.stats = {
+            'calls': 0,
+            'successes': 0,
+            'failures': 0,
+            'attempts': 0,
+            'retries': 0,
+            'timeouts': 0,
+            'hedges_sent': 0,
+            'hedges_won': 0,
+            'short_circuited': 0,
+            'breaker_opens': 0,
+            'in_flight': 0,
+            'max_in_flight': 0,
+            'total_call_ms': 0.0
+        }
+
+    # --- Entry points ---
+
+    async def generate(self, prompt: str, deadline_seconds: float = None) -> str:
+        """Model text for prompt; raises LLMUnavailable"""
+        future = asyncio.run_coroutine_threadsafe(self._call(prompt, deadline_seconds), self._ensure_loop())
+        return await asyncio.wrap_future(future)
+
+    def generate_sync(self, prompt: str, deadline_seconds: float = None) -> str:
+        """generate() for blocking callers (never from the gateway's own loop)"""
+        future = asyncio.run_coroutine_threadsafe(self._call(prompt, deadline_seconds), self._ensure_loop())
+        return future.result()
+
+    def close(self):
+        with self._lock:
+            if not self._loop:
+                return
+            asyncio.run_coroutine_threadsafe(self._client.aclose(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+            self._loop = self._thread = None
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if not self._loop:
+                loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=loop.run_forever, name='llm-gateway', daemon=True)
+                self._thread.start()
+                asyncio.run_coroutine_threadsafe(self._open(), loop).result()
+                self._loop = loop
+            return self._loop
+
+    async def _open(self):
+        # Loop-bound state is created on the gateway loop
+        self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        self._client = httpx.AsyncClient(
+            timeout=self.timeout_seconds,
+            limits=httpx.Limits(max_connections=self.max_concurrent * 2,
+                                max_keepalive_connections=self.max_concurrent)
+        )
+
+    # --- One call: breaker, deadline, retries ---
+
+    async def _call(self, prompt: str, deadline_seconds: float = None) -> str:
+        stats = self.stats
+        stats['calls'] += 1
+        if not self.breaker.allow():
+            stats['short_circuited'] += 1
+            raise LLMUnavailable("LLM circuit open - using fallbacks")
+
+        deadline = deadline_seconds or self.timeout_seconds
+        started = time.perf_counter()
+        settled = False  # the breaker heard how the call went - a half-open probe must always settle
+        try:
+            text = await asyncio.wait_for(self._with_retries(prompt, time.monotonic() + deadline), timeout=deadline)
+            self.breaker.record_success()
+            settled = True
+        except asyncio.TimeoutError:
+            stats['timeouts'] += 1
+            self._record_failure()
+            settled = True
+            raise LLMUnavailable(f"LLM gave no answer within {deadline}s")
+        except _RetryableError as e:
+            self._record_failure()
+            settled = True
+            raise LLMUnavailable(str(e))
+        except LLMUnavailable:
+            stats['failures'] += 1
+            self.breaker.record_success()  # rejected request - the service itself is up
+            settled = True
+            raise
+        finally:
+            stats['total_call_ms'] += (time.perf_counter() - started) * 1000
+            if not settled:
+                self.breaker.release()
+
+        stats['successes'] += 1
+        return text
+
+    def _record_failure(self):
+        self.stats['failures'] += 1
+        if self.breaker.record_failure():
+            self.stats['breaker_opens'] += 1
+            print(f"⚠️ LLM circuit open for {self.breaker.reset_seconds}s after "
+                  f"{self.breaker.failures} failed call(s) - AI answers fall back to rules")
+
+    async def _with_retries(self, prompt: str, deadline_at: float) -> str:
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await self._hedged(prompt)
+            except _RetryableError as e:
+                if attempt == self.max_retries:
+                    raise
+                # Full jitter keeps workers hit by the same 429 from retrying in lockstep
+                delay = e.retry_after if e.retry_after is not None else \
+                    random.uniform(0, min(MAX_BACKOFF_SECONDS, 0.5 * 2 ** attempt))
+                if time.monotonic() + delay >= deadline_at:
+                    raise
+                self.stats['retries'] += 1
+                await asyncio.sleep(delay)
+
+    # --- One attempt, possibly hedged ---
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds before a hedge is sent: the recent p95 latency (None until enough samples)"""
+        if not self.hedge or len(self._latencies) < MIN_HEDGE_SAMPLES:
+            return None
+        latencies = sorted(self._latencies)
+        return max(self.hedge_min_seconds, latencies[int(len(latencies) * 0.95) - 1])
+
+    async def _hedged(self, prompt: str) -> str:
+        delay = self.hedge_delay()
+        primary = asyncio.ensure_future(self._attempt(prompt))
+        tasks = {primary}
+        try:
+            if delay is not None:
+                await asyncio.wait(tasks, timeout=delay)
+                # Hedge only with spare capacity - under load it would just add to the queue
+                if not primary.done() and not self._semaphore.locked():
+                    self.stats['hedges_sent'] += 1
+                    tasks.add(asyncio.ensure_future(self._attempt(prompt)))
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.stats['hedges_won'] += 1
+                        return task.result()
+            raise primary.exception()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _attempt(self, prompt: str) -> str:
+        stats = self.stats
+        async with self._semaphore:
+            stats['attempts'] += 1
+            stats['in_flight'] += 1
+            stats['max_in_flight'] = max(stats['max_in_flight'], stats['in_flight'])
+            started = time.perf_counter()
+            try:
+                response = await self._client.post(
+                    self.url,
+                    params={'key': self.api_key},
+                    json={'contents': [{'parts': [{'text': prompt}]}]}
+                )
+            except httpx.TimeoutException:
+                raise _RetryableError(f"LLM request timed out after {self.timeout_seconds}s")
+            except httpx.TransportError as e:
+                raise _RetryableError(f"LLM connection error: {e}")
+            finally:
+                stats['in_flight'] -= 1
+
+            if response.status_code in RETRYABLE_STATUS:
+                raise _RetryableError(f"LLM HTTP {response.status_code}", self._retry_after(response))
+            if response.status_code >= 400:
+                raise LLMUnavailable(f"LLM HTTP {response.status_code}: {response.text[:200]}")
+            self._latencies.append(time.perf_counter() - started)
+            return self._extract_text(response.json())
+
+    @staticmethod
+    def _retry_after(response: httpx.Response) -> Optional[float]:
+        try:
+            return min(float(response.headers['retry-after']), MAX_BACKOFF_SECONDS)
+        except (KeyError, ValueError):
+            return None
+
+    @staticmethod
+    def _extract_text(data: Dict[str, Any]) -> str:
+        candidates = data.get('candidates') or []
+        parts = (candidates[0].get('content') or {}).get('parts') or [] if candidates else []
+        text = ''.join(part.get('text', '') for part in parts)
+        if not text:
+            reason = candidates[0].get('finishReason') if candidates else \
+                (data.get('promptFeedback') or {}).get('blockReason')
+            raise LLMUnavailable(f"LLM returned no text ({reason or 'empty response'})")
+        return text
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self.stats.copy()
+        latencies = sorted(self._latencies)
+        stats['p50_ms'] = latencies[len(latencies) // 2] * 1000 if latencies else 0
+        stats['p95_ms'] = latencies[max(int(len(latencies) * 0.95) - 1, 0)] * 1000 if latencies else 0
+        stats['avg_call_ms'] = (stats['total_call_ms'] / stats['calls']) if stats['calls'] else 0
+        stats['hedge_delay_ms'] = (self.hedge_delay() or 0) * 1000
+        stats['breaker'] = self.breaker.state
+        return stats
+
+
+class GatewayModel:
+    """Stands in for genai.GenerativeModel: generate_content() through the gateway"""
+
+    class Response:
+        def __init__(self, text: str):
+            self.text = text
+
+    def __init__(self, gateway: LLMGateway):
+        self.gateway = gateway
+
+    def generate_content(self, prompt: str) -> 'GatewayModel.Response':
+        return self.Response(self.gateway.generate_sync(prompt))
+
+
+_shared_gateways: Dict[str, LLMGateway] = {}
+
+
+def shared_gateway(api_key: str, **options) -> LLMGateway:
+    """The process-wide gateway for api_key (options apply when it is first created)"""
+    if api_key not in _shared_gateways:
+        _shared_gateways[api_key] = LLMGateway(api_key, **options)
+    return _shared_gateways[api_key]
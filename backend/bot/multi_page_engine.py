@@ -0,0 +1,297 @@
+# bot/multi_page_engine.py - Page-state machine for multi-step application forms
+import re
+import time
+from typing import Dict, Any, List, Callable, Optional
+from selenium.common.exceptions import NoAlertPresentException
+from bot.page_scripts import take_form_snapshot, fill_values
+from bot.button_classifier import button_classifier
+
+SCAN = 'scan'
+FILL = 'fill'
+ADVANCE = 'advance'
+REVIEW = 'review'
+SUBMIT = 'submit'
+DONE = 'done'
+FAILED = 'failed'
+
+# Wording of "check your answers" steps that have no controls of their own
+REVIEW_PATTERN = re.compile(
+    r'review (your|and submit|the information|application)|application summary|'
+    r'confirm (your|the) (details|information|application)|please (review|verify)', re.I)
+
+PAGE_TEXT_SCRIPT = "return (document.body && document.body.innerText || '').slice(0, 5000);"
+
+
+def _answer_key(text: Optional[str]) -> str:
+    return re.sub(r'[^a-z0-9]+', ' ', (text or '').lower()).strip()
+
+
+class MultiPageEngine:
+    """Walks a multi-step application form until its submit step.
+
+    States, per step:
+      scan    - one snapshot of the step; controls seen on earlier steps of the same
+                URL are passed as known locators and come back as stubs, so only new
+                controls get label inference (a DOM diff instead of a full rescan)
+      fill    - answers given on earlier steps are carried forward by label / name;
+                the rest come from the answer_step callback, then one fill_values call
+      review  - no new controls and review wording on the page; nothing to fill
+                (step kinds: 'form', 'review', 'navigation', 'submit')
+      advance - click the best 'next' button and wait for the page to settle. A step
+                whose URL, controls and buttons are unchanged afterwards is stuck
+      submit  - the best button is a submit: stop and hand back to the caller, who
+                owns CAPTCHA checks and success detection
+      done    - a later step with nothing to fill and no button: possibly the confirmation
+                page, but unverified - the caller checks before counting it as submitted
+    Every step records scan / resolve / fill / advance milliseconds in `pages`.
+
+    All methods are blocking WebDriver calls - run the engine on the browser's thread.
+    """
+
+    def __init__(self, driver, readiness, classifier=None, pacing_seconds: float = 0, max_pages: int = 15,
+                 template_cache=None, domain: str = None):
+        self.driver = driver
+        self.readiness = readiness
+        self.classifier = classifier or button_classifier
+        self.pacing_seconds = pacing_seconds
+        self.max_pages = max_pages
+        # Optional FormTemplateCache: steps are then scanned structure-first and
+        # a cached step skips label inference
+        self.template_cache = template_cache
+        self.domain = domain
+        self.state = SCAN
+        self.pages: List[Dict[str, Any]] = []
+        self.answers: Dict[str, Any] = {}
+        self.known_locators = set()
+        self.known_url = None
+        self.error = None
+
+    def run(self, answer_step: Callable[[Dict[str, Any]], List[tuple]]) -> Dict[str, Any]:
+        """Drive the form to its submit step.
+
+        answer_step(step) receives the step dict (its 'pending' fields still need an
+        answer, 'answers' holds everything answered so far) and returns a list of
+        (field, value) assignments. Returns {state, error, pages, submit_button, total_ms}.
+        """
+        started = time.perf_counter()
+        submit_button = None
+        previous_signature = None
+
+        while self.state not in (SUBMIT, DONE, FAILED):
+            if len(self.pages) >= self.max_pages:
+                self._fail(f"gave up after {self.max_pages} steps")
+                break
+
+            step = self._scan_step()
+            if step is None:
+                break
+
+            if step['fields']:
+                self.state = FILL
+                self._fill_step(step, answer_step)
+
+            buttons = self._rank_buttons(step)
+            if buttons is None:
+                break
+            signature = (step['url'], tuple(step['visible']), buttons['signature'])
+            if signature == previous_signature:
+                self._fail(f"step {step['index'] + 1} did not advance: {self.pages[-2].get('alert') or 'form unchanged'}")
+                break
+            previous_signature = signature
+            if len(self.pages) > 1:
+                # The previous step's button really moved the form on
+                self.classifier.learn_from(self.pages[-2].get('next_button'))
+
+            if step['kind'] == REVIEW:
+                print(f"🔎 Step {step['index'] + 1} is a review step")
+
+            next_button, submit_candidate = buttons['next'], buttons['submit']
+            if next_button and (not submit_candidate or next_button['score'] >= submit_candidate['score']):
+                self.state = ADVANCE
+                self._advance(step, next_button)
+            elif submit_candidate:
+                step['kind'] = SUBMIT
+                submit_button = submit_candidate
+                self.state = SUBMIT
+            elif not step['fields'] and step['index'] > 0:
+                # Nothing to fill and nowhere to go: the form may have been completed along the
+                # way - the caller must confirm it (error pages and login walls look the same)
+                self.state = DONE
+            else:
+                self._fail(f"no next or submit button on step {step['index'] + 1}")
+
+        total_ms = (time.perf_counter() - started) * 1000
+        self._log_timings(total_ms)
+        return {
+            'state': self.state,
+            'error': self.error,
+            'pages': self.pages,
+            'submit_button': submit_button,
+            'total_ms': round(total_ms)
+        }
+
+    def _scan_step(self) -> Optional[Dict[str, Any]]:
+        self.state = SCAN
+        started = time.perf_counter()
+        url = self.driver.current_url
+        if url != self.known_url:
+            # A new document: nothing on it has been seen yet
+            self.known_locators = set()
+            self.known_url = url
+            self.readiness.for_url(url)
+
+        template = None
+        try:
+            if self.template_cache:
+                snapshot = take_form_snapshot(self.driver, self.known_locators, skeleton=True)
+                fields = [f for f in snapshot['fields'] if f.get('element')]
+                template = self.template_cache.lookup(self.domain, fields) if fields else None
+                if template:
+                    fields = self.template_cache.apply(template, fields)
+            if not template:
+                snapshot = take_form_snapshot(self.driver, self.known_locators)
+                fields = [f for f in snapshot['fields'] if f.get('element')]
+        except Exception as e:
+            self._fail(f"scan failed: {e}")
+            return None
+
+        visible = sorted(f['locator'] for f in snapshot['fields'])
+        known = len(visible) - len(fields)
+        kind = 'form' if fields else self._classify_empty_step()
+
+        step = {
+            'index': len(self.pages),
+            'url': url,
+            'kind': kind,
+            'fields': fields,
+            'pending': fields,
+            'visible': visible,
+            'template': template,
+            'answers': self.answers,
+            'assignments': [],
+            'results': [],
+            'carried': 0,
+            'filled': 0,
+            'timings': {'scan_ms': round((time.perf_counter() - started) * 1000)}
+        }
+        self.pages.append(step)
+        self.known_locators.update(visible)
+        print(f"📄 Step {step['index'] + 1}: {len(fields)} new field(s), {known} already seen ({kind})")
+        return step
+
+    def _classify_empty_step(self) -> str:
+        try:
+            text = self.driver.execute_script(PAGE_TEXT_SCRIPT) or ''
+        except Exception:
+            text = ''
+        return REVIEW if REVIEW_PATTERN.search(text) else 'navigation'
+
+    def _fill_step(self, step: Dict[str, Any], answer_step: Callable[[Dict[str, Any]], List[tuple]]):
+        carried, pending = [], []
+        for field in step['fields']:
+            value = self._carried_answer(field)
+            if value is not None:
+                carried.append((field, value))
+            else:
+                pending.append(field)
+        step['pending'] = pending
+        step['carried'] = len(carried)
+        if carried:
+            print(f"↪️ Carrying {len(carried)} answer(s) forward from earlier steps")
+
+        started = time.perf_counter()
+        try:
+            assignments = carried + list(answer_step(step) if pending else [])
+        except Exception as e:
+            print(f"❌ Error answering step {step['index'] + 1}: {e}")
+            assignments = carried
+        step['timings']['resolve_ms'] = round((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        try:
+            results = fill_values(self.driver, assignments, self.pacing_seconds)
+        except Exception as e:
+            print(f"❌ Error filling step {step['index'] + 1}: {e}")
+            results = [{'filled': False, 'reason': str(e)} for _ in assignments]
+        step['timings']['fill_ms'] = round((time.perf_counter() - started) * 1000)
+
+        for (field, value), result in zip(assignments, results):
+            if result.get('filled'):
+                self._remember_answer(field, value)
+                print(f"✅ Filled '{field.get('label', '')}' with: {value}")
+            else:
+                print(f"❌ Could not fill '{field.get('label', '')}': {result.get('reason')}")
+        step['assignments'] = assignments
+        step['results'] = results
+        step['filled'] = sum(1 for result in results if result.get('filled'))
+
+    def _carried_answer(self, field: Dict[str, Any]) -> Any:
+        for key in (_answer_key(field.get('label')), 'name:' + (field.get('name') or '')):
+            if key and key != 'name:' and key in self.answers:
+                return self.answers[key]
+        return None
+
+    def _remember_answer(self, field: Dict[str, Any], value: Any):
+        label = _answer_key(field.get('label'))
+        if label:
+            self.answers[label] = value
+        if field.get('name'):
+            self.answers['name:' + field['name']] = value
+
+    def _rank_buttons(self, step: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        template = step.get('template') or {}
+        preferred = {'submit': [template['submit_locator']]} if template.get('submit_locator') else None
+        try:
+            ranked = self.classifier.classify(self.driver, step['url'], ['next', 'submit'], preferred)
+        except Exception as e:
+            self._fail(f"button classification failed: {e}")
+            return None
+
+        buttons = {'signature': []}
+        for kind in ('next', 'submit'):
+            candidates = ranked.get(kind) or []
+            best = dict(candidates[0], kind=kind, url=step['url']) if candidates else None
+            buttons[kind] = best
+            buttons['signature'].extend(c['locator'] + ':' + c.get('text', '') for c in candidates)
+        buttons['signature'] = tuple(buttons['signature'])
+        return buttons
+
+    def _advance(self, step: Dict[str, Any], button: Dict[str, Any]):
+        started = time.perf_counter()
+        print(f"➡️ Advancing from step {step['index'] + 1} via '{button.get('text')}'")
+        try:
+            try:
+                button['element'].click()
+            except Exception as click_error:
+                print(f"⚠️ Normal click failed ({click_error}), using JavaScript click")
+                self.driver.execute_script("arguments[0].click();", button['element'])
+            step['alert'] = self._dismiss_alert()
+            if step['alert']:
+                print(f"⚠️ Step {step['index'] + 1} raised an alert: {step['alert']}")
+            else:
+                step['next_button'] = button
+                self.readiness.wait_for_page()
+        except Exception as e:
+            print(f"❌ Error advancing from step {step['index'] + 1}: {e}")
+        step['timings']['advance_ms'] = round((time.perf_counter() - started) * 1000)
+
+    def _dismiss_alert(self) -> Optional[str]:
+        """Validation messages on some forms are alert() dialogs that block every other call"""
+        try:
+            alert = self.driver.switch_to.alert
+            text = alert.text
+            alert.accept()
+            return text
+        except NoAlertPresentException:
+            return None
+
+    def _fail(self, error: str):
+        self.state = FAILED
+        self.error = error
+        print(f"❌ Multi-page form: {error}")
+
+    def _log_timings(self, total_ms: float):
+        for step in self.pages:
+            timings = ', '.join(f"{name[:-3]} {value} ms" for name, value in step['timings'].items())
+            print(f"⏱️ Step {step['index'] + 1} ({step['kind']}, {step['filled']} filled): {timings}")
+        print(f"⏱️ {len(self.pages)} step(s) in {total_ms:.0f} ms, ended in state '{self.state}'")
@@ -0,0 +1,163 @@
+# bot/node_registry.py - Bot worker node registry: heartbeats, dead-node detection, cluster stats
+import json
+import os
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+from database.connection import db
+from config import settings
+
+try:
+    import psutil
+except ImportError:  # nodes report no RSS without psutil
+    psutil = None
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # BOT_NODE_REGISTRY=redis falls back to postgres
+    aioredis = None
+
+# Nodes in these states are not expected to heartbeat
+FINISHED_STATES = ('stopped', 'dead')
+
+
+class PostgresNodeRegistry:
+    """Nodes are rows in bot_workers (sql/005_bot_workers.sql, 006_worker_heartbeats.sql)"""
+
+    backend = 'postgres'
+
+    async def heartbeat(self, node: Dict[str, Any]) -> bool:
+        return await db.report_bot_worker(node)
+
+    async def get_nodes(self) -> List[Dict[str, Any]]:
+        return await db.get_bot_workers()
+
+    async def set_state(self, worker_id: str, state: str) -> bool:
+        return await db.set_bot_worker_state(worker_id, state)
+
+
+class RedisNodeRegistry:
+    """Nodes are JSON values in one Redis hash (worker id -> node), for clusters that already run Redis"""
+
+    backend = 'redis'
+    KEY = 'intelliapply:bot_nodes'
+
+    def __init__(self, url: str):
+        self.redis = aioredis.from_url(url, decode_responses=True)
+
+    async def heartbeat(self, node: Dict[str, Any]) -> bool:
+        try:
+            node = {**node, 'last_seen_at': datetime.now(timezone.utc).isoformat()}
+            await self.redis.hset(self.KEY, node['worker_id'], json.dumps(node, default=str))
+            return True
+        except Exception as e:
+            print(f"❌ Error reporting bot worker status to Redis: {e}")
+            return False
+
+    async def get_nodes(self) -> List[Dict[str, Any]]:
+        try:
+            nodes = [json.loads(value) for value in (await self.redis.hgetall(self.KEY)).values()]
+        except Exception as e:
+            print(f"❌ Error reading bot workers from Redis: {e}")
+            return []
+        return sorted(nodes, key=lambda node: node.get('last_seen_at') or '', reverse=True)
+
+    async def set_state(self, worker_id: str, state: str) -> bool:
+        try:
+            value = await self.redis.hget(self.KEY, worker_id)
+            if value:
+                await self.redis.hset(self.KEY, worker_id, json.dumps({**json.loads(value), 'state': state}))
+            return True
+        except Exception as e:
+            print(f"❌ Error updating bot worker state in Redis: {e}")
+            return False
+
+
+def build_node_registry():
+    if settings.bot_node_registry == 'redis':
+        if aioredis:
+            return RedisNodeRegistry(settings.redis_url)
+        print("⚠️ BOT_NODE_REGISTRY=redis but the redis package is not installed - using postgres")
+    return PostgresNodeRegistry()
+
+
+def seconds_since_seen(node: Dict[str, Any]) -> Optional[float]:
+    value = node.get('last_seen_at')
+    if not value:
+        return None
+    try:
+        seen = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if not seen.tzinfo:
+        seen = seen.replace(tzinfo=timezone.utc)
+    return (datetime.now(timezone.utc) - seen).total_seconds()
+
+
+def is_alive(node: Dict[str, Any]) -> bool:
+    age = seconds_since_seen(node)
+    return node.get('state') not in FINISHED_STATES and age is not None and age <= settings.bot_node_timeout_seconds
+
+
+def is_dead(node: Dict[str, Any]) -> bool:
+    """Stopped heartbeating without saying goodbye (crashed, killed, lost its network)"""
+    age = seconds_since_seen(node)
+    return node.get('state') not in FINISHED_STATES and (age is None or age > settings.bot_node_timeout_seconds)
+
+
+def process_tree_rss_mb() -> Optional[float]:
+    """Resident memory of this process plus its children (chromedriver and Chrome)"""
+    if not psutil:
+        return None
+    try:
+        root = psutil.Process(os.getpid())
+        return round(sum(p.memory_info().rss for p in [root] + root.children(recursive=True)) / (1024 * 1024), 1)
+    except Exception:
+        return None
+
+
+def aggregate_cluster(nodes: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Cluster-wide totals over the live nodes, plus a summary line per node"""
+    live = [node for node in nodes if is_alive(node)]
+    running = [node for node in live if node.get('state') == 'running']
+    totals = {'total_processed': 0, 'successful': 0, 'failed': 0, 'captcha_required': 0}
+    claims = {'claimed': 0, 'leases_requeued': 0, 'leases_renewed': 0, 'leases_lost': 0, 'dead_nodes_reclaimed': 0}
+    for node in live:
+        stats = node.get('stats') or {}
+        for key in totals:
+            totals[key] += stats.get(key, 0) or 0
+        for key in claims:
+            claims[key] += (stats.get('queue_claims') or {}).get(key, 0) or 0
+
+    capacity = sum(node.get('max_concurrent') or 0 for node in running)
+    busy = sum(node.get('busy_slots') or 0 for node in running)
+    finished = totals['successful'] + totals['failed']
+    return {
+        'registry': settings.bot_node_registry,
+        'nodes_live': len(live),
+        'nodes_running': len(running),
+        'nodes_dead': sum(1 for node in nodes if node.get('state') == 'dead' or is_dead(node)),
+        'capacity': capacity,
+        'busy_slots': busy,
+        'utilization_percent': round(busy / capacity * 100, 1) if capacity else 0,
+        'active_sessions': sum(node.get('active_sessions') or 0 for node in live),
+        'parked_captchas': sum(node.get('parked_captchas') or 0 for node in live),
+        'rss_mb': round(sum(node.get('rss_mb') or 0 for node in live), 1),
+        **totals,
+        'success_rate': round(totals['successful'] / finished * 100, 1) if finished else 0,
+        'queue_claims': claims,
+        'nodes': [{
+            'worker_id': node['worker_id'],
+            'hostname': node.get('hostname'),
+            'pid': node.get('pid'),
+            'state': node.get('state') if is_alive(node) or node.get('state') in FINISHED_STATES else 'unresponsive',
+            'max_concurrent': node.get('max_concurrent'),
+            'busy_slots': node.get('busy_slots'),
+            'active_sessions': node.get('active_sessions'),
+            'rss_mb': node.get('rss_mb'),
+            'seen_seconds_ago': round(seconds_since_seen(node) or 0, 1)
+        } for node in nodes]
+    }
+
+
+# Global registry instance
+node_registry = build_node_registry()
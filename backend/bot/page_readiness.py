@@ -0,0 +1,143 @@
+# bot/page_readiness.py - Event-driven page readiness checks that replace fixed sleeps
+import time
+from typing import Dict, Any, Optional, Iterable
+from urllib.parse import urlparse
+from bot.page_scripts import load_page_script
+
+READY_STATE = 'ready_state'
+NETWORK_IDLE = 'network_idle'
+DOM_QUIET = 'dom_quiet'
+ELEMENT_STABLE = 'element_stable'
+
+# Deadlines are seconds; quiet windows are milliseconds. A condition that misses its
+# deadline is logged and dropped, so the bot never waits longer than the slowest deadline.
+DEFAULT_TUNING = {
+    'ready_state_timeout': 15,
+    'network_idle_timeout': 5,
+    'network_idle_ms': 500,
+    'dom_quiet_timeout': 3,
+    'dom_quiet_ms': 300,
+    'element_stable_timeout': 2,
+    'poll_interval': 0.1
+}
+
+# Per-site overrides, matched against the host (suffix match, most specific wins)
+SITE_TUNING = {
+    # Heavy SPAs that keep rendering and polling after readyState is complete
+    'myworkdayjobs.com': {'ready_state_timeout': 25, 'network_idle_timeout': 10, 'network_idle_ms': 800,
+                          'dom_quiet_timeout': 6, 'dom_quiet_ms': 500},
+    'workday.com': {'ready_state_timeout': 25, 'network_idle_timeout': 10, 'network_idle_ms': 800,
+                    'dom_quiet_timeout': 6, 'dom_quiet_ms': 500},
+    'icims.com': {'network_idle_timeout': 8, 'dom_quiet_ms': 400},
+    'indeed.com': {'network_idle_timeout': 4, 'network_idle_ms': 400},
+    # Server-rendered forms settle quickly
+    'greenhouse.io': {'network_idle_timeout': 3, 'dom_quiet_timeout': 2},
+    'lever.co': {'network_idle_timeout': 3, 'dom_quiet_timeout': 2},
+    'applytojob.com': {'network_idle_timeout': 3, 'dom_quiet_timeout': 2}
+}
+
+
+def tuning_for(url: Optional[str]) -> Dict[str, Any]:
+    """Default tuning merged with the most specific SITE_TUNING entry for the URL's host"""
+    tuning = DEFAULT_TUNING.copy()
+    host = (urlparse(url or '').hostname or '').lower()
+    matches = [site for site in SITE_TUNING if host == site or host.endswith('.' + site)]
+    if matches:
+        tuning.update(SITE_TUNING[max(matches, key=len)])
+    return tuning
+
+
+class PageReadiness:
+    """Waits for readiness signals collected by bot/js/page_readiness.js.
+
+    Conditions:
+      ready_state    - document.readyState == 'complete'
+      network_idle   - no fetch/XHR in flight and no resource finished for network_idle_ms
+      dom_quiet      - no DOM mutation for dom_quiet_ms
+      element_stable - the element's bounding rect is unchanged across two polls
+    Each poll is a single WebDriver round trip covering every requested condition.
+    """
+
+    def __init__(self, driver, url: str = None):
+        self.driver = driver
+        self.tuning = tuning_for(url)
+        self.stats = {
+            'waits': 0,
+            'total_wait_seconds': 0.0,
+            'timeouts': {READY_STATE: 0, NETWORK_IDLE: 0, DOM_QUIET: 0, ELEMENT_STABLE: 0}
+        }
+
+    def for_url(self, url: str):
+        """Switch to the tuning for a newly opened site"""
+        self.tuning = tuning_for(url)
+
+    def wait_for_page(self) -> Dict[str, bool]:
+        """After navigation, or a click that may navigate or re-render: loaded, network idle, DOM quiet"""
+        return self.wait_until([READY_STATE, NETWORK_IDLE, DOM_QUIET])
+
+    def wait_for_dom_quiet(self) -> Dict[str, bool]:
+        return self.wait_until([DOM_QUIET])
+
+    def wait_for_element_stable(self, element) -> Dict[str, bool]:
+        """After scrolling to an element: wait until it stops moving"""
+        return self.wait_until([ELEMENT_STABLE], element=element)
+
+    def wait_until(self, conditions: Iterable[str], element=None) -> Dict[str, bool]:
+        """Poll until every condition holds or has passed its own deadline.
+
+        Returns {condition: met} so callers can tell a satisfied wait from a timeout.
+        """
+        tuning = self.tuning
+        started = time.monotonic()
+        pending = {c: started + tuning[f"{c}_timeout"] for c in conditions}
+        results = {}
+        last_rect = None
+
+        while pending:
+            state = self._poll(element)
+            now = time.monotonic()
+
+            for condition in list(pending):
+                if state is not None and self._holds(condition, state, tuning, last_rect):
+                    results[condition] = True
+                    del pending[condition]
+                elif now >= pending[condition]:
+                    print(f"⏱️ Readiness: {condition} not reached within {tuning[f'{condition}_timeout']}s, continuing")
+                    self.stats['timeouts'][condition] += 1
+                    results[condition] = False
+                    del pending[condition]
+
+            if state is not None:
+                last_rect = state.get('rect')
+            if pending:
+                time.sleep(tuning['poll_interval'])
+
+        self.stats['waits'] += 1
+        self.stats['total_wait_seconds'] += time.monotonic() - started
+        return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self.stats.copy()
+        waits = stats['waits']
+        stats['avg_wait_seconds'] = (stats['total_wait_seconds'] / waits) if waits else 0
+        return stats
+
+    def _poll(self, element=None) -> Optional[Dict[str, Any]]:
+        try:
+            return self.driver.execute_script(load_page_script('page_readiness'), element)
+        except Exception:
+            # Mid-navigation the old document is gone; the next poll reads the new one
+            return None
+
+    @staticmethod
+    def _holds(condition: str, state: Dict[str, Any], tuning: Dict[str, Any], last_rect) -> bool:
+        if condition == READY_STATE:
+            return state['readyState'] == 'complete'
+        if condition == NETWORK_IDLE:
+            return state['inflight'] == 0 and state['now'] - state['lastNetwork'] >= tuning['network_idle_ms']
+        if condition == DOM_QUIET:
+            return state['now'] - state['lastMutation'] >= tuning['dom_quiet_ms']
+        if condition == ELEMENT_STABLE:
+            rect = state.get('rect')
+            return rect is not None and rect == last_rect
+        raise ValueError(f"Unknown readiness condition: {condition}")
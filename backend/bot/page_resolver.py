@@ -0,0 +1,268 @@
+# bot/page_resolver.py - One structured LLM call for every unresolved field on a form page
+import hashlib
+import json
+import re
+import time
+from typing import Dict, List, Optional, Any
+
+from bot.llm_cache import cache_key
+from bot.single_flight import single_flight
+
+MAX_ESSAY_LENGTH = 500
+_MISS = object()
+
+
+# "Select...", "-- Choose one --", "Please select" and blank options are not answers
+_PLACEHOLDER_OPTION = re.compile(
+    r'^[\W_]*((please\s+)?(select|choose|pick)(\s+(one|an?|your|from|option)\b.*|[\W_]*))?$', re.IGNORECASE)
+
+
+def _words(text: str) -> List[str]:
+    return re.findall(r'[^\W_]+', text.lower())
+
+
+def _has_run(words: List[str], run: List[str]) -> bool:
+    """True if `run` appears as consecutive whole words in `words`"""
+    return any(words[i:i + len(run)] == run for i in range(len(words) - len(run) + 1))
+
+
+def match_option(answer: str, options: List[str]) -> Optional[str]:
+    """The option an LLM answer refers to: exact (case-insensitive) first, then the longest
+    option whose words appear whole in the answer, then the first option containing the
+    answer's words. Substrings inside words never match ('Unknown' is not 'No'), and blank
+    or placeholder options are never chosen."""
+    answer = (answer or '').strip().strip('\'"')
+    if not answer:
+        return None
+    options = [option for option in options if option and not _PLACEHOLDER_OPTION.match(str(option))]
+    for option in options:
+        if answer.lower() == str(option).strip().lower():
+            return option
+    answer_words = _words(answer)
+    in_answer = [option for option in options if _words(str(option)) and _has_run(answer_words, _words(str(option)))]
+    if in_answer:
+        return max(in_answer, key=lambda option: len(_words(str(option))))
+    for option in options:
+        if answer_words and _has_run(_words(str(option)), answer_words):
+            return option
+    return None
+
+
+def truncate_essay(essay: str, max_length: int = MAX_ESSAY_LENGTH) -> str:
+    """Cut at the last full sentence that fits"""
+    if len(essay) <= max_length:
+        return essay
+    truncated = ''
+    for sentence in essay.split('. '):
+        if len(truncated + sentence + '. ') <= max_length - 3:
+            truncated += sentence + '. '
+        else:
+            break
+    return (truncated.rstrip() or essay[:max_length - 3]) + '...'
+
+
+class BatchFieldResolver:
+    """Answers a page's open questions with one generate_content call.
+
+    fields are dicts with 'id', 'label', 'type' and optional 'options'. The profile goes
+    into the prompt once, followed by the questions as JSON and the schema the model must
+    answer in. Answers to questions with options must name one of them; anything else is
+    dropped (the caller falls back to its defaults for that field).
+    With profile_keys, the model also names the profile key each answer came from.
+    With a cache (bot/llm_cache.py), each field's outcome is stored under its normalized
+    question and the profile version, and only fields never asked before reach the model.
+    A question already in flight for the same profile version in another thread (a parallel
+    application) is not asked again: this page waits for that answer (bot/single_flight.py).
+    """
+
+    def __init__(self, model, cache=None, model_name: str = 'gemini', flight=single_flight):
+        self.model = model
+        self.cache = cache
+        self.model_name = model_name
+        self.flight = flight
+        self.stats = {
+            'batches': 0,
+            'fields': 0,
+            'cached': 0,
+            'coalesced': 0,
+            'answered': 0,
+            'invalid_answers': 0,
+            'errors': 0,
+            'total_ms': 0.0
+        }
+
+    def resolve(self, fields: List[Dict[str, Any]], profile_context: str, profile_keys: List[str] = None,
+                profile_version: str = None) -> Dict[str, Dict[str, Any]]:
+        """{field id: {'answer': str, 'profile_key': str or None}} for the fields the model answered"""
+        answers = {}
+        pending = []
+        # Answers are only shared within one profile version; the context stands in when none is given
+        version = profile_version or hashlib.sha256(profile_context.encode()).hexdigest()[:16]
+        keys = {field['id']: self._cache_key(field, profile_keys, version) for field in fields}
+        for field in fields:
+            if self.cache:
+                cached = self.cache.get(keys[field['id']], _MISS)
+                if cached is not _MISS:
+                    self.stats['cached'] += 1
+                    cached = self._adapt(field, cached)
+                    if cached:
+                        answers[field['id']] = cached
+                    continue
+            pending.append(field)
+        if answers:
+            print(f"🧠 {len(answers)} field(s) answered from the AI cache")
+        if not self.model or not pending:
+            return answers
+
+        # Questions another application is asking right now (same profile version) wait for
+        # that answer; the rest - one field per question - go out in this page's request
+        if self.flight:
+            owned, waiting = self.flight.claim(keys[field['id']] for field in pending)
+        else:
+            owned, waiting = list(dict.fromkeys(keys[field['id']] for field in pending)), {}
+        leading, led = [], set()
+        for field in pending:
+            key = keys[field['id']]
+            if key in owned and key not in led:
+                led.add(key)
+                leading.append(field)
+        results = {}
+        try:
+            if leading:
+                resolved = self._ask(leading, profile_context, profile_keys, keys)
+                results.update({keys[field['id']]: resolved.get(field['id']) for field in leading})
+        finally:
+            # Before waiting on anyone else, so two pages leading each other's questions can't deadlock
+            if self.flight:
+                for key in owned:
+                    self.flight.publish(key, results.get(key))
+        if waiting:
+            print(f"🔗 {len(waiting)} question(s) already being asked for this profile - sharing that answer")
+            for key, future in waiting.items():
+                try:
+                    results[key] = future.result()
+                except Exception:
+                    results[key] = None
+                self.stats['coalesced'] += 1
+
+        for field in pending:
+            result = self._adapt(field, results.get(keys[field['id']]))
+            if result:
+                answers[field['id']] = result
+        return answers
+
+    def _ask(self, fields: List[Dict[str, Any]], profile_context: str, profile_keys: List[str],
+             keys: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+        """One model call for fields; outcomes go to the cache (not when the call failed)"""
+        prompt = self.build_prompt(fields, profile_context, profile_keys)
+        self.stats['batches'] += 1
+        self.stats['fields'] += len(fields)
+        started = time.perf_counter()
+        try:
+            response = self.model.generate_content(prompt)
+            raw = self.parse_response(response.text)
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"❌ Batched field resolution error: {e}")
+            return {}
+        finally:
+            self.stats['total_ms'] += (time.perf_counter() - started) * 1000
+
+        resolved = self.validate(fields, raw, profile_keys)
+        self.stats['answered'] += len(resolved)
+        print(f"🧠 One AI call answered {len(resolved)}/{len(fields)} field(s) on this page")
+        if self.cache:
+            # Unanswered fields are remembered too - asking again would get the same null
+            for field in fields:
+                self.cache.set(keys[field['id']], resolved.get(field['id']))
+        return resolved
+
+    @staticmethod
+    def _adapt(field: Dict[str, Any], result: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """A stored or shared answer in this field's terms: its own spelling of the chosen option"""
+        if not result or not field.get('options'):
+            return result
+        option = match_option(result['answer'], field['options'])
+        return {**result, 'answer': option} if option else None
+
+    def _cache_key(self, field: Dict[str, Any], profile_keys: List[str], profile_version: str) -> str:
+        return cache_key(self.model_name, 'page_field', {
+            'label': field['label'],
+            'type': field.get('type') or 'text',
+            'options': field.get('options') or [],
+            'profile_keys': profile_keys or []
+        }, profile_version)
+
+    @staticmethod
+    def build_prompt(fields: List[Dict[str, Any]], profile_context: str, profile_keys: List[str] = None) -> str:
+        questions = [{
+            'id': field['id'],
+            'label': field['label'],
+            'type': field.get('type') or 'text',
+            **({'options': field['options']} if field.get('options') else {})
+        } for field in fields]
+        key_rule = key_schema = ''
+        if profile_keys:
+            key_rule = (f"\n5. Set profile_key to the profile key whose value is the answer, or null.\n"
+                        f"   Profile keys: {json.dumps(profile_keys)}")
+            key_schema = ', "profile_key": "<profile key or null>"'
+        return f"""
+You are filling out one page of a job application for the candidate below.
+
+Candidate Profile:
+{profile_context}
+
+Questions:
+{json.dumps(questions, indent=1)}
+
+Rules:
+1. Answer every question from the candidate's profile; don't make up information not in it.
+2. For questions with options, answer with the exact text of one option.
+3. Text fields: a short value (1-5 words). Textarea fields: 2-3 professional sentences, under {MAX_ESSAY_LENGTH} characters.
+4. If the profile gives no basis for an answer, use null.{key_rule}
+
+Respond with JSON only, no explanations, in this schema:
+{{"answers": [{{"id": "<question id>", "answer": "<answer or null>"{key_schema}}}]}}
+"""
+
+    @staticmethod
+    def parse_response(text: str) -> Dict[str, Dict[str, Any]]:
+        """{id: answer object} from the model's JSON (code fences and surrounding prose tolerated)"""
+        text = re.sub(r'```(?:json)?', '', text or '').strip()
+        start, end = text.find('{'), text.rfind('}')
+        if start < 0 or end < start:
+            raise ValueError(f"no JSON object in response: {text[:100]}")
+        data = json.loads(text[start:end + 1])
+        answers = data.get('answers', []) if isinstance(data, dict) else []
+        return {str(item['id']): item for item in answers if isinstance(item, dict) and 'id' in item}
+
+    def validate(self, fields: List[Dict[str, Any]], raw: Dict[str, Dict[str, Any]],
+                 profile_keys: List[str] = None) -> Dict[str, Dict[str, Any]]:
+        answers = {}
+        for field in fields:
+            item = raw.get(str(field['id']))
+            answer = item.get('answer') if item else None
+            if answer is None or str(answer).strip().lower() in ('', 'null', 'none'):
+                continue
+            answer = str(answer).strip()
+            if field.get('options'):
+                matched = match_option(answer, field['options'])
+                if not matched:
+                    self.stats['invalid_answers'] += 1
+                    print(f"   ⚠️ AI answer '{answer[:40]}' is not an option of '{field['label']}'")
+                    continue
+                answer = matched
+            elif field.get('type') == 'textarea':
+                answer = truncate_essay(answer)
+            profile_key = item.get('profile_key')
+            answers[field['id']] = {
+                'answer': answer,
+                'profile_key': profile_key if profile_keys and profile_key in profile_keys else None
+            }
+        return answers
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self.stats.copy()
+        stats['avg_ms_per_batch'] = (stats['total_ms'] / stats['batches']) if stats['batches'] else 0
+        stats['avg_fields_per_batch'] = (stats['fields'] / stats['batches']) if stats['batches'] else 0
+        return stats
@@ -0,0 +1,75 @@
+# bot/page_scripts.py - Loader for the JavaScript snippets injected into job pages
+import os
+from functools import lru_cache
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'js')
+
+# Helper files prepended to a script's body before it is sent to the page
+SCRIPT_HELPERS = {
+    'form_snapshot': ['dom_helpers'],
+    'classify_buttons': ['dom_helpers']
+}
+
+
+def _read_script(name: str) -> str:
+    path = os.path.join(SCRIPTS_DIR, f"{name}.js")
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+@lru_cache(maxsize=None)
+def load_page_script(name: str) -> str:
+    """Return the source of bot/js/<name>.js with its helpers (cached after the first read)"""
+    parts = [_read_script(helper) for helper in SCRIPT_HELPERS.get(name, [])]
+    parts.append(_read_script(name))
+    return '\n'.join(parts)
+
+
+def take_form_snapshot(driver, known_locators=None, skeleton: bool = False) -> dict:
+    """Snapshot every visible form control on the current page in one round trip"""
+    snapshot = driver.execute_script(
+        load_page_script('form_snapshot'),
+        {'known': list(known_locators or []), 'skeleton': skeleton}
+    )
+    return snapshot or {'url': None, 'title': None, 'fields': []}
+
+
+def fill_values(driver, assignments, pacing_seconds: float = 0) -> list:
+    """Fill every (field, value) pair on the page in one round trip.
+
+    Fields are snapshot entries (element or elements/options/values). With
+    pacing_seconds > 0 the fill is spread over that total budget in-page.
+    File inputs are uploaded with send_keys afterwards. Returns one
+    {filled, reason} dict per assignment, in order.
+    """
+    payload = []
+    for field, value in assignments:
+        if isinstance(value, (list, tuple)):
+            value = ", ".join(str(v) for v in value)
+        payload.append({
+            'element': field.get('element'),
+            'elements': field.get('elements') or [],
+            'options': field.get('options') or [],
+            'values': field.get('values') or [],
+            'value': '' if value is None else str(value)
+        })
+    if not payload:
+        return []
+
+    script = load_page_script('fill_values')
+    if pacing_seconds and pacing_seconds > 0:
+        driver.set_script_timeout(pacing_seconds + 10)
+        results = driver.execute_async_script(script, payload, {'pacingMs': int(pacing_seconds * 1000)})
+    else:
+        results = driver.execute_script(script, payload, {})
+    results = results or [{'filled': False, 'reason': 'no result'} for _ in payload]
+
+    for entry, result in zip(payload, results):
+        if result.get('reason') != 'file':
+            continue
+        if entry['value'] and os.path.exists(entry['value']):
+            entry['element'].send_keys(entry['value'])
+            result.update({'filled': True, 'reason': None})
+        else:
+            result['reason'] = f"file not found: {entry['value']}"
+    return results
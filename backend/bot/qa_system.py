@@ -1,19 +1,36 @@
 # bot/qa_system.py - COMPLETE FIXED Q&A SYSTEM WITH AI INTEGRATION
-from typing import Dict, Optional, Any, Tuple
+from typing import Dict, List, Optional, Any, Tuple
+import asyncio
 import json
 import os
 from datetime import datetime
 
+from bot.llm_cache import profile_version
+from bot.page_resolver import match_option
+from bot.question_index import normalize_question, same_subject
+
 class QASystem:
     """Complete Q&A System with all fixes and AI integration"""
     
-    def __init__(self):
+    def __init__(self, ai_engine=None, question_index=None, min_similarity: float = 0.7,
+                 min_text_similarity: float = 0.85, min_margin: float = 0.1):
+        self.ai_engine = ai_engine  # EnhancedAIEngine for page-level batches (Level 4)
+        # QuestionIndexStore of questions each user already answered (Level 3); a choice reuses
+        # an answer from min_similarity on, free text only from min_text_similarity, and only
+        # when the best match beats any differently answered one by min_margin
+        self.question_index = question_index
+        self.min_similarity = min_similarity
+        self.min_text_similarity = min_text_similarity
+        self.min_margin = min_margin
         self.cache = {}
         self.site_patterns = {}
         self.ai_stats = {
             'total_ai_calls': 0,
             'successful_ai_responses': 0,
-            'ai_fallbacks': 0
+            'ai_fallbacks': 0,
+            'batched_pages': 0,
+            'batched_fields': 0,
+            'similar_answers': 0
         }
         print("🧠 Complete Fixed Q&A System with AI initialized")
     
@@ -42,171 +59,291 @@ class QASystem:
             self.update_site_patterns(site_domain, field_label, answer, "smart_pattern")
             return answer, "smart_pattern"
         
-        # Level 3: AI Integration with detailed logging
+        # Level 3: A question this user already answered, worded differently
+        field = {'label': field_label, 'type': field_type, 'options': kwargs.get('options')}
+        answer = (await self._get_similar_answers([field], profile_data, user_id)).get(0)
+        if answer:
+            print(f"✅ Level 3 (Similar): {field_label} → {answer}")
+            self.update_site_patterns(site_domain, field_label, answer, "similar_question")
+            return answer, "similar_question"
+        
+        # Level 4: AI Integration with detailed logging
         answer = await self._get_ai_answer_with_logging(field_label, field_type, profile_data, site_domain)
         if answer:
-            print(f"✅ Level 3 (AI): {field_label} → {answer}")
+            print(f"✅ Level 4 (AI): {field_label} → {answer}")
             self.update_site_patterns(site_domain, field_label, answer, "ai_generated")
             return answer, "ai_generated"
         
-        # Level 4: Default values (renamed from Level 3)
+        # Level 5: Default values (renamed from Level 4)
         answer = self._get_default_answer(field_label, field_type)
         if answer:
-            print(f"✅ Level 4 (Default): {field_label} → {answer}")
+            print(f"✅ Level 5 (Default): {field_label} → {answer}")
             self.update_site_patterns(site_domain, field_label, answer, "default_value")
             return answer, "default_value"
         
         print(f"❌ No answer found for: {field_label}")
         return None, "no_answer"
     
-    def _get_profile_answer_fixed(self, field_label: str, profile_data: Dict[str, Any]) -> Optional[str]:
-        """FIXED profile data extraction with detailed debugging"""
+    async def get_page_answers(self, fields: List[Dict[str, Any]], site_domain: str,
+                               profile_data: Dict[str, Any], user_id: str,
+                               application_id: str = None) -> List[Tuple[Optional[str], str]]:
+        """
+        Same levels as get_field_answer_hierarchical for every field of one form page, but
+        Level 4 is one AI call for all fields Levels 1-3 could not answer
+        Returns: [(answer_string, source_info)] in the order of fields
+        """
+        results: List[Optional[Tuple[Optional[str], str]]] = [None] * len(fields)
+        unresolved = []
         
-        try:
-            print(f"   🔍 Profile data structure: {type(profile_data)}")
-            print(f"   🔍 Profile data keys: {list(profile_data.keys()) if isinstance(profile_data, dict) else 'Not a dict'}")
-            
-            # Get profile_data - handle multiple possible structures
-            if 'profile_data' in profile_data:
-                profile_json = profile_data['profile_data']
-                print(f"   📋 Found profile_data key, type: {type(profile_json)}")
-            else:
-                # Maybe the data is already the profile structure
-                profile_json = profile_data
-                print(f"   📋 Using direct profile data, type: {type(profile_json)}")
+        for i, field in enumerate(fields):
+            field_label = field.get('label') or f'Field {i+1}'
+            field_type = field.get('type') or 'unknown'
             
-            # If it's a string, parse it
-            if isinstance(profile_json, str):
-                try:
-                    profile_json = json.loads(profile_json)
-                    print(f"   ✅ Parsed JSON profile data successfully")
-                except json.JSONDecodeError as e:
-                    print(f"   ❌ JSON parse error: {e}")
-                    print(f"   📄 Raw string (first 200 chars): {profile_json[:200]}")
-                    return None
+            answer = self._get_profile_answer_fixed(field_label, profile_data)
+            if answer:
+                print(f"✅ Level 1 (Profile): {field_label} → {answer}")
+                results[i] = (answer, "profile_direct")
+                continue
             
-            # Get personal info with multiple fallback paths
-            personal_info = None
+            answer = self._get_smart_answer(field_label, field_type, profile_data)
+            if answer:
+                print(f"✅ Level 2 (Smart): {field_label} → {answer}")
+                results[i] = (answer, "smart_pattern")
+                continue
             
-            # Try different possible structures
-            if isinstance(profile_json, dict):
-                if 'personal_info' in profile_json:
-                    personal_info = profile_json['personal_info']
-                    print(f"   ✅ Found personal_info via profile_json.personal_info")
-                elif 'profile_data' in profile_json and isinstance(profile_json['profile_data'], dict):
-                    nested_profile = profile_json['profile_data']
-                    if 'personal_info' in nested_profile:
-                        personal_info = nested_profile['personal_info']
-                        print(f"   ✅ Found personal_info via profile_json.profile_data.personal_info")
-                
-                # If still no personal_info, maybe the current level IS personal_info
-                if not personal_info and any(key in profile_json for key in ['legal_first_name', 'email', 'phone']):
-                    personal_info = profile_json
-                    print(f"   ✅ Using profile_json directly as personal_info")
+            unresolved.append(i)
+        
+        # Level 3: questions this user already answered, one index lookup for the page
+        similar = await self._get_similar_answers(
+            [fields[i] for i in unresolved], profile_data, user_id) if unresolved else {}
+        for position, i in enumerate(unresolved):
+            if similar.get(position):
+                print(f"✅ Level 3 (Similar): {fields[i].get('label') or f'Field {i+1}'} → {similar[position]}")
+                results[i] = (similar[position], "similar_question")
+        unresolved = [i for position, i in enumerate(unresolved) if not similar.get(position)]
+        
+        # Level 4: one AI round trip for the whole page
+        ai_answers = await self._get_ai_answers_batch(
+            [fields[i] for i in unresolved], profile_data, site_domain) if unresolved else {}
+        if ai_answers:
+            await self._remember_answers([fields[i] for i in unresolved], ai_answers, profile_data, user_id)
+        
+        for position, i in enumerate(unresolved):
+            field_label = fields[i].get('label') or f'Field {i+1}'
+            answer = ai_answers.get(position)
+            if answer:
+                print(f"✅ Level 4 (AI): {field_label} → {answer}")
+                results[i] = (answer, "ai_generated")
+                continue
             
-            if personal_info:
-                print(f"   📋 Personal info keys: {list(personal_info.keys())}")
-                
-                # Debug: Show actual values
-                print(f"   📋 Sample personal info:")
-                for key in ['legal_first_name', 'legal_last_name', 'email', 'phone']:
-                    if key in personal_info:
-                        print(f"     {key}: {personal_info[key]}")
+            answer = self._get_default_answer(field_label, fields[i].get('type') or 'unknown')
+            if answer:
+                print(f"✅ Level 5 (Default): {field_label} → {answer}")
+                results[i] = (answer, "default_value")
             else:
-                print(f"   ❌ Could not find personal_info in any expected location")
-                print(f"   📄 Available keys at root: {list(profile_json.keys()) if isinstance(profile_json, dict) else 'Not a dict'}")
+                print(f"❌ No answer found for: {field_label}")
+                results[i] = (None, "no_answer")
+        
+        for i, (answer, source) in enumerate(results):
+            if answer:
+                self.update_site_patterns(site_domain, fields[i].get('label') or f'Field {i+1}', answer, source)
+        
+        return results
+    
+    async def _get_ai_answers_batch(self, fields: List[Dict[str, Any]], profile_data: Dict[str, Any],
+                                    site_domain: str) -> Dict[int, str]:
+        """Level 4 for a page: {position in fields: answer}. Without a configured AI model
+        this falls back to the per-field AI path."""
+        if not (self.ai_engine and self.ai_engine.model):
+            answers = {}
+            for position, field in enumerate(fields):
+                answer = await self._get_ai_answer_with_logging(
+                    field.get('label') or '', field.get('type') or 'unknown', profile_data, site_domain)
+                if answer:
+                    answers[position] = answer
+            return answers
+        
+        print(f"🤖 AI INTEGRATION - Level 4 ({len(fields)} field(s) in one batch)")
+        specs = [{
+            'id': f"q{position + 1}",
+            'label': field.get('label') or f'Field {position + 1}',
+            'type': field.get('type') or 'text',
+            'options': [option for option in (field.get('options') or []) if option and option.strip()] or None
+        } for position, field in enumerate(fields)]
+        
+        self.ai_stats['total_ai_calls'] += 1
+        self.ai_stats['batched_pages'] += 1
+        self.ai_stats['batched_fields'] += len(fields)
+        try:
+            # The Gemini client blocks - keep it off the event loop
+            loop = asyncio.get_running_loop()
+            by_id = await loop.run_in_executor(
+                None, self.ai_engine.resolve_page_fields, specs, self._unwrap_profile(profile_data))
+        except Exception as e:
+            print(f"   ❌ AI Integration Error: {e}")
+            by_id = {}
+        
+        answers = {position: by_id[spec['id']] for position, spec in enumerate(specs) if by_id.get(spec['id'])}
+        self.ai_stats['successful_ai_responses'] += len(answers)
+        self.ai_stats['ai_fallbacks'] += len(fields) - len(answers)
+        return answers
+    
+    async def _get_similar_answers(self, fields: List[Dict[str, Any]], profile_data: Dict[str, Any],
+                                   user_id: str) -> Dict[int, str]:
+        """Level 3: {position in fields: answer} from the user's question index - answers to
+        near-duplicates of these questions in their Q&A cache and earlier AI answers"""
+        if not self.question_index:
+            return {}
+        try:
+            index = await self.question_index.for_user(user_id)
+            if not index or not len(index):
+                return {}
+            version = profile_version(self._unwrap_profile(profile_data))
+            # Down to min_similarity - min_margin, so a close runner-up shows up to veto the best match
+            matches = self.question_index.search(
+                index, [field.get('label') or '' for field in fields], k=3,
+                min_similarity=max(0.0, self.min_similarity - self.min_margin))
+        except Exception as e:
+            print(f"   ⚠️ Question index lookup error: {e}")
+            return {}
+        
+        answers = {}
+        for position, (field, candidates) in enumerate(zip(fields, matches)):
+            # Answers generated from an older version of the profile don't count
+            candidates = [match for match in candidates if not match['version'] or match['version'] == version]
+            if not candidates or candidates[0]['similarity'] < self.min_similarity:
+                continue
+            best = candidates[0]
+            rival = next((match for match in candidates[1:]
+                          if normalize_question(match['answer']) != normalize_question(best['answer'])), None)
+            if rival and best['similarity'] - rival['similarity'] < self.min_margin:
+                continue  # two answered questions fit about as well - let the AI decide
+            if not same_subject(field.get('label') or '', best['question']):
+                continue  # shares the wording, not the subject ('travel' vs 'relocate', 21 vs 18)
+            answer = self._reuse_answer(field, best)
+            if answer:
+                print(f"   🔎 Similar to: {best['question']} (similarity {best['similarity']:.2f})")
+                answers[position] = answer
+        self.ai_stats['similar_answers'] += len(answers)
+        return answers
+    
+    def _reuse_answer(self, field: Dict[str, Any], match: Dict[str, Any]) -> Optional[str]:
+        """A similar question's answer in this field's terms, or None if it doesn't carry over"""
+        options = [option for option in (field.get('options') or []) if option and option.strip()]
+        if options:
+            return match_option(match['answer'], options)
+        if (field.get('type') or '') == 'textarea' or match['similarity'] < self.min_text_similarity:
+            return None  # essays and loosely similar free text are specific to their job
+        return match['answer']
+    
+    async def _remember_answers(self, fields: List[Dict[str, Any]], answers: Dict[int, str],
+                                profile_data: Dict[str, Any], user_id: str):
+        """Add AI answers to the user's question index, tagged with the profile version they came from.
+        The mock AI path's canned answers are not worth remembering."""
+        if not (self.question_index and self.ai_engine and self.ai_engine.model):
+            return
+        try:
+            index = await self.question_index.for_user(user_id)
+            if index is None:
+                return
+            version = profile_version(self._unwrap_profile(profile_data))
+            self.question_index.add(user_id, index, [{
+                'question': fields[position].get('label') or '',
+                'answer': answer,
+                'source': 'ai_generated',
+                'version': version
+            } for position, answer in answers.items() if answer])
+        except Exception as e:
+            print(f"   ⚠️ Question index update error: {e}")
+    
+    def _unwrap_profile(self, profile_data: Dict[str, Any]) -> Dict[str, Any]:
+        """The profile itself, whether passed bare or as a user_profiles row"""
+        profile_json = profile_data.get('profile_data', profile_data)
+        if isinstance(profile_json, str):
+            try:
+                profile_json = json.loads(profile_json)
+            except ValueError:
+                return profile_data
+        return profile_json if isinstance(profile_json, dict) else profile_data
+    
+    # Normalized label (lowercase, no spaces/-/_) -> personal_info key
+    PROFILE_KEY_PATTERNS = {
+        # First name patterns (enhanced)
+        'resumatorfirstnamevalue': 'legal_first_name',
+        'firstname': 'legal_first_name',
+        'first': 'legal_first_name',
+        'fname': 'legal_first_name',
+        'givenname': 'legal_first_name',
+        
+        # Last name patterns (enhanced)
+        'resumatorlastnamevalue': 'legal_last_name',
+        'lastname': 'legal_last_name',
+        'last': 'legal_last_name',
+        'lname': 'legal_last_name',
+        'surname': 'legal_last_name',
+        'familyname': 'legal_last_name',
+        
+        # Email patterns
+        'resumatoremailvalue': 'email',
+        'email': 'email',
+        'emailaddress': 'email',
+        'mail': 'email',
+        
+        # Phone patterns
+        'resumatorphonevalue': 'phone',
+        'phone': 'phone',
+        'phonenumber': 'phone',
+        'telephone': 'phone',
+        'mobile': 'phone',
+        'cell': 'phone',
+        
+        # Address patterns
+        'address': 'address_line_1',
+        'streetaddress': 'address_line_1',
+        'street': 'address_line_1',
+        'homeaddress': 'address_line_1',
+        'addressline1': 'address_line_1',
+        
+        # City patterns
+        'city': 'city',
+        'town': 'city',
+        'municipality': 'city',
+        
+        # State patterns
+        'state': 'state_province',
+        'stateprovince': 'state_province',
+        'province': 'state_province',
+        'region': 'state_province',
+        
+        # Postal patterns
+        'postal': 'zip_postal_code',
+        'zip': 'zip_postal_code',
+        'zipcode': 'zip_postal_code',
+        'postalcode': 'zip_postal_code',
+        'postcode': 'zip_postal_code',
+        
+        # Country patterns
+        'country': 'country',
+        'nation': 'country',
+    }
+    
+    def _get_profile_answer_fixed(self, field_label: str, profile_data: Dict[str, Any]) -> Optional[str]:
+        """FIXED profile data extraction with detailed debugging"""
+        
+        try:
+            personal_info = self._extract_personal_info(profile_data)
+            if not personal_info:
                 return None
             
-            # Enhanced field matching with debugging
-            field_lower = field_label.lower().replace('-', '').replace('_', '').replace(' ', '')
+            # Debug: Show actual values
+            print(f"   📋 Sample personal info:")
+            for key in ['legal_first_name', 'legal_last_name', 'email', 'phone']:
+                if key in personal_info:
+                    print(f"     {key}: {personal_info[key]}")
             
-            # Comprehensive field mappings
-            field_mappings = {
-                # First name patterns (enhanced)
-                'resumatorfirstnamevalue': personal_info.get('legal_first_name'),
-                'firstname': personal_info.get('legal_first_name'),
-                'first': personal_info.get('legal_first_name'),
-                'fname': personal_info.get('legal_first_name'),
-                'givenname': personal_info.get('legal_first_name'),
-                
-                # Last name patterns (enhanced)
-                'resumatorlastnamevalue': personal_info.get('legal_last_name'),
-                'lastname': personal_info.get('legal_last_name'),
-                'last': personal_info.get('legal_last_name'),
-                'lname': personal_info.get('legal_last_name'),
-                'surname': personal_info.get('legal_last_name'),
-                'familyname': personal_info.get('legal_last_name'),
-                
-                # Email patterns
-                'resumatoremailvalue': personal_info.get('email'),
-                'email': personal_info.get('email'),
-                'emailaddress': personal_info.get('email'),
-                'mail': personal_info.get('email'),
-                
-                # Phone patterns
-                'resumatorphonevalue': personal_info.get('phone'),
-                'phone': personal_info.get('phone'),
-                'phonenumber': personal_info.get('phone'),
-                'telephone': personal_info.get('phone'),
-                'mobile': personal_info.get('phone'),
-                'cell': personal_info.get('phone'),
-                
-                # Address patterns
-                'address': personal_info.get('address_line_1'),
-                'streetaddress': personal_info.get('address_line_1'),
-                'street': personal_info.get('address_line_1'),
-                'homeaddress': personal_info.get('address_line_1'),
-                'addressline1': personal_info.get('address_line_1'),
-                
-                # City patterns
-                'city': personal_info.get('city'),
-                'town': personal_info.get('city'),
-                'municipality': personal_info.get('city'),
-                
-                # State patterns
-                'state': personal_info.get('state_province'),
-                'stateprovince': personal_info.get('state_province'),
-                'province': personal_info.get('state_province'),
-                'region': personal_info.get('state_province'),
-                
-                # Postal patterns
-                'postal': personal_info.get('zip_postal_code'),
-                'zip': personal_info.get('zip_postal_code'),
-                'zipcode': personal_info.get('zip_postal_code'),
-                'postalcode': personal_info.get('zip_postal_code'),
-                'postcode': personal_info.get('zip_postal_code'),
-                
-                # Country patterns
-                'country': personal_info.get('country'),
-                'nation': personal_info.get('country'),
-            }
-            
-            # Check exact match first
-            if field_lower in field_mappings:
-                value = field_mappings[field_lower]
-                if value and str(value).strip():
-                    print(f"   ✅ Exact match found: {field_lower} → {value}")
-                    return str(value).strip()
-            
-            # Check partial matches
-            for key, value in field_mappings.items():
-                if (key in field_lower or field_lower in key) and value:
-                    if str(value).strip():
-                        print(f"   ✅ Partial match found: {key} in {field_lower} → {value}")
-                        return str(value).strip()
-            
-            # Keyword-based matching for complex field names
-            if 'name' in field_lower:
-                if any(word in field_lower for word in ['first', 'given']):
-                    value = personal_info.get('legal_first_name')
-                    if value:
-                        print(f"   ✅ Keyword match (first name): {value}")
-                        return str(value).strip()
-                elif any(word in field_lower for word in ['last', 'family', 'surname']):
-                    value = personal_info.get('legal_last_name')
-                    if value:
-                        print(f"   ✅ Keyword match (last name): {value}")
-                        return str(value).strip()
+            key = self._match_personal_info_key(field_label, personal_info)
+            if key:
+                return str(personal_info[key]).strip()
             
             print(f"   ❌ No profile match found for: {field_label}")
             return None
@@ -217,6 +354,108 @@ class QASystem:
             print(f"   📄 Full traceback: {traceback.format_exc()}")
             return None
     
+    def resolve_profile_key(self, field_label: str, profile_data: Dict[str, Any]) -> Optional[str]:
+        """Profile path (e.g. 'personal_info.email') a label maps to, for caching label → key mappings"""
+        try:
+            personal_info = self._extract_personal_info(profile_data)
+            key = self._match_personal_info_key(field_label, personal_info) if personal_info else None
+            return f"personal_info.{key}" if key else None
+        except Exception as e:
+            print(f"   ⚠️ Profile key resolution error: {e}")
+            return None
+    
+    def get_profile_value(self, profile_key: str, profile_data: Dict[str, Any]) -> Optional[str]:
+        """Value at a path returned by resolve_profile_key"""
+        section, _, key = profile_key.partition('.')
+        if section != 'personal_info':
+            return None
+        personal_info = self._extract_personal_info(profile_data) or {}
+        value = personal_info.get(key)
+        return str(value).strip() if value and str(value).strip() else None
+    
+    def _extract_personal_info(self, profile_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Find personal_info in any of the profile shapes we store"""
+        print(f"   🔍 Profile data structure: {type(profile_data)}")
+        print(f"   🔍 Profile data keys: {list(profile_data.keys()) if isinstance(profile_data, dict) else 'Not a dict'}")
+        
+        # Get profile_data - handle multiple possible structures
+        if 'profile_data' in profile_data:
+            profile_json = profile_data['profile_data']
+            print(f"   📋 Found profile_data key, type: {type(profile_json)}")
+        else:
+            # Maybe the data is already the profile structure
+            profile_json = profile_data
+            print(f"   📋 Using direct profile data, type: {type(profile_json)}")
+        
+        # If it's a string, parse it
+        if isinstance(profile_json, str):
+            try:
+                profile_json = json.loads(profile_json)
+                print(f"   ✅ Parsed JSON profile data successfully")
+            except json.JSONDecodeError as e:
+                print(f"   ❌ JSON parse error: {e}")
+                print(f"   📄 Raw string (first 200 chars): {profile_json[:200]}")
+                return None
+        
+        # Get personal info with multiple fallback paths
+        personal_info = None
+        
+        # Try different possible structures
+        if isinstance(profile_json, dict):
+            if 'personal_info' in profile_json:
+                personal_info = profile_json['personal_info']
+                print(f"   ✅ Found personal_info via profile_json.personal_info")
+            elif 'profile_data' in profile_json and isinstance(profile_json['profile_data'], dict):
+                nested_profile = profile_json['profile_data']
+                if 'personal_info' in nested_profile:
+                    personal_info = nested_profile['personal_info']
+                    print(f"   ✅ Found personal_info via profile_json.profile_data.personal_info")
+            
+            # If still no personal_info, maybe the current level IS personal_info
+            if not personal_info and any(key in profile_json for key in ['legal_first_name', 'email', 'phone']):
+                personal_info = profile_json
+                print(f"   ✅ Using profile_json directly as personal_info")
+        
+        if personal_info:
+            print(f"   📋 Personal info keys: {list(personal_info.keys())}")
+        else:
+            print(f"   ❌ Could not find personal_info in any expected location")
+            print(f"   📄 Available keys at root: {list(profile_json.keys()) if isinstance(profile_json, dict) else 'Not a dict'}")
+        return personal_info
+    
+    def _match_personal_info_key(self, field_label: str, personal_info: Dict[str, Any]) -> Optional[str]:
+        """personal_info key with a non-empty value that the label refers to"""
+        
+        def has_value(key):
+            value = personal_info.get(key)
+            return bool(value and str(value).strip())
+        
+        # Enhanced field matching with debugging
+        field_lower = field_label.lower().replace('-', '').replace('_', '').replace(' ', '')
+        
+        # Check exact match first
+        key = self.PROFILE_KEY_PATTERNS.get(field_lower)
+        if key and has_value(key):
+            print(f"   ✅ Exact match found: {field_lower} → {personal_info[key]}")
+            return key
+        
+        # Check partial matches
+        for pattern, key in self.PROFILE_KEY_PATTERNS.items():
+            if (pattern in field_lower or field_lower in pattern) and has_value(key):
+                print(f"   ✅ Partial match found: {pattern} in {field_lower} → {personal_info[key]}")
+                return key
+        
+        # Keyword-based matching for complex field names
+        if 'name' in field_lower:
+            if any(word in field_lower for word in ['first', 'given']) and has_value('legal_first_name'):
+                print(f"   ✅ Keyword match (first name): {personal_info['legal_first_name']}")
+                return 'legal_first_name'
+            elif any(word in field_lower for word in ['last', 'family', 'surname']) and has_value('legal_last_name'):
+                print(f"   ✅ Keyword match (last name): {personal_info['legal_last_name']}")
+                return 'legal_last_name'
+        
+        return None
+    
     def _get_smart_answer(self, field_label: str, field_type: str, profile_data: Dict[str, Any]) -> Optional[str]:
         """Smart pattern-based answers with enhanced logic"""
         
@@ -296,7 +535,7 @@ class QASystem:
     async def _get_ai_answer_with_logging(self, field_label: str, field_type: str, profile_data: Dict[str, Any], site_domain: str) -> Optional[str]:
         """AI integration with detailed input/output logging"""
         
-        print(f"🤖 AI INTEGRATION - Level 3")
+        print(f"🤖 AI INTEGRATION - Level 4")
         print(f"   🔍 Preparing AI request for: {field_label}")
         
         try:
@@ -435,7 +674,7 @@ What should be entered in this field?
             return None
     
     def _get_default_answer(self, field_label: str, field_type: str) -> Optional[str]:
-        """Default fallback answers (Level 4)"""
+        """Default fallback answers (Level 5)"""
         
         field_lower = field_label.lower()
         
@@ -509,7 +748,9 @@ What should be entered in this field?
             'cache_size': len(self.cache),
             'site_patterns': len(self.site_patterns),
             'ai_stats': self.ai_stats,
+            'question_index': self.question_index.get_stats() if self.question_index else None,
             'status': 'complete_with_ai',
-            'methods': ['get_field_answer_hierarchical', 'update_site_patterns', 'get_session_stats'],
-            'levels': ['Level 1: Profile Data', 'Level 2: Smart Patterns', 'Level 3: AI Integration', 'Level 4: Defaults']
+            'methods': ['get_field_answer_hierarchical', 'get_page_answers', 'update_site_patterns', 'get_session_stats'],
+            'levels': ['Level 1: Profile Data', 'Level 2: Smart Patterns', 'Level 3: Similar Questions',
+                       'Level 4: AI Integration', 'Level 5: Defaults']
         }
@@ -0,0 +1,349 @@
+# bot/question_index.py - Per-user similarity index over answered questions (hashed char n-gram TF-IDF)
+import asyncio
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Callable, Awaitable
+
+try:
+    import numpy as np
+except ImportError:  # the similar-question level is skipped without numpy
+    np = None
+
+_MIX = 0x9E3779B97F4A7C15  # 64-bit golden ratio multiplier spreads the rolling hashes over the buckets
+
+
+def normalize_question(text: Any) -> str:
+    """Lower case, words only - punctuation and required-field asterisks don't make a question different"""
+    return ' '.join(re.findall(r'[^\W_]+', str(text or '').lower()))
+
+
+_NUMBER_WORDS = {'one': '1', 'two': '2', 'three': '3', 'four': '4', 'five': '5', 'six': '6', 'seven': '7',
+                 'eight': '8', 'nine': '9', 'ten': '10'}
+# Words that don't change what a screening question is about
+_FILLER_WORDS = set("""
+a an the and or but if of to in on at by for from with into about as than so
+i you your yours we our us it its they their this that these those there here what which who whom whose
+when where why how am is are was were be been being do does did have has had having will would shall
+should can could may might must not no yes any some all each every other more most such own same very
+just also ever never now currently current future previously previous before again please
+able willing prepared happy comfortable need require hold possess submit undergo least old older age per
+work working job role position company organization employer employment usa united states country
+located location
+""".split())
+
+
+def question_terms(text: Any):
+    """(numbers, content word stems) of a question - what it is about, not how it is worded"""
+    numbers, content = set(), set()
+    for word in normalize_question(str(text or '').replace('-', '')).split():
+        word = _NUMBER_WORDS.get(word, word)
+        if word.isdigit():
+            numbers.add(word)
+        elif word not in _FILLER_WORDS:
+            content.add(word[:5])  # crude stem: relocate / relocation, sponsor / sponsorship
+    return numbers, content
+
+
+def same_subject(question: Any, answered: Any) -> bool:
+    """True if an answer to `answered` can stand for `question`: the same numbers, and no
+    content word in the question that the answered one lacks ('travel' is not 'relocate',
+    21 is not 18). Cosine similarity only measures shared wording; this guards the meaning."""
+    numbers, content = question_terms(question)
+    answered_numbers, answered_content = question_terms(answered)
+    return numbers == answered_numbers and content <= answered_content
+
+
+class QuestionIndex:
+    """Answered questions of one user, searchable by cosine similarity.
+
+    Each question is a vector of character n-gram counts (3-5 characters, across word
+    boundaries) hashed into 2**bits buckets - no vocabulary to grow, so inserts only append
+    a row. Rows are reweighted by IDF and normalized lazily, once per search after inserts,
+    and kept bucket-major: a question touches ~100 of the buckets, so a search multiplies
+    only those buckets' rows instead of the whole matrix.
+    """
+
+    def __init__(self, bits: int = 11, ngrams=(3, 5)):
+        self.bits = bits
+        self.dim = 1 << bits
+        self.ngrams = ngrams
+        self._lock = threading.Lock()
+        self._buffer = np.zeros((16, self.dim), dtype=np.float32)  # grows by doubling; rows past len() unused
+        self.questions: List[str] = []
+        self.answers: List[str] = []
+        self.sources: List[str] = []
+        self.versions: List[str] = []  # profile version the answer was generated for ('' = any)
+        self._rows: Dict[str, int] = {}  # normalized question -> row
+        self._weighted = None
+
+    def __len__(self) -> int:
+        return len(self.questions)
+
+    @property
+    def counts(self) -> 'np.ndarray':
+        """n-gram counts, one row per question"""
+        return self._buffer[:len(self.questions)]
+
+    def vectorize(self, text: str) -> 'np.ndarray':
+        """Bucket counts of the question's character n-grams"""
+        codes = np.frombuffer(f" {normalize_question(text)} ".encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+        buckets = []
+        for n in range(self.ngrams[0], self.ngrams[1] + 1):
+            if len(codes) < n:
+                break
+            rolling = np.zeros(len(codes) - n + 1, dtype=np.uint64)
+            for offset in range(n):
+                rolling = rolling * np.uint64(1000003) + codes[offset:len(codes) - n + 1 + offset] + np.uint64(n)
+            buckets.append((rolling * np.uint64(_MIX)) >> np.uint64(64 - self.bits))
+        if not buckets:
+            return np.zeros(self.dim, dtype=np.float32)
+        return np.bincount(np.concatenate(buckets).astype(np.int64), minlength=self.dim).astype(np.float32)
+
+    def add(self, question: str, answer: str, source: str = '', version: str = '', replace: bool = True) -> bool:
+        """Insert an answered question (or update it, unless replace is False); False if nothing changed"""
+        key = normalize_question(question)
+        if not key or not str(answer or '').strip():
+            return False
+        with self._lock:
+            row = self._rows.get(key)
+            if row is not None:
+                if not replace:
+                    return False
+                self.answers[row], self.sources[row], self.versions[row] = str(answer), source, version
+                return True
+            row = len(self.questions)
+            if row == len(self._buffer):
+                grown = np.zeros((max(16, 2 * row), self.dim), dtype=np.float32)
+                grown[:row] = self._buffer[:row]
+                self._buffer = grown
+            self._buffer[row] = self.vectorize(question)
+            self._rows[key] = row
+            self.questions.append(str(question))
+            self.answers.append(str(answer))
+            self.sources.append(source)
+            self.versions.append(version)
+            self._weighted = None
+        return True
+
+    def search(self, question: str, k: int = 5, min_similarity: float = 0.0) -> List[Dict[str, Any]]:
+        """Up to k answered questions, most similar first"""
+        return self.search_many([question], k, min_similarity)[0]
+
+    def search_many(self, questions: List[str], k: int = 5, min_similarity: float = 0.0) -> List[List[Dict[str, Any]]]:
+        """search() for every question of a page in one matrix product"""
+        with self._lock:
+            if not self.questions or not questions:
+                return [[] for _ in questions]
+            by_bucket, idf = self._weights()
+            queries = np.stack([self.vectorize(q) for q in questions]) * idf
+            norms = np.linalg.norm(queries, axis=1, keepdims=True)
+            used = np.flatnonzero(queries.any(axis=0))
+            scores = ((queries[:, used] / np.where(norms > 0, norms, 1)) @ by_bucket[used]).T
+            k = min(k, len(self.questions))
+            results = []
+            for column in scores.T:
+                top = np.argpartition(-column, k - 1)[:k]
+                results.append([{
+                    'question': self.questions[row],
+                    'answer': self.answers[row],
+                    'source': self.sources[row],
+                    'version': self.versions[row],
+                    'similarity': float(column[row])
+                } for row in top[np.argsort(-column[top])] if column[row] >= min_similarity])
+            return results
+
+    def _weights(self):
+        """(rows * idf normalized to unit length, one row per bucket; idf) - rebuilt after inserts"""
+        if self._weighted is None:
+            documents = len(self.questions)
+            frequency = np.count_nonzero(self.counts, axis=0)
+            idf = (np.log((1 + documents) / (1 + frequency)) + 1).astype(np.float32)
+            weighted = self.counts * idf
+            norms = np.linalg.norm(weighted, axis=1, keepdims=True)
+            self._weighted = (np.ascontiguousarray((weighted / np.where(norms > 0, norms, 1)).T), idf)
+        return self._weighted
+
+    def save(self, path: str):
+        """Write the index to an .npz file (atomically - readers never see half a file)"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp.npz"
+        with self._lock:
+            np.savez_compressed(tmp, bits=self.bits, ngrams=np.array(self.ngrams),
+                                counts=self.counts.astype(np.uint16),
+                                questions=np.array(self.questions, dtype=str),
+                                answers=np.array(self.answers, dtype=str),
+                                sources=np.array(self.sources, dtype=str),
+                                versions=np.array(self.versions, dtype=str))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'QuestionIndex':
+        with np.load(path, allow_pickle=False) as data:
+            index = cls(bits=int(data['bits']), ngrams=tuple(int(n) for n in data['ngrams']))
+            index._buffer = data['counts'].astype(np.float32).reshape(-1, index.dim)
+            index.questions = [str(q) for q in data['questions']]
+            index.answers = [str(a) for a in data['answers']]
+            index.sources = [str(s) for s in data['sources']]
+            index.versions = [str(v) for v in data['versions']]
+        index._rows = {normalize_question(q): row for row, q in enumerate(index.questions)}
+        return index
+
+
+# Answer sources the bot worked out itself (Q&A levels, old site patterns). Answers it records
+# carry the profile version they came from; an untagged one in the Q&A cache is never seeded.
+DERIVED_ANSWER_SOURCES = frozenset({'profile_direct', 'smart_pattern', 'similar_question', 'ai_generated',
+                                    'default_value', 'site_pattern'})
+SEED_SOURCE = 'qa_cache'
+
+
+class QuestionIndexStore:
+    """One QuestionIndex per user, kept in memory for the most recently used users and
+    persisted as <directory>/<user_id>.npz. The index holds the user's own answers from
+    loader(user_id) -> [{'question_text', 'answer_text', 'answer_source'}] (their Q&A cache;
+    rows the bot derived itself are skipped) plus the answers recorded since, each tagged
+    with its profile version. The cache rows are re-read every refresh_seconds, and the index
+    is rebuilt when they changed."""
+
+    def __init__(self, directory: str, loader: Callable[[str], Awaitable[List[Dict[str, Any]]]] = None,
+                 bits: int = 11, max_users: int = 32, refresh_seconds: float = 300):
+        self.directory = directory
+        self.loader = loader
+        self.bits = bits
+        self.max_users = max_users
+        self.refresh_seconds = refresh_seconds
+        self._indexes: 'OrderedDict[str, QuestionIndex]' = OrderedDict()
+        self._synced_at: Dict[str, float] = {}
+        self._loading: Dict[str, asyncio.Future] = {}
+        self.stats = {
+            'lookups': 0,
+            'hits': 0,
+            'inserts': 0,
+            'loaded_from_disk': 0,
+            'seeded': 0,
+            'seeded_rows': 0,
+            'refreshes': 0,
+            'errors': 0,
+            'total_lookup_us': 0.0
+        }
+
+    def path_for(self, user_id: str) -> str:
+        return os.path.join(self.directory, f"{re.sub(r'[^A-Za-z0-9_.-]', '_', str(user_id))}.npz")
+
+    async def for_user(self, user_id: str) -> Optional[QuestionIndex]:
+        """The user's index - from memory, from disk, or seeded from the database; re-synced
+        with their Q&A cache once refresh_seconds have passed"""
+        if not user_id:
+            return None
+        index = self._indexes.get(user_id)
+        if index is not None:
+            self._indexes.move_to_end(user_id)
+            if not self.loader or time.monotonic() - self._synced_at.get(user_id, 0) < self.refresh_seconds:
+                return index
+        if user_id in self._loading:  # another slot of this user is loading it already
+            return await asyncio.shield(self._loading[user_id])
+        future = asyncio.get_running_loop().create_future()
+        self._loading[user_id] = future
+        try:
+            index = await (self._sync(user_id, index) if index is not None else self._open(user_id))
+            self._indexes[user_id] = index
+            while len(self._indexes) > self.max_users:
+                self._synced_at.pop(self._indexes.popitem(last=False)[0], None)
+            future.set_result(index)
+            return index
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"⚠️ Could not {'refresh' if index is not None else 'open'} question index for {user_id}: {e}")
+            future.set_result(index)  # a refresh that failed keeps the index as it was
+            return index
+        finally:
+            del self._loading[user_id]
+
+    async def _open(self, user_id: str) -> QuestionIndex:
+        path = self.path_for(user_id)
+        if os.path.exists(path):
+            try:
+                index = QuestionIndex.load(path)
+                if index.bits == self.bits:
+                    self.stats['loaded_from_disk'] += 1
+                    return await self._sync(user_id, index) if self.loader else index
+            except Exception as e:
+                print(f"⚠️ Could not read question index {path} ({e}); reseeding")
+        self.stats['seeded'] += 1
+        index = QuestionIndex(bits=self.bits)
+        return await self._sync(user_id, index) if self.loader else index
+
+    async def _sync(self, user_id: str, index: QuestionIndex) -> QuestionIndex:
+        """The index with the user's current Q&A cache: rebuilt if a cache row was added,
+        changed or removed (or it still has untagged rows from older seeds), keeping the
+        answers recorded since"""
+        self._synced_at[user_id] = time.monotonic()  # a failed sync is retried after refresh_seconds too
+        seed = {}
+        for row in await self.loader(user_id):
+            key = normalize_question(row.get('question_text'))
+            answer = str(row.get('answer_text') or '').strip()
+            if key and answer and (row.get('answer_source') or row.get('source')) not in DERIVED_ANSWER_SOURCES:
+                seed.setdefault(key, (str(row['question_text']), answer))
+        rows = list(zip(index.questions, index.answers, index.sources, index.versions))
+        seeded = {normalize_question(question): (question, answer)
+                  for question, answer, source, _ in rows if source == SEED_SOURCE}
+        untagged = any(source != SEED_SOURCE and not version for _, _, source, version in rows)
+        if seed == seeded and not untagged:
+            return index
+
+        rebuilt = QuestionIndex(bits=index.bits, ngrams=index.ngrams)
+        for question, answer in seed.values():
+            rebuilt.add(question, answer, SEED_SOURCE)
+        for question, answer, source, version in rows:
+            if source != SEED_SOURCE and version:  # the cache wins over a recorded answer
+                rebuilt.add(question, answer, source, version, replace=False)
+        self.stats['seeded_rows'] += len(seed)
+        if len(index):
+            self.stats['refreshes'] += 1
+        self.save(user_id, rebuilt)
+        print(f"🔎 Question index for {user_id}: {len(seed)} answered question(s) from the Q&A cache, "
+              f"{len(rebuilt) - len(seed)} recorded since")
+        return rebuilt
+
+    def search(self, index: QuestionIndex, questions: List[str], k: int = 3,
+               min_similarity: float = 0.0) -> List[List[Dict[str, Any]]]:
+        started = time.perf_counter()
+        results = index.search_many(questions, k, min_similarity)
+        self.stats['lookups'] += len(questions)
+        self.stats['hits'] += sum(1 for matches in results if matches)
+        self.stats['total_lookup_us'] += (time.perf_counter() - started) * 1e6
+        return results
+
+    def add(self, user_id: str, index: QuestionIndex, entries: List[Dict[str, Any]]):
+        """Insert [{'question', 'answer', 'source', 'version'}] and persist the user's index"""
+        index = self._indexes.get(user_id, index)  # rebuilt by a refresh since the caller got it
+        added = sum(index.add(e['question'], e['answer'], e.get('source', ''), e.get('version', '')) for e in entries)
+        if added:
+            self.stats['inserts'] += added
+            self.save(user_id, index)
+
+    def save(self, user_id: str, index: QuestionIndex):
+        try:
+            index.save(self.path_for(user_id))
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"⚠️ Could not save question index for {user_id}: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self.stats.copy()
+        stats['hit_rate'] = (stats['hits'] / stats['lookups']) if stats['lookups'] else 0
+        stats['avg_lookup_us'] = (stats['total_lookup_us'] / stats['lookups']) if stats['lookups'] else 0
+        stats['users_in_memory'] = len(self._indexes)
+        stats['entries_in_memory'] = sum(len(index) for index in self._indexes.values())
+        return stats
+
+
+def question_index_store(directory: str, loader=None, bits: int = 11, max_users: int = 32,
+                         refresh_seconds: float = 300):
+    """A QuestionIndexStore, or None (with a warning) when numpy is not installed"""
+    if np is None:
+        print("⚠️ The question index needs numpy - similar-question lookups are disabled")
+        return None
+    return QuestionIndexStore(directory, loader, bits=bits, max_users=max_users, refresh_seconds=refresh_seconds)
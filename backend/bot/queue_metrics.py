@@ -0,0 +1,84 @@
+# bot/queue_metrics.py - Queue-wait percentiles per subscription plan (fair-share check)
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+
+SAMPLES_PER_PLAN = 1000
+PLAN_CACHE_SECONDS = 600
+
+
+def parse_plan_weights(value: str) -> Dict[str, int]:
+    """'free:1,pro:2,enterprise:4' -> {'free': 1, 'pro': 2, 'enterprise': 4}"""
+    weights = {}
+    for item in (value or '').split(','):
+        if ':' in item:
+            plan, weight = item.split(':', 1)
+            try:
+                weights[plan.strip()] = max(1, int(weight))
+            except ValueError:
+                print(f"⚠️ Ignoring plan weight '{item}'")
+    return weights
+
+
+class QueueWaitTracker:
+    """Seconds from queueing to claim, kept per plan (last SAMPLES_PER_PLAN claims each).
+
+    Plans are looked up once per user and cached for PLAN_CACHE_SECONDS.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.samples: Dict[str, deque] = {}
+        self.claimed: Dict[str, int] = {}
+        self._plans: Dict[str, tuple] = {}  # user_id -> (plan, looked_up_at)
+
+    async def record_claims(self, applications: List[Dict[str, Any]]):
+        now = time.monotonic()
+        unknown = {a['user_id'] for a in applications
+                   if a.get('user_id') and now - self._plans.get(a['user_id'], (None, -PLAN_CACHE_SECONDS))[1] >= PLAN_CACHE_SECONDS}
+        if unknown:
+            try:
+                for user_id, plan in (await self.db.get_user_plans(list(unknown))).items():
+                    self._plans[user_id] = (plan, now)
+            except Exception as e:
+                print(f"⚠️ Could not look up subscription plans: {e}")
+
+        claimed_at = datetime.now(timezone.utc)
+        for application in applications:
+            plan = self._plans.get(application.get('user_id'), ('unknown', 0))[0]
+            self.claimed[plan] = self.claimed.get(plan, 0) + 1
+            queued_at = self._parse_time(application.get('created_at'))
+            if queued_at:
+                self.samples.setdefault(plan, deque(maxlen=SAMPLES_PER_PLAN)).append(
+                    max(0.0, (claimed_at - queued_at).total_seconds()))
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = {}
+        for plan, claimed in self.claimed.items():
+            waits = sorted(self.samples.get(plan, []))
+            stats[plan] = {
+                'claimed': claimed,
+                'samples': len(waits),
+                'p50_wait_seconds': self.percentile(waits, 0.50),
+                'p90_wait_seconds': self.percentile(waits, 0.90),
+                'p99_wait_seconds': self.percentile(waits, 0.99),
+                'max_wait_seconds': round(waits[-1], 1) if waits else 0
+            }
+        return stats
+
+    @staticmethod
+    def percentile(sorted_values: List[float], fraction: float) -> float:
+        if not sorted_values:
+            return 0
+        return round(sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))], 1)
+
+    @staticmethod
+    def _parse_time(value) -> Optional[datetime]:
+        if not value:
+            return None
+        try:
+            parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+            return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+        except ValueError:
+            return None
@@ -0,0 +1,145 @@
+# bot/resource_policy.py - Opt-in CDP request blocking for images, fonts, media and trackers
+import json
+from typing import Dict, Any, List, Optional
+from urllib.parse import urlparse
+
+# Network.setBlockedURLs patterns per category ('*' is the only wildcard CDP supports).
+# The image patterns match any host, CAPTCHA providers' challenge images included - CDP has
+# no exception syntax - so images are only blocked when asked for by name (see from_setting)
+CATEGORY_PATTERNS = {
+    'images': ['*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.avif', '*.bmp', '*.ico', '*.svg'],
+    'fonts': ['*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot', '*fonts.googleapis.com/*', '*fonts.gstatic.com/*',
+              '*use.typekit.net/*'],
+    'media': ['*.mp4', '*.webm', '*.ogg', '*.mp3', '*.wav', '*.m4a', '*.mov', '*.m3u8'],
+    'trackers': ['*google-analytics.com/*', '*googletagmanager.com/*', '*doubleclick.net/*',
+                 '*googleadservices.com/*', '*connect.facebook.net/*', '*facebook.com/tr*', '*hotjar.com/*',
+                 '*segment.com/*', '*segment.io/*', '*mixpanel.com/*', '*fullstory.com/*', '*clarity.ms/*',
+                 '*px.ads.linkedin.com/*', '*snap.licdn.com/*', '*bat.bing.com/*', '*adroll.com/*',
+                 '*newrelic.com/*', '*nr-data.net/*', '*quantserve.com/*', '*scorecardresearch.com/*']
+}
+
+# What RESOURCE_BLOCKING=all blocks: everything that can't break a CAPTCHA challenge
+DEFAULT_CATEGORIES = ['fonts', 'media', 'trackers']
+
+# Typical transfer size per blocked request, used to estimate bytes saved
+AVG_BLOCKED_BYTES = {'images': 45000, 'fonts': 35000, 'media': 400000, 'trackers': 30000}
+
+# CAPTCHA providers: their requests are never attributed to a category in the network report.
+# This is reporting only - a blocked image pattern still matches their URLs (see above).
+GLOBAL_ALLOW = ['recaptcha', 'hcaptcha.com', 'challenges.cloudflare.com', 'arkoselabs.com', 'funcaptcha.com']
+
+# Per-site allow-lists (host suffix -> categories and/or patterns that keep loading)
+SITE_ALLOW = {
+    # Workday renders its buttons and checkboxes with an icon font
+    'myworkdayjobs.com': ['fonts'],
+    'workday.com': ['fonts'],
+    # iCIMS loads the apply form via a tracker-hosted tag manager on some tenants
+    'icims.com': ['*googletagmanager.com/*'],
+    # Greenhouse's embedded boards need its own SVG sprite for the upload widget
+    'greenhouse.io': ['*boards.greenhouse.io/*.svg']
+}
+
+
+def _host(url: Optional[str]) -> str:
+    return (urlparse(url or '').hostname or '').lower()
+
+
+class ResourcePolicy:
+    """Decides which requests Chrome should drop for a given job site.
+
+    Network.setBlockedURLs has no exception syntax and Fetch interception needs a
+    CDP event stream Selenium does not expose, so allow-lists work by removing
+    patterns (or whole categories) from the block list for the target site.
+    An empty category list keeps measuring without blocking anything. Once a CAPTCHA
+    shows up, lift() drops the block list for the rest of that page.
+    """
+
+    def __init__(self, categories: List[str] = None, site_allow: Dict[str, List[str]] = None):
+        self.categories = [c for c in (categories or []) if c in CATEGORY_PATTERNS]
+        self.site_allow = SITE_ALLOW.copy()
+        self.site_allow.update(site_allow or {})
+
+    @classmethod
+    def from_setting(cls, value: str) -> Optional['ResourcePolicy']:
+        """Build from RESOURCE_BLOCKING: '' / 'off', 'measure', 'all' (every category but images)
+        or 'images,fonts,...'"""
+        value = (value or '').strip().lower()
+        if value in ('', 'off', 'false', 'none'):
+            return None
+        if value == 'measure':
+            return cls([])
+        if value == 'all':
+            return cls(list(DEFAULT_CATEGORIES))
+        return cls([c.strip() for c in value.split(',')])
+
+    def blocked_patterns(self, url: str) -> List[str]:
+        """Block list for a navigation to `url`, minus everything the site allow-lists"""
+        host = _host(url)
+        allowed = []
+        for site, entries in self.site_allow.items():
+            if host == site or host.endswith('.' + site):
+                allowed.extend(entries)
+
+        patterns = []
+        for category in self.categories:
+            if category in allowed:
+                continue
+            patterns.extend(p for p in CATEGORY_PATTERNS[category] if p not in allowed)
+        return patterns
+
+    def apply(self, driver, url: str) -> int:
+        """Install the block list for the page about to be opened; returns the pattern count"""
+        patterns = self.blocked_patterns(url)
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+        return len(patterns)
+
+    @staticmethod
+    def lift(driver):
+        """Stop blocking for the current page (a CAPTCHA challenge needs its images); the
+        next apply() installs the block list again"""
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': []})
+
+    @staticmethod
+    def category_of(url: str) -> Optional[str]:
+        lowered = (url or '').lower()
+        if any(allow in lowered for allow in GLOBAL_ALLOW):
+            return None
+        path = urlparse(lowered).path
+        for category, patterns in CATEGORY_PATTERNS.items():
+            for pattern in patterns:
+                needle = pattern.strip('*')
+                if pattern.startswith('*.') and pattern.count('*') == 1:
+                    if path.endswith(needle):
+                        return category
+                elif needle.rstrip('/') in lowered:
+                    return category
+        return None
+
+    def read_network_log(self, driver) -> Dict[str, Any]:
+        """Drain Chrome's performance log: blocked requests per category and bytes transferred"""
+        report = {'blocked': {}, 'blocked_requests': 0, 'bytes_transferred': 0, 'est_bytes_saved': 0}
+        try:
+            entries = driver.get_log('performance')
+        except Exception as e:
+            print(f"⚠️ Performance log unavailable: {e}")
+            return report
+
+        urls = {}
+        for entry in entries:
+            try:
+                message = json.loads(entry['message'])['message']
+            except (KeyError, ValueError):
+                continue
+            method, params = message.get('method'), message.get('params', {})
+
+            if method == 'Network.requestWillBeSent':
+                urls[params.get('requestId')] = params.get('request', {}).get('url')
+            elif method == 'Network.loadingFinished':
+                report['bytes_transferred'] += int(params.get('encodedDataLength') or 0)
+            elif method == 'Network.loadingFailed' and params.get('blockedReason') == 'inspector':
+                category = self.category_of(urls.get(params.get('requestId'))) or 'other'
+                report['blocked'][category] = report['blocked'].get(category, 0) + 1
+                report['blocked_requests'] += 1
+                report['est_bytes_saved'] += AVG_BLOCKED_BYTES.get(category, 0)
+        return report
@@ -0,0 +1,80 @@
+# bot/single_flight.py - Coalesce identical in-flight AI requests within a process
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+
+class SingleFlight:
+    """At most one in-flight computation per key.
+
+    The first caller for a key (the leader) does the work; callers arriving while it runs
+    wait on the leader's future and get its result - or its exception - instead of repeating
+    the request. Keys are forgotten as soon as the result is published, so this coalesces
+    concurrent requests only; answers that outlive the request belong in bot/llm_cache.py.
+    Thread-based: the AI engines run on executor threads and the CLI's main thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+        self.stats = {
+            'leaders': 0,
+            'coalesced': 0,
+            'errors': 0,
+            'in_flight': 0,
+            'max_in_flight': 0
+        }
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """fn() - or the result of the identical call already in flight"""
+        owned, waiting = self.claim([key])
+        if waiting:
+            return waiting[key].result()
+        try:
+            result = fn()
+        except BaseException as e:
+            self.publish(key, error=e)
+            raise
+        self.publish(key, result)
+        return result
+
+    def claim(self, keys: Iterable[str]) -> Tuple[List[str], Dict[str, Future]]:
+        """(keys the caller now leads and must publish, futures of keys someone else leads)"""
+        owned, waiting = [], {}
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                future = self._calls.get(key)
+                if future is not None:
+                    self.stats['coalesced'] += 1
+                    waiting[key] = future
+                else:
+                    self._calls[key] = Future()
+                    self.stats['leaders'] += 1
+                    owned.append(key)
+            self.stats['in_flight'] = len(self._calls)
+            self.stats['max_in_flight'] = max(self.stats['max_in_flight'], len(self._calls))
+        return owned, waiting
+
+    def publish(self, key: str, result: Any = None, error: BaseException = None):
+        """Hand a led key's outcome to its waiters and end the flight"""
+        with self._lock:
+            future = self._calls.pop(key, None)
+            self.stats['in_flight'] = len(self._calls)
+            if error is not None:
+                self.stats['errors'] += 1
+        if future is None:
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self.stats.copy()
+        requests = stats['leaders'] + stats['coalesced']
+        stats['coalesced_rate'] = (stats['coalesced'] / requests) if requests else 0
+        return stats
+
+
+# Shared by every AI engine in the process
+single_flight = SingleFlight()
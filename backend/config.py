@@ -21,14 +21,116 @@ class Settings:
         # AI Services
         self.gemini_api_key = os.getenv("GEMINI_API_KEY")
         self.anthropic_api_key = os.getenv("ANTHROPIC_API_KEY")
+        # Gemini client: "rest" (bot/llm_gateway.py) or "sdk" (google-generativeai, blocking).
+        # The gateway allows LLM_MAX_CONCURRENT requests per process, gives each call
+        # LLM_TIMEOUT_SECONDS, retries 429/5xx up to LLM_MAX_RETRIES times with jitter, hedges
+        # slow calls after the recent p95 (at least LLM_HEDGE_MIN_SECONDS), and stops calling for
+        # LLM_BREAKER_RESET_SECONDS after LLM_BREAKER_THRESHOLD failed calls in a row
+        self.llm_client = os.getenv("LLM_CLIENT", "rest").lower()
+        self.llm_model = os.getenv("LLM_MODEL", "gemini-1.5-flash")
+        self.llm_base_url = os.getenv("LLM_BASE_URL", "https://generativelanguage.googleapis.com/v1beta")
+        self.llm_max_concurrent = int(os.getenv("LLM_MAX_CONCURRENT", "8"))
+        self.llm_timeout_seconds = float(os.getenv("LLM_TIMEOUT_SECONDS", "20"))
+        self.llm_max_retries = int(os.getenv("LLM_MAX_RETRIES", "3"))
+        self.llm_hedge = os.getenv("LLM_HEDGE", "True").lower() == "true"
+        self.llm_hedge_min_seconds = float(os.getenv("LLM_HEDGE_MIN_SECONDS", "1.5"))
+        self.llm_breaker_threshold = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+        self.llm_breaker_reset_seconds = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
         
         # Application
         self.environment = os.getenv("ENVIRONMENT", "development")
         self.debug = os.getenv("DEBUG", "True").lower() == "true"
         
+        # Database HTTP pool: keep-alive connections to PostgREST, concurrent queries, per-query timeout
+        self.db_max_connections = int(os.getenv("DB_MAX_CONNECTIONS", "20"))
+        self.db_max_keepalive = int(os.getenv("DB_MAX_KEEPALIVE", "20"))
+        self.db_max_concurrency = int(os.getenv("DB_MAX_CONCURRENCY", "20"))
+        self.db_timeout_seconds = float(os.getenv("DB_TIMEOUT_SECONDS", "10"))
+        # Rows per request for bulk inserts (queueing URLs, admin fan-out)
+        self.db_bulk_chunk_size = int(os.getenv("DB_BULK_CHUNK_SIZE", "500"))
+        # Seconds a category's interested-user list is reused (0 disables the cache)
+        self.db_category_cache_ttl = float(os.getenv("DB_CATEGORY_CACHE_TTL", "60"))
+        
         # Redis
         self.redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
         
+        # Bot state files (learned buttons, form templates)
+        self.bot_data_dir = os.getenv("BOT_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+        # LLM answer cache: "sqlite" (LLM_CACHE_PATH, per node), "redis" (REDIS_URL, shared by all
+        # workers) or "off". Entries live LLM_CACHE_TTL_SECONDS; least recently used ones are
+        # evicted beyond LLM_CACHE_MAX_ENTRIES entries or LLM_CACHE_MAX_MB
+        self.llm_cache = os.getenv("LLM_CACHE", "sqlite").lower()
+        self.llm_cache_path = os.getenv("LLM_CACHE_PATH", os.path.join(self.bot_data_dir, "llm_cache.sqlite3"))
+        self.llm_cache_ttl_seconds = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(30 * 86400)))
+        self.llm_cache_max_entries = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "100000"))
+        self.llm_cache_max_mb = int(os.getenv("LLM_CACHE_MAX_MB", "200"))
+        # Similar-question index (Q&A Level 3): per-user .npz files in QA_INDEX_DIR holding the
+        # user's own user_qa_cache answers (re-read every QA_INDEX_REFRESH_SECONDS, the index is
+        # rebuilt when they changed) and the AI answers recorded since, tagged with their profile
+        # version. A choice
+        # reuses a similar question's answer from QA_INDEX_MIN_SIMILARITY (cosine) on, free text
+        # from QA_INDEX_MIN_TEXT_SIMILARITY, and only if the best match beats any differently
+        # answered one by QA_INDEX_MIN_MARGIN and asks about the same things (numbers, content
+        # words - bot/question_index.same_subject); QA_INDEX=off disables the level
+        self.qa_index = os.getenv("QA_INDEX", "on").lower() != "off"
+        self.qa_index_dir = os.getenv("QA_INDEX_DIR", os.path.join(self.bot_data_dir, "qa_index"))
+        self.qa_index_refresh_seconds = float(os.getenv("QA_INDEX_REFRESH_SECONDS", "300"))
+        self.qa_index_min_similarity = float(os.getenv("QA_INDEX_MIN_SIMILARITY", "0.7"))
+        self.qa_index_min_text_similarity = float(os.getenv("QA_INDEX_MIN_TEXT_SIMILARITY", "0.85"))
+        self.qa_index_min_margin = float(os.getenv("QA_INDEX_MIN_MARGIN", "0.1"))
+        
+        # Where the bot runs: "inline" inside the API process, or "external" in separate
+        # `python -m workers.bot` processes that follow the bot_control row every
+        # BOT_CONTROL_POLL_SECONDS (sql/005_bot_workers.sql)
+        self.bot_worker_mode = os.getenv("BOT_WORKER_MODE", "inline").lower()
+        self.bot_control_poll_seconds = float(os.getenv("BOT_CONTROL_POLL_SECONDS", "5"))
+        # Node registry ("postgres" bot_workers table or "redis" at REDIS_URL): running processors
+        # heartbeat and renew the leases of their live sessions every BOT_HEARTBEAT_SECONDS; a node
+        # silent for BOT_NODE_TIMEOUT_SECONDS is dead and its applications are requeued
+        self.bot_node_registry = os.getenv("BOT_NODE_REGISTRY", "postgres").lower()
+        self.bot_heartbeat_seconds = float(os.getenv("BOT_HEARTBEAT_SECONDS", "15"))
+        self.bot_node_timeout_seconds = float(os.getenv("BOT_NODE_TIMEOUT_SECONDS", "90"))
+        
+        # Queue claims: each processor claims applications under its worker id with a lease;
+        # leases that run out (worker died) are requeued every BOT_LEASE_REAP_SECONDS
+        self.bot_worker_id = os.getenv("BOT_WORKER_ID", "")
+        self.bot_lease_seconds = int(os.getenv("BOT_LEASE_SECONDS", "1800"))
+        self.bot_lease_reap_seconds = int(os.getenv("BOT_LEASE_REAP_SECONDS", "60"))
+        # Fair share: claim by priority, then round-robin across users, BOT_PLAN_WEIGHTS
+        # applications per round for each subscription plan; rounds count the user's
+        # claims over the last BOT_FAIR_SHARE_WINDOW_SECONDS
+        self.bot_fair_share = os.getenv("BOT_FAIR_SHARE", "True").lower() == "true"
+        self.bot_plan_weights = os.getenv("BOT_PLAN_WEIGHTS", "free:1,pro:2,enterprise:4")
+        self.bot_fair_share_window_seconds = int(os.getenv("BOT_FAIR_SHARE_WINDOW_SECONDS", "3600"))
+        # Idle polling: an empty queue is re-checked after MIN seconds, doubling up to MAX
+        self.bot_idle_backoff_min = float(os.getenv("BOT_IDLE_BACKOFF_MIN", "1"))
+        self.bot_idle_backoff_max = float(os.getenv("BOT_IDLE_BACKOFF_MAX", "30"))
+        # Per-domain politeness: at most DOMAIN_RATE_PER_MINUTE application starts per ATS host
+        # (bursts of DOMAIN_BURST), DOMAIN_MAX_IN_FLIGHT open at once, and a pause after a CAPTCHA.
+        # Claimed applications wait (up to DOMAIN_HOLD_LIMIT per worker) until their host is free;
+        # claims skip hosts with held applications or no free start (sql/008_claim_exclude_hosts.sql).
+        self.domain_rate_per_minute = float(os.getenv("DOMAIN_RATE_PER_MINUTE", "6"))
+        self.domain_burst = int(os.getenv("DOMAIN_BURST", "2"))
+        self.domain_max_in_flight = int(os.getenv("DOMAIN_MAX_IN_FLIGHT", "2"))
+        self.domain_captcha_cooldown_seconds = int(os.getenv("DOMAIN_CAPTCHA_COOLDOWN_SECONDS", "300"))
+        self.domain_hold_limit = int(os.getenv("DOMAIN_HOLD_LIMIT", "20"))
+        # CAPTCHA parking: blocked applications keep their browser outside the worker slots
+        self.captcha_parking_capacity = int(os.getenv("CAPTCHA_PARKING_CAPACITY", "5"))
+        self.captcha_park_timeout_seconds = int(os.getenv("CAPTCHA_PARK_TIMEOUT_SECONDS", "900"))
+        self.captcha_recheck_seconds = int(os.getenv("CAPTCHA_RECHECK_SECONDS", "15"))
+        
+        # Browser pool (size defaults to the bot's max_concurrent)
+        self.browser_pool_size = int(os.getenv("BROWSER_POOL_SIZE", "0"))
+        self.browser_max_uses = int(os.getenv("BROWSER_MAX_USES", "25"))
+        self.browser_max_rss_mb = int(os.getenv("BROWSER_MAX_RSS_MB", "1500"))
+        
+        # Form filling: total seconds to spread a page's input over (0 = instant)
+        self.fill_pacing_seconds = float(os.getenv("FILL_PACING_SECONDS", "0"))
+        
+        # Headless resource blocking: off, measure, all (fonts, media, trackers), or a list like
+        # "images,fonts,media,trackers" - images only when named, they include CAPTCHA challenges
+        self.resource_blocking = os.getenv("RESOURCE_BLOCKING", "off")
+        
         # Validate required settings
         if not self.supabase_url:
             raise ValueError("SUPABASE_URL is required")
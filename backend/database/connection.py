@@ -1,104 +1,472 @@
 # database/connection.py - Complete version with all methods
-from supabase import create_client, Client
-from config import settings
 import asyncio
+import time
+import httpx
+from postgrest import AsyncPostgrestClient
+from postgrest.constants import DEFAULT_POSTGREST_CLIENT_HEADERS
+from config import settings
 from typing import Optional, Dict, Any, List
 import json
-from datetime import datetime
-from typing import Dict, List, Optional, Any
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+
+# Every status job_applications.status can hold (ApplicationStatus in database/models.py, plus 'paused')
+APPLICATION_STATUSES = ['queued', 'processing', 'captcha_required', 'completed', 'failed', 'skipped', 'paused']
+# A (user_id, job_url) pair holds at most one application in these (sql/007_active_application_key.sql)
+ACTIVE_APPLICATION_STATUSES = ['queued', 'processing', 'captcha_required']
+# Job URLs per lookup of existing active applications (keeps the query string short)
+ACTIVE_LOOKUP_CHUNK = 100
+
+# Row-by-row claims (no claim function installed) pick from this many candidates per slot
+FALLBACK_CLAIM_WINDOW = 10
+
+
+def job_url_host(url: str) -> str:
+    """Host of a job URL as claims compare them (job_url_host in sql/008_claim_exclude_hosts.sql)"""
+    host = urlparse(url or '').netloc.lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+def fair_share_order(applications: List[dict], weights: Dict[str, int] = None,
+                     plans: Dict[str, str] = None) -> List[dict]:
+    """Order applications like claim_queued_applications_fair: priority, then round
+    (a user's n-th application at weight w is in round ceil(n / w)), then age"""
+    weights, plans = weights or {}, plans or {}
+    seen: Dict[tuple, int] = {}
+    ranked = []
+    for application in sorted(applications, key=lambda a: a.get('created_at') or ''):
+        key = (application.get('user_id'), application.get('priority') or 0)
+        seen[key] = seen.get(key, 0) + 1
+        weight = max(1, weights.get(plans.get(application.get('user_id')), 1))
+        ranked.append((-(application.get('priority') or 0), -(-seen[key] // weight),
+                       application.get('created_at') or '', application))
+    return [entry[-1] for entry in sorted(ranked, key=lambda entry: entry[:3])]
+
+
+class PooledPostgrestClient(AsyncPostgrestClient):
+    """Async PostgREST client on one shared httpx session with a bounded keep-alive pool"""
+    
+    def __init__(self, base_url: str, api_key: str, timeout: float, limits: httpx.Limits):
+        self.limits = limits  # read by create_session() during super().__init__
+        super().__init__(
+            base_url,
+            headers={**DEFAULT_POSTGREST_CLIENT_HEADERS, 'apikey': api_key, 'Authorization': f'Bearer {api_key}'},
+            timeout=timeout
+        )
+    
+    def create_session(self, base_url, headers, timeout, *args, **kwargs) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            limits=self.limits,
+            verify=kwargs.get('verify', True),
+            follow_redirects=True
+        )
+
 
 class DatabaseConnection:
-    """Handles all database operations for IntelliApply"""
+    """Handles all database operations for IntelliApply.
+    
+    Every query goes through _execute(): awaited on a pooled async HTTP client,
+    at most db_max_concurrency in flight, each bounded by db_timeout_seconds.
+    """
     
     def __init__(self):
-        self.supabase: Client = create_client(
-            settings.supabase_url,
-            settings.supabase_service_key
+        self.rest = PooledPostgrestClient(
+            f"{settings.supabase_url.rstrip('/')}/rest/v1",
+            settings.supabase_service_key,
+            timeout=settings.db_timeout_seconds,
+            limits=httpx.Limits(
+                max_connections=settings.db_max_connections,
+                max_keepalive_connections=settings.db_max_keepalive,
+                keepalive_expiry=30
+            )
         )
+        self.timeout = settings.db_timeout_seconds
+        self._semaphore = asyncio.Semaphore(settings.db_max_concurrency)
+        self.pool_stats = {
+            'queries': 0,
+            'errors': 0,
+            'timeouts': 0,
+            'in_flight': 0,
+            'max_in_flight': 0,
+            'total_query_ms': 0.0,
+            'total_wait_ms': 0.0
+        }
+        # category_id -> (expires_at, users); see get_users_by_job_category
+        self._category_cache: Dict[str, tuple] = {}
+        self.category_cache_stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+        self._claim_rpc_available = True  # cleared if sql/002_queue_claims.sql is not installed
+        self._fair_claim_rpc_available = True  # likewise sql/004_fair_share_claims.sql
+        self._claim_exclude_available = True  # cleared if the claim functions predate sql/008_claim_exclude_hosts.sql
+        self._lease_columns_available = True  # cleared if job_applications lacks worker_id / lease_expires_at (002)
+        self._status_counts_rpc_available = True  # likewise sql/003_status_counts.sql
+    
+    async def _execute(self, query):
+        """Run a PostgREST request builder without blocking the event loop"""
+        stats = self.pool_stats
+        queued = time.perf_counter()
+        async with self._semaphore:
+            started = time.perf_counter()
+            stats['total_wait_ms'] += (started - queued) * 1000
+            stats['in_flight'] += 1
+            stats['max_in_flight'] = max(stats['max_in_flight'], stats['in_flight'])
+            try:
+                return await asyncio.wait_for(query.execute(), timeout=self.timeout)
+            except asyncio.TimeoutError:
+                stats['timeouts'] += 1
+                raise TimeoutError(f"Database request exceeded {self.timeout}s")
+            except Exception:
+                stats['errors'] += 1
+                raise
+            finally:
+                stats['in_flight'] -= 1
+                stats['queries'] += 1
+                stats['total_query_ms'] += (time.perf_counter() - started) * 1000
+    
+    def get_pool_stats(self) -> Dict[str, Any]:
+        stats = self.pool_stats.copy()
+        queries = stats['queries']
+        stats['avg_query_ms'] = (stats['total_query_ms'] / queries) if queries else 0
+        stats['avg_wait_ms'] = (stats['total_wait_ms'] / queries) if queries else 0
+        stats['category_cache'] = self.category_cache_stats.copy()
+        return stats
+    
+    async def close(self):
+        """Close the pooled HTTP connections (application shutdown)"""
+        await self.rest.aclose()
     
     # User operations
     async def create_user(self, user_data: dict) -> dict:
         """Create a new user"""
-        response = self.supabase.table('users').insert(user_data).execute()
+        response = await self._execute(self.rest.table('users').insert(user_data))
         return response.data[0] if response.data else None
     
     async def get_user_by_email(self, email: str) -> Optional[dict]:
         """Get user by email"""
-        response = self.supabase.table('users').select('*').eq('email', email).execute()
+        response = await self._execute(self.rest.table('users').select('*').eq('email', email))
         return response.data[0] if response.data else None
     
     async def get_user_by_id(self, user_id: str) -> Optional[dict]:
         """Get user by ID"""
-        response = self.supabase.table('users').select('*').eq('id', user_id).execute()
+        response = await self._execute(self.rest.table('users').select('*').eq('id', user_id))
         return response.data[0] if response.data else None
     
     async def update_user(self, user_id: str, updates: dict) -> dict:
         """Update user data"""
-        response = self.supabase.table('users').update(updates).eq('id', user_id).execute()
+        response = await self._execute(self.rest.table('users').update(updates).eq('id', user_id))
+        self.invalidate_category_cache()
         return response.data[0] if response.data else None
     
     # User Profile operations
     async def create_profile(self, profile_data: dict) -> dict:
         """Create a new user profile"""
-        response = self.supabase.table('user_profiles').insert(profile_data).execute()
+        response = await self._execute(self.rest.table('user_profiles').insert(profile_data))
+        self.invalidate_category_cache()
         return response.data[0] if response.data else None
     
     async def get_user_profiles(self, user_id: str) -> List[dict]:
         """Get all profiles for a user"""
-        response = self.supabase.table('user_profiles').select('*').eq('user_id', user_id).eq('is_active', True).execute()
+        response = await self._execute(self.rest.table('user_profiles').select('*').eq('user_id', user_id).eq('is_active', True))
         return response.data or []
     
     async def get_profile_by_id(self, profile_id: str) -> Optional[dict]:
         """Get profile by ID"""
-        response = self.supabase.table('user_profiles').select('*').eq('id', profile_id).execute()
+        response = await self._execute(self.rest.table('user_profiles').select('*').eq('id', profile_id))
         return response.data[0] if response.data else None
     
     async def update_profile(self, profile_id: str, updates: dict) -> dict:
         """Update profile data"""
-        response = self.supabase.table('user_profiles').update(updates).eq('id', profile_id).execute()
+        response = await self._execute(self.rest.table('user_profiles').update(updates).eq('id', profile_id))
+        self.invalidate_category_cache()
         return response.data[0] if response.data else None
     
     async def delete_profile(self, profile_id: str) -> bool:
         """Delete a profile (soft delete)"""
-        response = self.supabase.table('user_profiles').update({'is_active': False}).eq('id', profile_id).execute()
+        response = await self._execute(self.rest.table('user_profiles').update({'is_active': False}).eq('id', profile_id))
+        self.invalidate_category_cache()
         return len(response.data) > 0
     
     # Job Application operations
     async def create_application(self, app_data: dict) -> dict:
         """Create a new job application"""
-        response = self.supabase.table('job_applications').insert(app_data).execute()
+        response = await self._execute(self.rest.table('job_applications').insert(app_data))
         return response.data[0] if response.data else None
     
+    async def create_applications_bulk(self, applications: List[dict], chunk_size: int = None,
+                                       on_chunk=None) -> Dict[str, int]:
+        """Queue many applications, one request per chunk; a (user_id, job_url) pair that
+        already has an active application is skipped, one whose application failed, was
+        skipped or completed is queued again (see sql/007_active_application_key.sql).
+        PostgREST can't name a partial index as its conflict target, so the active pairs
+        are looked up first; a pair queued concurrently fails its chunk on the index."""
+        active = await self._active_application_pairs(applications)
+        fresh, seen = [], set(active)
+        for application in applications:
+            pair = (application['user_id'], application['job_url'])
+            if pair not in seen:
+                seen.add(pair)
+                fresh.append(application)
+        skipped = len(applications) - len(fresh)
+        
+        async def report(result):
+            if on_chunk:
+                await on_chunk({**result, 'skipped': result['skipped'] + skipped})
+        
+        result = await self.insert_rows_bulk('job_applications', fresh, chunk_size=chunk_size, on_chunk=report)
+        result['skipped'] += skipped
+        return result
+    
+    async def _active_application_pairs(self, applications: List[dict]) -> set:
+        """(user_id, job_url) pairs among `applications` that already have an active application"""
+        user_ids = {a['user_id'] for a in applications}
+        job_urls = list(dict.fromkeys(a['job_url'] for a in applications))
+        pairs = set()
+        for start in range(0, len(job_urls), ACTIVE_LOOKUP_CHUNK):
+            query = (self.rest.table('job_applications').select('user_id, job_url')
+                     .in_('job_url', job_urls[start:start + ACTIVE_LOOKUP_CHUNK])
+                     .in_('status', ACTIVE_APPLICATION_STATUSES))
+            if len(user_ids) == 1:
+                query = query.eq('user_id', next(iter(user_ids)))
+            response = await self._execute(query)
+            pairs.update((row['user_id'], row['job_url']) for row in response.data or [])
+        return {pair for pair in pairs if pair[0] in user_ids}
+    
+    async def insert_rows_bulk(self, table: str, rows: List[dict], on_conflict: str = None,
+                               chunk_size: int = None, on_chunk=None) -> Dict[str, int]:
+        """Insert rows in chunks of chunk_size with one request per chunk.
+        
+        on_conflict names the unique columns ('a,b'); rows that collide with an existing
+        row are skipped instead of failing the chunk. A failed chunk is counted and the
+        rest still go in. on_chunk(result) is awaited after every chunk for progress.
+        Returns {'inserted', 'skipped', 'failed', 'chunks'}.
+        """
+        chunk_size = chunk_size or settings.db_bulk_chunk_size
+        result = {'inserted': 0, 'skipped': 0, 'failed': 0, 'chunks': 0}
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            try:
+                if on_conflict:
+                    query = self.rest.table(table).upsert(chunk, on_conflict=on_conflict, ignore_duplicates=True)
+                else:
+                    query = self.rest.table(table).insert(chunk)
+                response = await self._execute(query)
+                inserted = len(response.data or [])
+                result['inserted'] += inserted
+                result['skipped'] += len(chunk) - inserted
+            except Exception as e:
+                print(f"❌ Bulk insert into {table} failed for rows {start}-{start + len(chunk) - 1}: {e}")
+                result['failed'] += len(chunk)
+            result['chunks'] += 1
+            if on_chunk:
+                await on_chunk(result)
+        return result
+    
     async def get_user_applications(self, user_id: str, limit: int = 50, offset: int = 0) -> List[dict]:
         """Get applications for a user"""
-        response = (
-            self.supabase.table('job_applications')
+        response = await self._execute(
+            self.rest.table('job_applications')
             .select('*')
             .eq('user_id', user_id)
             .order('created_at', desc=True)
             .range(offset, offset + limit - 1)
-            .execute()
         )
         return response.data or []
     
     async def get_next_queued_application(self) -> Optional[dict]:
         """Get the next application to process"""
         try:
-            response = self.supabase.rpc('get_next_queued_application').execute()
+            response = await self._execute(self.rest.rpc('get_next_queued_application', {}))
             return response.data[0] if response.data else None
         except:
             # Fallback if RPC doesn't exist
-            response = (
-                self.supabase.table('job_applications')
+            response = await self._execute(
+                self.rest.table('job_applications')
                 .select('*')
                 .eq('status', 'queued')
                 .order('priority', desc=True)
                 .order('created_at', desc=False)
                 .limit(1)
-                .execute()
             )
             return response.data[0] if response.data else None
-    
+
+    async def claim_applications(self, worker_id: str, limit: int = 1, lease_seconds: int = 1800,
+                                 plan_weights: Dict[str, int] = None,
+                                 fair_share_window: int = 3600,
+                                 exclude_hosts: List[str] = None) -> List[dict]:
+        """Atomically move up to `limit` queued applications to 'processing' for this worker.
+
+        With plan_weights, claims are fair-share: priority first, then weighted round-robin
+        across users, counting each user's claims over the last fair_share_window seconds
+        (claim_queued_applications_fair, sql/004_fair_share_claims.sql). Without, or until
+        that migration is run, claim_queued_applications takes the highest-priority, oldest
+        rows (sql/002_queue_claims.sql, FOR UPDATE SKIP LOCKED).
+        While neither is installed, candidates are claimed with a conditional update
+        (status still 'queued'), which is also safe across workers but costs a request per row,
+        and carries the same worker id and lease when the table has those columns.
+        Applications on exclude_hosts (hosts the worker cannot start yet) stay in the queue.
+        """
+        if limit <= 0:
+            return []
+        if plan_weights is not None and self._fair_claim_rpc_available:
+            try:
+                return await self._claim_rpc('claim_queued_applications_fair', {
+                    'p_worker_id': worker_id,
+                    'p_limit': limit,
+                    'p_lease_seconds': lease_seconds,
+                    'p_weights': plan_weights,
+                    'p_window_seconds': fair_share_window
+                }, exclude_hosts)
+            except Exception as e:
+                if not self._is_missing_function(e):
+                    print(f"❌ Error claiming applications: {e}")
+                    return []
+                self._fair_claim_rpc_available = False
+                print("⚠️ claim_queued_applications_fair is not installed (see database/sql/004_fair_share_claims.sql); "
+                      "claiming by priority and age")
+        if self._claim_rpc_available:
+            try:
+                return await self._claim_rpc('claim_queued_applications', {
+                    'p_worker_id': worker_id,
+                    'p_limit': limit,
+                    'p_lease_seconds': lease_seconds
+                }, exclude_hosts)
+            except Exception as e:
+                if not self._is_missing_function(e):
+                    print(f"❌ Error claiming applications: {e}")
+                    return []
+                self._claim_rpc_available = False
+                print("⚠️ claim_queued_applications is not installed (see database/sql/002_queue_claims.sql); "
+                      "claiming row by row")
+
+        try:
+            candidates = await self.get_applications_by_status('queued', limit=limit * FALLBACK_CLAIM_WINDOW)
+            if exclude_hosts:
+                excluded = set(exclude_hosts)
+                candidates = [c for c in candidates if job_url_host(c.get('job_url')) not in excluded]
+            if plan_weights is not None:
+                plans = await self.get_user_plans(list({c['user_id'] for c in candidates}))
+                candidates = fair_share_order(candidates, plan_weights, plans)
+            claimed = []
+            for application in candidates:
+                if len(claimed) >= limit:
+                    break
+                claimed.extend(await self._claim_row(application['id'], worker_id, lease_seconds))
+            return claimed
+        except Exception as e:
+            print(f"❌ Error claiming applications: {e}")
+            return []
+
+    async def _claim_rpc(self, function: str, params: Dict[str, Any], exclude_hosts: List[str] = None) -> List[dict]:
+        """Call a claim function, passing exclude_hosts where sql/008 is installed"""
+        if exclude_hosts and self._claim_exclude_available:
+            try:
+                response = await self._execute(self.rest.rpc(function, {**params, 'p_exclude_hosts': list(exclude_hosts)}))
+                return response.data or []
+            except Exception as e:
+                if not self._is_missing_function(e):
+                    raise
+                self._claim_exclude_available = False
+                print("⚠️ Claim functions take no p_exclude_hosts (see database/sql/008_claim_exclude_hosts.sql); "
+                      "claims may include hosts this worker cannot start yet")
+        response = await self._execute(self.rest.rpc(function, params))
+        return response.data or []
+
+    async def _claim_row(self, app_id: str, worker_id: str, lease_seconds: int) -> List[dict]:
+        """Conditional claim of one queued row; empty when another worker got there first"""
+        now = datetime.utcnow()
+        updates = {'status': 'processing', 'updated_at': now.isoformat(), 'processing_started_at': now.isoformat()}
+        if self._lease_columns_available:
+            updates.update({'worker_id': worker_id,
+                            'lease_expires_at': (now + timedelta(seconds=lease_seconds)).isoformat()})
+        try:
+            response = await self._execute(
+                self.rest.table('job_applications').update(updates).eq('id', app_id).eq('status', 'queued'))
+        except Exception as e:
+            if not (self._lease_columns_available and self._is_missing_column(e)):
+                raise
+            self._lease_columns_available = False
+            print("⚠️ job_applications has no worker_id / lease_expires_at (see database/sql/002_queue_claims.sql); "
+                  "claims carry no lease")
+            return await self._claim_row(app_id, worker_id, lease_seconds)
+        return response.data or []
+
+    async def get_user_plans(self, user_ids: List[str]) -> Dict[str, str]:
+        """Subscription plan of several users in one request ({user_id: plan})"""
+        if not user_ids:
+            return {}
+        response = await self._execute(
+            self.rest.table('users').select('id, subscription_plan').in_('id', list(user_ids))
+        )
+        return {row['id']: row.get('subscription_plan') or 'free' for row in response.data or []}
+
+    async def requeue_expired_leases(self) -> int:
+        """Put applications whose worker's lease ran out back in the queue; returns how many"""
+        if not self._claim_rpc_available:
+            return 0  # no leases without the queue-claim migration
+        try:
+            response = await self._execute(self.rest.rpc('requeue_expired_leases', {}))
+            return response.data or 0
+        except Exception as e:
+            if self._is_missing_function(e):
+                self._claim_rpc_available = False
+            else:
+                print(f"❌ Error requeueing expired leases: {e}")
+            return 0
+
+    async def renew_leases(self, worker_id: str, app_ids: List[str], lease_seconds: int) -> int:
+        """Extend this worker's leases on applications it is still working on; returns how many
+        are still ours (fewer means another node requeued them)"""
+        if not app_ids:
+            return 0
+        if not self._lease_columns_available:
+            return len(app_ids)  # claims without leases - nothing to renew or lose
+        try:
+            response = await self._execute(
+                self.rest.table('job_applications')
+                .update({'lease_expires_at': (datetime.utcnow() + timedelta(seconds=lease_seconds)).isoformat()})
+                .in_('id', app_ids)
+                .eq('worker_id', worker_id)
+            )
+            return len(response.data or [])
+        except Exception as e:
+            print(f"❌ Error renewing leases: {e}")
+            return len(app_ids)  # unknown - don't report them as lost
+
+    async def requeue_worker_applications(self, worker_id: str) -> int:
+        """Put a dead worker's applications (in progress or parked on a CAPTCHA) back in the
+        queue and expire their pending CAPTCHA sessions; returns how many were requeued"""
+        try:
+            response = await self._execute(
+                self.rest.table('job_applications')
+                .update({'status': 'queued', 'worker_id': None, 'lease_expires_at': None,
+                         'updated_at': datetime.utcnow().isoformat()})
+                .eq('worker_id', worker_id)
+                .in_('status', ['processing', 'captcha_required'])
+            )
+            app_ids = [row['id'] for row in response.data or []]
+            if app_ids:
+                await self._execute(
+                    self.rest.table('captcha_sessions')
+                    .update({'status': 'expired'})
+                    .in_('application_id', app_ids)
+                    .eq('status', 'pending')
+                )
+            return len(app_ids)
+        except Exception as e:
+            print(f"❌ Error requeueing applications of worker {worker_id}: {e}")
+            return 0
+
+    @staticmethod
+    def _is_missing_function(error: Exception) -> bool:
+        return 'PGRST202' in str(error) or 'Could not find the function' in str(error)
+
+    @staticmethod
+    def _is_missing_column(error: Exception) -> bool:
+        return 'PGRST204' in str(error) or ('column' in str(error) and
+                                             ('worker_id' in str(error) or 'lease_expires_at' in str(error)))
+
     async def update_application_status(self, app_id: str, status: str, error_message: str = None) -> bool:
         """Update application status"""
         try:
@@ -106,7 +474,7 @@ class DatabaseConnection:
             if error_message:
                 updates['error_message'] = error_message
             
-            self.supabase.table('job_applications').update(updates).eq('id', app_id).execute()
+            await self._execute(self.rest.table('job_applications').update(updates).eq('id', app_id))
             return True
         except Exception as e:
             print(f"Error updating application status: {e}")
@@ -114,20 +482,19 @@ class DatabaseConnection:
 
     async def get_application_by_id(self, app_id: str) -> Optional[dict]:
         """Get application by ID"""
-        response = self.supabase.table('job_applications').select('*').eq('id', app_id).execute()
+        response = await self._execute(self.rest.table('job_applications').select('*').eq('id', app_id))
         return response.data[0] if response.data else None
 
     async def get_applications_by_status(self, status: str, limit: int = 10) -> List[dict]:
         """Get applications by status"""
         try:
-            response = (
-                self.supabase.table('job_applications')
+            response = await self._execute(
+                self.rest.table('job_applications')
                 .select('*')
                 .eq('status', status)
                 .order('priority', desc=True)
                 .order('created_at', desc=False)
                 .limit(limit)
-                .execute()
             )
             return response.data or []
         except Exception as e:
@@ -137,23 +504,22 @@ class DatabaseConnection:
     # Batch operations
     async def create_batch(self, batch_data: dict) -> dict:
         """Create a new application batch"""
-        response = self.supabase.table('application_batches').insert(batch_data).execute()
+        response = await self._execute(self.rest.table('application_batches').insert(batch_data))
         return response.data[0] if response.data else None
     
     async def get_user_batches(self, user_id: str) -> List[dict]:
         """Get all batches for a user"""
-        response = (
-            self.supabase.table('application_batches')
+        response = await self._execute(
+            self.rest.table('application_batches')
             .select('*')
             .eq('user_id', user_id)
             .order('created_at', desc=True)
-            .execute()
         )
         return response.data or []
 
     async def get_batch_by_id(self, batch_id: str) -> Optional[dict]:
         """Get batch by ID"""
-        response = self.supabase.table('application_batches').select('*').eq('id', batch_id).execute()
+        response = await self._execute(self.rest.table('application_batches').select('*').eq('id', batch_id))
         return response.data[0] if response.data else None
     
     async def update_batch_progress(self, batch_id: str, processed_count: int, successful_count: int, failed_count: int) -> bool:
@@ -166,7 +532,7 @@ class DatabaseConnection:
                 'updated_at': datetime.utcnow().isoformat()
             }
             
-            self.supabase.table('application_batches').update(updates).eq('id', batch_id).execute()
+            await self._execute(self.rest.table('application_batches').update(updates).eq('id', batch_id))
             return True
         except Exception as e:
             print(f"Error updating batch progress: {e}")
@@ -175,44 +541,106 @@ class DatabaseConnection:
     # CAPTCHA operations
     async def create_captcha_session(self, session_data: dict) -> dict:
         """Create a new CAPTCHA session"""
-        response = self.supabase.table('captcha_sessions').insert(session_data).execute()
+        response = await self._execute(self.rest.table('captcha_sessions').insert(session_data))
         return response.data[0] if response.data else None
     
     async def get_pending_captchas(self) -> List[dict]:
         """Get all pending CAPTCHA sessions"""
-        response = (
-            self.supabase.table('captcha_sessions')
+        response = await self._execute(
+            self.rest.table('captcha_sessions')
             .select('*')
             .eq('status', 'pending')
             .order('created_at', desc=False)
-            .execute()
         )
         return response.data or []
 
+    async def get_pending_captcha_count(self) -> int:
+        """Number of pending CAPTCHA sessions (count only, no rows)"""
+        return await self.count_rows('captcha_sessions', status='pending')
+
     async def get_captcha_session(self, session_id: str) -> Optional[dict]:
         """Get CAPTCHA session by ID"""
-        response = self.supabase.table('captcha_sessions').select('*').eq('id', session_id).execute()
+        response = await self._execute(self.rest.table('captcha_sessions').select('*').eq('id', session_id))
         return response.data[0] if response.data else None
     
-    async def update_captcha_status(self, session_id: str, status: str, solved_by: str = None) -> bool:
-        """Update CAPTCHA session status"""
+    async def get_captcha_statuses(self, session_ids: List[str]) -> Dict[str, str]:
+        """Current status of several CAPTCHA sessions in one request ({id: status})"""
+        if not session_ids:
+            return {}
+        response = await self._execute(
+            self.rest.table('captcha_sessions').select('id, status').in_('id', session_ids)
+        )
+        return {row['id']: row['status'] for row in response.data or []}
+
+    # Bot worker control operations (sql/005_bot_workers.sql)
+    async def get_bot_control(self) -> Optional[dict]:
+        """Desired bot state the API asked for ({desired_state, headless, max_concurrent})"""
         try:
-            updates = {'status': status}
-            if status == 'solved' and solved_by:
-                updates['solved_at'] = datetime.utcnow().isoformat()
-                updates['solved_by'] = solved_by
-            
-            self.supabase.table('captcha_sessions').update(updates).eq('id', session_id).execute()
+            response = await self._execute(self.rest.table('bot_control').select('*').eq('id', 'default'))
+            return response.data[0] if response.data else None
+        except Exception as e:
+            print(f"❌ Error reading bot control: {e}")
+            return None
+
+    async def set_bot_control(self, desired_state: str, headless: bool = None,
+                              max_concurrent: int = None) -> Optional[dict]:
+        """Ask the bot workers to start ('running') or stop ('stopped')"""
+        control = {'id': 'default', 'desired_state': desired_state, 'updated_at': datetime.utcnow().isoformat()}
+        if headless is not None:
+            control['headless'] = headless
+        if max_concurrent is not None:
+            control['max_concurrent'] = max_concurrent
+        try:
+            response = await self._execute(self.rest.table('bot_control').upsert(control, on_conflict='id'))
+            return response.data[0] if response.data else None
+        except Exception as e:
+            print(f"❌ Error writing bot control: {e}")
+            return None
+
+    async def signal_bot_workers(self, signal: str) -> bool:
+        """Stamp bot_control.<signal>_at ('work_queued', 'captcha_resolved') for workers to pick up
+        on their next poll (sql/009_bot_signals.sql)"""
+        try:
+            await self._execute(self.rest.table('bot_control')
+                                .update({f'{signal}_at': datetime.utcnow().isoformat()}).eq('id', 'default'))
             return True
         except Exception as e:
-            print(f"Error updating CAPTCHA status: {e}")
+            print(f"❌ Error signalling bot workers ({signal}): {e}")
             return False
-    
+
+    async def report_bot_worker(self, worker: dict) -> bool:
+        """Insert or refresh this worker's row in bot_workers"""
+        try:
+            await self._execute(self.rest.table('bot_workers').upsert(
+                {**worker, 'last_seen_at': datetime.utcnow().isoformat()}, on_conflict='worker_id'))
+            return True
+        except Exception as e:
+            print(f"❌ Error reporting bot worker status: {e}")
+            return False
+
+    async def set_bot_worker_state(self, worker_id: str, state: str) -> bool:
+        try:
+            await self._execute(self.rest.table('bot_workers').update({'state': state}).eq('worker_id', worker_id))
+            return True
+        except Exception as e:
+            print(f"❌ Error updating bot worker state: {e}")
+            return False
+
+    async def get_bot_workers(self) -> List[dict]:
+        """Every registered bot worker, most recently seen first"""
+        try:
+            response = await self._execute(
+                self.rest.table('bot_workers').select('*').order('last_seen_at', desc=True))
+            return response.data or []
+        except Exception as e:
+            print(f"❌ Error reading bot workers: {e}")
+            return []
+
     # Notification operations
     async def create_notification(self, notification_data: dict) -> dict:
         """Create a new notification"""
         try:
-            response = self.supabase.table('notifications').insert(notification_data).execute()
+            response = await self._execute(self.rest.table('notifications').insert(notification_data))
             return response.data[0] if response.data else None
         except Exception as e:
             print(f"Error creating notification: {e}")
@@ -221,12 +649,12 @@ class DatabaseConnection:
     async def get_user_notifications(self, user_id: str, unread_only: bool = False) -> List[dict]:
         """Get notifications for a user"""
         try:
-            query = self.supabase.table('notifications').select('*').eq('user_id', user_id)
+            query = self.rest.table('notifications').select('*').eq('user_id', user_id)
             
             if unread_only:
                 query = query.eq('is_read', False)
             
-            response = query.order('created_at', desc=True).execute()
+            response = await self._execute(query.order('created_at', desc=True))
             return response.data or []
         except Exception as e:
             print(f"Error getting user notifications: {e}")
@@ -235,7 +663,7 @@ class DatabaseConnection:
     async def mark_notification_read(self, notification_id: str) -> bool:
         """Mark notification as read"""
         try:
-            self.supabase.table('notifications').update({'is_read': True}).eq('id', notification_id).execute()
+            await self._execute(self.rest.table('notifications').update({'is_read': True}).eq('id', notification_id))
             return True
         except Exception as e:
             print(f"Error marking notification as read: {e}")
@@ -244,12 +672,11 @@ class DatabaseConnection:
     async def pause_user_applications(self, user_id: str) -> int:
         """Pause all queued applications for a user"""
         try:
-            response = (
-                self.supabase.table('job_applications')
+            response = await self._execute(
+                self.rest.table('job_applications')
                 .update({'status': 'paused'})
                 .eq('user_id', user_id)
                 .eq('status', 'queued')
-                .execute()
             )
             return len(response.data) if response.data else 0
         except Exception as e:
@@ -259,12 +686,11 @@ class DatabaseConnection:
     async def resume_user_applications(self, user_id: str) -> int:
         """Resume all paused applications for a user"""
         try:
-            response = (
-                self.supabase.table('job_applications')
+            response = await self._execute(
+                self.rest.table('job_applications')
                 .update({'status': 'queued'})
                 .eq('user_id', user_id)
                 .eq('status', 'paused')
-                .execute()
             )
             return len(response.data) if response.data else 0
         except Exception as e:
@@ -274,14 +700,14 @@ class DatabaseConnection:
     async def get_job_urls(self, category_id: str = None, status: str = None):
         """Get job URLs, optionally filtered"""
         try:
-            query = self.supabase.table('job_urls_master').select('*, job_categories(category_name)')
+            query = self.rest.table('job_urls_master').select('*, job_categories(category_name)')
             
             if category_id:
                 query = query.eq('category_id', category_id)
             if status:
                 query = query.eq('status', status)
             
-            response = query.execute()
+            response = await self._execute(query)
             return response.data or []
         except Exception as e:
             print(f"Error getting job URLs: {e}")
@@ -293,7 +719,7 @@ class DatabaseConnection:
     async def get_job_categories(self):
         """Get all job categories"""
         try:
-            response = self.supabase.table('job_categories').select('*').eq('is_active', True).execute()
+            response = await self._execute(self.rest.table('job_categories').select('*').eq('is_active', True))
             return response.data or []
         except Exception as e:
             print(f"Error getting job categories: {e}")
@@ -302,7 +728,7 @@ class DatabaseConnection:
     async def create_job_category(self, category_data: dict):
         """Create a new job category"""
         try:
-            response = self.supabase.table('job_categories').insert(category_data).execute()
+            response = await self._execute(self.rest.table('job_categories').insert(category_data))
             return response.data[0] if response.data else None
         except Exception as e:
             print(f"Error creating job category: {e}")
@@ -311,7 +737,7 @@ class DatabaseConnection:
     async def get_job_category_by_id(self, category_id: str):
         """Get job category by ID"""
         try:
-            response = self.supabase.table('job_categories').select('*').eq('id', category_id).execute()
+            response = await self._execute(self.rest.table('job_categories').select('*').eq('id', category_id))
             return response.data[0] if response.data else None
         except Exception as e:
             print(f"Error getting job category: {e}")
@@ -320,14 +746,14 @@ class DatabaseConnection:
     async def get_job_urls(self, category_id: str = None, status: str = None):
         """Get job URLs, optionally filtered"""
         try:
-            query = self.supabase.table('job_urls_master').select('*, job_categories(category_name)')
+            query = self.rest.table('job_urls_master').select('*, job_categories(category_name)')
             
             if category_id:
                 query = query.eq('category_id', category_id)
             if status:
                 query = query.eq('status', status)
             
-            response = query.execute()
+            response = await self._execute(query)
             return response.data or []
         except Exception as e:
             print(f"Error getting job URLs: {e}")
@@ -336,154 +762,119 @@ class DatabaseConnection:
     async def create_job_url(self, url_data: dict):
         """Create a new job URL"""
         try:
-            response = self.supabase.table('job_urls_master').insert(url_data).execute()
+            response = await self._execute(self.rest.table('job_urls_master').insert(url_data))
             return response.data[0] if response.data else None
         except Exception as e:
             print(f"Error creating job URL: {e}")
             return None
     
+    async def create_job_urls_bulk(self, url_rows: List[dict]) -> Dict[str, int]:
+        """Add many job URLs; a URL already listed in its category is skipped"""
+        return await self.insert_rows_bulk('job_urls_master', url_rows, on_conflict='category_id,job_url')
+    
     async def get_users_by_job_category(self, category_id: str) -> List[dict]:
-        """Get users who are interested in a specific job category"""
-        try:
-            print(f'🔍 Looking for users with category: {category_id}')
+        """Get users who are interested in a specific job category.
+
+        One request: active profiles with the category preference, with their user
+        embedded. Results are reused for db_category_cache_ttl seconds; any profile
+        or user write clears the cache.
+        """
+        cached = self._category_cache.get(category_id)
+        if cached and cached[0] > time.monotonic():
+            self.category_cache_stats['hits'] += 1
+            return [user.copy() for user in cached[1]]
+        self.category_cache_stats['misses'] += 1
 
-            # Step 1: Get user profiles with the category preference
-            profiles_response = (
-                self.supabase.table('user_profiles')
-                .select('user_id, id, profile_name')
+        try:
+            response = await self._execute(
+                self.rest.table('user_profiles')
+                .select('user_id, profile_id:id, profile_name, users!inner(email, name, subscription_plan)')
                 .eq('preferred_job_category_id', category_id)
                 .eq('is_active', True)
-                .execute()
             )
 
-            print(f'📋 Found {len(profiles_response.data)} profiles with category preference')
-
-            if not profiles_response.data:
-                print('⚠️ No profiles found with this category preference')
-                return []
-
-            # Step 2: Get user details for each profile
             users = []
-            for profile in profiles_response.data:
-                user_id = profile['user_id']
-                profile_id = profile['id']
-                profile_name = profile['profile_name']
-
-                # Get user details
-                user_response = (
-                    self.supabase.table('users')
-                    .select('email, name')
-                    .eq('id', user_id)
-                    .execute()
-                )
-
-                if user_response.data:
-                    user_data = user_response.data[0]
-                    users.append({
-                        'user_id': user_id,
-                        'email': user_data['email'],
-                        'name': user_data.get('name', ''),
-                        'profile_id': profile_id,
-                        'profile_name': profile_name
-                    })
-                    print(f'   ✅ Added user: {user_data["email"]}')
+            for profile in response.data or []:
+                user_data = profile.get('users') or {}
+                users.append({
+                    'user_id': profile['user_id'],
+                    'email': user_data.get('email'),
+                    'name': user_data.get('name') or '',
+                    'subscription_plan': user_data.get('subscription_plan') or 'free',
+                    'profile_id': profile['profile_id'],
+                    'profile_name': profile['profile_name']
+                })
 
-            print(f'🎯 Returning {len(users)} users')
-            return users
+            print(f'🎯 Found {len(users)} users for category {category_id}')
+            if settings.db_category_cache_ttl > 0:
+                self._category_cache[category_id] = (time.monotonic() + settings.db_category_cache_ttl, users)
+            return [user.copy() for user in users]
 
         except Exception as e:
             print(f'❌ Error getting users by category: {e}')
             import traceback
             traceback.print_exc()
             return []
-            # Direct table query that we know works from debug output
-            response = (
-                self.supabase.table('user_profiles')
-                .select('user_id, id AS profile_id, profile_name, users(email, name)')
-                .eq('preferred_job_category_id', category_id)
-                .eq('is_active', True)
-                .execute()
-            )
-            
-            print(f"📋 Raw query returned {len(response.data)} profiles")
-            
-            users = []
-            for profile in response.data or []:
-                user_data = profile.get('users')
-                if user_data:
-                    users.append({
-                        'user_id': profile['user_id'],
-                        'email': user_data['email'],
-                        'name': user_data.get('name', ''),
-                        'profile_id': profile['profile_id'],
-                        'profile_name': profile['profile_name']
-                    })
-                    print(f"   ✅ Added user: {user_data['email']}")
-            
-            print(f"🎯 Returning {len(users)} users")
-            return users
-            
-        except Exception as e:
-            print(f"❌ Error getting users by category: {e}")
-            import traceback
-            traceback.print_exc()
-            return []
+
+    def invalidate_category_cache(self):
+        """Drop cached category membership (a profile can move between categories)"""
+        if self._category_cache:
+            self._category_cache.clear()
+            self.category_cache_stats['invalidations'] += 1
+
     async def get_user_default_profile(self, user_id: str):
         """Get user's default profile"""
         try:
-            response = (
-                self.supabase.table('user_profiles')
+            response = await self._execute(
+                self.rest.table('user_profiles')
                 .select('*')
                 .eq('user_id', user_id)
                 .eq('is_active', True)
                 .order('is_default', desc=True)
                 .limit(1)
-                .execute()
             )
             return response.data[0] if response.data else None
         except Exception as e:
             print(f"Error getting default profile: {e}")
             return None
     
-    async def get_admin_stats(self):
-        """Get admin dashboard statistics"""
-        try:
-            # Call the database function we created
-            response = self.supabase.rpc('get_admin_dashboard_stats').execute()
-            return response.data or {}
-        except Exception as e:
-            print(f"Error getting admin stats: {e}")
-            # Fallback to manual calculation
+    async def get_application_status_counts(self, user_id: str = None) -> Dict[str, int]:
+        """Application counts per status ({status: count}) for one user or everyone.
+
+        One GROUP BY query through get_application_status_counts (sql/003_status_counts.sql);
+        without that function, one count-only request per known status.
+        """
+        if self._status_counts_rpc_available:
             try:
-                stats = {}
-                
-                users_response = self.supabase.table('users').select('id', count='exact').execute()
-                stats['total_users'] = users_response.count or 0
-                
-                categories_response = self.supabase.table('job_categories').select('id', count='exact').execute()
-                stats['total_categories'] = categories_response.count or 0
-                
-                urls_response = self.supabase.table('job_urls_master').select('id', count='exact').execute()
-                stats['total_job_urls'] = urls_response.count or 0
-                
-                # Get application counts by status
-                apps_response = self.supabase.table('job_applications').select('status').execute()
-                applications = apps_response.data or []
-                
-                stats['active_applications'] = len([app for app in applications if app['status'] in ['queued', 'processing']])
-                stats['completed_applications'] = len([app for app in applications if app['status'] == 'completed'])
-                stats['failed_applications'] = len([app for app in applications if app['status'] == 'failed'])
-                stats['pending_captchas'] = len([app for app in applications if app['status'] == 'captcha_required'])
-                
-                return stats
-            except Exception as fallback_error:
-                print(f"Fallback stats calculation failed: {fallback_error}")
-                return {}
-    
+                response = await self._execute(
+                    self.rest.rpc('get_application_status_counts', {'p_user_id': user_id})
+                )
+                return {row['status']: row['count'] for row in response.data or []}
+            except Exception as e:
+                if not self._is_missing_function(e):
+                    raise
+                self._status_counts_rpc_available = False
+                print("⚠️ get_application_status_counts is not installed (see database/sql/003_status_counts.sql); "
+                      "counting per status")
+
+        filters = {'user_id': user_id} if user_id else {}
+        counts = await asyncio.gather(*[
+            self.count_rows('job_applications', status=status, **filters) for status in APPLICATION_STATUSES
+        ])
+        return {status: count for status, count in zip(APPLICATION_STATUSES, counts) if count}
+
+    async def count_rows(self, table: str, **filters) -> int:
+        """Exact row count for equality filters; transfers at most one row"""
+        query = self.rest.table(table).select('id', count='exact')
+        for column, value in filters.items():
+            query = query.eq(column, value)
+        response = await self._execute(query.limit(1))
+        return response.count or 0
+
     async def create_application(self, app_data: dict):
         """Create a new job application"""
         try:
-            response = self.supabase.table('job_applications').insert(app_data).execute()
+            response = await self._execute(self.rest.table('job_applications').insert(app_data))
             return response.data[0] if response.data else None
         except Exception as e:
             print(f"Error creating application: {e}")
@@ -496,9 +887,9 @@ class DatabaseConnection:
             if "UPDATE users SET applications_used" in query:
                 user_id = params[0] if params else None
                 if user_id:
-                    response = self.supabase.table('users').update({
+                    response = await self._execute(self.rest.table('users').update({
                         'applications_used': 'applications_used + 1'
-                    }).eq('id', user_id).execute()
+                    }).eq('id', user_id))
                     return response.data
             
             # Add more query patterns as needed
@@ -513,7 +904,7 @@ class DatabaseConnection:
         try:
             # Implement common fetch patterns
             if "SELECT" in query and "job_applications" in query:
-                response = self.supabase.table('job_applications').select('*').execute()
+                response = await self._execute(self.rest.table('job_applications').select('*'))
                 return response.data or []
             
             print(f"Fetch query not implemented: {query}")
@@ -534,23 +925,15 @@ class DatabaseConnection:
     # Analytics operations
     async def get_user_stats(self, user_id: str) -> dict:
         """Get user application statistics"""
-        # Get application counts by status
-        apps_response = (
-            self.supabase.table('job_applications')
-            .select('status')
-            .eq('user_id', user_id)
-            .execute()
-        )
-        
-        applications = apps_response.data or []
+        counts = await self.get_application_status_counts(user_id)
         
         stats = {
-            'total_applications': len(applications),
-            'queued': len([app for app in applications if app['status'] == 'queued']),
-            'processing': len([app for app in applications if app['status'] == 'processing']),
-            'completed': len([app for app in applications if app['status'] == 'completed']),
-            'failed': len([app for app in applications if app['status'] == 'failed']),
-            'captcha_required': len([app for app in applications if app['status'] == 'captcha_required'])
+            'total_applications': sum(counts.values()),
+            'queued': counts.get('queued', 0),
+            'processing': counts.get('processing', 0),
+            'completed': counts.get('completed', 0),
+            'failed': counts.get('failed', 0),
+            'captcha_required': counts.get('captcha_required', 0)
         }
         
         # Calculate success rate
@@ -568,7 +951,6 @@ class DatabaseConnection:
             if category_id:
                 print(f"🔍 Getting users for category: {category_id}")
                 
-                # Use the fixed get_users_by_job_category function
                 users_with_category = await self.get_users_by_job_category(category_id)
                 
                 # Convert to the format expected by the API
@@ -582,7 +964,7 @@ class DatabaseConnection:
                             'id': user_id,
                             'email': user['email'],
                             'name': user.get('name', ''),
-                            'subscription_plan': 'free'  # Default value
+                            'subscription_plan': user['subscription_plan']
                         })
                         seen_users.add(user_id)
                 
@@ -590,7 +972,7 @@ class DatabaseConnection:
                 return result
             else:
                 # Get all users without filter
-                response = self.supabase.table('users').select('id, email, name, subscription_plan').execute()
+                response = await self._execute(self.rest.table('users').select('id, email, name, subscription_plan'))
                 return response.data or []
                 
         except Exception as e:
@@ -600,38 +982,35 @@ class DatabaseConnection:
             return []
 
     async def get_admin_stats(self) -> dict:
-        """Get admin statistics with proper error handling"""
+        """Get admin statistics: table counts and application counts per status, fetched concurrently"""
         try:
-            # Real database queries
-                # Get user count
-                users_response = self.supabase.table('users').select('id', count='exact').execute()
-                total_users = users_response.count or 0
-                
-                # Get application stats
-                apps_response = self.supabase.table('job_applications').select('status', count='exact').execute()
-                total_applications = apps_response.count or 0
-                
-                # Get status breakdown
-                pending_response = self.supabase.table('job_applications').select('id', count='exact').eq('status', 'queued').execute()
-                pending_applications = pending_response.count or 0
-                
-                completed_response = self.supabase.table('job_applications').select('id', count='exact').eq('status', 'completed').execute()
-                completed_applications = completed_response.count or 0
-                
-                captcha_response = self.supabase.table('captcha_sessions').select('id', count='exact').eq('status', 'pending').execute()
-                pending_captchas = captcha_response.count or 0
-                
-                return {
-                    "total_users": total_users,
-                    "total_applications": total_applications,
-                    "pending_applications": pending_applications,
-                    "completed_applications": completed_applications,
-                    "pending_captchas": pending_captchas
-                }
+            counts, total_users, total_categories, total_job_urls, pending_captchas = await asyncio.gather(
+                self.get_application_status_counts(),
+                self.count_rows('users'),
+                self.count_rows('job_categories'),
+                self.count_rows('job_urls_master'),
+                self.get_pending_captcha_count()
+            )
+            
+            return {
+                "total_users": total_users,
+                "total_categories": total_categories,
+                "total_job_urls": total_job_urls,
+                "total_applications": sum(counts.values()),
+                "pending_applications": counts.get('queued', 0),
+                "active_applications": counts.get('queued', 0) + counts.get('processing', 0),
+                "completed_applications": counts.get('completed', 0),
+                "failed_applications": counts.get('failed', 0),
+                "captcha_applications": counts.get('captcha_required', 0),
+                "pending_captchas": pending_captchas,
+                "status_counts": counts
+            }
         except Exception as e:
             print(f"Error getting admin stats: {e}")
             return {
                 "total_users": 0,
+                "total_categories": 0,
+                "total_job_urls": 0,
                 "total_applications": 0,
                 "pending_applications": 0,
                 "completed_applications": 0,
@@ -644,7 +1023,7 @@ class DatabaseConnection:
             # Real database queries
                 # Build query with proper joins
                 query = (
-                    self.supabase.table('job_urls_master')
+                    self.rest.table('job_urls_master')
                     .select('*, job_categories(category_name)')
                 )
                 
@@ -653,7 +1032,7 @@ class DatabaseConnection:
                 if status:
                     query = query.eq('status', status)
                 
-                response = query.execute()
+                response = await self._execute(query)
                 
                 # Flatten the response to match expected format
                 formatted_urls = []
@@ -670,7 +1049,7 @@ class DatabaseConnection:
     async def get_captcha_session(self, session_id: str) -> Optional[dict]:
         """Get CAPTCHA session by ID"""
         try:
-            response = self.supabase.table('captcha_sessions').select('*').eq('id', session_id).execute()
+            response = await self._execute(self.rest.table('captcha_sessions').select('*').eq('id', session_id))
             return response.data[0] if response.data else None
         except Exception as e:
             print(f"Error getting CAPTCHA session: {e}")
@@ -679,19 +1058,22 @@ class DatabaseConnection:
     async def create_captcha_session(self, captcha_data: dict) -> dict:
         """Create a new CAPTCHA session"""
         try:
-            response = self.supabase.table('captcha_sessions').insert(captcha_data).execute()
+            response = await self._execute(self.rest.table('captcha_sessions').insert(captcha_data))
             return response.data[0] if response.data else None
         except Exception as e:
             print(f"Error creating CAPTCHA session: {e}")
             return None
     
-    async def update_captcha_status(self, session_id: str, status: str) -> bool:
+    async def update_captcha_status(self, session_id: str, status: str, solved_by: str = None) -> bool:
         """Update CAPTCHA session status"""
         try:
-            response = self.supabase.table('captcha_sessions').update({
+            updates = {
                 'status': status,
                 'solved_at': datetime.utcnow().isoformat() if status == 'solved' else None
-            }).eq('id', session_id).execute()
+            }
+            if status == 'solved' and solved_by:
+                updates['solved_by'] = solved_by
+            response = await self._execute(self.rest.table('captcha_sessions').update(updates).eq('id', session_id))
             return len(response.data) > 0
         except Exception as e:
             print(f"Error updating CAPTCHA status: {e}")
@@ -701,12 +1083,12 @@ class DatabaseConnection:
     async def get_user_qa_cache(self, user_id: str, question_text: str = None) -> List[dict]:
         """Get user's Q&A cache entries"""
         try:
-            query = self.supabase.table('user_qa_cache').select('*').eq('user_id', user_id)
+            query = self.rest.table('user_qa_cache').select('*').eq('user_id', user_id)
             
             if question_text:
                 query = query.eq('question_text', question_text)
             
-            response = query.execute()
+            response = await self._execute(query)
             return response.data or []
         except Exception as e:
             print(f"Error getting user Q&A cache: {e}")
@@ -723,15 +1105,15 @@ class DatabaseConnection:
             
             if existing:
                 # Update existing entry
-                response = self.supabase.table('user_qa_cache').update({
+                response = await self._execute(self.rest.table('user_qa_cache').update({
                     'answer_text': cache_data['answer_text'],
                     'confidence_score': cache_data.get('confidence_score', 0.8),
                     'usage_count': existing[0].get('usage_count', 0) + 1,
                     'updated_at': datetime.utcnow().isoformat()
-                }).eq('id', existing[0]['id']).execute()
+                }).eq('id', existing[0]['id']))
             else:
                 # Create new entry
-                response = self.supabase.table('user_qa_cache').insert(cache_data).execute()
+                response = await self._execute(self.rest.table('user_qa_cache').insert(cache_data))
             
             return response.data[0] if response.data else None
         except Exception as e:
@@ -749,10 +1131,10 @@ class DatabaseConnection:
             entry = cache_entries[0]
             new_usage_count = entry.get('usage_count', 0) + 1
             
-            response = self.supabase.table('user_qa_cache').update({
+            response = await self._execute(self.rest.table('user_qa_cache').update({
                 'usage_count': new_usage_count,
                 'updated_at': datetime.utcnow().isoformat()
-            }).eq('id', entry['id']).execute()
+            }).eq('id', entry['id']))
             
             return len(response.data) > 0
         except Exception as e:
@@ -763,12 +1145,12 @@ class DatabaseConnection:
     async def get_site_field_patterns(self, site_domain: str, field_label: str = None) -> List[dict]:
         """Get site-specific field patterns"""
         try:
-            query = self.supabase.table('site_field_patterns').select('*').eq('site_domain', site_domain)
+            query = self.rest.table('site_field_patterns').select('*').eq('site_domain', site_domain)
             
             if field_label:
                 query = query.eq('field_label', field_label)
             
-            response = query.execute()
+            response = await self._execute(query)
             return response.data or []
         except Exception as e:
             print(f"Error getting site field patterns: {e}")
@@ -796,13 +1178,13 @@ class DatabaseConnection:
                     else:
                         common_answers = {new_answer: 1}
                 
-                response = self.supabase.table('site_field_patterns').update({
+                response = await self._execute(self.rest.table('site_field_patterns').update({
                     'common_answers': common_answers,
                     'usage_frequency': pattern.get('usage_frequency', 0) + 1
-                }).eq('id', pattern['id']).execute()
+                }).eq('id', pattern['id']))
             else:
                 # Create new pattern
-                response = self.supabase.table('site_field_patterns').insert(pattern_data).execute()
+                response = await self._execute(self.rest.table('site_field_patterns').insert(pattern_data))
             
             return response.data[0] if response.data else None
         except Exception as e:
@@ -813,7 +1195,7 @@ class DatabaseConnection:
     async def save_application_qa_history(self, history_data: dict) -> dict:
         """Save Q&A interaction to application history"""
         try:
-            response = self.supabase.table('application_qa_history').insert(history_data).execute()
+            response = await self._execute(self.rest.table('application_qa_history').insert(history_data))
             return response.data[0] if response.data else None
         except Exception as e:
             print(f"Error saving application Q&A history: {e}")
@@ -822,7 +1204,7 @@ class DatabaseConnection:
     async def get_application_qa_history(self, application_id: str) -> List[dict]:
         """Get Q&A history for an application"""
         try:
-            response = self.supabase.table('application_qa_history').select('*').eq('application_id', application_id).execute()
+            response = await self._execute(self.rest.table('application_qa_history').select('*').eq('application_id', application_id))
             return response.data or []
         except Exception as e:
             print(f"Error getting application Q&A history: {e}")
@@ -831,13 +1213,12 @@ class DatabaseConnection:
     async def get_user_qa_history(self, user_id: str, limit: int = 50) -> List[dict]:
         """Get Q&A history for a user across all applications"""
         try:
-            response = (
-                self.supabase.table('application_qa_history')
+            response = await self._execute(
+                self.rest.table('application_qa_history')
                 .select('*')
                 .eq('user_id', user_id)
                 .order('created_at', desc=True)
                 .limit(limit)
-                .execute()
             )
             return response.data or []
         except Exception as e:
@@ -848,13 +1229,13 @@ class DatabaseConnection:
     async def get_applications_by_status(self, status: str, limit: int = 10) -> List[dict]:
         """Get applications by status"""
         try:
-            response = (
-                self.supabase.table('job_applications')
+            response = await self._execute(
+                self.rest.table('job_applications')
                 .select('*')
                 .eq('status', status)
+                .order('priority', desc=True)
                 .order('created_at')
                 .limit(limit)
-                .execute()
             )
             return response.data or []
         except Exception as e:
@@ -876,8 +1257,18 @@ class DatabaseConnection:
                 update_data['processing_started_at'] = datetime.utcnow().isoformat()
             elif status == 'completed':
                 update_data['submitted_at'] = datetime.utcnow().isoformat()
+            elif status == 'queued' and self._lease_columns_available:
+                # Back in the queue: no worker holds it any more
+                update_data.update({'worker_id': None, 'lease_expires_at': None})
             
-            response = self.supabase.table('job_applications').update(update_data).eq('id', app_id).execute()
+            try:
+                response = await self._execute(self.rest.table('job_applications').update(update_data).eq('id', app_id))
+            except Exception as e:
+                if 'worker_id' not in update_data or not self._is_missing_column(e):
+                    raise
+                self._lease_columns_available = False
+                del update_data['worker_id'], update_data['lease_expires_at']
+                response = await self._execute(self.rest.table('job_applications').update(update_data).eq('id', app_id))
             return len(response.data) > 0
         except Exception as e:
             print(f"Error updating application status: {e}")
@@ -891,16 +1282,16 @@ class DatabaseConnection:
             
             if user_id:
                 # User-specific stats
-                cache_response = self.supabase.table('user_qa_cache').select('id', count='exact').eq('user_id', user_id).execute()
-                history_response = self.supabase.table('application_qa_history').select('id', count='exact').eq('user_id', user_id).execute()
+                cache_response = await self._execute(self.rest.table('user_qa_cache').select('id', count='exact').eq('user_id', user_id))
+                history_response = await self._execute(self.rest.table('application_qa_history').select('id', count='exact').eq('user_id', user_id))
                 
                 stats['user_cache_entries'] = getattr(cache_response, 'count', 0)
                 stats['user_qa_interactions'] = getattr(history_response, 'count', 0)
             else:
                 # System-wide stats
-                total_cache = self.supabase.table('user_qa_cache').select('id', count='exact').execute()
-                total_history = self.supabase.table('application_qa_history').select('id', count='exact').execute()
-                total_patterns = self.supabase.table('site_field_patterns').select('id', count='exact').execute()
+                total_cache = await self._execute(self.rest.table('user_qa_cache').select('id', count='exact'))
+                total_history = await self._execute(self.rest.table('application_qa_history').select('id', count='exact'))
+                total_patterns = await self._execute(self.rest.table('site_field_patterns').select('id', count='exact'))
                 
                 stats['total_cache_entries'] = getattr(total_cache, 'count', 0)
                 stats['total_qa_interactions'] = getattr(total_history, 'count', 0)
@@ -916,12 +1307,11 @@ class DatabaseConnection:
         try:
             # This would require a more complex query in production
             # For now, we'll get the most used cache entries
-            response = (
-                self.supabase.table('user_qa_cache')
+            response = await self._execute(
+                self.rest.table('user_qa_cache')
                 .select('question_text, usage_count')
                 .order('usage_count', desc=True)
                 .limit(limit)
-                .execute()
             )
             return response.data or []
         except Exception as e:
@@ -932,14 +1322,13 @@ class DatabaseConnection:
         """Get successful patterns for a specific site"""
         try:
             # Get all patterns for the site
-            patterns_response = self.supabase.table('site_field_patterns').select('*').eq('site_domain', site_domain).execute()
+            patterns_response = await self._execute(self.rest.table('site_field_patterns').select('*').eq('site_domain', site_domain))
             
             # Get successful applications for the site
-            apps_response = (
-                self.supabase.table('job_applications')
+            apps_response = await self._execute(
+                self.rest.table('job_applications')
                 .select('status')
                 .like('job_url', f'%{site_domain}%')
-                .execute()
             )
             
             patterns = patterns_response.data or []
@@ -965,14 +1354,14 @@ class DatabaseConnection:
         """Search for similar questions in the Q&A cache"""
         try:
             # This is a simplified version - in production you'd want semantic search
-            query = self.supabase.table('user_qa_cache').select('*')
+            query = self.rest.table('user_qa_cache').select('*')
             
             if user_id:
                 query = query.eq('user_id', user_id)
             
             # For now, we'll do a simple text search
             # In production, you'd implement vector similarity search
-            response = query.ilike('question_text', f'%{question_text}%').limit(limit).execute()
+            response = await self._execute(query.ilike('question_text', f'%{question_text}%').limit(limit))
             
             return response.data or []
         except Exception as e:
@@ -985,11 +1374,10 @@ class DatabaseConnection:
         try:
             cutoff_date = datetime.utcnow() - timedelta(days=days_old)
             
-            response = (
-                self.supabase.table('captcha_sessions')
+            response = await self._execute(
+                self.rest.table('captcha_sessions')
                 .delete()
                 .lt('created_at', cutoff_date.isoformat())
-                .execute()
             )
             
             deleted_count = len(response.data) if response.data else 0
@@ -1003,13 +1391,12 @@ class DatabaseConnection:
         """Optimize user's Q&A cache by removing low-confidence, unused entries"""
         try:
             # Get entries with low confidence and low usage
-            response = (
-                self.supabase.table('user_qa_cache')
+            response = await self._execute(
+                self.rest.table('user_qa_cache')
                 .select('*')
                 .eq('user_id', user_id)
                 .lt('confidence_score', 0.3)
                 .eq('usage_count', 1)
-                .execute()
             )
             
             low_quality_entries = response.data or []
@@ -1017,21 +1404,19 @@ class DatabaseConnection:
             # Delete low-quality entries
             deleted_count = 0
             for entry in low_quality_entries:
-                delete_response = (
-                    self.supabase.table('user_qa_cache')
+                delete_response = await self._execute(
+                    self.rest.table('user_qa_cache')
                     .delete()
                     .eq('id', entry['id'])
-                    .execute()
                 )
                 if delete_response.data:
                     deleted_count += 1
             
             # Get remaining count
-            remaining_response = (
-                self.supabase.table('user_qa_cache')
+            remaining_response = await self._execute(
+                self.rest.table('user_qa_cache')
                 .select('id', count='exact')
                 .eq('user_id', user_id)
-                .execute()
             )
             
             remaining_count = getattr(remaining_response, 'count', 0)
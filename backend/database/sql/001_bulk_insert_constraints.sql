@@ -0,0 +1,29 @@
+-- 001_bulk_insert_constraints.sql - Unique keys used as ON CONFLICT targets by bulk inserts
+--
+-- DatabaseConnection.create_job_urls_bulk upserts with on_conflict=category_id,job_url
+-- (ignore duplicates), so re-running an admin fan-out or re-uploading a URL list never
+-- queues a job twice. The job_applications key below is replaced by a partial one over
+-- active applications in 007_active_application_key.sql.
+-- Run once in the Supabase SQL editor.
+
+-- Duplicate applications that never started are safe to drop (keep the oldest)
+DELETE FROM job_applications a
+USING job_applications b
+WHERE a.user_id = b.user_id
+  AND a.job_url = b.job_url
+  AND a.status = 'queued'
+  AND (a.created_at, a.id) > (b.created_at, b.id);
+
+-- Fails if a user still has two processed applications for the same URL; resolve those
+-- by hand (SELECT user_id, job_url, count(*) FROM job_applications GROUP BY 1, 2 HAVING count(*) > 1)
+CREATE UNIQUE INDEX IF NOT EXISTS job_applications_user_job_url_key
+    ON job_applications (user_id, job_url);
+
+DELETE FROM job_urls_master a
+USING job_urls_master b
+WHERE a.category_id = b.category_id
+  AND a.job_url = b.job_url
+  AND (a.created_at, a.id) > (b.created_at, b.id);
+
+CREATE UNIQUE INDEX IF NOT EXISTS job_urls_master_category_job_url_key
+    ON job_urls_master (category_id, job_url);
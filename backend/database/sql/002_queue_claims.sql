@@ -0,0 +1,70 @@
+-- 002_queue_claims.sql - Atomic queue claims so several bot workers can share job_applications
+--
+-- DatabaseConnection.claim_applications calls claim_queued_applications: the oldest,
+-- highest-priority queued rows are locked with FOR UPDATE SKIP LOCKED and flipped to
+-- 'processing' in the same statement, so two workers never get the same row and neither
+-- waits on the other's locks. Each claim carries the worker's id and a lease; a worker
+-- that dies leaves its rows behind until requeue_expired_leases puts them back.
+-- Run once in the Supabase SQL editor (after 001_bulk_insert_constraints.sql).
+
+ALTER TABLE job_applications ADD COLUMN IF NOT EXISTS worker_id TEXT;
+ALTER TABLE job_applications ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMPTZ;
+ALTER TABLE job_applications ADD COLUMN IF NOT EXISTS claim_count INTEGER NOT NULL DEFAULT 0;
+
+-- Serves the claim's ORDER BY without scanning finished applications
+CREATE INDEX IF NOT EXISTS job_applications_queue_idx
+    ON job_applications (priority DESC, created_at)
+    WHERE status = 'queued';
+
+-- Serves the reaper
+CREATE INDEX IF NOT EXISTS job_applications_lease_idx
+    ON job_applications (lease_expires_at)
+    WHERE status = 'processing';
+
+CREATE OR REPLACE FUNCTION claim_queued_applications(
+    p_worker_id TEXT,
+    p_limit INTEGER DEFAULT 1,
+    p_lease_seconds INTEGER DEFAULT 1800
+)
+RETURNS SETOF job_applications
+LANGUAGE sql
+AS $$
+    UPDATE job_applications a
+    SET status = 'processing',
+        worker_id = p_worker_id,
+        lease_expires_at = now() + make_interval(secs => p_lease_seconds),
+        processing_started_at = now(),
+        updated_at = now(),
+        claim_count = a.claim_count + 1
+    FROM (
+        SELECT id
+        FROM job_applications
+        WHERE status = 'queued'
+        ORDER BY priority DESC, created_at
+        LIMIT p_limit
+        FOR UPDATE SKIP LOCKED
+    ) claimed
+    WHERE a.id = claimed.id
+    RETURNING a.*;
+$$;
+
+-- Puts applications whose worker stopped renewing its lease back in the queue.
+-- Returns the number of applications requeued.
+CREATE OR REPLACE FUNCTION requeue_expired_leases()
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    requeued INTEGER;
+BEGIN
+    UPDATE job_applications
+    SET status = 'queued',
+        worker_id = NULL,
+        lease_expires_at = NULL,
+        updated_at = now()
+    WHERE status = 'processing'
+      AND lease_expires_at < now();
+    GET DIAGNOSTICS requeued = ROW_COUNT;
+    RETURN requeued;
+END;
+$$;
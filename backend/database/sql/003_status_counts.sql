@@ -0,0 +1,24 @@
+-- 003_status_counts.sql - One GROUP BY query for application counts per status
+--
+-- DatabaseConnection.get_application_status_counts calls this for the queue status,
+-- user stats and admin stats endpoints instead of downloading application rows and
+-- counting them in Python. The indexes keep it an index-only count as history grows.
+-- Run once in the Supabase SQL editor.
+
+CREATE INDEX IF NOT EXISTS job_applications_status_idx
+    ON job_applications (status);
+
+CREATE INDEX IF NOT EXISTS job_applications_user_status_idx
+    ON job_applications (user_id, status);
+
+-- All applications when p_user_id is NULL, else that user's
+CREATE OR REPLACE FUNCTION get_application_status_counts(p_user_id UUID DEFAULT NULL)
+RETURNS TABLE (status TEXT, count BIGINT)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT a.status::TEXT, count(*)
+    FROM job_applications a
+    WHERE p_user_id IS NULL OR a.user_id = p_user_id
+    GROUP BY a.status;
+$$;
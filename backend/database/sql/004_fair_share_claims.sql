@@ -0,0 +1,70 @@
+-- 004_fair_share_claims.sql - Priority first, then weighted round-robin across users
+--
+-- DatabaseConnection.claim_applications calls this when BOT_FAIR_SHARE is on (default).
+-- Within each priority level every user's queued applications are numbered oldest
+-- first, continuing from the number of applications claimed for that user in the last
+-- p_window_seconds; application n of a user on a plan with weight w belongs to round
+-- ceil(n / w). Claims take the highest priority, then the lowest round, then the
+-- oldest, so a user who queues 500 URLs gets w applications per round like everyone
+-- else instead of blocking the queue. (Counting recent claims is what carries the
+-- rotation from one claim to the next.) Weights come from the caller, e.g.
+-- {"free": 1, "pro": 2, "enterprise": 4}; unknown plans weigh 1.
+-- Requires 002_queue_claims.sql. Run once in the Supabase SQL editor.
+
+CREATE INDEX IF NOT EXISTS job_applications_queue_user_idx
+    ON job_applications (user_id, priority, created_at)
+    WHERE status = 'queued';
+
+CREATE INDEX IF NOT EXISTS job_applications_started_idx
+    ON job_applications (processing_started_at);
+
+CREATE OR REPLACE FUNCTION claim_queued_applications_fair(
+    p_worker_id TEXT,
+    p_limit INTEGER DEFAULT 1,
+    p_lease_seconds INTEGER DEFAULT 1800,
+    p_weights JSONB DEFAULT '{}'::JSONB,
+    p_window_seconds INTEGER DEFAULT 3600
+)
+RETURNS SETOF job_applications
+LANGUAGE sql
+AS $$
+    WITH served AS (
+        SELECT user_id, count(*) AS recent
+        FROM job_applications
+        WHERE processing_started_at > now() - make_interval(secs => p_window_seconds)
+        GROUP BY user_id
+    ),
+    ranked AS (
+        SELECT a.id,
+               a.priority,
+               a.created_at,
+               ceil(
+                   (COALESCE(s.recent, 0)
+                    + row_number() OVER (PARTITION BY a.user_id, a.priority ORDER BY a.created_at))::NUMERIC
+                   / GREATEST(COALESCE((p_weights ->> u.subscription_plan)::NUMERIC, 1), 1)
+               ) AS round
+        FROM job_applications a
+        LEFT JOIN users u ON u.id = a.user_id
+        LEFT JOIN served s ON s.user_id = a.user_id
+        WHERE a.status = 'queued'
+    ),
+    claimed AS (
+        SELECT j.id
+        FROM ranked r
+        JOIN job_applications j ON j.id = r.id
+        WHERE j.status = 'queued'  -- re-checked after waiting on a concurrent claim
+        ORDER BY r.priority DESC, r.round, r.created_at
+        LIMIT p_limit
+        FOR UPDATE OF j SKIP LOCKED
+    )
+    UPDATE job_applications a
+    SET status = 'processing',
+        worker_id = p_worker_id,
+        lease_expires_at = now() + make_interval(secs => p_lease_seconds),
+        processing_started_at = now(),
+        updated_at = now(),
+        claim_count = a.claim_count + 1
+    FROM claimed
+    WHERE a.id = claimed.id
+    RETURNING a.*;
+$$;
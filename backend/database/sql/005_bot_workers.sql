@@ -0,0 +1,29 @@
+-- 005_bot_workers.sql - Control channel between the API and standalone bot workers
+--
+-- With BOT_WORKER_MODE=external the API server no longer runs the bot itself.
+-- /api/bot/start and /api/bot/stop write the desired state to bot_control; every
+-- `python -m workers.bot` process polls that row, starts or stops its
+-- ApplicationProcessor to match, and writes its own state and stats to bot_workers,
+-- which /api/bot/status reads. Applications still reach the workers through the
+-- job_applications claims (002/004). Run once in the Supabase SQL editor.
+
+CREATE TABLE IF NOT EXISTS bot_control (
+    id TEXT PRIMARY KEY DEFAULT 'default',
+    desired_state TEXT NOT NULL DEFAULT 'stopped' CHECK (desired_state IN ('running', 'stopped')),
+    headless BOOLEAN NOT NULL DEFAULT TRUE,
+    max_concurrent INTEGER NOT NULL DEFAULT 1,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+INSERT INTO bot_control (id) VALUES ('default') ON CONFLICT (id) DO NOTHING;
+
+CREATE TABLE IF NOT EXISTS bot_workers (
+    worker_id TEXT PRIMARY KEY,
+    hostname TEXT,
+    pid INTEGER,
+    state TEXT NOT NULL DEFAULT 'idle',  -- idle | running | stopped
+    max_concurrent INTEGER,
+    started_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    last_seen_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    stats JSONB
+);
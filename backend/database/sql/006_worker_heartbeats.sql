@@ -0,0 +1,21 @@
+-- 006_worker_heartbeats.sql - Node registry columns for bot worker heartbeats
+--
+-- With BOT_NODE_REGISTRY=postgres (default) every running ApplicationProcessor upserts its
+-- bot_workers row every BOT_HEARTBEAT_SECONDS with its capacity, busy slots, live browser
+-- sessions, parked CAPTCHAs and process-tree RSS, and renews the leases of the applications
+-- it is still working on. A node silent for BOT_NODE_TIMEOUT_SECONDS is marked 'dead' by the
+-- next live node, which requeues that node's applications (job_applications.worker_id).
+-- /api/bot/status adds these rows up for the whole cluster.
+-- Requires 002_queue_claims.sql and 005_bot_workers.sql. Run once in the Supabase SQL editor.
+
+ALTER TABLE bot_workers ADD COLUMN IF NOT EXISTS busy_slots INTEGER;
+ALTER TABLE bot_workers ADD COLUMN IF NOT EXISTS active_sessions INTEGER;
+ALTER TABLE bot_workers ADD COLUMN IF NOT EXISTS parked_captchas INTEGER;
+ALTER TABLE bot_workers ADD COLUMN IF NOT EXISTS rss_mb NUMERIC;
+
+-- state: idle | running | stopped | dead
+
+-- Serves the reclaim of a dead node's applications
+CREATE INDEX IF NOT EXISTS job_applications_worker_idx
+    ON job_applications (worker_id)
+    WHERE status IN ('processing', 'captcha_required');
@@ -0,0 +1,17 @@
+-- 007_active_application_key.sql - One active application per (user, job URL), not one ever
+--
+-- 001_bulk_insert_constraints.sql made (user_id, job_url) unique over every status, so a URL
+-- whose application failed or was skipped could never be queued again: the bulk insert
+-- dropped it as a duplicate. The key now only covers applications that are still active
+-- (queued, processing, captcha_required). DatabaseConnection.create_applications_bulk skips
+-- pairs that have an active application and inserts the rest; this index catches a
+-- concurrent insert of the same pair. Requires 001. Run once in the Supabase SQL editor.
+
+DROP INDEX IF EXISTS job_applications_user_job_url_key;
+
+-- Fails if a user has two active applications for the same URL; resolve those by hand
+-- (SELECT user_id, job_url, count(*) FROM job_applications
+--  WHERE status IN ('queued', 'processing', 'captcha_required') GROUP BY 1, 2 HAVING count(*) > 1)
+CREATE UNIQUE INDEX IF NOT EXISTS job_applications_user_job_url_active_key
+    ON job_applications (user_id, job_url)
+    WHERE status IN ('queued', 'processing', 'captcha_required');
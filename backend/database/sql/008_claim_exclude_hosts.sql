@@ -0,0 +1,105 @@
+-- 008_claim_exclude_hosts.sql - Let a claim skip the ATS hosts the worker cannot start yet
+--
+-- A worker holds claimed applications until their host allows another start (per-host
+-- rate, in-flight cap, CAPTCHA pause - bot/domain_limiter.py). Without this, a long run of
+-- URLs on one host at the head of the queue fills the worker's holds with that host while
+-- its other slots sit idle, and holds handed back before their lease runs out are claimed
+-- again in the same order. Both claim functions now take p_exclude_hosts: hosts (lower
+-- case, no leading www., port kept - as ApplicationProcessor._extract_domain) whose queued
+-- applications stay in the queue for this claim.
+-- Requires 002_queue_claims.sql and 004_fair_share_claims.sql. Run once in the Supabase SQL editor.
+
+-- Host of a job URL the way the worker compares them
+CREATE OR REPLACE FUNCTION job_url_host(p_url TEXT)
+RETURNS TEXT
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT regexp_replace(lower(substring(p_url FROM '^[A-Za-z][A-Za-z0-9+.-]*://([^/?#]+)')), '^www\.', '');
+$$;
+
+-- The old signatures would make calls without p_exclude_hosts ambiguous
+DROP FUNCTION IF EXISTS claim_queued_applications(TEXT, INTEGER, INTEGER);
+DROP FUNCTION IF EXISTS claim_queued_applications_fair(TEXT, INTEGER, INTEGER, JSONB, INTEGER);
+
+CREATE OR REPLACE FUNCTION claim_queued_applications(
+    p_worker_id TEXT,
+    p_limit INTEGER DEFAULT 1,
+    p_lease_seconds INTEGER DEFAULT 1800,
+    p_exclude_hosts TEXT[] DEFAULT '{}'
+)
+RETURNS SETOF job_applications
+LANGUAGE sql
+AS $$
+    UPDATE job_applications a
+    SET status = 'processing',
+        worker_id = p_worker_id,
+        lease_expires_at = now() + make_interval(secs => p_lease_seconds),
+        processing_started_at = now(),
+        updated_at = now(),
+        claim_count = a.claim_count + 1
+    FROM (
+        SELECT id
+        FROM job_applications
+        WHERE status = 'queued'
+          AND COALESCE(job_url_host(job_url), '') <> ALL(p_exclude_hosts)
+        ORDER BY priority DESC, created_at
+        LIMIT p_limit
+        FOR UPDATE SKIP LOCKED
+    ) claimed
+    WHERE a.id = claimed.id
+    RETURNING a.*;
+$$;
+
+CREATE OR REPLACE FUNCTION claim_queued_applications_fair(
+    p_worker_id TEXT,
+    p_limit INTEGER DEFAULT 1,
+    p_lease_seconds INTEGER DEFAULT 1800,
+    p_weights JSONB DEFAULT '{}'::JSONB,
+    p_window_seconds INTEGER DEFAULT 3600,
+    p_exclude_hosts TEXT[] DEFAULT '{}'
+)
+RETURNS SETOF job_applications
+LANGUAGE sql
+AS $$
+    WITH served AS (
+        SELECT user_id, count(*) AS recent
+        FROM job_applications
+        WHERE processing_started_at > now() - make_interval(secs => p_window_seconds)
+        GROUP BY user_id
+    ),
+    ranked AS (
+        SELECT a.id,
+               a.priority,
+               a.created_at,
+               ceil(
+                   (COALESCE(s.recent, 0)
+                    + row_number() OVER (PARTITION BY a.user_id, a.priority ORDER BY a.created_at))::NUMERIC
+                   / GREATEST(COALESCE((p_weights ->> u.subscription_plan)::NUMERIC, 1), 1)
+               ) AS round
+        FROM job_applications a
+        LEFT JOIN users u ON u.id = a.user_id
+        LEFT JOIN served s ON s.user_id = a.user_id
+        WHERE a.status = 'queued'
+    ),
+    claimed AS (
+        SELECT j.id
+        FROM ranked r
+        JOIN job_applications j ON j.id = r.id
+        WHERE j.status = 'queued'  -- re-checked after waiting on a concurrent claim
+          AND COALESCE(job_url_host(j.job_url), '') <> ALL(p_exclude_hosts)
+        ORDER BY r.priority DESC, r.round, r.created_at
+        LIMIT p_limit
+        FOR UPDATE OF j SKIP LOCKED
+    )
+    UPDATE job_applications a
+    SET status = 'processing',
+        worker_id = p_worker_id,
+        lease_expires_at = now() + make_interval(secs => p_lease_seconds),
+        processing_started_at = now(),
+        updated_at = now(),
+        claim_count = a.claim_count + 1
+    FROM claimed
+    WHERE a.id = claimed.id
+    RETURNING a.*;
+$$;
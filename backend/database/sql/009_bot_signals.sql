@@ -0,0 +1,12 @@
+-- 009_bot_signals.sql - Wake standalone bot workers when the API queues work or a CAPTCHA is resolved
+--
+-- With BOT_WORKER_MODE=external the API process has no processor to notify directly.
+-- It stamps these bot_control columns instead: work_queued_at when applications are
+-- queued, captcha_resolved_at when a CAPTCHA session is solved or skipped. Every
+-- `python -m workers.bot` process already reads bot_control every BOT_CONTROL_POLL_SECONDS;
+-- a changed stamp cuts its processor's idle back-off short, or re-reads the parked
+-- CAPTCHA sessions right away instead of on the next CAPTCHA_RECHECK_SECONDS sweep.
+-- Requires 005_bot_workers.sql. Run once in the Supabase SQL editor.
+
+ALTER TABLE bot_control ADD COLUMN IF NOT EXISTS work_queued_at TIMESTAMPTZ;
+ALTER TABLE bot_control ADD COLUMN IF NOT EXISTS captcha_resolved_at TIMESTAMPTZ;
@@ -47,6 +47,15 @@ except ImportError as e:
     print(f"⚠️ Warning: Admin API not available: {e}")
     print("   This is normal if you haven't created the admin.py file yet")
 
+# Release the pooled database connections on shutdown
+@app.on_event("shutdown")
+async def close_database_pool():
+    try:
+        from database.connection import db
+        await db.close()
+    except Exception as e:
+        print(f"⚠️ Error closing database pool: {e}")
+
 # Health check endpoint
 @app.get("/health")
 async def health_check():
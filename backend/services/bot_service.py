@@ -1,9 +1,11 @@
 # services/bot_service.py - Bot service manager and API integration
 import asyncio
-from typing import Dict, Any, Optional
-from bot.application_processor import ApplicationProcessor
+from typing import Dict, Any
+from bot.application_processor import ApplicationProcessor, STOP_TIMEOUT_SECONDS
+from bot.node_registry import node_registry, aggregate_cluster
 from database.connection import db
 from services.notification_service import NotificationService
+from config import settings
 import uuid
 
 class BotService:
@@ -11,12 +13,18 @@ class BotService:
     
     def __init__(self):
         self.processor = None
+        self._processor_task = None
         self.notification_service = NotificationService()
         self.is_running = False
+        # external: the bot runs in `python -m workers.bot` processes driven through bot_control
+        self.external_workers = settings.bot_worker_mode == 'external'
         
     async def start_bot(self, headless: bool = True, max_concurrent: int = 1) -> Dict[str, Any]:
         """Start the application processing bot"""
         try:
+            if self.external_workers:
+                return await self._set_worker_state('running', headless, max_concurrent)
+            
             if self.is_running:
                 return {'success': False, 'message': 'Bot is already running'}
             
@@ -26,7 +34,7 @@ class BotService:
             self.processor = ApplicationProcessor(headless=headless, max_concurrent=max_concurrent)
             
             # Start processing in background
-            asyncio.create_task(self.processor.start_processing())
+            self._processor_task = asyncio.create_task(self.processor.start_processing())
             
             self.is_running = True
             
@@ -49,16 +57,23 @@ class BotService:
     async def stop_bot(self) -> Dict[str, Any]:
         """Stop the application processing bot"""
         try:
+            if self.external_workers:
+                return await self._set_worker_state('stopped')
+            
             if not self.is_running or not self.processor:
                 return {'success': False, 'message': 'Bot is not running'}
             
             print("⏹️ Stopping IntelliApply Bot Service...")
             
-            # Stop processor
+            # Stop claiming, then let in-flight applications finish before the browsers close
             await self.processor.stop_processing()
+            try:
+                await asyncio.wait_for(self._processor_task, timeout=STOP_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                print(f"⚠️ Processor did not finish within {STOP_TIMEOUT_SECONDS}s - cancelling it")
             
             self.is_running = False
-            self.processor = None
+            self.processor = self._processor_task = None
             
             # Send system alert
             await self.notification_service.send_system_alert("IntelliApply Bot stopped", "info")
@@ -69,9 +84,47 @@ class BotService:
             print(f"❌ Error stopping bot: {e}")
             return {'success': False, 'message': f'Failed to stop bot: {str(e)}'}
     
+    async def _set_worker_state(self, desired_state: str, headless: bool = None,
+                                max_concurrent: int = None) -> Dict[str, Any]:
+        """External mode: record the desired state; workers pick it up on their next poll"""
+        control = await db.get_bot_control()
+        if control and control['desired_state'] == desired_state:
+            return {'success': False,
+                    'message': 'Bot is already running' if desired_state == 'running' else 'Bot is not running'}
+        
+        control = await db.set_bot_control(desired_state, headless, max_concurrent)
+        if not control:
+            return {'success': False,
+                    'message': 'Could not update bot_control (see database/sql/005_bot_workers.sql)'}
+        
+        verb = 'start' if desired_state == 'running' else 'stop'
+        print(f"🤖 Bot workers asked to {verb}")
+        await self.notification_service.send_system_alert(f"IntelliApply Bot workers asked to {verb}", "info")
+        result = {
+            'success': True,
+            'message': f'Bot workers will {verb} within {settings.bot_control_poll_seconds:g}s'
+        }
+        if desired_state == 'running':
+            result['config'] = {'headless': control.get('headless'), 'max_concurrent': control.get('max_concurrent')}
+        return result
+    
+    async def notify_captcha_status(self, session_id: str, status: str) -> bool:
+        """Resume (or drop) an application parked on this CAPTCHA session right away"""
+        if status not in ('solved', 'skipped', 'expired'):
+            return False
+        if self.external_workers:
+            # Parked in a worker process - it re-reads its CAPTCHA sessions on the next control poll
+            return await db.signal_bot_workers('captcha_resolved')
+        if not self.processor:
+            return False
+        return self.processor.captcha_parking.notify(session_id, status)
+    
     async def get_bot_status(self) -> Dict[str, Any]:
         """Get current bot status and statistics"""
         try:
+            if self.external_workers:
+                return await self._get_worker_status()
+            
             if not self.is_running or not self.processor:
                 return {
                     'running': False,
@@ -83,6 +136,7 @@ class BotService:
             return {
                 'running': True,
                 'stats': stats,
+                'cluster': aggregate_cluster(await node_registry.get_nodes()),
                 'active_sessions': len(self.processor.active_sessions),
                 'message': 'Bot is running normally'
             }
@@ -95,6 +149,26 @@ class BotService:
                 'message': 'Error retrieving bot status'
             }
     
+    async def _get_worker_status(self) -> Dict[str, Any]:
+        """External mode: desired state plus the cluster's live workers"""
+        control, nodes = await asyncio.gather(db.get_bot_control(), node_registry.get_nodes())
+        desired_state = (control or {}).get('desired_state', 'stopped')
+        cluster = aggregate_cluster(nodes)
+        
+        if desired_state == 'running':
+            message = f"{cluster['nodes_running']} bot worker(s) running" if cluster['nodes_running'] \
+                else 'Waiting for a bot worker to start'
+        else:
+            message = 'Bot is not running'
+        return {
+            'running': cluster['nodes_running'] > 0,
+            'mode': 'external',
+            'desired_state': desired_state,
+            'cluster': cluster,
+            'active_sessions': cluster['active_sessions'],
+            'message': message
+        }
+    
     async def add_urls_to_queue(self, user_id: str, profile_id: str, urls: list, batch_name: str = None) -> Dict[str, Any]:
         """Add job URLs to the processing queue"""
         try:
@@ -128,10 +202,9 @@ class BotService:
             
             batch = await db.create_batch(batch_data)
             
-            # Create individual applications
-            applications_created = 0
-            for url in urls:
-                app_data = {
+            # Create individual applications in chunked bulk inserts
+            result = await db.create_applications_bulk([
+                {
                     'id': str(uuid.uuid4()),
                     'user_id': user_id,
                     'profile_id': profile_id,
@@ -140,10 +213,15 @@ class BotService:
                     'status': 'queued',
                     'priority': 0
                 }
-                
-                app = await db.create_application(app_data)
-                if app:
-                    applications_created += 1
+                for url in dict.fromkeys(urls)
+            ])
+            applications_created = result['inserted']
+            if applications_created and self.external_workers:
+                await db.signal_bot_workers('work_queued')
+            elif applications_created and self.processor:
+                self.processor.notify_work_available()
+            if result['skipped']:
+                print(f"ℹ️ Skipped {result['skipped']} URL(s) this user already has an active application for")
             
             return {
                 'success': True,
@@ -220,20 +298,21 @@ class BotService:
     async def get_queue_status(self) -> Dict[str, Any]:
         """Get current queue status"""
         try:
-            # Get applications by status
-            queued = await db.get_applications_by_status('queued')
-            processing = await db.get_applications_by_status('processing')
-            captcha_required = await db.get_applications_by_status('captcha_required')
-            
-            # Get pending CAPTCHAs
-            pending_captchas = await db.get_pending_captchas()
+            # Counts only - one grouped query plus the CAPTCHA count, run together
+            counts, pending_captchas = await asyncio.gather(
+                db.get_application_status_counts(),
+                db.get_pending_captcha_count()
+            )
+            queued = counts.get('queued', 0)
+            processing = counts.get('processing', 0)
+            captcha_required = counts.get('captcha_required', 0)
             
             return {
-                'queued': len(queued),
-                'processing': len(processing),
-                'captcha_required': len(captcha_required),
-                'pending_captchas': len(pending_captchas),
-                'total_pending': len(queued) + len(processing) + len(captcha_required)
+                'queued': queued,
+                'processing': processing,
+                'captcha_required': captcha_required,
+                'pending_captchas': pending_captchas,
+                'total_pending': queued + processing + captcha_required
             }
             
         except Exception as e:
@@ -243,22 +322,13 @@ class BotService:
     async def get_user_queue_status(self, user_id: str) -> Dict[str, Any]:
         """Get queue status for a specific user"""
         try:
-            # Get user's applications by status
-            all_apps = await db.get_user_applications(user_id, limit=1000)
+            counts = await db.get_application_status_counts(user_id)
             
             status_counts = {
-                'queued': 0,
-                'processing': 0,
-                'captcha_required': 0,
-                'completed': 0,
-                'failed': 0,
-                'total': len(all_apps)
+                status: counts.get(status, 0)
+                for status in ('queued', 'processing', 'captcha_required', 'completed', 'failed')
             }
-            
-            for app in all_apps:
-                status = app.get('status', 'unknown')
-                if status in status_counts:
-                    status_counts[status] += 1
+            status_counts['total'] = sum(counts.values())
             
             # Calculate success rate
             completed = status_counts['completed']
@@ -0,0 +1,112 @@
+# services/fanout_service.py - Background fan-out of admin job URLs to interested users
+import asyncio
+import uuid
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+from database.connection import db
+
+# Finished jobs kept for progress lookups; older ones are dropped first
+MAX_FINISHED_JOBS = 50
+
+
+class FanoutService:
+    """Queues one application per (interested user, job URL) as a background job.
+
+    The admin request only starts the job and gets its id back; the rows are built
+    in memory and written with chunked bulk inserts, updating the job's progress
+    counters after every chunk. Jobs live in this process's memory.
+    """
+
+    def __init__(self):
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def start(self, category_id: str, job_urls: List[str], priority: int = 1) -> Dict[str, Any]:
+        """Start a fan-out job and return its initial state"""
+        job_urls = list(dict.fromkeys(job_urls))  # a URL listed twice is one job
+        job = {
+            'id': str(uuid.uuid4()),
+            'category_id': category_id,
+            'status': 'pending',
+            'urls': len(job_urls),
+            'users': 0,
+            'applications_total': 0,
+            'applications_created': 0,
+            'duplicates_skipped': 0,
+            'failed': 0,
+            'chunks_done': 0,
+            'error': None,
+            'created_at': datetime.utcnow().isoformat(),
+            'finished_at': None
+        }
+        self.jobs[job['id']] = job
+        self._tasks[job['id']] = asyncio.create_task(self._run(job, job_urls, priority))
+        self._prune()
+        print(f"🚀 Fan-out job {job['id'][:8]} started: {len(job_urls)} URL(s) for category {category_id}")
+        return job.copy()
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self.jobs.get(job_id)
+        return self._with_progress(job) if job else None
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        return [self._with_progress(job) for job in sorted(self.jobs.values(), key=lambda j: j['created_at'], reverse=True)]
+
+    async def _run(self, job: Dict[str, Any], job_urls: List[str], priority: int):
+        try:
+            job['status'] = 'running'
+
+            # Find users who want jobs in this category
+            interested_users = [u for u in await db.get_users_by_job_category(job['category_id']) if u.get('profile_id')]
+            job['users'] = len(interested_users)
+            job['applications_total'] = len(interested_users) * len(job_urls)
+
+            rows = [
+                {
+                    'id': str(uuid.uuid4()),
+                    'user_id': user['user_id'],
+                    'profile_id': user['profile_id'],
+                    'job_url': job_url,
+                    'status': 'queued',
+                    'priority': priority  # Higher priority for admin-added jobs
+                }
+                for user in interested_users
+                for job_url in job_urls
+            ]
+
+            async def record_progress(result: Dict[str, int]):
+                job['applications_created'] = result['inserted']
+                job['duplicates_skipped'] = result['skipped']
+                job['failed'] = result['failed']
+                job['chunks_done'] = result['chunks']
+
+            result = await db.create_applications_bulk(rows, on_chunk=record_progress)
+            await record_progress(result)
+            job['status'] = 'completed_with_errors' if result['failed'] else 'completed'
+            print(f"🎯 Fan-out job {job['id'][:8]}: {result['inserted']} applications for {job['users']} users "
+                  f"({result['skipped']} skipped as already active, {result['failed']} failed)")
+
+        except Exception as e:
+            print(f"❌ Fan-out job {job['id'][:8]} failed: {e}")
+            job['status'] = 'failed'
+            job['error'] = str(e)
+        finally:
+            job['finished_at'] = datetime.utcnow().isoformat()
+            self._tasks.pop(job['id'], None)
+
+    @staticmethod
+    def _with_progress(job: Dict[str, Any]) -> Dict[str, Any]:
+        view = job.copy()
+        done = job['applications_created'] + job['duplicates_skipped'] + job['failed']
+        view['progress_percent'] = round(done / job['applications_total'] * 100, 1) if job['applications_total'] else (
+            100.0 if job['finished_at'] else 0.0)
+        return view
+
+    def _prune(self):
+        finished = sorted((j for j in self.jobs.values() if j['finished_at']), key=lambda j: j['finished_at'])
+        for job in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job['id']]
+
+
+# Global fan-out service instance
+fanout_service = FanoutService()
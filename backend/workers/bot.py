@@ -0,0 +1,183 @@
+# workers/bot.py - Standalone bot worker: the application processor outside the API server
+#
+# Usage (from backend/):  python -m workers.bot [--max-concurrent N] [--visible] [--worker-id ID] [--always-on]
+# With BOT_WORKER_MODE=external on the API, /api/bot/start and /api/bot/stop only write the
+# bot_control row (database/sql/005_bot_workers.sql); each worker process polls it, starts or
+# stops its own ApplicationProcessor to match. A running processor heartbeats to the node
+# registry (bot/node_registry.py) and renews its leases; an idle worker reports itself there
+# on every poll. Applications reach the workers through the job_applications queue claims, so
+# any number of worker processes can run per node, on any number of nodes. A processor that
+# dies is restarted on the next poll. The same poll picks up the API's signals in bot_control
+# (database/sql/009_bot_signals.sql): new work cuts the idle back-off short, a solved or
+# skipped CAPTCHA re-reads the parked sessions at once.
+#
+# Local cluster: start several of these with --always-on (or BOT_WORKER_MODE=external on the
+# API), kill one with `kill -9` and watch /api/bot/status - after BOT_NODE_TIMEOUT_SECONDS a
+# surviving worker marks it dead and requeues its applications.
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import uuid
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from bot.application_processor import ApplicationProcessor, STOP_TIMEOUT_SECONDS
+from bot.node_registry import node_registry
+from database.connection import db
+from config import settings
+
+
+class BotWorker:
+    """Runs an ApplicationProcessor when bot_control says 'running' (or always, with always_on)"""
+
+    def __init__(self, worker_id: str = None, max_concurrent: int = None, headless: bool = None,
+                 always_on: bool = False):
+        self.worker_id = worker_id or settings.bot_worker_id or \
+            f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        # None = take it from bot_control
+        self.max_concurrent = max_concurrent
+        self.headless = headless
+        self.always_on = always_on
+        self.processor: Optional[ApplicationProcessor] = None
+        self._task: Optional[asyncio.Task] = None
+        self._config = None  # (headless, max_concurrent) the processor was started with
+        self._signals = None  # (work_queued_at, captcha_resolved_at) last seen in bot_control
+        self._shutdown = asyncio.Event()
+        self.started_at = datetime.utcnow().isoformat()
+
+    async def run(self):
+        print(f"👷 Bot worker {self.worker_id} started (pid {os.getpid()}, "
+              f"{'always on' if self.always_on else 'following bot_control'})")
+        try:
+            while not self._shutdown.is_set():
+                try:
+                    await self._follow_control()
+                    await self._report()
+                except Exception as e:
+                    print(f"⚠️ Bot worker control error: {e}")
+                try:
+                    await asyncio.wait_for(self._shutdown.wait(), timeout=settings.bot_control_poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            await self._stop_processor()
+            await self._report('stopped')
+            await db.close()
+            print(f"👋 Bot worker {self.worker_id} exited")
+
+    def request_shutdown(self):
+        print(f"⏹️ Bot worker {self.worker_id} shutting down...")
+        self._shutdown.set()
+
+    async def _follow_control(self):
+        """Start, stop or restart the processor to match the desired state"""
+        control = await db.get_bot_control()
+        if control is not None:
+            self._follow_signals(control)
+        if self.always_on:
+            desired = 'running'
+            config = (True if self.headless is None else self.headless, self.max_concurrent or 1)
+        else:
+            if control is None:
+                return  # keep the current state until the control row can be read again
+            desired = control['desired_state']
+            config = (control.get('headless', True) if self.headless is None else self.headless,
+                      self.max_concurrent or control.get('max_concurrent') or 1)
+
+        if self._task and self._task.done():
+            print("⚠️ Application processor exited - restarting it if the bot should be running")
+            self.processor = self._task = None
+
+        if desired == 'running':
+            if self.processor and config != self._config:
+                print(f"🔄 Bot settings changed to headless={config[0]}, max_concurrent={config[1]} - restarting")
+                await self._stop_processor()
+            if not self.processor:
+                self._start_processor(*config)
+        elif self.processor:
+            await self._stop_processor()
+
+    def _follow_signals(self, control: Dict[str, Any]):
+        """Pass on what the API announced since the last poll (sql/009_bot_signals.sql)"""
+        signals = (control.get('work_queued_at'), control.get('captcha_resolved_at'))
+        seen, self._signals = self._signals, signals
+        if not self.processor or seen is None:
+            return
+        if signals[0] != seen[0]:
+            self.processor.notify_work_available()
+        if signals[1] != seen[1]:
+            self.processor.captcha_parking.recheck_now()
+
+    def _start_processor(self, headless: bool, max_concurrent: int):
+        print(f"🚀 Starting application processor (headless={headless}, max_concurrent={max_concurrent})")
+        self.processor = ApplicationProcessor(headless=headless, max_concurrent=max_concurrent,
+                                              worker_id=self.worker_id)
+        self._config = (headless, max_concurrent)
+        self._task = asyncio.create_task(self.processor.start_processing())
+
+    async def _stop_processor(self):
+        if not self.processor:
+            return
+        print("⏹️ Stopping application processor...")
+        try:
+            await self.processor.stop_processing()
+            await asyncio.wait_for(self._task, timeout=STOP_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            print(f"⚠️ Processor did not finish within {STOP_TIMEOUT_SECONDS}s - cancelling it")
+            self._task.cancel()
+        except Exception as e:
+            print(f"⚠️ Error stopping application processor: {e}")
+        self.processor = self._task = None
+
+    async def _report(self, state: str = None):
+        """Register this worker while it has no processor (a running processor heartbeats itself)"""
+        if self.processor and not state:
+            return
+        await node_registry.heartbeat({
+            'worker_id': self.worker_id,
+            'hostname': socket.gethostname(),
+            'pid': os.getpid(),
+            'state': state or 'idle',
+            'max_concurrent': None,
+            'busy_slots': 0,
+            'active_sessions': 0,
+            'parked_captchas': 0,
+            'rss_mb': None,
+            'started_at': self.started_at,
+            'stats': None
+        })
+
+
+def parse_args() -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description="Run the application bot outside the API server")
+    parser.add_argument('--worker-id', help="claim and report under this id (default: host-pid-random)")
+    parser.add_argument('--max-concurrent', type=int, help="slots for this worker (default: from /api/bot/start)")
+    parser.add_argument('--visible', action='store_true', help="show the browser windows")
+    parser.add_argument('--always-on', action='store_true', help="process the queue without waiting for /api/bot/start")
+    args = parser.parse_args()
+    return {
+        'worker_id': args.worker_id,
+        'max_concurrent': args.max_concurrent,
+        'headless': False if args.visible else None,
+        'always_on': args.always_on
+    }
+
+
+async def main():
+    worker = BotWorker(**parse_args())
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, worker.request_shutdown)
+        except NotImplementedError:
+            pass  # Windows: Ctrl+C raises KeyboardInterrupt instead
+    await worker.run()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
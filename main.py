@@ -11,35 +11,21 @@ from src import history_manager
 from selenium.common.exceptions import UnexpectedAlertPresentException, NoAlertPresentException, NoSuchElementException
 from selenium.webdriver.common.by import By
 
-def process_page_elements(browser, ai, kb):
-    """Processes all form elements using the smarter browser handler."""
-    q_history = history_manager.load_history()
-    
-    # --- NEW: Click "Attach resume" link before processing ---
-    try:
-        attach_link = browser.driver.find_element(By.PARTIAL_LINK_TEXT, "Attach resume")
-        if attach_link.is_displayed():
-            print("Found 'Attach resume' link, clicking to reveal file input.")
-            attach_link.click()
-            time.sleep(1)
-    except NoSuchElementException:
-        pass # No link found, continue
-        
-    form_fields = browser.get_form_elements_fully()
-    if not form_fields:
-        print("Could not find any form fields on the page.")
-        return 0
-
-    filled_count = 0
+def answer_fields(form_fields, browser, ai, kb, q_history):
+    """Resolves an answer for every field of one form step; returns (field, value) pairs.
+    Fields that history, the semantic cache and the rules can't answer go to the AI together,
+    in one request per step."""
+    assignments = []
     all_kb_keys = kb.get_all_keys()
+    answers = {}
+    unresolved = []
     
-    for field in form_fields:
+    for i, field in enumerate(form_fields):
         label = field.get('label', '')
         if not label: continue
 
         field_type = field.get('type')
-        is_required = field.get('required', False)
-        print(f"\nProcessing field: '{label}' (Type: {field_type}, Required: {is_required})")
+        print(f"\nProcessing field: '{label}' (Type: {field_type}, Required: {field.get('required', False)})")
 
         final_answer = None
 
@@ -47,38 +33,80 @@ def process_page_elements(browser, ai, kb):
         if label in q_history:
             final_answer = q_history[label]
             print(f"HISTORY: Found answer for '{label}'")
-        else:
-            if field_type not in ['radio', 'checkbox']:
-                # FIXED: Use the corrected semantic cache functions
-                answer_key = semantic_cache.get_field_mapping(label) or ai.find_best_match_for_label(label, all_kb_keys)
-                if answer_key: 
-                    semantic_cache.add_field_mapping(label, answer_key)
-                final_answer = kb.get_info(answer_key) if answer_key else None
-            else: # For radio/checkbox
-                options = [browser._get_label_for_element(e) for e in field.get('elements', [])]
-                final_answer = ai.answer_yes_no_question(label, kb._data) or ai.make_a_choice(label, options, kb._data)
+        elif field_type not in ['radio', 'checkbox']:
+            # FIXED: Use the corrected semantic cache functions
+            answer_key = semantic_cache.get_field_mapping(label) or ai.match_label_locally(label, all_kb_keys)
+            if answer_key: 
+                semantic_cache.add_field_mapping(label, answer_key)
+            final_answer = kb.get_info(answer_key) if answer_key else None
+        else: # For radio/checkbox
+            final_answer = ai.answer_yes_no_question(label, kb._data)
         
+        if final_answer is None:
+            unresolved.append(i)
+        answers[i] = final_answer
+
+    # One AI request for everything the lookups above left open
+    if unresolved:
+        specs = []
+        for i in unresolved:
+            field = form_fields[i]
+            options = None
+            if field.get('type') in ['radio', 'checkbox']:
+                options = field.get('options') or [browser._get_label_for_element(e) for e in field.get('elements', [])]
+            specs.append({'id': str(i), 'label': field['label'], 'type': field.get('type'), 'options': options})
+        
+        batch = ai.answer_fields_batch(specs, kb._data, all_kb_keys)
+        for i in unresolved:
+            result = batch.get(str(i))
+            if not result: continue
+            answer_key = result['profile_key']
+            if answer_key and form_fields[i].get('type') not in ['radio', 'checkbox']:
+                semantic_cache.add_field_mapping(form_fields[i]['label'], answer_key)
+                answers[i] = kb.get_info(answer_key) or result['answer']
+            else:
+                answers[i] = result['answer']
+
+    for i, final_answer in answers.items():
+        field = form_fields[i]
+        label = field['label']
         if final_answer is not None:
             q_history[label] = final_answer
-            print(f"  ➡️ Determined Answer: '{final_answer}'")
-            
-            if field_type in ['radio', 'checkbox']:
-                if browser.click_choice_button(field['elements'], final_answer):
-                    print(f"✅ Clicked choice '{final_answer}' for '{label}'")
-                    filled_count += 1
-            elif field_type == 'dropdown':
-                browser.select_dropdown_option_by_text(field['element'], final_answer)
-                print(f"✅ Selected '{final_answer}' for '{label}'")
-                filled_count += 1
-            else: # Text, file, etc.
-                if isinstance(final_answer, list): 
-                    final_answer = ", ".join(final_answer)
-                browser.fill_text_input_slowly(field['element'], final_answer)
-                filled_count += 1
-        elif is_required:
+            print(f"  ➡️ Determined Answer for '{label}': '{final_answer}'")
+            assignments.append((field, final_answer))
+        elif field.get('required', False):
             print(f"❌ Warning: No answer found for required field: '{label}'")
 
+    return assignments
+
+def process_page_elements(browser, ai, kb):
+    """Fills every step of the form up to its submit step; returns the number of fields filled."""
+    q_history = history_manager.load_history()
+    
+    # --- NEW: Click "Attach resume" link before processing ---
+    try:
+        attach_link = browser.driver.find_element(By.PARTIAL_LINK_TEXT, "Attach resume")
+        if attach_link.is_displayed():
+            print("Found 'Attach resume' link, clicking to reveal file input.")
+            attach_link.click()
+            browser.readiness.wait_for_dom_quiet()
+    except NoSuchElementException:
+        pass # No link found, continue
+    
+    # Lazy-loaded sections render after a scroll to the bottom
+    browser.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+    browser.readiness.wait_for_page()
+    
+    # Scan, fill and advance step by step; each answer is resolved only once per form
+    outcome = browser.complete_form_steps(
+        lambda fields, answers: answer_fields(fields, browser, ai, kb, q_history))
+    
     history_manager.save_history(q_history)
+    filled_count = sum(step['filled'] for step in outcome['pages'])
+    if outcome['state'] == 'failed':
+        print(f"❌ Form could not be completed: {outcome['error']}")
+    elif not filled_count:
+        print("Could not find any form fields on the page.")
     return filled_count
 
 def handle_alert(browser):
@@ -101,7 +129,8 @@ def main():
         sys.exit("A critical component failed to initialize. Exiting.")
     
     try:
-        job_url = "https://aqueity.applytojob.com/apply/Appyvb1yAu/Jr-SOC-Engineer?source=LinkedIn"
+        # A URL (or file:// path, e.g. multi_page_test.html) can be passed on the command line
+        job_url = sys.argv[1] if len(sys.argv) > 1 else "https://aqueity.applytojob.com/apply/Appyvb1yAu/Jr-SOC-Engineer?source=LinkedIn"
         browser.navigate_to_url(job_url)
         initial_url = browser.driver.current_url
         browser.handle_cookie_banner()
@@ -147,28 +176,7 @@ def main():
         # Enhanced submit button detection and clicking
         print("\n🔍 Looking for submit button...")
         
-        submit_button = None
-        submit_patterns = [
-            "//a[@id='resumator-submit-resume']",  # Specific ID from the error
-            "//button[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'submit application')]",
-            "//a[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'submit application')]",
-            "//*[contains(@class, 'btn') and contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'submit')]",
-            "//input[@type='submit']",
-            "//button[@type='submit']"
-        ]
-        
-        for pattern in submit_patterns:
-            try:
-                elements = browser.driver.find_elements(By.XPATH, pattern)
-                for element in elements:
-                    if element.is_displayed():
-                        submit_button = element
-                        print(f"✅ Found submit button: {element.tag_name} with text: '{element.text}'")
-                        break
-                if submit_button:
-                    break
-            except Exception as e:
-                continue
+        submit_button = browser.find_submit_button()
         
         if submit_button:
             print(f"\n🎯 Attempting to submit application...")
@@ -191,12 +199,12 @@ def main():
                     });
                 """)
                 
-                # Wait a moment for overlays to be removed
-                time.sleep(1)
+                # Wait for overlay removal to settle
+                browser.readiness.wait_for_dom_quiet()
                 
                 # Scroll to submit button and ensure it's visible
                 browser.driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", submit_button)
-                time.sleep(2)
+                browser.readiness.wait_for_element_stable(submit_button)
                 
                 # Try multiple submission methods
                 submission_successful = False
@@ -211,7 +219,7 @@ def main():
                         }
                     """, submit_button)
                     print("✅ Attempted form submission via JavaScript")
-                    time.sleep(3)
+                    browser.readiness.wait_for_page()
                     
                     # Check if URL changed
                     new_url = browser.driver.current_url
@@ -230,7 +238,7 @@ def main():
                             arguments[0].click();
                         """, submit_button)
                         print("✅ Clicked submit button with JavaScript")
-                        time.sleep(3)
+                        browser.readiness.wait_for_page()
                         
                         # Check for URL change again
                         new_url = browser.driver.current_url
@@ -250,7 +258,7 @@ def main():
                             submitButton.dispatchEvent(event);
                         """, submit_button)
                         print("✅ Triggered click event via JavaScript")
-                        time.sleep(3)
+                        browser.readiness.wait_for_page()
                         
                         new_url = browser.driver.current_url
                         if new_url != current_url:
@@ -272,9 +280,11 @@ def main():
                 if url_changed and ('thank' in final_url.lower() or 'success' in final_url.lower() or 'confirm' in final_url.lower()):
                     print("\n🎉 --- APPLICATION SUBMITTED SUCCESSFULLY! ---")
                     print(f"   Final URL: {final_url}")
+                    browser.learn_button()
                 elif success_found:
                     print("\n🎉 --- APPLICATION SUBMITTED SUCCESSFULLY! ---")
                     print("   Success indicators found on page")
+                    browser.learn_button()
                 elif url_changed:
                     print("\n✅ --- APPLICATION LIKELY SUBMITTED ---")
                     print(f"   URL changed from: {current_url}")
@@ -1,23 +1,38 @@
 # src/ai_engine.py (FIXED VERSION - Better Yes/No Handling)
 
+import sys
 import google.generativeai as genai
 from src import config
 import pypdf
 import json
 from datetime import datetime
 
+if config.BACKEND_DIR not in sys.path:
+    sys.path.append(config.BACKEND_DIR)
+from bot.page_resolver import BatchFieldResolver
+from bot.llm_gateway import GatewayModel, shared_gateway
+from bot.llm_cache import profile_version, shared_llm_cache
+
 class AIEngine:
     """Handles all interactions with the AI model, with intelligent context-aware matching and rule-based answering."""
     VERSION = "9.3"  # Fixed yes/no question handling
 
     def __init__(self):
         try:
-            genai.configure(api_key=config.GEMINI_API_KEY)
-            self.model = genai.GenerativeModel('gemini-1.5-flash')
+            if config.LLM_CLIENT == 'rest':
+                if not config.GEMINI_API_KEY:
+                    raise ValueError("GEMINI_API_KEY is not set")
+                self.model = GatewayModel(shared_gateway(config.GEMINI_API_KEY, base_url=config.LLM_BASE_URL,
+                                                         timeout_seconds=config.LLM_TIMEOUT_SECONDS))
+            else:
+                genai.configure(api_key=config.GEMINI_API_KEY)
+                self.model = genai.GenerativeModel('gemini-1.5-flash')
             print(f"AIEngine Version: {self.VERSION} initialized successfully.")
         except Exception as e:
             print(f"Error initializing AI Engine: {e}")
             self.model = None
+        self.batch_resolver = BatchFieldResolver(self.model, shared_llm_cache(config.LLM_CACHE, config.LLM_CACHE_PATH),
+                                                 'gemini-1.5-flash')
 
     def answer_yes_no_question(self, question_label, user_profile):
         """
@@ -87,9 +102,8 @@ class AIEngine:
             print(f"AI Error: Failed to generate or structured work history: {e}")
             return None
 
-    def find_best_match_for_label(self, label_text, knowledge_base_keys):
-        if not self.model: return None
-        
+    def match_label_locally(self, label_text, knowledge_base_keys):
+        """Fuzzy label -> key match without the model; None when nothing matches."""
         def normalize(text): return text.lower().replace("_", "").replace(" ", "")
         normalized_label = normalize(label_text)
         
@@ -97,6 +111,14 @@ class AIEngine:
             if normalized_label in normalize(key) or normalize(key) in normalized_label:
                 print(f"AIEngine: Direct match (fuzzy) for '{label_text}' -> '{key}'")
                 return key
+        return None
+
+    def find_best_match_for_label(self, label_text, knowledge_base_keys):
+        if not self.model: return None
+        
+        local_key = self.match_label_locally(label_text, knowledge_base_keys)
+        if local_key:
+            return local_key
         
         keys_string = ", ".join(knowledge_base_keys)
         prompt = f"""
@@ -223,4 +245,18 @@ class AIEngine:
             return response.text.strip()
         except Exception as e:
             print(f"AI error generating essay: {e}")
-            return None
\ No newline at end of file
+            return None
+
+    def answer_fields_batch(self, fields, user_profile, knowledge_base_keys=None):
+        """
+        Answers every field of one form page in a single model call.
+        fields: dicts with 'id', 'label', 'type' and optional 'options'.
+        Returns {id: {'answer': ..., 'profile_key': ...}}; choice answers are always one of the
+        field's options and profile_key (when the answer comes straight from the profile)
+        one of knowledge_base_keys. Questions answered before for this profile come from the cache.
+        """
+        if not fields: return {}
+        print(f"AI is answering {len(fields)} field(s) of this page in one request")
+        profile_string = json.dumps(user_profile, indent=2)
+        return self.batch_resolver.resolve(fields, f"```json\n{profile_string}\n```", knowledge_base_keys,
+                                           profile_version=profile_version(user_profile))
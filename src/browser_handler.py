@@ -1,8 +1,6 @@
 # src/browser_handler.py (FIXED VERSION - Better Checkbox Handling)
 
-import time
-import random
-import os
+import sys
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service as ChromeService
 from webdriver_manager.chrome import ChromeDriverManager
@@ -10,17 +8,28 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import Select
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from src import config
+
+if config.BACKEND_DIR not in sys.path:
+    sys.path.append(config.BACKEND_DIR)
+from bot.page_scripts import take_form_snapshot, fill_values
+from bot.page_readiness import PageReadiness
+from bot.button_classifier import ButtonClassifier
+from bot.multi_page_engine import MultiPageEngine
 
 class BrowserHandler:
     """Manages all Selenium WebDriver interactions."""
     VERSION = "18.1" # Fixed checkbox grouping version
 
     def __init__(self):
+        self.button_classifier = ButtonClassifier(config.BUTTON_OVERRIDES_PATH)
+        self.last_button = None
         options = webdriver.ChromeOptions()
         try:
             self.driver = webdriver.Chrome(service=ChromeService(ChromeDriverManager().install()), options=options)
             self.driver.maximize_window()
             self.wait = WebDriverWait(self.driver, 10)
+            self.readiness = PageReadiness(self.driver)
             print(f"BrowserHandler Version: {self.VERSION} initialized successfully.")
         except Exception as e: 
             print(f"Error initializing WebDriver: {e}")
@@ -29,7 +38,7 @@ class BrowserHandler:
         return []
 
     def handle_cookie_banner(self):
-        time.sleep(1)
+        self.readiness.wait_for_dom_quiet()
         try:
             allow_keywords = ['allow', 'accept', 'ok', 'agree']
             xpath = " | ".join([f"//button[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), '{key}')]" for key in allow_keywords])
@@ -38,7 +47,7 @@ class BrowserHandler:
                 if button.is_displayed() and button.is_enabled():
                     print("Found and clicked cookie consent button.")
                     button.click()
-                    time.sleep(1)
+                    self.readiness.wait_for_dom_quiet()
                     return True
         except Exception:
             return False
@@ -47,61 +56,30 @@ class BrowserHandler:
         if self.driver:
             print(f"Navigating to: {url}")
             self.driver.get(url)
+            self.readiness.for_url(url)
+            self.readiness.wait_for_page()
 
-    def find_navigation_button(self, keywords):
-        """Enhanced button finding that handles various button types and formats."""
+    def find_navigation_button(self, kind, fallback_kinds=None):
+        """Returns the best-ranked 'submit' / 'next' / 'apply' button from one injected classifier pass.
+        Buttons learned for this site (see learn_button) are preferred over heuristic scores."""
         if not self.driver: return None
-        
-        for keyword in keywords:
-            # Method 1: Look for buttons with text containing the keyword
-            xpath_patterns = [
-                # Standard button elements
-                f"//button[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), '{keyword.lower()}')]",
-                # Input buttons
-                f"//input[@type='button' and contains(translate(@value, 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), '{keyword.lower()}')]",
-                f"//input[@type='submit' and contains(translate(@value, 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), '{keyword.lower()}')]",
-                # Div or span elements that act as buttons
-                f"//div[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), '{keyword.lower()}') and (contains(@class, 'btn') or contains(@class, 'button') or contains(@onclick, 'submit') or contains(@role, 'button'))]",
-                # Links that act as buttons (but not href="#")
-                f"//a[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), '{keyword.lower()}') and not(@href='#')]",
-                # Any element with role="button"
-                f"//*[@role='button' and contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), '{keyword.lower()}')]",
-                # Look for elements with specific classes that might be buttons
-                f"//*[contains(@class, 'submit') and contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), '{keyword.lower()}')]"
-            ]
-            
-            for xpath in xpath_patterns:
-                try:
-                    elements = self.driver.find_elements(By.XPATH, xpath)
-                    for element in elements:
-                        if element.is_displayed() and element.is_enabled():
-                            print(f"Found {keyword} button: {element.tag_name} with text: '{element.text}' and class: '{element.get_attribute('class')}'")
-                            return element
-                except Exception as e:
-                    print(f"Error in xpath pattern {xpath}: {e}")
-                    continue
-        
-        # If no button found with keywords, try a broader search for submit-type elements
-        print(f"No button found with keywords {keywords}. Trying broader search...")
         try:
-            # Look for any submit inputs or buttons
-            submit_elements = self.driver.find_elements(By.XPATH, 
-                "//input[@type='submit'] | //button[@type='submit'] | //*[contains(@class, 'submit')] | //*[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'submit application')]")
-            
-            for element in submit_elements:
-                if element.is_displayed() and element.is_enabled():
-                    print(f"Found submit element via broader search: {element.tag_name} with text: '{element.text}'")
-                    return element
+            candidate = self.button_classifier.best(self.driver, kind, fallback_kinds=fallback_kinds)
         except Exception as e:
-            print(f"Error in broader search: {e}")
-        
-        return None
+            print(f"Error classifying buttons: {e}")
+            return None
+        self.last_button = candidate
+        return candidate['element'] if candidate else None
+
+    def learn_button(self):
+        """Remembers the last button found as the right one for this site."""
+        self.button_classifier.learn_from(self.last_button)
 
     def find_next_button(self): 
-        return self.find_navigation_button(['next', 'continue'])
+        return self.find_navigation_button('next')
     
     def find_submit_button(self): 
-        return self.find_navigation_button(['submit', 'apply', 'finish', 'send'])
+        return self.find_navigation_button('submit', ['apply'])
 
     def find_success_indicators(self):
         """Looks for keywords on the page that indicate a successful submission."""
@@ -120,114 +98,54 @@ class BrowserHandler:
     def get_form_elements_fully(self):
         if not self.driver: return []
         self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(1)
+        # Lazy-loaded sections render after the scroll
+        self.readiness.wait_for_page()
         return self._extract_form_elements()
 
     def _extract_form_elements(self):
-        """Improved parser that properly groups checkboxes and radio buttons by their question."""
-        form_fields = []
-        all_inputs = self.driver.find_elements(By.CSS_SELECTOR, "input, textarea, select")
-        choice_groups = {}
-        processed_elements = set()
-        
-        for element in all_inputs:
-            if not element.is_displayed() or element in processed_elements: 
-                continue
-            
-            field_type = element.get_attribute('type')
-            
-            if field_type in ['radio', 'checkbox']:
-                # Find the question label for this choice group
-                question_label = self._find_question_for_choice(element)
-                
-                if question_label:
-                    # Group by question instead of name attribute
-                    group_key = question_label
-                    
-                    if group_key not in choice_groups:
-                        choice_groups[group_key] = {
-                            'label': question_label, 
-                            'elements': [], 
-                            'type': field_type, 
-                            'required': self._is_choice_group_required(element)
-                        }
-                    
-                    choice_groups[group_key]['elements'].append(element)
-                    processed_elements.add(element)
-                else:
-                    # Fallback: treat as individual field if no question found
-                    field = self._parse_element_details(element)
-                    if field: form_fields.append(field)
-                    processed_elements.add(element)
-            else:
-                field = self._parse_element_details(element)
-                if field: form_fields.append(field)
-                processed_elements.add(element)
+        """Single-round-trip parser: one injected script resolves labels, options and
+        radio/checkbox groups for every visible control on the page."""
+        snapshot = take_form_snapshot(self.driver)
+        return [field for field in map(self.legacy_field, snapshot['fields']) if field]
+
+    @staticmethod
+    def legacy_field(field):
+        """Maps a snapshot entry to the field shape the rest of the bot expects (None if unusable)."""
+        if not field.get('element') or not field.get('label'):
+            return None
         
-        # Add grouped choices to form fields
-        form_fields.extend(choice_groups.values())
-        return form_fields
-
-    def _find_question_for_choice(self, element):
-        """
-        Find the actual question text for a checkbox/radio button.
-        This looks for nearby text that looks like a question.
-        """
-        try:
-            # Method 1: Look for question text in parent containers
-            current = element
-            for _ in range(5):  # Go up to 5 levels
-                current = current.find_element(By.XPATH, "./..")
-                # Look for text that ends with '?' or contains 'sponsorship', 'visa', etc.
-                text_elements = current.find_elements(By.XPATH, ".//*[contains(text(), '?') or contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'sponsorship') or contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'visa') or contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'require')]")
-                
-                for text_elem in text_elements:
-                    text = text_elem.text.strip()
-                    if text and len(text) > 10:  # Reasonable question length
-                        return text
-                        
-        except Exception:
-            pass
-            
-        try:
-            # Method 2: Look for preceding text elements
-            preceding_elements = self.driver.find_elements(By.XPATH, f"//input[@type='{element.get_attribute('type')}' and @value='{element.get_attribute('value')}']/preceding::*[contains(text(), '?')][1]")
-            if preceding_elements:
-                return preceding_elements[0].text.strip()
-        except Exception:
-            pass
-            
-        return None
-
-    def _is_choice_group_required(self, element):
-        """Check if the choice group is required by looking for required indicators."""
-        try:
-            # Look for asterisk (*) or 'required' in nearby elements
-            parent = element.find_element(By.XPATH, "./ancestor::div[1]")
-            return '*' in parent.text or 'required' in parent.get_attribute('class').lower()
-        except:
-            return element.get_attribute('required') is not None
-
-    def _parse_element_details(self, element):
-        label = self._get_label_for_element(element)
-        if not label: return None
-        is_required = element.get_attribute('required') is not None
-        if '*' in label: is_required = True
+        field_data = {'label': field['label'], 'required': field['required'], 'locator': field['locator'],
+                      'name': field.get('name')}
         
-        tag = element.tag_name
-        field_type = element.get_attribute('type')
-        field_data = {'label': label.replace('*', '').strip(), 'element': element, 'required': is_required}
-
-        if tag == 'select':
-            field_data['type'] = 'dropdown'
-            field_data['options'] = [opt.text for opt in Select(element).options if opt.text and '--' not in opt.text]
-        elif tag == 'textarea': 
-            field_data['type'] = 'textarea'
-        else: 
-            field_data['type'] = field_type
+        if field.get('elements'):
+            # Choice group - grouped by question in-page
+            field_data.update({'type': field['type'], 'elements': field['elements'], 'options': field['options']})
+        elif field['type'] in ['radio', 'checkbox']:
+            # Lone checkbox - keep the group shape click_choice_button expects
+            field_data.update({'type': field['type'], 'elements': [field['element']], 'options': [field['label']]})
+        elif field['tag'] == 'select':
+            field_data.update({'type': 'dropdown', 'element': field['element'], 'options': field['options']})
+        elif field['tag'] == 'textarea':
+            field_data.update({'type': 'textarea', 'element': field['element']})
+        else:
+            field_data.update({'type': field['type'], 'element': field['element']})
         
         return field_data
 
+    def complete_form_steps(self, answer_step, max_pages=15):
+        """Fills a (possibly multi-step) form up to its submit step.
+        answer_step(fields, answers) returns (field, value) pairs for the step's new fields;
+        answers given on earlier steps are carried forward. Returns the engine's outcome."""
+        engine = MultiPageEngine(self.driver, self.readiness, classifier=self.button_classifier,
+                                 pacing_seconds=config.FILL_PACING_SECONDS, max_pages=max_pages)
+        def answer(step):
+            fields = [field for field in map(self.legacy_field, step['pending']) if field]
+            return answer_step(fields, step['answers'])
+        outcome = engine.run(answer)
+        if outcome['submit_button']:
+            self.last_button = outcome['submit_button']
+        return outcome
+
     def _get_label_for_element(self, element, is_group=False):
         # Try to find an associated <label> tag first
         try:
@@ -254,24 +172,28 @@ class BrowserHandler:
         # Final fallback
         return element.get_attribute('placeholder') or element.get_attribute('name') or element.get_attribute('value') or ""
     
-    def fill_text_input_slowly(self, element, text):
-        if not element: return
+    def fill_fields(self, assignments, pacing_seconds=None):
+        """Fills every (field, value) pair on the page in one script call.
+        Text is set through the native value setter with input/change/blur events;
+        pacing_seconds spreads the whole page over a human-looking time budget."""
+        if not assignments: return []
+        if pacing_seconds is None:
+            pacing_seconds = config.FILL_PACING_SECONDS
         try:
-            field_type = element.get_attribute('type')
-            if field_type == 'file':
-                if text and os.path.exists(str(text)):
-                    element.send_keys(str(text))
-                    print(f"✅ Uploaded file: {text}")
-                else: 
-                    print(f"⚠️ Warning: File path not found or invalid: {text}")
+            results = fill_values(self.driver, assignments, pacing_seconds)
+        except Exception as e:
+            print(f"❌ Error filling fields: {e}")
+            return [False for _ in assignments]
+        for (field, value), result in zip(assignments, results):
+            if result.get('filled'):
+                print(f"✅ Filled '{field.get('label', '')}' with: {value}")
             else:
-                element.clear()
-                for char in str(text):
-                    element.send_keys(char)
-                    time.sleep(random.uniform(0.05, 0.1))
-                print(f"✅ Filled text field with: {text}")
-        except Exception as e: 
-            print(f"❌ Error filling input: {e}")
+                print(f"❌ Could not fill '{field.get('label', '')}': {result.get('reason')}")
+        return [result.get('filled', False) for result in results]
+
+    def fill_text_input_slowly(self, element, text):
+        if not element: return
+        self.fill_fields([({'element': element}, text)])
 
     def select_dropdown_option_by_text(self, element, text):
         if element:
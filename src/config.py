@@ -6,12 +6,28 @@ load_dotenv()
 
 # --- Gemini API Configuration ---
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+# "rest": async gateway with timeouts, retries, hedging and a circuit breaker
+# (backend/bot/llm_gateway.py); "sdk": the blocking google-generativeai client
+LLM_CLIENT = os.getenv("LLM_CLIENT", "rest").lower()
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://generativelanguage.googleapis.com/v1beta")
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "20"))
 
 # --- File Path Configurations ---
 # The os.path.join ensures compatibility across different operating systems
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 PROFILE_JSON_PATH = os.path.join(BASE_DIR, 'data', 'profile.json')
+# Submit/next button locators learned per site
+BUTTON_OVERRIDES_PATH = os.path.join(BASE_DIR, 'data', 'button_overrides.json')
+# Backend package root - shared page scripts and browser helpers live under backend/bot
+BACKEND_DIR = os.path.join(BASE_DIR, 'backend')
+# Answers to page batches, per question and profile version ("sqlite" or "off")
+LLM_CACHE = os.getenv("LLM_CACHE", "sqlite").lower()
+LLM_CACHE_PATH = os.path.join(BASE_DIR, 'data', 'llm_cache.sqlite3')
 
 # --- Browser/Selenium Configurations ---
 # Set to True to run the browser in the background without a UI
-HEADLESS_MODE = False
\ No newline at end of file
+HEADLESS_MODE = False
+
+# --- Form Filling ---
+# Total seconds to spread a page's typing over ("human pacing"); 0 fills instantly
+FILL_PACING_SECONDS = float(os.getenv("FILL_PACING_SECONDS", "0"))